@@ -1,17 +1,59 @@
 """
 Основное Flask приложение для универсального конвертера данных
 """
-from flask import Flask, render_template, request, jsonify, send_file, flash
+from flask import (Flask, Response, render_template, request, jsonify, send_file, flash,
+                   stream_with_context, make_response, url_for, send_from_directory, g)
+import itertools
 import os
 import io
+import json
 import tempfile
 import logging
 from werkzeug.utils import secure_filename
+from werkzeug.middleware.proxy_fix import ProxyFix
 from converters.engine import ConversionEngine, ConversionError
+from converters.base import PRETTY, check_profile
+from converters.schema import SchemaStore
+from converters.incremental import IncrementalStateError
+from converters.workers import WorkerPool
+from converters.admission import AdmissionController, AdmissionRejected
+from converters.profiling import Profiler, ProfilingMiddleware, TOKEN_HEADER
+from converters.results import ResultStore
+from converters.limits import LimitExceeded
+from assets import StaticAssets
+from converters.compression import (RequestDecompressionMiddleware, open_decompressed, WIRE_LENGTH_KEY,
+                                    split_extension, ensure_supported, iter_compress,
+                                    iter_chunks, FILE_SUFFIXES, MIME_TYPES)
 
 app = Flask(__name__)
 app.secret_key = 'universal-data-converter-secret-key'
 app.config['MAX_CONTENT_LENGTH'] = 10 * 1024 * 1024  # 10MB максимум
+app.config['SCHEMA_FOLDER'] = os.environ.get(
+    'SCHEMA_FOLDER', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schemas'))
+app.config['RESULT_FOLDER'] = os.environ.get(
+    'RESULT_FOLDER', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results'))
+
+# Тела запросов с Content-Encoding: gzip (и zstd, bzip2, xz) распаковываются потоком
+app.wsgi_app = RequestDecompressionMiddleware(app.wsgi_app)
+
+# За доверенными прокси (TRUSTED_PROXY_HOPS - их число) адрес клиента
+# берется из X-Forwarded-For; без прокси заголовку не доверяем
+TRUSTED_PROXY_HOPS = int(os.environ.get('TRUSTED_PROXY_HOPS', '0'))
+if TRUSTED_PROXY_HOPS > 0:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_HOPS)
+
+# Профилирование выбранных запросов (PROFILE_TOKEN, PROFILE_SAMPLE_RATE, PROFILE_LATENCY_MS);
+# профили пишутся в PROFILE_DIR, по умолчанию во временный каталог системы
+profiler = Profiler.from_env()
+app.wsgi_app = ProfilingMiddleware(app.wsgi_app, profiler)
+
+# Статические файлы по адресам с хэшем содержимого
+static_assets = StaticAssets(app.static_folder)
+
+@app.context_processor
+def inject_asset_url():
+    """asset_url('js/main.js') в шаблонах - адрес файла с хэшем"""
+    return {'asset_url': lambda filename: url_for('asset', filename=static_assets.url_name(filename))}
 
 # Настройка логирования
 logging.basicConfig(level=logging.DEBUG)
@@ -20,14 +62,134 @@ logger = logging.getLogger(__name__)
 # Инициализируем движок конвертации
 converter_engine = ConversionEngine()
 
+# Полные конвертации можно выполнять в пуле процессов (CONVERSION_WORKERS=N);
+# данные передаются процессам через разделяемую память
+CONVERSION_WORKERS = int(os.environ.get('CONVERSION_WORKERS', '0'))
+worker_pool = WorkerPool(CONVERSION_WORKERS) if CONVERSION_WORKERS > 0 else None
+
+# Допуск запросов к конвертации: лимиты клиентов и справедливая очередь
+admission = AdmissionController(max_concurrent=CONVERSION_WORKERS or None)
+
 # Поддерживаемые расширения файлов
-ALLOWED_EXTENSIONS = {'json', 'xml', 'csv', 'yaml', 'yml', 'toml', 'txt'}
+ALLOWED_EXTENSIONS = {'json', 'jsonl', 'ndjson', 'xml', 'csv', 'yaml', 'yml', 'toml', 'xlsx',
+                      'db', 'sqlite', 'sqlite3', 'txt'}
+
+# Ограничения предпросмотра по умолчанию (preview=1)
+PREVIEW_RECORDS = 1000
+PREVIEW_BYTES = 256 * 1024
 
 def allowed_file(filename):
-    """Проверяет разрешенные расширения файлов"""
+    """Проверяет разрешенные расширения файлов (в том числе сжатых: data.csv.gz)"""
+    filename = split_extension(filename)[0]
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def compressed_response(chunks, compression, filename):
+    """Ответ со сжатым на лету результатом в виде файла"""
+    return Response(
+        iter_compress(chunks, compression),
+        mimetype=MIME_TYPES[compression],
+        headers={'Content-Disposition': f'attachment; filename="{filename}{FILE_SUFFIXES[compression]}"'}
+    )
+
+def wants_raw_body(mime_type):
+    """
+    Результат отдается телом ответа, а не строкой внутри JSON:
+    по параметру raw=1 или если клиент через Accept предпочитает MIME тип
+    целевого формата JSON обертке
+    """
+    if request.values.get('raw') in ('1', 'true'):
+        return True
+    accept = request.accept_mimetypes
+    return (mime_type != 'application/json' and
+            accept[mime_type] > accept['application/json'])
+
+def is_binary(format_name):
+    """Результат в формате - байты (xlsx): он всегда отдается телом ответа"""
+    return converter_engine.get_converter(format_name).binary
+
+def raw_response(chunks, mime_type, attachment=None, **metadata):
+    """
+    Ответ с результатом в теле; метаданные передаются заголовками X-*.
+    
+    Первый фрагмент вычисляется сразу, чтобы ошибка сериализации стала
+    ответом 400, а не оборванным потоком. Двоичный результат отдается
+    вложением с именем attachment и без кодировки в Content-Type.
+    """
+    chunks = iter(chunks)
+    first = next(chunks, '')
+    headers = {'X-' + '-'.join(part.capitalize() for part in name.split('_')): str(value)
+               for name, value in metadata.items() if value is not None}
+    if attachment:
+        headers['Content-Disposition'] = f'attachment; filename="{attachment}"'
+        content_type = mime_type
+    else:
+        content_type = f'{mime_type}; charset=utf-8'
+    return Response(stream_with_context(itertools.chain([first], chunks)),
+                    content_type=content_type, headers=headers)
+
+def binary_attachment(format_name):
+    """Имя файла для двоичного результата или None для текстового"""
+    if is_binary(format_name):
+        return f'converted{converter_engine.get_file_extension(format_name)}'
+    return None
+
+def get_result_store():
+    """Хранилище полных результатов для веб-интерфейса"""
+    return ResultStore(app.config['RESULT_FOLDER'])
+
+def stored_response(chunks, source_format, target_format, truncated=False):
+    """
+    Сохраняет результат на сервере и возвращает его адрес вместо содержимого.
+    
+    Страница читает результат по адресу потоком и скачивает по ссылке.
+    """
+    meta = get_result_store().save(chunks, format=target_format)
+    return jsonify({
+        'success': True,
+        'result_id': meta['id'],
+        'result_url': url_for('api_result', result_id=meta['id']),
+        'size': meta['size'],
+        'lines': meta['lines'],
+        'binary': is_binary(target_format),
+        'source_format': source_format,
+        'target_format': target_format,
+        'truncated': truncated
+    })
+
+def get_schema_store():
+    """Хранилище сохраненных JSON схем"""
+    return SchemaStore(app.config['SCHEMA_FOLDER'])
+
+def get_request_schema():
+    """Схема из запроса: переданная текстом в поле schema или сохраненная (schema_name)"""
+    schema_text = request.form.get('schema')
+    if schema_text:
+        try:
+            return json.loads(schema_text)
+        except json.JSONDecodeError as e:
+            raise ConversionError(f"Некорректная JSON схема: {str(e)}")
+    schema_name = request.form.get('schema_name')
+    if schema_name:
+        return get_schema_store().load(schema_name)
+    return None
+
+def get_request_pipeline():
+    """Конвейер обработки записей из поля pipeline (JSON список шагов)"""
+    pipeline_text = request.form.get('pipeline')
+    if not pipeline_text:
+        return None
+    try:
+        return json.loads(pipeline_text)
+    except json.JSONDecodeError as e:
+        raise ConversionError(f"Некорректное описание конвейера: {str(e)}")
+
+def get_request_data():
+    """Данные запроса: загруженный файл или текст из поля text_data"""
+    if 'file' in request.files and request.files['file'].filename:
+        return open_decompressed(request.files['file'].stream)
+    return request.form.get('text_data') or None
+
 @app.route('/')
 def index():
     """Главная страница"""
@@ -37,11 +199,92 @@ def index():
 @app.route('/favicon.ico')
 def favicon():
     """Favicon"""
-    return send_file('static/images/favicon.ico', mimetype='image/vnd.microsoft.icon')
+    return send_file('static/images/favicon.ico', mimetype='image/vnd.microsoft.icon',
+                     max_age=86400)
+
+@app.route('/assets/<path:filename>')
+def asset(filename):
+    """Статический файл по адресу с хэшем"""
+    return static_assets.response(filename)
+
+def get_client_id():
+    """
+    Клиент для лимитов - адрес подключения (за доверенными прокси - из
+    X-Forwarded-For). Заголовкам, которые клиент выбирает сам, не доверяем:
+    иначе лимиты обходятся сменой заголовка.
+    """
+    return request.remote_addr or 'anonymous'
+
+def get_request_size():
+    """
+    Размер тела запроса для бюджета клиента, без чтения тела.
+    
+    У сжатого тела Content-Length удаляется при распаковке - берется длина
+    сжатых данных; если длина неизвестна (chunked), учитывается наибольший
+    допустимый размер.
+    """
+    length = request.content_length or request.environ.get(WIRE_LENGTH_KEY)
+    if length is not None:
+        return int(length)
+    return app.config['MAX_CONTENT_LENGTH'] if request.method == 'POST' else 0
+
+def admission_formats():
+    """
+    Форматы для оценки стоимости до чтения тела: из параметров адреса
+    (?source_format=...&target_format=...), форма к этому моменту не прочитана
+    """
+    return (request.args.get('source_format') or 'auto',
+            request.args.get('target_format') or '')
+
+def note_formats(source_format, target_format):
+    """Уточняет оценку допуска, когда исходный формат определен"""
+    ticket = g.get('admission_ticket')
+    if ticket is not None:
+        ticket.set_formats(source_format, target_format)
 
 @app.route('/api/convert', methods=['POST'])
 def api_convert():
     """API endpoint для конвертации данных"""
+    # Допуск - до чтения формы: отклоненный запрос не буферизует тело
+    try:
+        ticket = admission.acquire(get_client_id(), get_request_size(), *admission_formats())
+    except AdmissionRejected as e:
+        logger.warning(f"Запрос отклонен: {str(e)}")
+        response = jsonify({'error': str(e), 'retry_after': e.retry_after})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 429
+    
+    g.admission_ticket = ticket
+    try:
+        response = make_response(run_conversion())
+    except BaseException:
+        ticket.release()
+        raise
+    if response.is_streamed:
+        # Потоковый результат сериализуется во время отправки - место
+        # освобождается, когда тело отправлено или соединение закрыто
+        response.response = release_after(response.response, ticket)
+        response.call_on_close(ticket.release)
+    else:
+        ticket.release()
+        if response.status_code == 200:
+            # Повторный запрос с тем же результатом получает 304 без тела
+            response.add_etag()
+            etag = response.get_etag()[0]
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+                response.set_etag(etag)
+    return response
+
+def release_after(chunks, ticket):
+    """Фрагменты ответа; по их окончании освобождается место в очереди"""
+    try:
+        yield from chunks
+    finally:
+        ticket.release()
+
+def run_conversion():
+    """Конвертация данных запроса"""
     try:
         logger.debug(f"Получен запрос на конвертацию: {request.form}")
         logger.debug(f"Файлы в запросе: {request.files}")
@@ -56,6 +299,21 @@ def api_convert():
             logger.error("Целевой формат не указан")
             return jsonify({'error': 'Не указан целевой формат'}), 400
         
+        # Оформление результата: pretty, compact или canonical
+        profile = check_profile(request.form.get('profile') or PRETTY)
+        
+        # Инкрементальный режим: клиент присылает хэш прошлой версии и правки
+        preview_records = request.form.get('preview_records', type=int)
+        # Двоичный результат не показывается на странице: флаг preview к нему
+        # не применяется, явные preview_records и preview_bytes - применяются
+        show_preview = request.form.get('preview') in ('1', 'true') and not is_binary(target_format)
+        if show_preview:
+            preview_records = preview_records or PREVIEW_RECORDS
+        base_hash = request.form.get('base_hash')
+        if base_hash:
+            return convert_incremental(base_hash, target_format, preview_records, profile)
+        raw = is_binary(target_format) or wants_raw_body(converter_engine.get_mime_type(target_format))
+        
         # Получаем данные - либо из файла, либо из текста
         if 'file' in request.files and request.files['file'].filename:
             file = request.files['file']
@@ -66,7 +324,8 @@ def api_convert():
                 return jsonify({'error': 'Неподдерживаемый тип файла'}), 400
             
             filename = secure_filename(file.filename)
-            data = file.stream
+            # Сжатые файлы распаковываются по мере чтения парсером
+            data = open_decompressed(file.stream)
             logger.debug(f"Обработка файла: {filename}")
         else:
             text_data = request.form.get('text_data')
@@ -85,29 +344,96 @@ def api_convert():
             file_size = request.content_length or 0
             use_streaming = file_size > 5 * 1024 * 1024  # 5MB threshold
         
-        # Выполняем конвертацию
-        logger.debug(f"Начинаем конвертацию с параметрами: streaming={use_streaming}")
-        result = converter_engine.convert(data, source_format, target_format, filename, stream=use_streaming)
+        # Текст, который пользователь будет править: запоминаем разбор
+        if (filename is None and request.form.get('incremental') in ('1', 'true')
+                and not request.form.get('pipeline')):
+            result, digest, detected_format, truncated = converter_engine.convert_tracked(
+                data, source_format, target_format, max_records=preview_records, profile=profile)
+            note_formats(detected_format, target_format)
+            if raw:
+                return raw_response(iter_chunks(result), converter_engine.get_mime_type(target_format),
+                                    attachment=binary_attachment(target_format),
+                                    source_format=detected_format, target_format=target_format,
+                                    truncated=str(truncated).lower(), content_hash=digest)
+            return jsonify({
+                'success': True,
+                'result': result,
+                'source_format': detected_format,
+                'target_format': target_format,
+                'truncated': truncated,
+                'content_hash': digest
+            })
         
-        # Определяем исходный формат, если нужно
+        # Определяем исходный формат один раз, до конвертации
         if source_format == 'auto':
-            # Для автоопределения нужно сбросить указатель потока, если это файл
-            if hasattr(data, 'seek'):
-                data.seek(0)
             detected_format = converter_engine.detect_format(data, filename)
-            if hasattr(data, 'seek'):
-                data.seek(0)  # Сбрасываем для повторного чтения
         else:
             detected_format = source_format
+        note_formats(detected_format, target_format)
+        
+        # Режим предпросмотра: конвертируем только начало данных
+        preview_bytes = request.form.get('preview_bytes', type=int)
+        if show_preview:
+            preview_bytes = preview_bytes or PREVIEW_BYTES
+        
+        # store=1: результат сохраняется на сервере, в ответе - его адрес
+        store = request.form.get('store') in ('1', 'true')
+        
+        # Сжатие результата проверяем до конвертации
+        compression = request.form.get('compress')
+        if compression:
+            ensure_supported(compression)
+        
+        # Выполняем конвертацию
+        logger.debug(f"Начинаем конвертацию с параметрами: streaming={use_streaming}")
+        pipeline = get_request_pipeline()
+        # Параметры чтения исходного формата: лист книги xlsx, таблица
+        # или запрос SELECT к базе SQLite
+        options = {name: request.form.get(name) for name in ('sheet', 'table', 'query')}
+        truncated = False
+        if preview_records or preview_bytes:
+            result, truncated = converter_engine.convert_preview(
+                data, detected_format, target_format, filename,
+                max_records=preview_records, max_bytes=preview_bytes, pipeline=pipeline,
+                profile=profile, options=options)
+            chunks = iter_chunks(result)
+        elif compression or raw or store:
+            # Результат отдается частями по мере сериализации, не собираясь в строку
+            detected_format, chunks = converter_engine.convert_stream(
+                data, detected_format, target_format, filename, pipeline=pipeline, profile=profile,
+                options=options)
+        elif worker_pool is not None and not is_binary(detected_format):
+            # Пул передает данные текстом UTF-8 - двоичные форматы конвертируются здесь
+            result = worker_pool.convert(data, detected_format, target_format, filename,
+                                         pipeline=pipeline, profile=profile, options=options)
+        else:
+            result = converter_engine.convert(data, detected_format, target_format, filename,
+                                              stream=use_streaming, pipeline=pipeline,
+                                              profile=profile, options=options)
         logger.debug(f"Конвертация успешна: {detected_format} -> {target_format}")
         
+        if store:
+            return stored_response(chunks, detected_format, target_format, truncated)
+        if compression:
+            return compressed_response(chunks, compression,
+                                       f'converted{converter_engine.get_file_extension(target_format)}')
+        if raw:
+            return raw_response(chunks, converter_engine.get_mime_type(target_format),
+                                attachment=binary_attachment(target_format),
+                                source_format=detected_format, target_format=target_format,
+                                truncated=str(truncated).lower())
+        
         return jsonify({
             'success': True,
             'result': result,
             'source_format': detected_format,
-            'target_format': target_format
+            'target_format': target_format,
+            'truncated': truncated
         })
         
+    except LimitExceeded as e:
+        logger.warning(f"Превышено ограничение конвертации ({e.limit}): {str(e)}")
+        return jsonify({'error': str(e), 'limit': e.limit}), 422
     except ConversionError as e:
         logger.error(f"Ошибка конвертации: {str(e)}")
         return jsonify({'error': str(e)}), 400
@@ -115,6 +441,39 @@ def api_convert():
         logger.error(f"Внутренняя ошибка сервера: {str(e)}")
         return jsonify({'error': f'Внутренняя ошибка сервера: {str(e)}'}), 500
 
+def convert_incremental(base_hash, target_format, preview_records, profile=PRETTY):
+    """Повторная конвертация по правкам относительно ранее присланного текста"""
+    try:
+        edits = json.loads(request.form.get('diff', '[]'))
+    except json.JSONDecodeError:
+        return jsonify({'error': 'Некорректный формат правок'}), 400
+    if not isinstance(edits, list):
+        return jsonify({'error': 'Некорректный формат правок'}), 400
+    
+    try:
+        result, digest, source_format, truncated = converter_engine.convert_incremental(
+            base_hash, edits, target_format,
+            content_length=request.form.get('content_length', type=int),
+            max_records=preview_records, profile=profile)
+    except IncrementalStateError as e:
+        # Клиент должен повторить запрос с полным текстом
+        return jsonify({'error': str(e), 'code': 'base_missing'}), 409
+    note_formats(source_format, target_format)
+    
+    if is_binary(target_format) or wants_raw_body(converter_engine.get_mime_type(target_format)):
+        return raw_response(iter_chunks(result), converter_engine.get_mime_type(target_format),
+                            attachment=binary_attachment(target_format),
+                            source_format=source_format, target_format=target_format,
+                            truncated=str(truncated).lower(), content_hash=digest)
+    return jsonify({
+        'success': True,
+        'result': result,
+        'source_format': source_format,
+        'target_format': target_format,
+        'truncated': truncated,
+        'content_hash': digest
+    })
+
 @app.route('/api/validate', methods=['POST'])
 def api_validate():
     """API endpoint для валидации данных"""
@@ -124,26 +483,66 @@ def api_validate():
             return jsonify({'error': 'Не указан формат для валидации'}), 400
         
         # Получаем данные
-        if 'file' in request.files and request.files['file'].filename:
-            file = request.files['file']
-            data = file.stream
-        else:
-            text_data = request.form.get('text_data')
-            if not text_data:
-                return jsonify({'error': 'Не предоставлены данные для валидации'}), 400
-            data = text_data
+        data = get_request_data()
+        if data is None:
+            return jsonify({'error': 'Не предоставлены данные для валидации'}), 400
         
-        # Валидируем
-        is_valid = converter_engine.validate_data(data, format_name)
+        # Проверка по схеме выполняется за тот же потоковый проход, что и разбор
+        schema = get_request_schema()
+        if schema is not None:
+            max_errors = request.form.get('max_errors', 100, type=int)
+            report = converter_engine.validate_schema(data, format_name, schema, max_errors)
+            report['format'] = format_name
+            return jsonify(report)
         
-        return jsonify({
-            'valid': is_valid,
+        # Синтаксис проверяется сканером формата без построения документа
+        error = converter_engine.check_syntax(data, format_name)
+        
+        result = {
+            'valid': error is None,
             'format': format_name
-        })
+        }
+        if error is not None:
+            result['syntax_error'] = error
+        return jsonify(result)
         
+    except ConversionError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Ошибка валидации: {str(e)}'}), 500
 
+@app.route('/api/schema/infer', methods=['POST'])
+def api_schema_infer():
+    """API endpoint для вывода JSON схемы по образцу данных"""
+    try:
+        format_name = request.form.get('format')
+        if not format_name:
+            return jsonify({'error': 'Не указан формат данных'}), 400
+        
+        data = get_request_data()
+        if data is None:
+            return jsonify({'error': 'Не предоставлены данные для анализа'}), 400
+        
+        sample_size = request.form.get('sample_size', 1000, type=int)
+        schema = converter_engine.infer_schema(data, format_name, sample_size)
+        
+        # По желанию сохраняем схему для последующих проверок
+        save_as = request.form.get('save_as')
+        if save_as:
+            get_schema_store().save(save_as, schema)
+        
+        return jsonify({'schema': schema, 'format': format_name})
+        
+    except ConversionError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Ошибка вывода схемы: {str(e)}'}), 500
+
+@app.route('/api/schemas')
+def api_schemas():
+    """API endpoint для получения списка сохраненных схем"""
+    return jsonify({'schemas': get_schema_store().names()})
+
 @app.route('/api/download', methods=['POST'])
 def api_download():
     """API endpoint для скачивания конвертированного файла"""
@@ -162,6 +561,15 @@ def api_download():
         
         logger.debug(f"Creating file: {filename}, format: {format_name}")
         
+        # Сжатый файл отдаем потоком, без временного файла
+        compression = data.get('compress')
+        if compression:
+            try:
+                ensure_supported(compression)
+            except ConversionError as e:
+                return jsonify({'error': str(e)}), 400
+            return compressed_response(iter_chunks(content), compression, filename)
+        
         # Создаем временный файл с правильной кодировкой
         temp_file = tempfile.NamedTemporaryFile(
             mode='w', 
@@ -196,12 +604,58 @@ def api_download():
         logger.error(f"Ошибка при подготовке файла для скачивания: {str(e)}")
         return jsonify({'error': f'Ошибка при подготовке файла для скачивания: {str(e)}'}), 500
 
+@app.route('/api/results/<result_id>')
+def api_result(result_id):
+    """Сохраненный результат (store=1); download=1 - как вложение"""
+    meta = get_result_store().get(result_id)
+    if meta is None:
+        return jsonify({'error': 'Результат не найден или устарел'}), 404
+    format_name = meta['format']
+    mime_type = converter_engine.get_mime_type(format_name)
+    response = send_file(
+        meta['path'],
+        mimetype=mime_type,
+        as_attachment=request.args.get('download') in ('1', 'true'),
+        download_name=f'converted{converter_engine.get_file_extension(format_name)}',
+        conditional=True,
+        max_age=0
+    )
+    if not is_binary(format_name):
+        response.headers['Content-Type'] = f'{mime_type}; charset=utf-8'
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+@app.route('/api/profiles')
+def api_profiles():
+    """Список сохраненных профилей запросов (нужен заголовок X-Profile-Token)"""
+    if not profiler.authorized(request.headers.get(TOKEN_HEADER)):
+        return jsonify({'error': 'Доступ к профилям запрещен'}), 403
+    return jsonify({'profiles': profiler.list_profiles()})
+
+@app.route('/api/profiles/<path:filename>')
+def api_profile_file(filename):
+    """Файл профиля: .collapsed, .speedscope.json или .prof"""
+    if not profiler.authorized(request.headers.get(TOKEN_HEADER)):
+        return jsonify({'error': 'Доступ к профилям запрещен'}), 403
+    return send_from_directory(profiler.directory, filename, as_attachment=True)
+
 @app.route('/api/formats')
 def api_formats():
     """API endpoint для получения списка поддерживаемых форматов"""
-    return jsonify({
+    response = jsonify({
         'formats': converter_engine.get_supported_formats()
     })
+    # Список не меняется, пока работает процесс: клиент проверяет его по ETag
+    response.add_etag()
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+@app.route('/api/cache')
+def api_cache():
+    """Статистика кэша результатов: попадания, промахи и заполнение"""
+    if converter_engine.cache is None:
+        return jsonify({'enabled': False})
+    return jsonify(dict(converter_engine.cache.stats(), enabled=True))
 
 @app.errorhandler(413)
 def too_large(e):
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Статические файлы веб-интерфейса: адреса с хэшем содержимого и сжатые варианты
+
+Сборка (python assets.py) записывает static/manifest.json и рядом с файлами
+сжатые варианты .gz и .br. Если сборка не выполнялась, манифест строится при
+запуске приложения, а сжатые варианты создаются в памяти при первом запросе.
+Адрес файла меняется вместе с содержимым, поэтому файлы отдаются с
+бессрочным кэшированием.
+"""
+from typing import Dict, Optional, Tuple
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import sys
+import threading
+
+from flask import Response, abort, request
+
+try:
+    import brotli
+except ImportError:  # br отдается, только если установлен пакет
+    brotli = None
+
+MANIFEST_NAME = 'manifest.json'
+
+# Кэширование файлов с хэшем в адресе
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+# Варианты сжатия в порядке предпочтения: Content-Encoding и суффикс файла
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+# Расширения, которые имеет смысл сжимать
+COMPRESSIBLE = {'.css', '.js', '.svg', '.ico', '.json', '.txt', '.html'}
+
+
+def file_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def hashed_name(name: str, digest: str) -> str:
+    """css/style.css -> css/style.<хэш>.css"""
+    root, ext = os.path.splitext(name)
+    return f'{root}.{digest}{ext}'
+
+
+def compress(data: bytes, encoding: str) -> Optional[bytes]:
+    """Сжатый вариант или None, если алгоритм недоступен"""
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    if encoding == 'br' and brotli is not None:
+        return brotli.compress(data, quality=11)
+    return None
+
+
+def _iter_files(folder: str):
+    """Исходные файлы каталога (без манифеста и сжатых вариантов)"""
+    suffixes = tuple(suffix for _, suffix in ENCODINGS)
+    for root, _, files in os.walk(folder):
+        for filename in sorted(files):
+            path = os.path.join(root, filename)
+            name = os.path.relpath(path, folder).replace(os.sep, '/')
+            if name == MANIFEST_NAME or name.endswith(suffixes):
+                continue
+            yield name, path
+
+
+def build_manifest(folder: str) -> Dict[str, str]:
+    """Манифест: имя файла -> имя с хэшем содержимого"""
+    manifest = {}
+    for name, path in _iter_files(folder):
+        with open(path, 'rb') as f:
+            manifest[name] = hashed_name(name, file_digest(f.read()))
+    return manifest
+
+
+def build(folder: str) -> Dict[str, str]:
+    """Записывает манифест и сжатые варианты файлов"""
+    for name, path in _iter_files(folder):
+        if os.path.splitext(name)[1] not in COMPRESSIBLE:
+            continue
+        with open(path, 'rb') as f:
+            data = f.read()
+        for encoding, suffix in ENCODINGS:
+            body = compress(data, encoding)
+            # Вариант, который не меньше исходного, не нужен
+            if body is not None and len(body) < len(data):
+                with open(path + suffix, 'wb') as f:
+                    f.write(body)
+    manifest = build_manifest(folder)
+    with open(os.path.join(folder, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    return manifest
+
+
+class StaticAssets:
+    """Раздача статических файлов по адресам с хэшем"""
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        manifest_path = os.path.join(folder, MANIFEST_NAME)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, encoding='utf-8') as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = build_manifest(folder)
+        self.files = {hashed: name for name, hashed in self.manifest.items()}
+        self._bodies: Dict[Tuple[str, Optional[str]], Optional[bytes]] = {}
+        self._lock = threading.Lock()
+
+    def url_name(self, name: str) -> str:
+        """Имя файла с хэшем (или исходное, если файла нет в манифесте)"""
+        return self.manifest.get(name, name)
+
+    def _body(self, name: str, encoding: Optional[str]) -> Optional[bytes]:
+        """Содержимое файла или его сжатого варианта; читается один раз"""
+        key = (name, encoding)
+        with self._lock:
+            if key in self._bodies:
+                return self._bodies[key]
+
+        path = os.path.join(self.folder, name)
+        suffix = dict(ENCODINGS).get(encoding, '')
+        body = None
+        if os.path.exists(path + suffix):
+            with open(path + suffix, 'rb') as f:
+                body = f.read()
+        elif encoding is not None and os.path.splitext(name)[1] in COMPRESSIBLE:
+            data = self._body(name, None)
+            body = compress(data, encoding)
+            if body is not None and len(body) >= len(data):
+                body = None
+        with self._lock:
+            self._bodies[key] = body
+        return body
+
+    def response(self, hashed: str) -> Response:
+        """Ответ с файлом: сжатый вариант по Accept-Encoding, бессрочный кэш"""
+        name = self.files.get(hashed)
+        if name is None:
+            abort(404)
+
+        encoding, body = None, None
+        for candidate, _ in ENCODINGS:
+            if request.accept_encodings[candidate]:
+                body = self._body(name, candidate)
+                if body is not None:
+                    encoding = candidate
+                    break
+        if body is None:
+            body = self._body(name, None)
+
+        response = Response(body, mimetype=mimetypes.guess_type(name)[0] or 'application/octet-stream')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = IMMUTABLE
+        digest = os.path.splitext(hashed)[0].rsplit('.', 1)[-1]
+        response.set_etag(f'{digest}-{encoding}' if encoding else digest)
+        return response.make_conditional(request)
+
+
+if __name__ == '__main__':
+    folder = sys.argv[1] if len(sys.argv) > 1 else os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'static')
+    manifest = build(folder)
+    print(f'Файлов в манифесте: {len(manifest)}')
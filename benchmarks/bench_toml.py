@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Сравнение скорости TOML бэкендов: пакет toml и tomllib/tomli + tomli-w
+
+Запуск: python benchmarks/bench_toml.py [число записей]
+"""
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from converters.toml_converter import TOMLConverter, tomllib, tomli_w
+
+try:
+    import toml
+except ImportError:  # старый бэкенд для сравнения может быть не установлен
+    toml = None
+
+
+def make_records(count):
+    """Тестовые записи с вложенной таблицей и списком"""
+    return [
+        {
+            'id': i,
+            'name': f'user {i}',
+            'active': i % 2 == 0,
+            'score': i * 0.25,
+            'tags': ['a', 'b', 'c'],
+            'address': {'city': 'Paris', 'zip': f'{75000 + i % 100}'},
+        }
+        for i in range(count)
+    ]
+
+
+def measure(func, repeat=3):
+    """Лучшее время из repeat запусков"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    records = make_records(count)
+    document = {'data': records}
+    converter = TOMLConverter()
+    text = converter.serialize(records)
+
+    results = []
+    if toml is not None:
+        results.append(('toml dumps', measure(lambda: toml.dumps(document))))
+    results.append(('tomli-w dumps', measure(lambda: tomli_w.dumps(document))))
+    results.append(('TOMLConverter.serialize ([[data]] блоками)',
+                    measure(lambda: converter.serialize(records))))
+    if toml is not None:
+        results.append(('toml loads', measure(lambda: toml.loads(text))))
+    else:
+        print('Пакет toml не установлен, сравнение только для новых бэкендов')
+    results.append((f'{tomllib.__name__} loads', measure(lambda: tomllib.loads(text))))
+
+    print(f'Записей: {count}, размер документа: {len(text) / 1024:.0f} КБ')
+    for name, elapsed in results:
+        print(f'{name:45s} {elapsed * 1000:10.1f} мс')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+Нагрузочное тестирование API: поэтапное увеличение числа клиентов и отчет
+о задержках, пропускной способности, ошибках и памяти сервера
+
+Запуск:
+    python benchmarks/loadtest.py
+    python benchmarks/loadtest.py --stages 10:15,50:15,200:30 --output report.json
+    python benchmarks/loadtest.py --baseline report.json
+    python benchmarks/loadtest.py --url http://localhost:5000 --pid 1234
+
+Без --url сервер запускается отдельным процессом на свободном порту.
+Клиенты отправляют смесь запросов: разные пары форматов, размеры данных,
+текст и загрузку файла; у каждого клиента свой адрес в X-Forwarded-For
+(свой сервер запускается с TRUSTED_PROXY_HOPS=1, чтобы лимиты клиентов
+считались по этим адресам, и без кэша результатов: данные повторяются, и
+с кэшем замерялся бы кэш, а не конвертация; --cache его оставляет). С --baseline
+отчет сравнивается с сохраненным, и при падении пропускной способности или
+росте p95 сверх допуска скрипт завершается с кодом 1.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from converters.engine import ConversionEngine
+
+# Этапы по умолчанию: (клиентов, секунд)
+DEFAULT_STAGES = '10:10,50:10,200:20'
+
+# Размеры данных: имя -> (записей, вес в смеси)
+PAYLOAD_SIZES = {'small': (20, 70), 'medium': (2000, 25), 'large': (20000, 5)}
+
+# Смесь запросов: (вес, путь, исходный формат, целевой формат, способ отправки)
+DEFAULT_MIX = [
+    (25, '/api/convert', 'json', 'yaml', 'text'),
+    (20, '/api/convert', 'csv', 'json', 'upload'),
+    (10, '/api/convert', 'yaml', 'json', 'text'),
+    (10, '/api/convert', 'json', 'csv', 'upload'),
+    (10, '/api/convert', 'xml', 'json', 'text'),
+    (5, '/api/convert', 'jsonl', 'csv', 'upload'),
+    (5, '/api/convert', 'toml', 'json', 'text'),
+    (10, '/api/validate', 'json', None, 'text'),
+    (5, '/api/download', 'json', None, 'json'),
+]
+
+# Допуск при сравнении с базовым отчетом
+DEFAULT_TOLERANCE = 0.15
+
+REQUEST_TIMEOUT = 60.0
+
+
+def make_records(count: int) -> List[Dict[str, Any]]:
+    """Тестовые записи с вложенным объектом"""
+    return [
+        {
+            'id': i,
+            'name': f'user {i}',
+            'active': i % 2 == 0,
+            'score': round(i * 0.25, 2),
+            'address': {'city': 'Paris', 'zip': f'{75000 + i % 100}'},
+        }
+        for i in range(count)
+    ]
+
+
+def make_payloads(formats: List[str]) -> Dict[Tuple[str, str], str]:
+    """Данные для каждого исходного формата и размера"""
+    engine = ConversionEngine()
+    payloads = {}
+    for size, (count, _) in PAYLOAD_SIZES.items():
+        records = make_records(count)
+        text = json.dumps(records, ensure_ascii=False)
+        for format_name in formats:
+            if format_name == 'json':
+                payloads[(format_name, size)] = text
+            elif format_name == 'xml':
+                # XML документ должен иметь один корневой элемент
+                document = json.dumps({'records': {'record': records}}, ensure_ascii=False)
+                payloads[(format_name, size)] = engine.convert(document, 'json', 'xml')
+            else:
+                payloads[(format_name, size)] = engine.convert(text, 'json', format_name)
+    return payloads
+
+
+def build_request(rng: random.Random, mix: List[Tuple], payloads: Dict[Tuple[str, str], str],
+                  client_id: str) -> Tuple[str, str, Dict[str, str], bytes]:
+    """Случайный запрос из смеси: (метка, путь, заголовки, тело)"""
+    _, path, source, target, mode = rng.choices(mix, weights=[item[0] for item in mix])[0]
+    size = rng.choices(list(PAYLOAD_SIZES), weights=[w for _, w in PAYLOAD_SIZES.values()])[0]
+    text = payloads[(source, size)]
+    label = f'{path} {source}->{target or "-"} {mode} {size}'
+    headers = {'X-Forwarded-For': client_id}
+
+    if path == '/api/validate':
+        body = urlencode({'format': source, 'text_data': text}).encode()
+        headers['Content-Type'] = 'application/x-www-form-urlencoded'
+    elif path == '/api/download':
+        body = json.dumps({'content': text, 'format': source, 'filename': f'data.{source}'}).encode()
+        headers['Content-Type'] = 'application/json'
+    elif mode == 'upload':
+        boundary = uuid.uuid4().hex
+        parts = [f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'
+                 for name, value in (('source_format', source), ('target_format', target))]
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="file"; '
+                     f'filename="data.{source}"\r\nContent-Type: application/octet-stream\r\n\r\n')
+        body = (''.join(parts).encode() + text.encode('utf-8') +
+                f'\r\n--{boundary}--\r\n'.encode())
+        headers['Content-Type'] = f'multipart/form-data; boundary={boundary}'
+    else:
+        body = urlencode({'source_format': source, 'target_format': target,
+                          'text_data': text}).encode()
+        headers['Content-Type'] = 'application/x-www-form-urlencoded'
+    if path == '/api/convert':
+        # Форматы в адресе: сервер оценивает стоимость до чтения тела
+        path += '?' + urlencode({'source_format': source, 'target_format': target})
+    return label, path, headers, body
+
+
+async def send(host: str, port: int, path: str, headers: Dict[str, str],
+               body: bytes) -> Tuple[int, int]:
+    """POST запрос по отдельному соединению; возвращает (статус, байт ответа)"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        lines = [f'POST {path} HTTP/1.1', f'Host: {host}:{port}',
+                 f'Content-Length: {len(body)}', 'Connection: close']
+        lines.extend(f'{name}: {value}' for name, value in headers.items())
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode() + body)
+        await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+    status_line = response.split(b'\r\n', 1)[0].split()
+    status = int(status_line[1]) if len(status_line) > 1 else 0
+    return status, len(response)
+
+
+def read_rss(pid: Optional[int]) -> Optional[int]:
+    """Резидентная память процесса, байт (Linux /proc или psutil)"""
+    if pid is None:
+        return None
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss
+    except Exception:
+        return None
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Перцентиль по ближайшему рангу"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Stage:
+    """Результаты одного этапа нагрузки"""
+
+    def __init__(self, clients: int, duration: float):
+        self.clients = clients
+        self.duration = duration
+        self.samples: List[Tuple[str, float, int]] = []
+        self.rss: List[Tuple[float, int]] = []
+        self.elapsed = 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        latencies = [latency for _, latency, _ in self.samples]
+        statuses = [status for _, _, status in self.samples]
+        total = len(self.samples)
+        errors = sum(1 for status in statuses if status == 0 or status >= 500 or
+                     (status >= 400 and status != 429))
+        shed = statuses.count(429)
+        by_label: Dict[str, List[float]] = {}
+        for label, latency, _ in self.samples:
+            by_label.setdefault(label, []).append(latency)
+        return {
+            'clients': self.clients,
+            'requests': total,
+            'throughput': round(total / self.elapsed, 2) if self.elapsed else 0.0,
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 1),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 1),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 1),
+            'error_rate': round(errors / total, 4) if total else 0.0,
+            'shed_rate': round(shed / total, 4) if total else 0.0,
+            'max_rss_mb': round(max((rss for _, rss in self.rss), default=0) / 2 ** 20, 1),
+            'rss_mb': [[round(t, 1), round(rss / 2 ** 20, 1)] for t, rss in self.rss],
+            'p95_by_request_ms': {label: round(percentile(values, 0.95) * 1000, 1)
+                                  for label, values in sorted(by_label.items())},
+        }
+
+
+async def run_stage(stage: Stage, host: str, port: int, mix: List[Tuple],
+                    payloads: Dict[Tuple[str, str], str], pid: Optional[int],
+                    seed: int) -> None:
+    """Запускает stage.clients клиентов на stage.duration секунд"""
+    start = time.perf_counter()
+    deadline = start + stage.duration
+
+    async def client(number: int) -> None:
+        rng = random.Random(seed * 100003 + number)
+        client_id = f'10.{number >> 16 & 255}.{number >> 8 & 255}.{number & 255}'
+        while time.perf_counter() < deadline:
+            label, path, headers, body = build_request(rng, mix, payloads, client_id)
+            began = time.perf_counter()
+            try:
+                status, _ = await asyncio.wait_for(send(host, port, path, headers, body),
+                                                   REQUEST_TIMEOUT)
+            except (OSError, asyncio.TimeoutError):
+                status = 0
+            stage.samples.append((label, time.perf_counter() - began, status))
+            if status == 429:
+                # Сервер просит подождать - как поступил бы настоящий клиент
+                await asyncio.sleep(rng.uniform(0.5, 1.5))
+
+    async def sample_memory() -> None:
+        while time.perf_counter() < deadline:
+            rss = read_rss(pid)
+            if rss is not None:
+                stage.rss.append((time.perf_counter() - start, rss))
+            await asyncio.sleep(1.0)
+
+    await asyncio.gather(sample_memory(), *(client(n) for n in range(stage.clients)))
+    stage.elapsed = time.perf_counter() - start
+
+
+def parse_stages(spec: str) -> List[Tuple[int, float]]:
+    """"10:15,50:15" -> [(10, 15.0), (50, 15.0)]"""
+    stages = []
+    for item in spec.split(','):
+        clients, _, duration = item.partition(':')
+        stages.append((int(clients), float(duration or 10)))
+    return stages
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int, cache: bool = False) -> subprocess.Popen:
+    """
+    Запускает приложение отдельным процессом и ждет готовности; без cache
+    кэш результатов выключен
+    """
+    code = ('import logging, app; logging.disable(logging.CRITICAL); '
+            f'app.app.run(host="127.0.0.1", port={port}, threaded=True, '
+            'debug=False, use_reloader=False)')
+    # Клиенты различаются по X-Forwarded-For, как за балансировщиком
+    env = dict(os.environ, TRUSTED_PROXY_HOPS='1')
+    if not cache:
+        env['CACHE_SIZE_MB'] = '0'
+    process = subprocess.Popen([sys.executable, '-c', code], cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError('Сервер завершился при запуске')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError('Сервер не запустился за 30 секунд')
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Регрессии относительно базового отчета по этапам с тем же числом клиентов"""
+    previous = {stage['clients']: stage for stage in baseline.get('stages', [])}
+    problems = []
+    for stage in report['stages']:
+        base = previous.get(stage['clients'])
+        if base is None:
+            continue
+        if base['throughput'] and stage['throughput'] < base['throughput'] * (1 - tolerance):
+            problems.append(f"{stage['clients']} клиентов: пропускная способность "
+                            f"{stage['throughput']} < {base['throughput']} запр/с")
+        if base['p95_ms'] and stage['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            problems.append(f"{stage['clients']} клиентов: p95 {stage['p95_ms']} > "
+                            f"{base['p95_ms']} мс")
+        if stage['error_rate'] > base['error_rate'] + 0.01:
+            problems.append(f"{stage['clients']} клиентов: доля ошибок "
+                            f"{stage['error_rate']} > {base['error_rate']}")
+    return problems
+
+
+def print_report(report: Dict[str, Any], slo_p95: float, max_error_rate: float) -> None:
+    print(f"{'клиентов':>9} {'запросов':>9} {'запр/с':>8} {'p50 мс':>8} {'p95 мс':>8} "
+          f"{'p99 мс':>8} {'ошибки':>7} {'429':>6} {'RSS МБ':>7}  SLO")
+    for stage in report['stages']:
+        ok = stage['p95_ms'] <= slo_p95 and stage['error_rate'] <= max_error_rate
+        print(f"{stage['clients']:>9} {stage['requests']:>9} {stage['throughput']:>8} "
+              f"{stage['p50_ms']:>8} {stage['p95_ms']:>8} {stage['p99_ms']:>8} "
+              f"{stage['error_rate']:>7.2%} {stage['shed_rate']:>6.1%} "
+              f"{stage['max_rss_mb']:>7}  {'ok' if ok else 'нарушен'}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Нагрузочное тестирование API конвертера')
+    parser.add_argument('--url', help='адрес запущенного сервера (по умолчанию запускается свой)')
+    parser.add_argument('--pid', type=int, help='процесс сервера для замера памяти (с --url)')
+    parser.add_argument('--stages', default=DEFAULT_STAGES,
+                        help=f'этапы клиентов:секунд через запятую (по умолчанию {DEFAULT_STAGES})')
+    parser.add_argument('--cache', action='store_true',
+                        help='не выключать кэш результатов своего сервера')
+    parser.add_argument('--seed', type=int, default=1, help='начальное значение генератора')
+    parser.add_argument('--slo-p95', type=float, default=500.0, help='цель по p95, мс')
+    parser.add_argument('--max-error-rate', type=float, default=0.01, help='допустимая доля ошибок')
+    parser.add_argument('--output', help='сохранить отчет в JSON файл')
+    parser.add_argument('--baseline', help='сравнить с сохраненным отчетом')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='допуск при сравнении с базовым отчетом')
+    args = parser.parse_args()
+
+    mix = DEFAULT_MIX
+    payloads = make_payloads(sorted({item[2] for item in mix}))
+
+    process = None
+    if args.url:
+        address = urlsplit(args.url)
+        host, port, pid = address.hostname, address.port or 80, args.pid
+    else:
+        host, port = '127.0.0.1', free_port()
+        process = start_server(port, args.cache)
+        pid = process.pid
+
+    stages = []
+    try:
+        for clients, duration in parse_stages(args.stages):
+            stage = Stage(clients, duration)
+            print(f'Этап: {clients} клиентов, {duration:.0f} с', file=sys.stderr)
+            asyncio.run(run_stage(stage, host, port, mix, payloads, pid, args.seed))
+            stages.append(stage.summary())
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    report = {'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'stages': stages}
+    print_report(report, args.slo_p95, args.max_error_rate)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            problems = compare(report, json.load(f), args.tolerance)
+        for problem in problems:
+            print(f'Регрессия: {problem}')
+        if problems:
+            return 1
+        print('Регрессий относительно базового отчета нет')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
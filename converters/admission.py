@@ -0,0 +1,287 @@
+"""
+Допуск запросов по оценке стоимости и справедливая очередь между клиентами
+
+Стоимость запроса - ожидаемое время конвертации: размер входа, деленный
+на измеренную скорость для пары форматов. Контроллер ограничивает число
+одновременных конвертаций клиента и скорость в байтах, выдает свободные
+места клиенту с наименьшим обслуженным объемом работы и отклоняет запрос
+сразу, если ожидание в очереди превысит предел.
+"""
+from typing import Callable, Dict, Optional, Tuple
+from collections import deque
+from contextlib import contextmanager
+import math
+import threading
+import time
+
+from .base import ConversionError
+from .parallel import cpu_count
+
+# Скорость конвертации (байт/с), пока для пары форматов нет замеров
+DEFAULT_THROUGHPUT = 20 * 1024 * 1024
+
+# Относительная скорость разбора исходных форматов
+FORMAT_SPEED = {
+    'json': 1.0,
+    'jsonl': 1.0,
+    'ndjson': 1.0,
+    'csv': 1.0,
+    'xml': 0.3,
+    'toml': 0.3,
+    'yaml': 0.1,
+    'yml': 0.1,
+}
+
+# Постоянная часть стоимости запроса, с
+REQUEST_OVERHEAD = 0.002
+
+# Вес нового замера в скользящем среднем
+SMOOTHING = 0.2
+
+# Запросы меньше этого размера не учитываются в замерах: время в них
+# определяется накладными расходами, а не объемом
+MIN_SAMPLE_BYTES = 64 * 1024
+
+
+class AdmissionRejected(ConversionError):
+    """Запрос не принят: сервер или лимиты клиента перегружены"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class ThroughputModel:
+    """Измеренная скорость конвертации для пар форматов"""
+
+    def __init__(self, default: float = DEFAULT_THROUGHPUT):
+        self.default = default
+        self._rates: Dict[Tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+
+    def throughput(self, source_format: str, target_format: str) -> float:
+        """Байт в секунду для пары форматов"""
+        rate = self._rates.get((source_format, target_format))
+        if rate is None:
+            rate = self.default * FORMAT_SPEED.get(source_format, 1.0)
+        return rate
+
+    def estimate(self, size: int, source_format: str, target_format: str) -> float:
+        """Ожидаемое время конвертации, с"""
+        return REQUEST_OVERHEAD + size / self.throughput(source_format, target_format)
+
+    def record(self, size: int, elapsed: float, source_format: str, target_format: str) -> None:
+        """Учитывает замер завершенной конвертации"""
+        if size < MIN_SAMPLE_BYTES or elapsed <= 0:
+            return
+        key = (source_format, target_format)
+        sample = size / elapsed
+        with self._lock:
+            current = self._rates.get(key)
+            self._rates[key] = sample if current is None else (
+                current + SMOOTHING * (sample - current))
+
+
+class _Client:
+    """Состояние клиента: занятые места, очередь, бюджет байт"""
+
+    def __init__(self, burst: int, now: float, virtual_time: float):
+        self.running = 0
+        self.waiting: deque = deque()
+        self.tokens = float(burst)
+        self.updated = now
+        # Объем работы, выданный клиенту (в секундах оценки)
+        self.virtual_time = virtual_time
+
+
+class Ticket:
+    """Разрешение на выполнение запроса; release() освобождает место"""
+
+    def __init__(self, controller: 'AdmissionController', client_id: str, size: int,
+                 source_format: str, target_format: str, cost: float):
+        self.controller = controller
+        self.client_id = client_id
+        self.size = size
+        self.source_format = source_format
+        self.target_format = target_format
+        self.cost = cost
+        self.granted = False
+        self.started: Optional[float] = None
+        self._released = False
+
+    def set_formats(self, source_format: str, target_format: str) -> None:
+        """
+        Форматы, ставшие известны после допуска (форма запроса читается и
+        исходный формат определяется уже после него): стоимость оценивается
+        заново, замер скорости учитывается по ним
+        """
+        self.controller._reestimate(self, source_format, target_format)
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self.controller._release(self)
+
+
+class AdmissionController:
+    """
+    Допуск запросов к конвертации.
+
+    Args:
+        max_concurrent: Одновременных конвертаций на сервере
+        max_wait: Предел ожидаемого ожидания в очереди, с; дольше - 429
+        client_concurrent: Одновременных конвертаций одного клиента
+        client_rate: Бюджет клиента, байт в секунду
+        client_burst: Запас бюджета для всплеска запросов, байт
+        client_queue: Запросов клиента в очереди
+    """
+
+    # Сколько клиентов без запросов держать до очистки
+    MAX_IDLE_CLIENTS = 10000
+
+    def __init__(self, max_concurrent: Optional[int] = None, max_wait: float = 10.0,
+                 client_concurrent: int = 2, client_rate: int = 4 * 1024 * 1024,
+                 client_burst: int = 32 * 1024 * 1024, client_queue: int = 8,
+                 model: Optional[ThroughputModel] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_concurrent = max_concurrent or cpu_count()
+        self.max_wait = max_wait
+        self.client_concurrent = client_concurrent
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.client_queue = client_queue
+        self.model = model or ThroughputModel()
+        self.clock = clock
+
+        self._clients: Dict[str, _Client] = {}
+        self._running = 0
+        # Оценка оставшейся работы: выполняемые и ожидающие запросы
+        self._pending_cost = 0.0
+        self._virtual_time = 0.0
+        self._condition = threading.Condition()
+
+    def _client(self, client_id: str, now: float) -> _Client:
+        client = self._clients.get(client_id)
+        if client is None:
+            if len(self._clients) >= self.MAX_IDLE_CLIENTS:
+                self._clients = {key: c for key, c in self._clients.items()
+                                 if c.running or c.waiting}
+            # Новый клиент начинает с текущего уровня, а не с нуля
+            client = self._clients[client_id] = _Client(self.client_burst, now, self._virtual_time)
+        return client
+
+    def _refill(self, client: _Client, now: float) -> None:
+        client.tokens = min(self.client_burst,
+                            client.tokens + (now - client.updated) * self.client_rate)
+        client.updated = now
+
+    def acquire(self, client_id: str, size: int, source_format: str,
+                target_format: str) -> Ticket:
+        """
+        Ждет свободного места для запроса
+
+        Raises:
+            AdmissionRejected: Бюджет клиента исчерпан или очередь слишком длинная
+        """
+        cost = self.model.estimate(size, source_format, target_format)
+        with self._condition:
+            now = self.clock()
+            client = self._client(client_id, now)
+            self._refill(client, now)
+
+            # Запрос больше запаса пропускается при полном запасе
+            needed = min(size, self.client_burst)
+            if client.tokens < needed:
+                raise AdmissionRejected('Превышен лимит объема данных клиента',
+                                        (needed - client.tokens) / self.client_rate)
+            if len(client.waiting) >= self.client_queue:
+                raise AdmissionRejected('Слишком много запросов клиента в очереди',
+                                        self._pending_cost / self.max_concurrent)
+            # Свободное место есть - запрос выполняется сразу при любой стоимости
+            if self._running >= self.max_concurrent:
+                wait = self._pending_cost / self.max_concurrent
+                if wait + cost > self.max_wait:
+                    raise AdmissionRejected('Сервер перегружен', wait)
+
+            client.tokens -= needed
+            ticket = Ticket(self, client_id, size, source_format, target_format, cost)
+            client.waiting.append(ticket)
+            self._pending_cost += cost
+            self._dispatch()
+
+            deadline = now + self.max_wait
+            while not ticket.granted:
+                remaining = deadline - self.clock()
+                if remaining <= 0:
+                    client.waiting.remove(ticket)
+                    self._pending_cost -= cost
+                    client.tokens = min(self.client_burst, client.tokens + needed)
+                    raise AdmissionRejected('Сервер перегружен', self._pending_cost / self.max_concurrent)
+                self._condition.wait(remaining)
+            ticket.started = self.clock()
+            return ticket
+
+    def _dispatch(self) -> None:
+        """Выдает свободные места клиентам с наименьшим обслуженным объемом"""
+        granted = False
+        while self._running < self.max_concurrent:
+            candidates = [c for c in self._clients.values()
+                          if c.waiting and c.running < self.client_concurrent]
+            if not candidates:
+                break
+            client = min(candidates, key=lambda c: c.virtual_time)
+            ticket = client.waiting.popleft()
+            ticket.granted = True
+            client.running += 1
+            self._running += 1
+            # Уровень очереди - наименьший уровень среди получивших место
+            self._virtual_time = max(self._virtual_time, client.virtual_time)
+            client.virtual_time += ticket.cost
+            granted = True
+        if granted:
+            self._condition.notify_all()
+
+    def _reestimate(self, ticket: Ticket, source_format: str, target_format: str) -> None:
+        cost = self.model.estimate(ticket.size, source_format, target_format)
+        with self._condition:
+            ticket.source_format = source_format
+            ticket.target_format = target_format
+            if ticket._released:
+                return
+            delta = cost - ticket.cost
+            ticket.cost = cost
+            self._pending_cost = max(0.0, self._pending_cost + delta)
+            client = self._clients.get(ticket.client_id)
+            if client is not None and ticket.granted:
+                client.virtual_time += delta
+
+    def _release(self, ticket: Ticket) -> None:
+        # Замер без определенного исходного формата не относится ни к одной паре
+        if ticket.started is not None and ticket.source_format != 'auto' and ticket.target_format:
+            self.model.record(ticket.size, self.clock() - ticket.started,
+                              ticket.source_format, ticket.target_format)
+        with self._condition:
+            client = self._clients.get(ticket.client_id)
+            if client is not None:
+                client.running -= 1
+            self._running -= 1
+            self._pending_cost = max(0.0, self._pending_cost - ticket.cost)
+            self._dispatch()
+
+    @contextmanager
+    def admit(self, client_id: str, size: int, source_format: str, target_format: str):
+        """Контекст, в котором запрос занимает место"""
+        ticket = self.acquire(client_id, size, source_format, target_format)
+        try:
+            yield ticket
+        finally:
+            ticket.release()
+
+    def stats(self) -> Dict[str, float]:
+        """Текущая загрузка"""
+        with self._condition:
+            return {
+                'running': self._running,
+                'queued': sum(len(c.waiting) for c in self._clients.values()),
+                'pending_cost': round(self._pending_cost, 3),
+            }
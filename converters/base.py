@@ -2,13 +2,48 @@
 Базовый класс для всех конвертеров
 """
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Union
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Union
 import io
 
+# Профили оформления результата: читаемый, без лишних пробелов и
+# детерминированный (ключи отсортированы, пробелов нет)
+PRETTY = 'pretty'
+COMPACT = 'compact'
+CANONICAL = 'canonical'
+OUTPUT_PROFILES = (PRETTY, COMPACT, CANONICAL)
+
 
 class BaseConverter(ABC):
     """Базовый абстрактный класс для всех конвертеров"""
     
+    # iter_records читает данные по частям, не разбирая документ целиком
+    streaming = False
+    
+    # iter_serialize принимает итератор записей и пишет их по мере поступления
+    streaming_output = False
+    
+    # Начало данных, обрезанное по record_boundary, разбирается само по
+    # себе, поэтому предпросмотр может читать только префикс
+    record_prefix = True
+    
+    # Двоичный формат: данные читаются байтами, serialize возвращает bytes
+    binary = False
+    
+    # validate загружает документ в память целиком: при автоопределении
+    # формата такой конвертер проверяется, только если вход не больше
+    # ConversionEngine.DETECT_TEXT_LIMIT
+    validate_loads_all = False
+    
+    # Параметры чтения, которые принимают parse и iter_records
+    # (например, sheet - лист книги xlsx)
+    read_options = ()
+    
+    # parse_compact строит компактное дерево (converters.compact), а
+    # serialize и iter_serialize принимают его без преобразования в словари
+    compact_parse = False
+    compact_serialize = False
+    
     def __init__(self):
         self.supported_formats = []
     
@@ -17,16 +52,115 @@ class BaseConverter(ABC):
         """Парсит данные из строки/байтов/файла в Python объект"""
         pass
     
+    def parse_compact(self, data: Union[str, bytes, io.IOBase], **options) -> Any:
+        """
+        Парсит данные в компактное дерево: общие кортежи ключей вместо
+        словарей, упакованные списки чисел (см. converters.compact).
+        
+        По умолчанию - обычный parse.
+        """
+        return self.parse(data, **options)
+    
     @abstractmethod
-    def serialize(self, data: Any) -> str:
-        """Сериализует Python объект в строку"""
+    def serialize(self, data: Any, profile: str = PRETTY) -> str:
+        """
+        Сериализует Python объект в строку
+
+        Args:
+            data: Данные
+            profile: Оформление результата: pretty, compact или canonical
+        """
         pass
     
+    def iter_serialize(self, data: Any, profile: str = PRETTY) -> Iterator[str]:
+        """
+        Сериализует данные частями.
+
+        По умолчанию результат выдается одним фрагментом; форматы, которые
+        умеют писать записи по одной, переопределяют метод, чтобы большой
+        результат не собирался в одну строку.
+        """
+        if profile == PRETTY:
+            yield self.serialize(data)
+        else:
+            yield self.serialize(data, profile=profile)
+    
     @abstractmethod
     def validate(self, data: Union[str, bytes, io.IOBase]) -> bool:
         """Валидирует входные данные"""
         pass
     
+    def check_syntax(self, data: Union[str, bytes, io.IOBase]) -> Optional[Dict[str, Any]]:
+        """
+        Проверяет синтаксис данных, не строя документ.
+
+        Returns:
+            None для корректных данных, иначе первая ошибка (см. syntax_error).
+            Встроенные форматы сканируют данные потоком с постоянной памятью;
+            по умолчанию результат берется из validate.
+        """
+        if self.validate(data):
+            return None
+        return syntax_error("Данные не соответствуют формату")
+    
+    def iter_records(self, data: Union[str, bytes, io.IOBase]) -> Iterator[Any]:
+        """
+        Последовательно выдает записи документа.
+
+        Для списка верхнего уровня запись - это элемент списка, для любого
+        другого документа - сам документ. Табличные форматы переопределяют
+        метод и читают данные частями, не строя весь документ в памяти;
+        такие конвертеры (streaming = True) также принимают аргументы
+        columns (множество читаемых полей) и record_filter (RecordFilter
+        из converters.pipeline).
+        """
+        parsed = self.parse(data)
+        if isinstance(parsed, list):
+            yield from parsed
+        else:
+            yield parsed
+    
+    def streams_records(self, data: Union[str, bytes, io.IOBase]) -> bool:
+        """
+        Выдает ли iter_records для этих данных записи по частям.
+        
+        По умолчанию - да для потоковых форматов. Формат, у которого записи
+        есть не во всех документах (JSON: только массив), проверяет начало
+        данных, не сдвигая позицию файла; остальные документы движок
+        разбирает целиком.
+        """
+        return self.streaming
+    
+    def record_boundary(self, text: str) -> int:
+        """
+        Возвращает длину префикса text, состоящего только из целых записей.
+
+        Используется потоковыми форматами, чтобы обрезать начало большого
+        документа для предпросмотра.
+        """
+        return len(text)
+    
+    def split_records(self, text: str) -> Optional[List[int]]:
+        """
+        Возвращает начала записей в тексте для построчных форматов.
+
+        Первый элемент - конец заголовка (начало первой записи), последний -
+        длина текста. None - формат не делится на независимые записи или
+        текст обрывается посреди записи.
+        """
+        return None
+    
+    def record_types(self, records: List[Any]) -> Optional[Dict[str, str]]:
+        """
+        Типы полей, выведенные по набору записей, для построчных форматов.
+
+        Нужны, если тип значения зависит от соседних записей (в CSV тип
+        колонки выводится по всему файлу): инкрементальная конвертация
+        сравнивает типы заново разобранных записей с типами документа.
+        None - значения каждой записи не зависят от остальных.
+        """
+        return None
+    
     def get_mime_type(self) -> str:
         """Возвращает MIME тип для формата"""
         return "text/plain"
@@ -44,3 +178,43 @@ class ConversionError(Exception):
 class ValidationError(Exception):
     """Исключение для ошибок валидации"""
     pass
+
+
+def syntax_error(message: str, line: Optional[int] = None,
+                 column: Optional[int] = None) -> Dict[str, Any]:
+    """Описание синтаксической ошибки: сообщение и позиция (строка и колонка с 1)"""
+    error: Dict[str, Any] = {'message': message}
+    if line is not None:
+        error['line'] = line
+        error['column'] = column
+    return error
+
+
+def iter_blocks(data: Union[str, bytes, io.IOBase],
+                size: int = 64 * 1024) -> Iterator[Union[str, bytes]]:
+    """Данные блоками по size символов или байт, без копии целиком"""
+    if isinstance(data, (str, bytes)):
+        for start in range(0, len(data), size):
+            yield data[start:start + size]
+        return
+    for block in iter(lambda: data.read(size), data.read(0)):
+        yield block
+
+
+@contextmanager
+def preserve_position(data: Union[str, bytes, io.IOBase]):
+    """Возвращает файл на исходную позицию после проверки"""
+    position = data.tell() if isinstance(data, io.IOBase) else None
+    try:
+        yield data
+    finally:
+        if position is not None:
+            data.seek(position)
+
+
+def check_profile(profile: str) -> str:
+    """Проверяет название профиля оформления"""
+    if profile not in OUTPUT_PROFILES:
+        raise ConversionError(
+            f"Неизвестный профиль оформления: {profile} (допустимы: {', '.join(OUTPUT_PROFILES)})")
+    return profile
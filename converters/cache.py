@@ -0,0 +1,423 @@
+"""
+Общий кэш результатов конвертации и определенных форматов
+
+Ключ - хэш содержимого входа вместе с форматами, конвейером, оформлением и
+параметрами чтения. Хранилище подключается бэкендом: MemoryBackend держит
+записи в памяти процесса, SQLiteBackend - в файле базы, общем для всех
+процессов сервера на узле (пул CONVERSION_WORKERS, несколько процессов
+gunicorn), поэтому повторная конвертация попадает в кэш в любом процессе.
+
+Оба бэкенда ограничены по размеру (вытесняются давно не читанные записи)
+и по времени жизни. Запись атомарна: значение появляется целиком или не
+появляется вовсе. Ошибки хранилища не прерывают конвертацию - кэш
+считается промахом, и после сбоя хранилище не используется RETRY_AFTER
+секунд.
+"""
+from typing import Any, Dict, Iterable, Iterator, Optional, Union
+from collections import OrderedDict
+import atexit
+import hashlib
+import io
+import json
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Объем кэша по умолчанию, байт
+CACHE_SIZE = 64 * 1024 * 1024
+
+# Время жизни записи, с
+CACHE_TTL = 600
+
+# Результаты больше этого не кэшируются, байт
+MAX_VALUE_SIZE = 8 * 1024 * 1024
+
+# Сколько секунд не обращаться к хранилищу после ошибки
+RETRY_AFTER = 30
+
+# Как часто счетчики процесса добавляются к общим, с
+STATS_INTERVAL = 1.0
+
+# Меняется, когда меняется результат конвертации при тех же входных данных
+CACHE_VERSION = 1
+
+_HASH_BLOCK = 1024 * 1024
+
+_TEXT = b't'
+_BINARY = b'b'
+
+
+def content_digest(data: Union[str, bytes, io.IOBase],
+                   max_size: Optional[int] = None) -> Optional[str]:
+    """
+    Хэш содержимого входа или None, если вход нельзя прочитать повторно
+    или он больше max_size (такой вход не хэшируется вовсе).
+
+    Поток читается целиком и возвращается на прежнюю позицию.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    if isinstance(data, (str, bytes)):
+        if max_size is not None and len(data) > max_size:
+            return None
+        digest.update(data.encode('utf-8', errors='surrogatepass')
+                      if isinstance(data, str) else data)
+    elif isinstance(data, io.IOBase):
+        try:
+            if not data.seekable():
+                return None
+            position = data.tell()
+            if max_size is not None:
+                size = data.seek(0, io.SEEK_END) - position
+                data.seek(position)
+                if size > max_size:
+                    return None
+        except (AttributeError, OSError, ValueError):
+            return None
+        while True:
+            block = data.read(_HASH_BLOCK)
+            if not block:
+                break
+            digest.update(block.encode('utf-8', errors='surrogatepass')
+                          if isinstance(block, str) else block)
+        data.seek(position)
+    else:
+        return None
+    return digest.hexdigest()
+
+
+class MemoryBackend:
+    """Записи в памяти процесса (LRU с ограничением объема)"""
+
+    name = 'memory'
+
+    def __init__(self, max_size: int = CACHE_SIZE, ttl: float = CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            created, value = entry
+            if time.time() - created > self.ttl:
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.time(), value)
+            self._size += len(value)
+            while self._size > self.max_size and self._entries:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str) -> None:
+        _, value = self._entries.pop(key)
+        self._size -= len(value)
+
+    def add_counters(self, counters: Dict[str, int]) -> None:
+        # Счетчики процесса и есть общие
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'entries': len(self._entries), 'size': self._size}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+class SQLiteBackend:
+    """
+    Записи в файле базы SQLite, общем для процессов узла.
+
+    База открывается в режиме WAL: чтения не ждут записи, а запись с
+    вытеснением выполняется одной транзакцией. У каждого потока и процесса
+    свое соединение.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path: str, max_size: int = CACHE_SIZE, ttl: float = CACHE_TTL,
+                 timeout: float = 0.5):
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        local = self._local
+        # После fork соединение родителя не используется
+        if getattr(local, 'pid', None) != os.getpid():
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            connection.execute('PRAGMA journal_mode = WAL')
+            connection.execute('PRAGMA synchronous = NORMAL')
+            connection.executescript('''
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL,
+                    created REAL NOT NULL, accessed REAL NOT NULL);
+                CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+                CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+            ''')
+            local.connection = connection
+            local.pid = os.getpid()
+        return local.connection
+
+    def get(self, key: str) -> Optional[bytes]:
+        connection = self._connection()
+        row = connection.execute('SELECT value, created FROM entries WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        expired = now - row[1] > self.ttl
+        try:
+            if expired:
+                connection.execute('DELETE FROM entries WHERE key = ?', (key,))
+            else:
+                connection.execute('UPDATE entries SET accessed = ? WHERE key = ?', (now, key))
+        except sqlite3.OperationalError:
+            # База занята записью другого процесса - запись обновится позже
+            pass
+        return None if expired else bytes(row[0])
+
+    def set(self, key: str, value: bytes) -> None:
+        connection = self._connection()
+        now = time.time()
+        try:
+            connection.execute('BEGIN IMMEDIATE')
+        except sqlite3.OperationalError as e:
+            if 'locked' in str(e) or 'busy' in str(e):
+                # Другой процесс долго пишет - этот результат не сохраняется
+                return
+            raise
+        try:
+            connection.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)',
+                               (key, value, len(value), now, now))
+            connection.execute('DELETE FROM entries WHERE created < ?', (now - self.ttl,))
+            total = connection.execute('SELECT total(size) FROM entries').fetchone()[0]
+            if total > self.max_size:
+                # Вытесняем давно не читанные записи, пока объем не уложится
+                excess = total - self.max_size
+                removed = 0
+                keys = []
+                for old_key, size in connection.execute(
+                        'SELECT key, size FROM entries ORDER BY accessed'):
+                    keys.append((old_key,))
+                    removed += size
+                    if removed >= excess:
+                        break
+                connection.executemany('DELETE FROM entries WHERE key = ?', keys)
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+    def add_counters(self, counters: Dict[str, int]) -> None:
+        connection = self._connection()
+        connection.executemany(
+            'INSERT INTO counters VALUES (?, ?) ON CONFLICT (name) DO UPDATE SET value = value + excluded.value',
+            [(name, value) for name, value in counters.items() if value])
+
+    def stats(self) -> Dict[str, Any]:
+        connection = self._connection()
+        entries, size = connection.execute('SELECT count(*), total(size) FROM entries').fetchone()
+        counters = dict(connection.execute('SELECT name, value FROM counters'))
+        return {'entries': entries, 'size': int(size), 'shared': counters}
+
+    def clear(self) -> None:
+        connection = self._connection()
+        connection.execute('DELETE FROM entries')
+        connection.execute('DELETE FROM counters')
+
+
+class ResultCache:
+    """
+    Кэш результатов и форматов поверх бэкенда.
+
+    Args:
+        backend: MemoryBackend, SQLiteBackend или объект с теми же методами
+        max_value_size: Результаты больше этого размера не сохраняются
+        max_input_size: Вход больше этого размера не хэшируется и его
+            результат не кэшируется (по умолчанию max_value_size)
+    """
+
+    COUNTERS = ('hits', 'misses', 'stores', 'errors')
+
+    def __init__(self, backend, max_value_size: int = MAX_VALUE_SIZE,
+                 max_input_size: Optional[int] = None):
+        self.backend = backend
+        self.max_value_size = max_value_size
+        self.max_input_size = max_value_size if max_input_size is None else max_input_size
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
+        self._pending = dict.fromkeys(self.COUNTERS, 0)
+        self._flushed = time.monotonic()
+        self._unavailable_until = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> Optional['ResultCache']:
+        """
+        Кэш по CACHE_PATH (файл SQLite; без него - память процесса),
+        CACHE_SIZE_MB (0 - кэш выключен) и CACHE_TTL
+        """
+        size = float(os.environ.get('CACHE_SIZE_MB') or CACHE_SIZE / (1024 * 1024))
+        if size <= 0:
+            return None
+        max_size = int(size * 1024 * 1024)
+        ttl = float(os.environ.get('CACHE_TTL') or CACHE_TTL)
+        path = os.environ.get('CACHE_PATH')
+        if path:
+            cache = cls(SQLiteBackend(path, max_size, ttl))
+            # Счетчики, накопленные за последнюю секунду, не теряются при выходе
+            atexit.register(cache.flush)
+            return cache
+        return cls(MemoryBackend(max_size, ttl))
+
+    # Ключи
+
+    def digest(self, data: Union[str, bytes, io.IOBase]) -> Optional[str]:
+        """Хэш входа для ключа или None, если вход не кэшируется"""
+        return content_digest(data, self.max_input_size)
+
+    @staticmethod
+    def key(kind: str, *parts: Any) -> str:
+        """Ключ записи по виду (result, format) и параметрам"""
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(f'{CACHE_VERSION}:{kind}'.encode())
+        for part in parts:
+            if isinstance(part, (str, int, float, bool)) or part is None:
+                encoded = json.dumps(part).encode('utf-8')
+            elif isinstance(part, dict):
+                encoded = json.dumps(part, sort_keys=True, default=str).encode('utf-8')
+            else:
+                # Конвейер и другие объекты - по их сериализованному состоянию
+                encoded = pickle.dumps(part, protocol=4)
+            digest.update(len(encoded).to_bytes(8, 'big'))
+            digest.update(encoded)
+        return f'{kind}:{digest.hexdigest()}'
+
+    # Чтение и запись
+
+    def _available(self) -> bool:
+        return time.monotonic() >= self._unavailable_until
+
+    def _failed(self, error: Exception) -> None:
+        logger.warning(f"Кэш результатов недоступен: {error}")
+        self._unavailable_until = time.monotonic() + RETRY_AFTER
+        self._count('errors')
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+            self._pending[name] += 1
+            if time.monotonic() - self._flushed < STATS_INTERVAL:
+                return
+        self.flush()
+
+    def flush(self) -> None:
+        """Добавляет накопленные счетчики процесса к общим"""
+        with self._lock:
+            pending = self._pending
+            self._pending = dict.fromkeys(self.COUNTERS, 0)
+            self._flushed = time.monotonic()
+        if not any(pending.values()) or not self._available():
+            return
+        try:
+            self.backend.add_counters(pending)
+        except Exception as e:
+            logger.warning(f"Не удалось сохранить счетчики кэша: {e}")
+
+    def get(self, key: str) -> Optional[Union[str, bytes]]:
+        """Результат по ключу или None (промах или хранилище недоступно)"""
+        if not self._available():
+            return None
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            self._failed(e)
+            return None
+        if value is None:
+            self._count('misses')
+            return None
+        self._count('hits')
+        kind, payload = value[:1], value[1:]
+        return payload.decode('utf-8') if kind == _TEXT else payload
+
+    def put(self, key: str, value: Union[str, bytes]) -> None:
+        """Сохраняет результат, если он не больше max_value_size"""
+        if isinstance(value, str):
+            payload = _TEXT + value.encode('utf-8', errors='surrogatepass')
+        else:
+            payload = _BINARY + bytes(value)
+        if len(payload) > self.max_value_size or not self._available():
+            return
+        try:
+            self.backend.set(key, payload)
+        except Exception as e:
+            self._failed(e)
+            return
+        self._count('stores')
+
+    def store_chunks(self, key: str, chunks: Iterable[Union[str, bytes]]) -> Iterator[Union[str, bytes]]:
+        """
+        Фрагменты результата; когда они выданы полностью, результат
+        сохраняется (если уложился в max_value_size)
+        """
+        buffer = []
+        size = 0
+        for chunk in chunks:
+            if buffer is not None:
+                size += len(chunk)
+                if size > self.max_value_size:
+                    buffer = None
+                else:
+                    buffer.append(chunk)
+            yield chunk
+        if buffer:
+            self.put(key, buffer[0][:0].join(buffer))
+
+    # Статистика
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Счетчики процесса, доля попаданий и заполнение хранилища; для общего
+        хранилища - также счетчики всех процессов (shared)
+        """
+        with self._lock:
+            counters = dict(self.counters)
+        lookups = counters['hits'] + counters['misses']
+        stats = dict(counters, backend=self.backend.name, max_size=self.backend.max_size,
+                     ttl=self.backend.ttl,
+                     hit_rate=round(counters['hits'] / lookups, 4) if lookups else None,
+                     available=self._available())
+        try:
+            stats.update(self.backend.stats())
+        except Exception as e:
+            self._failed(e)
+            stats['available'] = False
+        shared = stats.get('shared')
+        if shared is not None:
+            with self._lock:
+                pending = dict(self._pending)
+            shared = {name: shared.get(name, 0) + pending[name] for name in self.COUNTERS}
+            total = shared['hits'] + shared['misses']
+            shared['hit_rate'] = round(shared['hits'] / total, 4) if total else None
+            stats['shared'] = shared
+        return stats
@@ -0,0 +1,204 @@
+"""
+Компактное представление разобранных документов
+
+Большой вложенный JSON или XML в виде словарей и списков занимает в памяти
+в несколько раз больше исходного текста: каждый маленький объект - отдельный
+словарь, каждая повторяющаяся строка - отдельный объект str. Компактное
+дерево строится прямо при разборе (CompactBuilder):
+
+- объект - CompactObject: кортеж ключей (форма), общий для всех объектов с
+  теми же ключами, и кортеж значений;
+- ключи и короткие строковые значения хранятся в одном экземпляре;
+- списки целых или дробных чисел упаковываются в array, остальные списки
+  становятся кортежами.
+
+CompactObject - Mapping, поэтому код, читающий документ как отображение,
+работает без изменений. Сериализаторы с compact_serialize обходят дерево
+сами и не восстанавливают словари целиком; thaw превращает дерево обратно
+в словари и списки.
+"""
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from array import array
+from collections.abc import Mapping
+import os
+
+# Документы от этого размера разбираются в компактное дерево, МБ
+COMPACT_THRESHOLD_MB = 32
+
+# Объекты с большим числом ключей остаются словарями
+MAX_SHAPE_KEYS = 64
+
+# Сколько разных форм и строк запоминается за один разбор
+MAX_SHAPES = 10000
+MAX_STRINGS = 100000
+
+# Более длинные строки не объединяются: повторы среди них редки
+MAX_STRING_LENGTH = 32
+
+
+class CompactObject(Mapping):
+    """Объект документа: общий кортеж ключей и кортеж значений"""
+
+    __slots__ = ('_keys', '_values')
+
+    def __init__(self, keys: Tuple[str, ...], values: Tuple[Any, ...]):
+        self._keys = keys
+        self._values = values
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return self._values[self._keys.index(key)]
+        except ValueError:
+            raise KeyError(key) from None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._keys
+
+    def keys(self) -> Tuple[str, ...]:
+        return self._keys
+
+    def values(self) -> Tuple[Any, ...]:
+        return self._values
+
+    def items(self) -> List[Tuple[str, Any]]:
+        return list(zip(self._keys, self._values))
+
+    def __repr__(self) -> str:
+        return f'CompactObject({dict(zip(self._keys, self._values))!r})'
+
+
+# Типы узлов-объектов и узлов-списков в обычном и компактном дереве
+MAPPING_TYPES = (dict, CompactObject)
+SEQUENCE_TYPES = (list, tuple, array)
+
+
+def to_builtin(value: Any) -> Any:
+    """
+    default для json: узел компактного дерева как dict или list.
+
+    Кодировщик вызывает его для каждого узла по мере обхода, поэтому
+    словарь одного уровня живет, только пока этот уровень записывается.
+    """
+    if isinstance(value, CompactObject):
+        return dict(zip(value._keys, value._values))
+    if isinstance(value, array):
+        return value.tolist()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def thaw(value: Any) -> Any:
+    """Обычное дерево из словарей и списков"""
+    kind = type(value)
+    if kind is CompactObject or kind is dict:
+        return {key: thaw(item) for key, item in value.items()}
+    if kind is tuple or kind is list:
+        return [thaw(item) for item in value]
+    if kind is array:
+        return value.tolist()
+    return value
+
+
+def threshold_from_env() -> Optional[int]:
+    """Порог COMPACT_PARSE_MB в байтах; 0 - компактное дерево не строится"""
+    value = os.environ.get('COMPACT_PARSE_MB')
+    size = float(value) if value else COMPACT_THRESHOLD_MB
+    return int(size * 1024 * 1024) if size > 0 else None
+
+
+class CompactBuilder:
+    """
+    Строит компактное дерево при разборе одного документа.
+
+    Пример:
+        builder = CompactBuilder()
+        document = builder.value(json.loads(text, object_pairs_hook=builder.mapping))
+    """
+
+    def __init__(self):
+        self._shapes: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+        self._strings: Dict[str, str] = {}
+
+    def string(self, value: str) -> str:
+        """Единственный экземпляр короткой строки"""
+        if len(value) > MAX_STRING_LENGTH:
+            return value
+        known = self._strings.get(value)
+        if known is not None:
+            return known
+        if len(self._strings) < MAX_STRINGS:
+            self._strings[value] = value
+        return value
+
+    def value(self, value: Any) -> Any:
+        """Значение, в котором списки и строки еще не упакованы"""
+        kind = type(value)
+        if kind is str:
+            return self.string(value)
+        if kind is list:
+            return self.sequence(value)
+        return value
+
+    def sequence(self, items: List[Any]) -> Any:
+        """Список: однотипные числа - в array, остальное - в кортеж"""
+        if not items:
+            return ()
+        first = type(items[0])
+        if first is int or first is float:
+            for item in items:
+                if type(item) is not first:
+                    break
+            else:
+                try:
+                    return array('q' if first is int else 'd', items)
+                except OverflowError:
+                    # Целые больше 64 бит
+                    pass
+        value = self.value
+        return tuple([value(item) for item in items])
+
+    def mapping(self, pairs: List[Tuple[str, Any]]) -> Any:
+        """
+        Объект из пар ключ-значение (object_pairs_hook для json.loads).
+
+        Вложенные объекты к этому моменту уже компактные, упаковываются
+        только строки и списки.
+        """
+        keys = tuple([key for key, _ in pairs])
+        shape = self._shapes.get(keys)
+        if shape is None:
+            if len(keys) > MAX_SHAPE_KEYS or len(set(keys)) != len(keys):
+                # Большой объект или повторы ключей (действует последний) - словарь
+                return {self.string(key): self.value(item) for key, item in pairs}
+            shape = tuple([self.string(key) for key in keys])
+            if len(self._shapes) < MAX_SHAPES:
+                self._shapes[keys] = shape
+        strings = self._strings
+        values = []
+        for _, item in pairs:
+            kind = type(item)
+            if kind is str:
+                if len(item) <= MAX_STRING_LENGTH:
+                    known = strings.get(item)
+                    item = known if known is not None else self.string(item)
+            elif kind is list:
+                item = self.sequence(item)
+            values.append(item)
+        return CompactObject(shape, tuple(values))
+
+    def element(self, path: Any, key: str, value: Any) -> Tuple[str, Any]:
+        """
+        postprocessor для xmltodict: каждый разобранный элемент и атрибут
+        упаковывается сразу, пока родитель еще строится.
+        """
+        kind = type(value)
+        if kind is dict:
+            return self.string(key), self.mapping(list(value.items()))
+        if kind is str:
+            return self.string(key), self.string(value)
+        return self.string(key), value
@@ -0,0 +1,209 @@
+"""
+Прозрачная распаковка входных данных и сжатие результата
+"""
+from typing import Iterable, Iterator, Optional, Tuple, Union
+import bz2
+import gzip
+import io
+import lzma
+import zlib
+
+from .base import ConversionError
+
+try:
+    import zstandard
+except ImportError:  # zstd поддерживается, только если установлен пакет
+    zstandard = None
+
+# Сигнатуры сжатых потоков
+MAGIC_NUMBERS = [
+    ('gzip', b'\x1f\x8b'),
+    ('bz2', b'BZh'),
+    ('xz', b'\xfd7zXZ\x00'),
+    ('zstd', b'\x28\xb5\x2f\xfd'),
+]
+MAGIC_LENGTH = max(len(magic) for _, magic in MAGIC_NUMBERS)
+
+# Расширения файлов и значения Content-Encoding
+EXTENSIONS = {'gz': 'gzip', 'bz2': 'bz2', 'xz': 'xz', 'zst': 'zstd'}
+FILE_SUFFIXES = {'gzip': '.gz', 'bz2': '.bz2', 'xz': '.xz', 'zstd': '.zst'}
+CONTENT_ENCODINGS = {'gzip': 'gzip', 'x-gzip': 'gzip', 'zstd': 'zstd', 'bzip2': 'bz2', 'xz': 'xz'}
+MIME_TYPES = {'gzip': 'application/gzip', 'bz2': 'application/x-bzip2',
+              'xz': 'application/x-xz', 'zstd': 'application/zstd'}
+
+CHUNK_SIZE = 64 * 1024
+
+
+def detect_compression(head: bytes) -> Optional[str]:
+    """Определяет алгоритм сжатия по первым байтам"""
+    for name, magic in MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return name
+    return None
+
+
+def split_extension(filename: str) -> Tuple[str, Optional[str]]:
+    """Отделяет расширение сжатия: data.csv.gz -> (data.csv, gzip)"""
+    base, dot, ext = filename.rpartition('.')
+    if dot and ext.lower() in EXTENSIONS:
+        return base, EXTENSIONS[ext.lower()]
+    return filename, None
+
+
+def _require_zstandard():
+    if zstandard is None:
+        raise ConversionError("Для формата zstd требуется пакет zstandard")
+
+
+class _PrefixedStream(io.RawIOBase):
+    """Несдвигаемый поток, из которого уже прочитано начало"""
+
+    def __init__(self, head: bytes, stream):
+        super().__init__()
+        self._head = head
+        self._stream = stream
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self._head:
+            size = min(len(buffer), len(self._head))
+            buffer[:size] = self._head[:size]
+            self._head = self._head[size:]
+            return size
+        chunk = self._stream.read(len(buffer))
+        buffer[:len(chunk)] = chunk
+        return len(chunk)
+
+
+def _peek(stream) -> Tuple[bytes, io.IOBase]:
+    """Читает сигнатуру, не теряя данные потока"""
+    try:
+        if stream.seekable():
+            position = stream.tell()
+            head = stream.read(MAGIC_LENGTH)
+            stream.seek(position)
+            return head, stream
+    except (AttributeError, OSError):
+        pass
+    head = stream.read(MAGIC_LENGTH)
+    return head, io.BufferedReader(_PrefixedStream(head, stream))
+
+
+def open_decompressed(stream, method: Optional[str] = None) -> io.IOBase:
+    """
+    Возвращает поток распакованных данных.
+
+    Данные распаковываются по мере чтения, распакованный документ целиком
+    в памяти не хранится. Если сигнатура сжатия не найдена, возвращается
+    исходный поток.
+    """
+    if method is None:
+        head, stream = _peek(stream)
+        if isinstance(head, str):
+            return stream
+        method = detect_compression(head)
+    if method is None:
+        return stream
+
+    if method == 'gzip':
+        return gzip.GzipFile(fileobj=stream, mode='rb')
+    if method == 'bz2':
+        return bz2.BZ2File(stream, mode='rb')
+    if method == 'xz':
+        return lzma.LZMAFile(stream, mode='rb')
+    if method == 'zstd':
+        _require_zstandard()
+        reader = zstandard.ZstdDecompressor().stream_reader(stream, read_across_frames=True)
+        return io.BufferedReader(reader)
+    raise ConversionError(f"Неподдерживаемый алгоритм сжатия: {method}")
+
+
+def decompress_input(data: Union[str, bytes, io.IOBase]) -> Union[str, bytes, io.IOBase]:
+    """Распаковывает байты или файл, если они сжаты; строки возвращает как есть"""
+    if isinstance(data, bytes):
+        if detect_compression(data[:MAGIC_LENGTH]) is None:
+            return data
+        return open_decompressed(io.BytesIO(data))
+    if isinstance(data, io.IOBase) and not isinstance(data, io.TextIOBase):
+        return open_decompressed(data)
+    return data
+
+
+def ensure_supported(method: str) -> None:
+    """Проверяет, что алгоритм сжатия доступен"""
+    if method not in FILE_SUFFIXES:
+        raise ConversionError(f"Неподдерживаемый алгоритм сжатия: {method}")
+    if method == 'zstd':
+        _require_zstandard()
+
+
+def _compressor(method: str):
+    if method == 'gzip':
+        return zlib.compressobj(6, zlib.DEFLATED, 31)
+    if method == 'bz2':
+        return bz2.BZ2Compressor(9)
+    if method == 'xz':
+        return lzma.LZMACompressor()
+    if method == 'zstd':
+        _require_zstandard()
+        return zstandard.ZstdCompressor().compressobj()
+    raise ConversionError(f"Неподдерживаемый алгоритм сжатия: {method}")
+
+
+def iter_compress(chunks: Iterable[Union[str, bytes]], method: str) -> Iterator[bytes]:
+    """Сжимает поток фрагментов результата, не собирая его целиком"""
+    compressor = _compressor(method)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    tail = compressor.flush()
+    if tail:
+        yield tail
+
+
+def iter_chunks(text: str, size: int = CHUNK_SIZE) -> Iterator[str]:
+    """Делит строку на фрагменты для потоковой отправки"""
+    for start in range(0, len(text), size):
+        yield text[start:start + size]
+
+
+# Ключ окружения WSGI с длиной сжатого тела запроса (Content-Length до распаковки)
+WIRE_LENGTH_KEY = 'converter.wire_content_length'
+
+
+class RequestDecompressionMiddleware:
+    """
+    WSGI middleware: распаковывает тела запросов с заголовком Content-Encoding.
+
+    Тело распаковывается по мере чтения; длина распакованных данных
+    ограничивается MAX_CONTENT_LENGTH приложения как для обычного запроса
+    без Content-Length. Длина сжатого тела сохраняется в окружении под
+    ключом WIRE_LENGTH_KEY (для лимитов объема клиента).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def __call__(self, environ, start_response):
+        encoding = environ.get('HTTP_CONTENT_ENCODING', '').strip().lower()
+        method = CONTENT_ENCODINGS.get(encoding)
+        if method is not None:
+            try:
+                environ['wsgi.input'] = open_decompressed(environ['wsgi.input'], method)
+            except ConversionError as e:
+                body = str(e).encode('utf-8')
+                start_response('415 Unsupported Media Type',
+                               [('Content-Type', 'text/plain; charset=utf-8'),
+                                ('Content-Length', str(len(body)))])
+                return [body]
+            wire_length = environ.pop('CONTENT_LENGTH', None)
+            if wire_length:
+                environ[WIRE_LENGTH_KEY] = wire_length
+            environ.pop('HTTP_CONTENT_ENCODING', None)
+            environ['wsgi.input_terminated'] = True
+        return self.app(environ, start_response)
@@ -3,21 +3,166 @@ CSV конвертер
 """
 import pandas as pd
 import csv
-from typing import Any, Union, List, Dict
+import codecs
+import re
+from typing import Any, Union, List, Dict, Iterator, Optional
+from itertools import chain, islice
 import io
-from .base import BaseConverter, ConversionError, ValidationError
+import os
+import tempfile
+import bz2
+import gzip
+import lzma
+from .base import (BaseConverter, ConversionError, ValidationError, CANONICAL, PRETTY,
+                   syntax_error, preserve_position)
+from . import parallel
+from .flatten import flatten_records, SpooledTable
+
+
+# Символы, влияющие на границы записей CSV
+_RECORD_DELIMITERS = re.compile(r'["\n]')
+
+
+def _stream_size(stream: io.IOBase) -> Optional[int]:
+    """Размер непрочитанной части файла, если его можно узнать без чтения"""
+    # Распаковывающие потоки перематываются в конец только распаковкой всех данных
+    if isinstance(stream, (gzip.GzipFile, bz2.BZ2File, lzma.LZMAFile)):
+        return None
+    try:
+        position = stream.tell()
+        size = stream.seek(0, io.SEEK_END) - position
+        stream.seek(position)
+        return size
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+class _ColumnTypes:
+    """
+    Сводный тип колонок по блокам таблицы.
+    
+    pandas выводит тип колонки по всем ее значениям: целые с пропусками
+    становятся дробными, смесь типов - object. Здесь тип сводится по типам
+    колонки в каждом блоке по тем же правилам, чтобы блоки записывались
+    одинаково и совпадали с таблицей, разобранной целиком.
+    """
+    
+    def __init__(self, separator: str = '.'):
+        self.separator = separator
+        self.rows = 0
+        # Виды значений колонки: 'i', 'f', 'b', 'O' или другой dtype
+        self.kinds: Dict[str, set] = {}
+        # Сколько строк было в блоках с этой колонкой
+        self.present: Dict[str, int] = {}
+        # Колонки с пропусками
+        self.missing: set = set()
+    
+    def add(self, frame: pd.DataFrame) -> None:
+        self.rows += len(frame)
+        for name in frame.columns:
+            column = frame[name]
+            self.present[name] = self.present.get(name, 0) + len(frame)
+            nulls = int(column.isna().sum())
+            if nulls:
+                self.missing.add(name)
+            if nulls < len(column):
+                kind = column.dtype.kind
+                self.kinds.setdefault(name, set()).add(
+                    kind if kind in ('i', 'f', 'b', 'O') else column.dtype)
+    
+    def dtypes(self, columns: List[str]) -> Dict[str, Any]:
+        """Типы колонок, отличные от object"""
+        result = {}
+        for name in columns:
+            kinds = set(self.kinds.get(name, ()))
+            prefix = f"{name}{self.separator}"
+            if any(other.startswith(prefix) for other in self.present):
+                # Объект, который позже стал значением: в колонке будет JSON
+                kinds.add('O')
+            if kinds == {'i', 'f'}:
+                kinds = {'f'}
+            if len(kinds) != 1:
+                continue
+            kind = kinds.pop()
+            missing = name in self.missing or self.present.get(name, 0) < self.rows
+            if kind == 'i':
+                result[name] = 'float64' if missing else 'int64'
+            elif kind == 'f':
+                result[name] = 'float64'
+            elif kind == 'b':
+                if not missing:
+                    result[name] = 'bool'
+            elif kind != 'O':
+                result[name] = kind
+        return result
 
 
 class CSVConverter(BaseConverter):
     """Конвертер для CSV формата"""
     
-    def __init__(self):
+    # Количество строк, которое pandas читает за один шаг потокового разбора
+    CHUNK_SIZE = 10000
+    streaming = True
+    streaming_output = True
+    
+    # Файлы от этого размера разбираются в пуле процессов
+    PARALLEL_THRESHOLD = parallel.PARALLEL_THRESHOLD
+    
+    # Блок копирования данных во временный файл для параллельного разбора
+    COPY_BLOCK_SIZE = 1024 * 1024
+    
+    # Сколько символов с начала данных проверяет validate
+    VALIDATE_SAMPLE = 64 * 1024
+    
+    def __init__(self, workers: Optional[int] = None):
         super().__init__()
         self.supported_formats = ['csv']
+        # Число процессов для параллельного разбора (по умолчанию - число ядер)
+        self.workers = workers
+    
+    def _parallel_input(self, data: Union[str, bytes, io.IOBase]) -> Optional[str]:
+        """
+        Путь к временной копии данных для параллельного разбора или None,
+        если файл мал или ядро одно.
+        
+        Копия пишется блоками, файл целиком в память не читается; процессы
+        пула читают из нее свои диапазоны. Удаляет копию вызывающий.
+        """
+        workers = self.workers or parallel.cpu_count()
+        if workers < 2:
+            return None
+        if isinstance(data, (str, bytes)):
+            # Для строки длина в символах - нижняя оценка размера в байтах
+            size = len(data)
+        else:
+            size = _stream_size(data)
+        if size is None or size < self.PARALLEL_THRESHOLD:
+            return None
+        
+        if isinstance(data, (str, bytes)):
+            blocks = (data[i:i + self.COPY_BLOCK_SIZE]
+                      for i in range(0, len(data), self.COPY_BLOCK_SIZE))
+        else:
+            blocks = iter(lambda: data.read(self.COPY_BLOCK_SIZE), data.read(0))
+        with tempfile.NamedTemporaryFile(suffix='.csv', delete=False) as copy:
+            try:
+                for block in blocks:
+                    copy.write(block.encode('utf-8') if isinstance(block, str) else block)
+            except BaseException:
+                copy.close()
+                os.remove(copy.name)
+                raise
+        return copy.name
     
     def parse(self, data: Union[str, bytes, io.IOBase]) -> Any:
         """Парсит CSV данные"""
         try:
+            path = self._parallel_input(data)
+            if path is not None:
+                try:
+                    return parallel.read_csv_parallel(path, self.workers).to_dict('records')
+                finally:
+                    os.remove(path)
             if isinstance(data, io.IOBase):
                 df = pd.read_csv(data)
             elif isinstance(data, bytes):
@@ -31,46 +176,194 @@ class CSVConverter(BaseConverter):
         except Exception as e:
             raise ConversionError(f"Ошибка парсинга CSV: {str(e)}")
     
-    def serialize(self, data: Any) -> str:
-        """Сериализует данные в CSV"""
+    def iter_records(self, data: Union[str, bytes, io.IOBase], columns=None,
+                     record_filter=None) -> Iterator[Dict]:
+        """
+        Потоково выдает строки CSV как словари, читая файл частями
+        
+        Большой файл копируется во временный файл, и его диапазоны
+        разбираются в пуле процессов; таблицы диапазонов выдаются по
+        порядку, в работе одновременно ограниченное число диапазонов.
+        
+        Args:
+            data: Входные данные
+            columns: Читать только эти колонки (остальные не разбираются)
+            record_filter: Фильтр, применяемый к каждой части до создания словарей
+        """
         try:
-            if isinstance(data, list) and len(data) > 0 and isinstance(data[0], dict):
-                # Список словарей - стандартный формат
+            path = self._parallel_input(data)
+            if path is not None:
+                try:
+                    for frame in parallel.iter_frames(path, self.workers, columns, record_filter):
+                        yield from frame.to_dict('records')
+                finally:
+                    os.remove(path)
+                return
+            
+            if isinstance(data, bytes):
+                data = io.StringIO(data.decode('utf-8'))
+            elif isinstance(data, str):
+                data = io.StringIO(data)
+            
+            usecols = (lambda name: name in columns) if columns is not None else None
+            with pd.read_csv(data, chunksize=self.CHUNK_SIZE, usecols=usecols) as reader:
+                for chunk in reader:
+                    if record_filter is not None:
+                        chunk = record_filter.filter_frame(chunk)
+                    yield from chunk.to_dict('records')
+        except Exception as e:
+            raise ConversionError(f"Ошибка парсинга CSV: {str(e)}")
+    
+    def record_boundary(self, text: str) -> int:
+        """Конец последней полной строки CSV, не попадающий внутрь кавычек"""
+        pos = text.rfind('\n')
+        while pos != -1:
+            # Четное число кавычек до перевода строки - мы вне поля в кавычках
+            if text.count('"', 0, pos) % 2 == 0:
+                return pos + 1
+            pos = text.rfind('\n', 0, pos)
+        return 0
+    
+    def split_records(self, text: str) -> Optional[List[int]]:
+        """Начала строк CSV с учетом переводов строк внутри кавычек"""
+        boundaries = []
+        in_quotes = False
+        for match in _RECORD_DELIMITERS.finditer(text):
+            if match.group() == '"':
+                in_quotes = not in_quotes
+            elif not in_quotes:
+                boundaries.append(match.end())
+        if in_quotes:
+            return None
+        
+        # Первая граница - конец заголовка, в конце - длина текста
+        starts = [b for b in boundaries if b < len(text)]
+        starts.append(len(text))
+        return starts
+    
+    def record_types(self, records: List[Any]) -> Optional[Dict[str, str]]:
+        """Типы колонок, которые pandas выводит по этим строкам"""
+        return pd.DataFrame(records).dtypes.astype(str).to_dict()
+    
+    def _to_frame(self, data: Any, profile: str) -> pd.DataFrame:
+        """Таблица для записи в CSV (в профиле canonical колонки по алфавиту)"""
+        if isinstance(data, list) and len(data) > 0 and isinstance(data[0], dict):
+            # Список словарей - вложенные объекты разворачиваются в колонки "a.b"
+            columns, rows = flatten_records(data)
+            df = pd.DataFrame(rows, columns=columns)
+        elif isinstance(data, dict):
+            # Словарь - конвертируем в DataFrame
+            if all(isinstance(v, list) for v in data.values()):
+                # Словарь списков
                 df = pd.DataFrame(data)
-            elif isinstance(data, dict):
-                # Словарь - конвертируем в DataFrame
-                if all(isinstance(v, list) for v in data.values()):
-                    # Словарь списков
-                    df = pd.DataFrame(data)
-                else:
-                    # Обычный словарь - делаем одну строку
-                    df = pd.DataFrame([data])
             else:
-                # Другие типы данных
-                df = pd.DataFrame({'data': data if isinstance(data, list) else [data]})
-            
-            return df.to_csv(index=False)
+                # Обычный словарь - делаем одну строку
+                columns, rows = flatten_records([data])
+                df = pd.DataFrame(rows, columns=columns)
+        else:
+            # Другие типы данных
+            df = pd.DataFrame({'data': data if isinstance(data, list) else [data]})
+        
+        if profile == CANONICAL:
+            df = df[sorted(df.columns, key=str)]
+        return df
+    
+    def serialize(self, data: Any, profile: str = PRETTY) -> str:
+        """Сериализует данные в CSV"""
+        try:
+            return self._to_frame(data, profile).to_csv(index=False)
+        except Exception as e:
+            raise ConversionError(f"Ошибка сериализации в CSV: {str(e)}")
+    
+    def iter_serialize(self, data: Any, profile: str = PRETTY) -> Iterator[str]:
+        """Сериализует данные в CSV блоками по CHUNK_SIZE строк"""
+        try:
+            if isinstance(data, Iterator):
+                yield from self._iter_serialize_records(data, profile)
+                return
+            df = self._to_frame(data, profile)
+            for start in range(0, max(len(df), 1), self.CHUNK_SIZE):
+                yield df.iloc[start:start + self.CHUNK_SIZE].to_csv(index=False, header=start == 0)
         except Exception as e:
             raise ConversionError(f"Ошибка сериализации в CSV: {str(e)}")
     
+    def _iter_serialize_records(self, records: Iterator[Any], profile: str) -> Iterator[str]:
+        """
+        Поток записей блоками по CHUNK_SIZE: в памяти только текущий блок.
+        
+        Заголовок - первая строка CSV, а поле может впервые появиться в
+        последней записи. Поэтому поток длиннее одного блока сначала
+        сбрасывается во временный файл (SpooledTable) и выдается, когда
+        прочитан целиком, с колонками и типами колонок по всем записям -
+        так же, как serialize.
+        """
+        first = list(islice(records, self.CHUNK_SIZE))
+        following = list(islice(records, self.CHUNK_SIZE))
+        if not following:
+            yield self._to_frame(first, profile).to_csv(index=False)
+            return
+        if not isinstance(first[0], dict):
+            # Не записи - одна колонка data, как в _to_frame
+            batches = chain([first, following], iter(lambda: list(islice(records, self.CHUNK_SIZE)), []))
+            for index, batch in enumerate(batches):
+                yield pd.DataFrame({'data': batch}).to_csv(index=False, header=index == 0)
+            return
+        
+        with SpooledTable() as table:
+            types = _ColumnTypes(table.separator)
+            batches = chain([first, following], iter(lambda: list(islice(records, self.CHUNK_SIZE)), []))
+            for batch in batches:
+                columns, rows = table.add(batch)
+                types.add(pd.DataFrame(rows, columns=columns))
+            del first, following, batch, rows
+            
+            columns = table.columns
+            dtypes = types.dtypes(columns)
+            order = sorted(columns, key=str) if profile == CANONICAL else columns
+            for index, rows in enumerate(table.batches()):
+                df = pd.DataFrame(rows, columns=columns, dtype=object).astype(dtypes)
+                yield df[order].to_csv(index=False, header=index == 0)
+    
     def validate(self, data: Union[str, bytes, io.IOBase]) -> bool:
         """Валидирует CSV данные"""
-        try:
+        return self.check_syntax(data) is None
+    
+    def _sample(self, data: Union[str, bytes, io.IOBase]) -> str:
+        """Целые строки из первых VALIDATE_SAMPLE символов данных"""
+        with preserve_position(data):
             if isinstance(data, io.IOBase):
-                content = data.read()
-                if isinstance(content, bytes):
-                    content = content.decode('utf-8')
-                data.seek(0)  # Возвращаем указатель в начало
-            elif isinstance(data, bytes):
-                content = data.decode('utf-8')
+                block = data.read(self.VALIDATE_SAMPLE + 1)
             else:
-                content = data
-            
-            # Пробуем парсить как CSV
-            csv.Sniffer().sniff(content)
-            return True
-        except Exception:
-            return False
+                block = data[:self.VALIDATE_SAMPLE + 1]
+        if isinstance(block, bytes):
+            # Блок может закончиться посреди многобайтного символа
+            block = codecs.getincrementaldecoder('utf-8')().decode(block)
+        if len(block) <= self.VALIDATE_SAMPLE:
+            return block
+        return block[:self.record_boundary(block[:self.VALIDATE_SAMPLE])]
+    
+    def check_syntax(self, data: Union[str, bytes, io.IOBase]) -> Optional[Dict[str, Any]]:
+        """
+        Проверяет начало CSV: по выборке определяется разделитель, и ни одна
+        строка выборки не должна быть шире заголовка - такую строку parse
+        не разберет. Остальные данные не читаются.
+        """
+        try:
+            sample = self._sample(data)
+        except UnicodeDecodeError as e:
+            return syntax_error(f"Ошибка кодировки: {str(e)}")
+        try:
+            csv.Sniffer().sniff(sample)
+            reader = csv.reader(io.StringIO(sample))
+            header = next(reader, [])
+            for row in reader:
+                if len(row) > len(header):
+                    return syntax_error(
+                        f"Ошибка синтаксиса CSV: полей в строке {len(row)}, в заголовке {len(header)}",
+                        reader.line_num, None)
+        except csv.Error as e:
+            return syntax_error(f"Ошибка синтаксиса CSV: {str(e)}")
+        return None
     
     def get_mime_type(self) -> str:
         return "text/csv"
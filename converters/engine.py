@@ -1,78 +1,141 @@
 """
 Универсальный движок конвертации
 """
-from typing import Dict, Any, Union, Optional
+from typing import Dict, Any, Iterable, Iterator, Union, Optional, Tuple
+from itertools import islice
+import codecs
 import io
 import os
-from .base import BaseConverter, ConversionError, ValidationError
-from .json_converter import JSONConverter
-from .xml_converter import XMLConverter
-from .csv_converter import CSVConverter
-from .yaml_converter import YAMLConverter
-from .toml_converter import TOMLConverter
+from .base import (BaseConverter, ConversionError, ValidationError, PRETTY, check_profile,
+                   preserve_position)
+from .registry import ConverterRegistry, create_default_registry
+from .schema import validate_records, infer_schema
+from .pipeline import Pipeline
+from .compression import decompress_input, split_extension, iter_chunks, CHUNK_SIZE
+from .profiling import annotate
+from .limits import Limits, Governor
+from .cache import ResultCache
+from .compact import threshold_from_env
+from .incremental import (SessionCache, IncrementalStateError, parse_full,
+                          parse_incremental, normalize_newlines)
+
+# Значение по умолчанию для cache: кэш из переменных окружения
+_FROM_ENV = object()
+
+
+def _coalesce(chunks: Iterable[Union[str, bytes]], size: int = CHUNK_SIZE) -> Iterator[Union[str, bytes]]:
+    """Склеивает мелкие фрагменты сериализатора в блоки около size символов (байт)"""
+    buffer = []
+    length = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield buffer[0][:0].join(buffer)
+            buffer = []
+            length = 0
+    if buffer:
+        yield buffer[0][:0].join(buffer)
 
 
 class ConversionEngine:
     """Универсальный движок для конвертации между форматами"""
     
-    def __init__(self):
-        self.converters: Dict[str, BaseConverter] = {
-            'json': JSONConverter(),
-            'xml': XMLConverter(),
-            'csv': CSVConverter(),
-            'yaml': YAMLConverter(),
-            'yml': YAMLConverter(),
-            'toml': TOMLConverter()
-        }
+    # Наибольший вход, который при автоопределении формата проверяют
+    # конвертеры, загружающие документ целиком (validate_loads_all)
+    DETECT_TEXT_LIMIT = 1024 * 1024
+    
+    def __init__(self, registry: Optional[ConverterRegistry] = None,
+                 limits: Optional[Limits] = None,
+                 cache: Optional[ResultCache] = _FROM_ENV):
+        # Конвертеры создаются лениво при первом обращении к формату
+        self.converters: ConverterRegistry = registry or create_default_registry()
+        # Ограничения ресурсов каждой конвертации
+        self.limits: Limits = limits or Limits.from_env()
+        # Кэш результатов и форматов (общий для процессов при CACHE_PATH);
+        # по умолчанию из окружения, None - без кэша
+        self.cache: Optional[ResultCache] = (ResultCache.from_env() if cache is _FROM_ENV
+                                             else cache)
+        # Вход от этого размера разбирается в компактное дерево (None - никогда)
+        self.compact_threshold: Optional[int] = threshold_from_env()
+        # Разобранные версии документов для инкрементальной конвертации
+        self.sessions = SessionCache()
     
     def get_supported_formats(self) -> list:
         """Возвращает список поддерживаемых форматов"""
-        return list(self.converters.keys())
+        return self.converters.names()
     
     def detect_format(self, data: Union[str, bytes, io.IOBase], filename: Optional[str] = None) -> str:
         """Автоматически определяет формат данных"""
-        # Получаем содержимое для проверки
-        content = self._get_content_for_validation(data)
+        digest = self.cache.digest(data) if self.cache is not None else None
+        return self._detect_format(data, filename, digest)
+    
+    def _detect_format(self, data: Union[str, bytes, io.IOBase], filename: Optional[str],
+                       digest: Optional[str]) -> str:
+        """Определение формата; digest - хэш содержимого для кэша"""
+        key = None
+        if digest is not None:
+            ext = os.path.splitext(split_extension(filename)[0])[1].lower() if filename else ''
+            key = self.cache.key('format', digest, ext)
+            cached = self.cache.get(key)
+            if cached in self.converters:
+                return cached
+        format_name = self._detect_uncached(data, filename)
+        if key is not None:
+            self.cache.put(key, format_name)
+        return format_name
+    
+    def _detect_uncached(self, data: Union[str, bytes, io.IOBase], filename: Optional[str]) -> str:
+        data = decompress_input(data)
+        # Конвертеры проверяют сам поток, возвращая его на прежнюю позицию;
+        # в память читается только начало данных, и только для конвертеров,
+        # которым нужен весь документ (кроме формата из расширения файла)
+        prefix = []
+        
+        def matches(converter: BaseConverter, by_extension: bool = False) -> bool:
+            if by_extension or not converter.validate_loads_all:
+                return converter.validate(data)
+            if not prefix:
+                prefix.append(self._detect_prefix(data))
+            return prefix[0] is not None and converter.validate(prefix[0])
         
-        # Сначала пробуем по расширению файла
+        # Сначала пробуем по расширению файла (без расширения сжатия: data.csv.gz)
         if filename:
-            ext = os.path.splitext(filename)[1].lower().lstrip('.')
+            ext = os.path.splitext(split_extension(filename)[0])[1].lower().lstrip('.')
             if ext in self.converters:
                 converter = self.converters[ext]
                 try:
-                    if converter.validate(content):
+                    if matches(converter, by_extension=True):
                         return ext
                 except Exception:
                     pass
         
         # Если по расширению не получилось, пробуем валидацию для каждого формата
-        for format_name, converter in self.converters.items():
+        for format_name in self.converters.canonical_names():
             try:
-                if converter.validate(content):
+                if matches(self.converters.get(format_name)):
                     return format_name
             except Exception:
                 continue
         
         raise ConversionError("Не удалось определить формат входных данных")
     
-    def _get_content_for_validation(self, data: Union[str, bytes, io.IOBase]) -> str:
-        """Получает содержимое данных для валидации"""
+    def _detect_prefix(self, data: Union[str, bytes, io.IOBase]) -> Optional[Union[str, bytes]]:
+        """
+        Данные целиком, если они не длиннее DETECT_TEXT_LIMIT, иначе None.
+        Из файла читается не больше DETECT_TEXT_LIMIT + 1 символов (байт).
+        """
         if isinstance(data, io.IOBase):
-            current_pos = data.tell()
-            data.seek(0)
-            content = data.read()
-            data.seek(current_pos)  # Возвращаем указатель на место
-            if isinstance(content, bytes):
-                content = content.decode('utf-8')
-            return content
-        elif isinstance(data, bytes):
-            return data.decode('utf-8')
-        else:
-            return data
+            with preserve_position(data):
+                data = data.read(self.DETECT_TEXT_LIMIT + 1)
+        return data if len(data) <= self.DETECT_TEXT_LIMIT else None
     
     def convert(self, data: Union[str, bytes, io.IOBase], 
                 source_format: str, target_format: str,
-                filename: Optional[str] = None, stream: bool = False) -> str:
+                filename: Optional[str] = None, stream: bool = False,
+                pipeline: Optional[Union[Pipeline, list]] = None,
+                profile: str = PRETTY,
+                options: Optional[Dict[str, Any]] = None) -> Union[str, bytes]:
         """
         Конвертирует данные из одного формата в другой
         
@@ -82,45 +145,481 @@ class ConversionEngine:
             target_format: Целевой формат
             filename: Имя файла (для автоопределения формата)
             stream: Использовать потоковую обработку для больших файлов
+            pipeline: Шаги обработки записей между разбором и сериализацией
+                (Pipeline или его JSON описание)
+            profile: Оформление результата: pretty, compact или canonical
+            options: Параметры чтения исходного формата (например, sheet
+                для xlsx); допустимые перечислены в read_options конвертера
             
         Returns:
-            Строка с конвертированными данными
+            Строка с конвертированными данными (байты для двоичных форматов)
         """
-        # Автоопределение исходного формата, если не указан
-        if source_format == 'auto':
-            source_format = self.detect_format(data, filename)
+        governor = self.limits.start()
+        digest = self.cache.digest(data) if self.cache is not None else None
+        data, source_format, pipeline = self._prepare(data, source_format, target_format,
+                                                      filename, pipeline, profile, governor, digest)
+        options = self._read_options(source_format, options)
         
-        # Проверяем поддержку форматов
-        if source_format not in self.converters:
-            raise ConversionError(f"Неподдерживаемый исходный формат: {source_format}")
-        
-        if target_format not in self.converters:
-            raise ConversionError(f"Неподдерживаемый целевой формат: {target_format}")
-        
-        # Если форматы одинаковые, возвращаем исходные данные
-        if source_format == target_format:
+        # Если форматы одинаковые (с учетом псевдонимов), возвращаем исходные данные
+        if self._is_passthrough(source_format, target_format, pipeline, profile, options):
+            binary = self.converters.get(source_format).binary
             if isinstance(data, io.IOBase):
                 content = data.read()
-                if isinstance(content, bytes):
+                if isinstance(content, bytes) and not binary:
                     return content.decode('utf-8')
                 return content
-            elif isinstance(data, bytes):
+            elif isinstance(data, bytes) and not binary:
                 return data.decode('utf-8')
             return data
         
+        key = self._result_key('convert', digest, source_format, target_format,
+                               pipeline, profile, options)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                # Ограничение размера результата действует и для кэша
+                return governor.result(cached)
+        
         try:
             # Парсим исходные данные
-            source_converter = self.converters[source_format]
-            parsed_data = source_converter.parse(data)
+            target_converter = self.converters.get(target_format)
+            compact = self._use_compact(data, source_format, target_converter, pipeline)
+            parsed_data = self._parse_source(data, source_format, pipeline, options, governor,
+                                             compact)
             
             # Сериализуем в целевой формат
-            target_converter = self.converters[target_format]
-            result = target_converter.serialize(parsed_data)
+            result = governor.result(self._serialize(target_converter, parsed_data, profile))
+            
+        except Exception as e:
+            limit = governor.cause(e)
+            if limit is not None:
+                raise limit
+            raise ConversionError(f"Ошибка конвертации из {source_format} в {target_format}: {str(e)}")
+        
+        if key is not None:
+            self.cache.put(key, result)
+        return result
+    
+    def convert_stream(self, data: Union[str, bytes, io.IOBase],
+                       source_format: str, target_format: str,
+                       filename: Optional[str] = None,
+                       pipeline: Optional[Union[Pipeline, list]] = None,
+                       profile: str = PRETTY,
+                       options: Optional[Dict[str, Any]] = None) -> Tuple[str, Iterator[Union[str, bytes]]]:
+        """
+        Конвертирует данные и выдает результат частями
+        
+        Разбор выполняется сразу, поэтому ошибки входных данных возникают
+        до первого фрагмента; сериализация идет по мере чтения результата,
+        и результат целиком в памяти не собирается.
+        
+        Returns:
+            Кортеж (исходный формат, итератор фрагментов результата);
+            двоичные форматы выдаются байтами
+        """
+        governor = self.limits.start()
+        digest = self.cache.digest(data) if self.cache is not None else None
+        data, source_format, pipeline = self._prepare(data, source_format, target_format,
+                                                      filename, pipeline, profile, governor, digest)
+        options = self._read_options(source_format, options)
+        if self._is_passthrough(source_format, target_format, pipeline, profile, options):
+            binary = self.converters.get(source_format).binary
+            return source_format, governor.output(self._iter_input(data, binary))
+        
+        key = self._result_key('stream', digest, source_format, target_format,
+                               pipeline, profile, options)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return source_format, governor.output(
+                    self._iter_input(cached, isinstance(cached, bytes)))
+        
+        try:
+            source_converter = self.converters.get(source_format)
+            target_converter = self.converters.get(target_format)
+            if target_converter.streaming_output and source_converter.streams_records(data):
+                # Записи идут от парсера через конвейер к сериализатору по одной:
+                # память не зависит от размера данных (сортировка сбрасывает
+                # серии на диск), ошибки разбора возникают по ходу выдачи
+                records = self._iter_source_records(source_converter, data, pipeline, options,
+                                                    governor)
+                chunks = target_converter.iter_serialize(records, profile)
+            else:
+                compact = self._use_compact(data, source_format, target_converter, pipeline)
+                parsed_data = self._parse_source(data, source_format, pipeline, options, governor,
+                                                 compact)
+                chunks = target_converter.iter_serialize(parsed_data, profile)
+        except Exception as e:
+            limit = governor.cause(e)
+            if limit is not None:
+                raise limit
+            raise ConversionError(f"Ошибка конвертации из {source_format} в {target_format}: {str(e)}")
+        chunks = _coalesce(governor.output(chunks))
+        if key is not None:
+            # Результат сохраняется в кэш, когда выдан целиком
+            chunks = self.cache.store_chunks(key, chunks)
+        return source_format, chunks
+    
+    def _prepare(self, data: Union[str, bytes, io.IOBase], source_format: str,
+                 target_format: str, filename: Optional[str],
+                 pipeline: Optional[Union[Pipeline, list]], profile: str,
+                 governor: Optional[Governor] = None, digest: Optional[str] = None):
+        """Общая подготовка конвертации: распаковка, определение и проверка форматов"""
+        pipeline = Pipeline.from_spec(pipeline)
+        check_profile(profile)
+        # Сжатые данные (gzip, bz2, xz, zstd) распаковываются потоком;
+        # распакованный размер ограничен
+        data = decompress_input(data)
+        if governor is not None:
+            data = governor.input(data)
+        
+        # Автоопределение исходного формата, если не указан
+        if source_format == 'auto':
+            source_format = self._detect_format(data, filename, digest)
+        
+        # Проверяем поддержку форматов
+        if source_format not in self.converters:
+            raise ConversionError(f"Неподдерживаемый исходный формат: {source_format}")
+        
+        if target_format not in self.converters:
+            raise ConversionError(f"Неподдерживаемый целевой формат: {target_format}")
+        # Пара форматов попадает в профиль запроса, если он профилируется
+        annotate(source_format=source_format, target_format=target_format)
+        return data, source_format, pipeline
+    
+    def _read_options(self, source_format: str,
+                      options: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Параметры чтения без пустых значений; неизвестные формату - ошибка"""
+        options = {name: value for name, value in (options or {}).items()
+                   if value is not None and value != ''}
+        unknown = sorted(set(options) - set(self.converters.get(source_format).read_options))
+        if unknown:
+            raise ConversionError(
+                f"Формат {source_format} не поддерживает параметры: {', '.join(unknown)}")
+        return options
+    
+    def _result_key(self, mode: str, digest: Optional[str], source_format: str,
+                    target_format: str, pipeline: Optional[Pipeline], profile: str,
+                    options: Dict[str, Any]) -> Optional[str]:
+        """
+        Ключ результата в кэше или None, если результат не кэшируется.
+        mode (convert или stream) входит в ключ: сериализация целиком и
+        по частям может давать разный результат.
+        """
+        if digest is None:
+            return None
+        converters = [type(self.converters.get(name)) for name in (source_format, target_format)]
+        return self.cache.key('result', mode, digest,
+                              self.converters.resolve(source_format), self.converters.resolve(target_format),
+                              *[f'{cls.__module__}.{cls.__qualname__}' for cls in converters],
+                              pipeline, profile, options)
+    
+    def _is_passthrough(self, source_format: str, target_format: str,
+                        pipeline: Optional[Pipeline], profile: str,
+                        options: Optional[Dict[str, Any]] = None) -> bool:
+        """Данные можно вернуть без разбора: форматы совпадают и обработки нет"""
+        return (pipeline is None and profile == PRETTY and not options and
+                self.converters.resolve(source_format) == self.converters.resolve(target_format))
+    
+    def _use_compact(self, data: Union[str, bytes, io.IOBase], source_format: str,
+                     target_converter: BaseConverter, pipeline: Optional[Pipeline]) -> bool:
+        """
+        Разбирать ли вход в компактное дерево: вход не меньше порога, оба
+        конвертера его поддерживают и конвейера нет (шаги работают со словарями)
+        """
+        if self.compact_threshold is None or pipeline is not None:
+            return False
+        if not (self.converters.get(source_format).compact_parse and
+                target_converter.compact_serialize):
+            return False
+        size = self._input_size(data)
+        return size is not None and size >= self.compact_threshold
+    
+    def _input_size(self, data: Union[str, bytes, io.IOBase]) -> Optional[int]:
+        """Размер входа без чтения; None, если поток не перематывается"""
+        if isinstance(data, (str, bytes)):
+            return len(data)
+        try:
+            position = data.tell()
+            size = data.seek(0, io.SEEK_END)
+            data.seek(position)
+            return size - position
+        except (AttributeError, OSError, ValueError):
+            return None
+    
+    def _parse_source(self, data: Union[str, bytes, io.IOBase], source_format: str,
+                      pipeline: Optional[Pipeline],
+                      options: Optional[Dict[str, Any]] = None,
+                      governor: Optional[Governor] = None,
+                      compact: bool = False) -> Any:
+        """Разбирает исходные данные и применяет конвейер"""
+        source_converter = self.converters.get(source_format)
+        options = options or {}
+        if pipeline is not None and source_converter.streams_records(data):
+            return list(self._iter_source_records(source_converter, data, pipeline, options,
+                                                  governor))
+        if compact:
+            parsed_data = source_converter.parse_compact(data, **options)
+        else:
+            parsed_data = source_converter.parse(data, **options)
+        if governor is not None:
+            # Глубина, узлы и развернутый размер - до обработки и сериализации
+            governor.walk(parsed_data)
+        if pipeline is None:
+            return parsed_data
+        return pipeline.apply_document(parsed_data)
+    
+    def _iter_input(self, data: Union[str, bytes, io.IOBase],
+                    binary: bool = False) -> Iterator[Union[str, bytes]]:
+        """Исходные данные фрагментами (для совпадающих форматов)"""
+        if binary:
+            if isinstance(data, bytes):
+                data = io.BytesIO(data)
+            yield from iter(lambda: data.read(CHUNK_SIZE), b'')
+        elif isinstance(data, str):
+            yield from iter_chunks(data)
+        elif isinstance(data, bytes):
+            yield from iter_chunks(data.decode('utf-8'))
+        else:
+            decoder = codecs.getincrementaldecoder('utf-8')()
+            while True:
+                chunk = data.read(CHUNK_SIZE)
+                if isinstance(chunk, str):
+                    if not chunk:
+                        return
+                    yield chunk
+                    continue
+                text = decoder.decode(chunk, final=not chunk)
+                if text:
+                    yield text
+                if not chunk:
+                    return
+    
+    def convert_preview(self, data: Union[str, bytes, io.IOBase],
+                        source_format: str, target_format: str,
+                        filename: Optional[str] = None,
+                        max_records: Optional[int] = None,
+                        max_bytes: Optional[int] = None,
+                        pipeline: Optional[Union[Pipeline, list]] = None,
+                        profile: str = PRETTY,
+                        options: Optional[Dict[str, Any]] = None) -> Tuple[Union[str, bytes], bool]:
+        """
+        Конвертирует только начало данных для предпросмотра
+        
+        Args:
+            data: Входные данные
+            source_format: Исходный формат
+            target_format: Целевой формат
+            filename: Имя файла (для автоопределения формата)
+            max_records: Максимальное число записей в результате
+            max_bytes: Сколько входных данных читать; для форматов без
+                потокового разбора ограничивает размер результата
+            pipeline: Шаги обработки записей (см. convert)
+            profile: Оформление результата (см. convert)
+            options: Параметры чтения исходного формата (см. convert)
             
-            return result
+        Returns:
+            Кортеж (результат, признак того, что результат обрезан)
+        """
+        governor = self.limits.start()
+        data = governor.input(decompress_input(data))
+        if source_format == 'auto':
+            source_format = self.detect_format(data, filename)
+        
+        pipeline = Pipeline.from_spec(pipeline)
+        check_profile(profile)
+        source_converter = self.get_converter(source_format)
+        target_converter = self.get_converter(target_format)
+        options = self._read_options(source_format, options)
+        truncated = False
+        
+        try:
+            streams = source_converter.streams_records(data)
+            if streams:
+                # Двоичный файл по префиксу не разобрать - ограничивает max_records
+                if max_bytes and not source_converter.binary and source_converter.record_prefix:
+                    # Читаем не больше max_bytes и обрезаем по границе
+                    # последней целой записи
+                    prefix, has_more = self._read_prefix(data, max_bytes)
+                    if has_more:
+                        prefix = prefix[:source_converter.record_boundary(prefix)]
+                        truncated = True
+                    data = prefix
+                
+                limit = max_records + 1 if max_records is not None else None
+                records = self._iter_source_records(source_converter, data, pipeline, options,
+                                                    governor)
+                parsed_data = list(islice(records, limit))
+                if max_records is not None and len(parsed_data) > max_records:
+                    parsed_data = parsed_data[:max_records]
+                    truncated = True
+            else:
+                parsed_data = self._parse_source(data, source_format, pipeline, options, governor)
+                if (isinstance(parsed_data, list) and max_records is not None
+                        and len(parsed_data) > max_records):
+                    parsed_data = parsed_data[:max_records]
+                    truncated = True
             
+            result = governor.result(self._serialize(target_converter, parsed_data, profile))
         except Exception as e:
+            limit = governor.cause(e)
+            if limit is not None:
+                raise limit
             raise ConversionError(f"Ошибка конвертации из {source_format} в {target_format}: {str(e)}")
+        
+        # Если вход не обрезан по границе записи, ограничиваем размер результата
+        if ((not streams or not source_converter.record_prefix) and not target_converter.binary
+                and max_bytes and len(result) > max_bytes):
+            cut = result.rfind('\n', 0, max_bytes)
+            result = result[:cut + 1 if cut > 0 else max_bytes]
+            truncated = True
+        
+        return result, truncated
+    
+    def _iter_source_records(self, converter: BaseConverter, data: Union[str, bytes, io.IOBase],
+                             pipeline: Optional[Pipeline],
+                             options: Optional[Dict[str, Any]] = None,
+                             governor: Optional[Governor] = None):
+        """
+        Записи потокового источника после конвейера обработки.
+        
+        Выбор колонок и начальные фильтры конвейера передаются парсеру, чтобы
+        ненужные колонки и строки вообще не превращались в записи.
+        """
+        options = options or {}
+        if pipeline is None:
+            records = converter.iter_records(data, **options)
+            return governor.records(records) if governor is not None else records
+        columns, record_filter, rest = pipeline.pushdown()
+        records = converter.iter_records(data, columns=columns, record_filter=record_filter,
+                                         **options)
+        if governor is not None:
+            records = governor.records(records)
+        return rest.apply(records)
+    
+    def _read_prefix(self, data: Union[str, bytes, io.IOBase], size: int) -> Tuple[str, bool]:
+        """Читает не более size символов начала данных; второй элемент - остались ли данные"""
+        if isinstance(data, io.IOBase):
+            chunk = data.read(size + 1)
+            if isinstance(chunk, bytes):
+                chunk = chunk.decode('utf-8', errors='ignore')
+        elif isinstance(data, bytes):
+            chunk = data[:size + 1].decode('utf-8', errors='ignore')
+        else:
+            chunk = data[:size + 1]
+        return chunk[:size], len(chunk) > size
+    
+    def convert_tracked(self, text: str, source_format: str, target_format: str,
+                        max_records: Optional[int] = None,
+                        profile: str = PRETTY) -> Tuple[str, str, str, bool]:
+        """
+        Конвертирует текст и запоминает результат разбора для последующих
+        инкрементальных правок
+        
+        Returns:
+            Кортеж (результат, хэш содержимого, исходный формат, признак обрезки)
+        """
+        check_profile(profile)
+        governor = self.limits.start()
+        text = governor.input(normalize_newlines(text))
+        if source_format == 'auto':
+            source_format = self.detect_format(text)
+        
+        converter = self.get_converter(source_format)
+        try:
+            state = parse_full(converter, text, source_format, governor)
+        except Exception as e:
+            limit = governor.cause(e)
+            if limit is not None:
+                raise limit
+            raise ConversionError(f"Ошибка конвертации из {source_format} в {target_format}: {str(e)}")
+        self.sessions.put(state)
+        
+        result, truncated = self._serialize_state(state, target_format, max_records, profile,
+                                                  governor)
+        return result, state.hash, source_format, truncated
+    
+    def convert_incremental(self, base_hash: str, edits: list, target_format: str,
+                            content_length: Optional[int] = None,
+                            max_records: Optional[int] = None,
+                            profile: str = PRETTY) -> Tuple[str, str, str, bool]:
+        """
+        Применяет правки к ранее сконвертированному тексту
+        
+        Для построчных форматов заново разбираются только записи, задетые
+        правками.
+        
+        Args:
+            base_hash: Хэш предыдущей версии текста (из convert_tracked)
+            edits: Список правок {start, end, text} относительно предыдущей версии
+            target_format: Целевой формат
+            content_length: Ожидаемая длина нового текста для проверки
+            max_records: Максимальное число записей в результате
+            profile: Оформление результата (см. convert)
+            
+        Returns:
+            Кортеж (результат, хэш нового содержимого, исходный формат, признак обрезки)
+        """
+        check_profile(profile)
+        state = self.sessions.get(base_hash)
+        if state is None:
+            raise IncrementalStateError("Предыдущая версия документа не найдена, отправьте текст целиком")
+        
+        governor = self.limits.start()
+        converter = self.get_converter(state.source_format)
+        try:
+            new_state = parse_incremental(converter, state, edits, governor)
+        except IncrementalStateError:
+            raise
+        except Exception as e:
+            limit = governor.cause(e)
+            if limit is not None:
+                raise limit
+            raise ConversionError(f"Ошибка конвертации из {state.source_format} в {target_format}: {str(e)}")
+        if content_length is not None and len(new_state.text) != content_length:
+            raise IncrementalStateError("Правка не соответствует документу, отправьте текст целиком")
+        self.sessions.put(new_state)
+        
+        result, truncated = self._serialize_state(new_state, target_format, max_records, profile,
+                                                  governor)
+        return result, new_state.hash, new_state.source_format, truncated
+    
+    def _serialize_state(self, state, target_format: str, max_records: Optional[int],
+                         profile: str, governor: Governor) -> Tuple[str, bool]:
+        """
+        Сериализует разобранный документ, при необходимости обрезая список
+        записей; документ уже проверен governor, результат учитывается им же
+        """
+        if (profile == PRETTY and
+                self.converters.resolve(state.source_format) == self.converters.resolve(target_format)):
+            return state.text, False
+        
+        target_converter = self.get_converter(target_format)
+        parsed_data = state.records()
+        truncated = False
+        if (isinstance(parsed_data, list) and max_records is not None
+                and len(parsed_data) > max_records):
+            parsed_data = parsed_data[:max_records]
+            truncated = True
+        try:
+            return governor.result(self._serialize(target_converter, parsed_data, profile)), truncated
+        except Exception as e:
+            limit = governor.cause(e)
+            if limit is not None:
+                raise limit
+            raise ConversionError(f"Ошибка конвертации из {state.source_format} в {target_format}: {str(e)}")
+    
+    def _serialize(self, converter: BaseConverter, data: Any, profile: str) -> str:
+        """Сериализует данные в выбранном профиле оформления"""
+        if profile == PRETTY:
+            # Сторонние конвертеры могут не принимать аргумент profile
+            return converter.serialize(data)
+        try:
+            return converter.serialize(data, profile=profile)
+        except TypeError as e:
+            if 'profile' not in str(e):
+                raise
+            raise ConversionError(f"Формат не поддерживает профиль оформления {profile}")
     
     def validate_data(self, data: Union[str, bytes, io.IOBase], 
                      format_name: str) -> bool:
@@ -128,14 +627,38 @@ class ConversionEngine:
         if format_name not in self.converters:
             return False
         
-        return self.converters[format_name].validate(data)
+        return self.converters.get(format_name).validate(decompress_input(data))
+    
+    def check_syntax(self, data: Union[str, bytes, io.IOBase],
+                     format_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Проверяет синтаксис без построения документа
+        
+        Returns:
+            None или первая ошибка: message, line и column
+        """
+        return self.get_converter(format_name).check_syntax(decompress_input(data))
+    
+    def validate_schema(self, data: Union[str, bytes, io.IOBase], format_name: str,
+                        schema: Dict, max_errors: int = 100) -> Dict[str, Any]:
+        """
+        Проверяет данные по JSON Schema за один потоковый проход.
+        
+        Returns:
+            Отчет: valid, количество записей и список ошибок с позициями
+        """
+        converter = self.get_converter(format_name)
+        return validate_records(converter.iter_records(decompress_input(data)), schema, max_errors)
+    
+    def infer_schema(self, data: Union[str, bytes, io.IOBase], format_name: str,
+                     sample_size: int = 1000) -> Dict[str, Any]:
+        """Выводит JSON Schema по первым sample_size записям"""
+        converter = self.get_converter(format_name)
+        return infer_schema(converter.iter_records(decompress_input(data)), sample_size)
     
     def get_converter(self, format_name: str) -> BaseConverter:
         """Возвращает конвертер для указанного формата"""
-        if format_name not in self.converters:
-            raise ConversionError(f"Неподдерживаемый формат: {format_name}")
-        
-        return self.converters[format_name]
+        return self.converters.get(format_name)
     
     def get_mime_type(self, format_name: str) -> str:
         """Возвращает MIME тип для формата"""
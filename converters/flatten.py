@@ -0,0 +1,310 @@
+"""
+Скомпилированные планы разворачивания вложенных записей в таблицу и обратно
+"""
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from collections import OrderedDict
+import json
+import math
+import pickle
+import tempfile
+import threading
+
+from .schema import schema_fingerprint
+
+# Сколько записей просматривается для вывода колонок
+SAMPLE_SIZE = 1000
+
+# Сколько скомпилированных планов держать в памяти
+PLAN_CACHE_SIZE = 128
+
+_plan_cache: 'OrderedDict[str, Any]' = OrderedDict()
+_plan_lock = threading.Lock()
+
+# Значение отсутствует в записи
+_MISSING = object()
+
+
+class _LayoutMiss(Exception):
+    """Запись не укладывается в план: в ней есть неизвестные поля"""
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or value is _MISSING or (isinstance(value, float) and math.isnan(value))
+
+
+def _cell(value: Any) -> Any:
+    """Значение ячейки: списки и словари записываются как JSON"""
+    if value is _MISSING:
+        return None
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False, default=str)
+    return value
+
+
+def _add_to_layout(layout: Dict[str, Any], record: Dict) -> None:
+    """
+    Дополняет раскладку полями записи.
+
+    Раскладка - словарь ключ -> вложенная раскладка (для объектов) или None
+    (для листовых значений). Поле, которое встречается и как объект, и как
+    скаляр, становится листом.
+    """
+    for key, value in record.items():
+        if isinstance(value, dict) and value:
+            child = layout.get(key, _MISSING)
+            if child is _MISSING:
+                child = layout[key] = {}
+            if child is not None:
+                _add_to_layout(child, value)
+        elif key not in layout:
+            layout[key] = None
+        elif layout[key] is not None and not _is_empty(value):
+            layout[key] = None
+
+
+def infer_layout(records: Iterable[Dict], sample_size: int = SAMPLE_SIZE) -> Dict[str, Any]:
+    """Раскладка колонок по первым sample_size записям"""
+    layout: Dict[str, Any] = {}
+    for index, record in enumerate(records):
+        if index >= sample_size:
+            break
+        if isinstance(record, dict):
+            _add_to_layout(layout, record)
+    return layout
+
+
+def _layout_schema(layout: Dict[str, Any]) -> List:
+    """Представление раскладки для хэша с сохранением порядка полей"""
+    return [[key, None if child is None else _layout_schema(child)] for key, child in layout.items()]
+
+
+def _compile_node(layout: Dict[str, Any], prefix: str,
+                  separator: str) -> Tuple[List[str], Callable[[Dict, List], None]]:
+    """Компилирует узел раскладки в список колонок и функцию извлечения"""
+    columns: List[str] = []
+    fields = []
+    for key, child in layout.items():
+        name = f"{prefix}{key}"
+        if child is None:
+            columns.append(name)
+            fields.append((key, None, 1))
+        else:
+            child_columns, child_extract = _compile_node(child, f"{name}{separator}", separator)
+            columns.extend(child_columns)
+            fields.append((key, child_extract, len(child_columns)))
+    keys = frozenset(layout)
+
+    def extract(obj: Dict, out: List) -> None:
+        if not keys.issuperset(obj):
+            raise _LayoutMiss()
+        for key, child, width in fields:
+            value = obj.get(key, _MISSING)
+            if child is None:
+                out.append(_cell(value))
+            elif isinstance(value, dict):
+                child(value, out)
+            elif _is_empty(value):
+                out.extend([None] * width)
+            else:
+                raise _LayoutMiss()
+
+    return columns, extract
+
+
+class FlattenPlan:
+    """
+    План разворачивания записей: колонки и функция, которая раскладывает
+    запись в строку без повторного поиска ключей.
+    """
+
+    def __init__(self, layout: Dict[str, Any], separator: str = '.'):
+        self.separator = separator
+        self.columns, self._extract = _compile_node(layout, '', separator)
+
+    def row(self, record: Dict) -> List[Any]:
+        """Строка таблицы для записи; _LayoutMiss, если в записи есть новые поля"""
+        out: List[Any] = []
+        self._extract(record, out)
+        return out
+
+
+def get_plan(layout: Dict[str, Any], separator: str = '.') -> FlattenPlan:
+    """Скомпилированный план для раскладки; планы кэшируются по ее хэшу"""
+    key = schema_fingerprint({'layout': _layout_schema(layout), 'separator': separator})
+    with _plan_lock:
+        plan = _plan_cache.get(key)
+        if plan is not None:
+            _plan_cache.move_to_end(key)
+            return plan
+
+    plan = FlattenPlan(layout, separator)
+    with _plan_lock:
+        _plan_cache[key] = plan
+        while len(_plan_cache) > PLAN_CACHE_SIZE:
+            _plan_cache.popitem(last=False)
+    return plan
+
+
+def flatten_records(records: List[Dict], separator: str = '.',
+                    sample_size: int = SAMPLE_SIZE) -> Tuple[List[str], List[List[Any]]]:
+    """
+    Разворачивает вложенные записи в таблицу.
+
+    Раскладка колонок выводится по образцу и компилируется в план один раз.
+    Если запись за пределами образца содержит новые поля, раскладка
+    дополняется и план компилируется заново.
+
+    Returns:
+        Кортеж (колонки, строки)
+    """
+    plan, rows = _flatten(records, infer_layout(records, sample_size), separator)
+    return plan.columns, rows
+
+
+def _flatten(records: List[Dict], layout: Dict[str, Any],
+             separator: str) -> Tuple[FlattenPlan, List[List[Any]]]:
+    """
+    Строки записей по раскладке; раскладка дополняется новыми полями на месте.
+
+    Записи с новыми полями только дополняют раскладку при просмотре; план
+    компилируется заново один раз, после просмотра всех записей, и строки
+    таких записей (или все строки, если колонки сдвинулись) собираются по
+    нему. Так стоимость не зависит от того, сколько раз появлялись новые поля.
+    """
+    plan = get_plan(layout, separator)
+    rows: List[Optional[List[Any]]] = []
+    missed: List[int] = []
+    for index, record in enumerate(records):
+        if not isinstance(record, dict):
+            record = {'data': record}
+        try:
+            rows.append(plan.row(record))
+        except _LayoutMiss:
+            _add_to_layout(layout, record)
+            missed.append(index)
+            rows.append(None)
+    if not missed:
+        return plan, rows
+
+    previous = plan.columns
+    plan = get_plan(layout, separator)
+    if plan.columns[:len(previous)] != previous:
+        # Колонки сдвинулись - строки собираются заново по окончательному плану
+        return plan, [plan.row(r if isinstance(r, dict) else {'data': r}) for r in records]
+
+    for index in missed:
+        record = records[index]
+        rows[index] = plan.row(record if isinstance(record, dict) else {'data': record})
+    # Строки, собранные до расширения плана, дополняются пустыми значениями
+    width = len(plan.columns)
+    for row in rows:
+        if len(row) < width:
+            row.extend([None] * (width - len(row)))
+    return plan, rows
+
+
+class SpooledTable:
+    """
+    Таблица из потока записей с колонками по всем записям.
+
+    Записи добавляются блоками: блок разворачивается по общей раскладке,
+    которая дополняется новыми полями так же, как в flatten_records для
+    всего списка, и сбрасывается во временный файл. Строки с окончательными
+    колонками выдаются, когда поток прочитан, поэтому поле, впервые
+    появившееся в последней записи, не теряется; в памяти - один блок.
+
+    Пример:
+        with SpooledTable() as table:
+            for batch in batches:
+                table.add(batch)
+            for rows in table.batches():
+                write(table.columns, rows)
+    """
+
+    def __init__(self, separator: str = '.'):
+        self.separator = separator
+        self.layout: Optional[Dict[str, Any]] = None
+        self._file = tempfile.TemporaryFile()
+        self._pickler = pickle.Pickler(self._file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def add(self, records: List[Any]) -> Tuple[List[str], List[List[Any]]]:
+        """Добавляет блок; возвращает колонки и строки блока по текущей раскладке"""
+        if self.layout is None:
+            self.layout = infer_layout(records)
+        plan, rows = _flatten(records, self.layout, self.separator)
+        self._pickler.dump(records)
+        # Без очистки memo pickler держит ссылки на все записанные блоки
+        self._pickler.clear_memo()
+        return plan.columns, rows
+
+    @property
+    def columns(self) -> List[str]:
+        """Колонки по всем добавленным записям"""
+        return get_plan(self.layout or {}, self.separator).columns
+
+    def batches(self) -> Iterator[List[List[Any]]]:
+        """Строки блоков с окончательными колонками, в порядке добавления"""
+        plan = get_plan(self.layout or {}, self.separator)
+        self._file.flush()
+        self._file.seek(0)
+        while True:
+            try:
+                records = pickle.load(self._file)
+            except EOFError:
+                return
+            yield [plan.row(r if isinstance(r, dict) else {'data': r}) for r in records]
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> 'SpooledTable':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _parse_cell(value: Any) -> Any:
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, str) and value[:1] in ('[', '{'):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    return value
+
+
+class UnflattenPlan:
+    """План сборки вложенных записей из колонок вида "a.b" """
+
+    def __init__(self, columns: Iterable[str], separator: str = '.'):
+        self.separator = separator
+        self.paths = [(column, column.split(separator)) for column in columns]
+
+    def record(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        result: Dict[str, Any] = {}
+        for column, parts in self.paths:
+            value = _parse_cell(row.get(column))
+            target = result
+            for part in parts[:-1]:
+                child = target.get(part)
+                if not isinstance(child, dict):
+                    child = target[part] = {}
+                target = child
+            target[parts[-1]] = value
+        return result
+
+
+def unflatten_records(records: Iterable[Dict], separator: str = '.') -> Iterable[Dict]:
+    """Собирает вложенные записи; план компилируется по колонкам первой записи"""
+    plan: Optional[UnflattenPlan] = None
+    columns = None
+    for record in records:
+        if not isinstance(record, dict):
+            yield record
+            continue
+        if plan is None or record.keys() != columns:
+            columns = record.keys()
+            plan = UnflattenPlan(list(columns), separator)
+        yield plan.record(record)
@@ -0,0 +1,284 @@
+"""
+Инкрементальная повторная конвертация отредактированного текста
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from collections import OrderedDict
+from itertools import chain
+from bisect import bisect_right
+import hashlib
+import sys
+import threading
+import time
+
+from .base import BaseConverter, ConversionError
+from .limits import Governor, Limits
+from .sorting import record_size
+
+# Память под разобранные версии документов в кэше сессий
+SESSION_CACHE_BYTES = 256 * 1024 * 1024
+
+
+class IncrementalStateError(ConversionError):
+    """Базовый документ не найден в кэше или правка к нему не подходит"""
+    pass
+
+
+def content_hash(text: str) -> str:
+    """Хэш содержимого, по которому клиент ссылается на предыдущую версию"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def normalize_newlines(text: str) -> str:
+    """Браузеры отправляют текст формы с CRLF - приводим к LF"""
+    return text.replace('\r\n', '\n')
+
+
+def apply_edits(text: str, edits: List[Dict[str, Any]]) -> Tuple[str, int, int, int]:
+    """
+    Применяет правки к тексту.
+
+    Каждая правка - словарь {start, end, text}: заменить символы [start, end)
+    исходного текста на text. Правки не должны пересекаться.
+
+    Returns:
+        Новый текст, начало и конец затронутой области в исходном тексте
+        и изменение длины
+    """
+    if not edits:
+        return text, 0, 0, 0
+
+    try:
+        ordered = sorted(
+            ((int(e['start']), int(e['end']), normalize_newlines(str(e.get('text', ''))))
+             for e in edits),
+            key=lambda e: e[0])
+    except (KeyError, TypeError, ValueError):
+        raise IncrementalStateError("Некорректный формат правки")
+
+    parts = []
+    position = 0
+    delta = 0
+    for start, end, replacement in ordered:
+        if start < position or end < start or end > len(text):
+            raise IncrementalStateError("Правка выходит за границы документа")
+        parts.append(text[position:start])
+        parts.append(replacement)
+        delta += len(replacement) - (end - start)
+        position = end
+    parts.append(text[position:])
+
+    return ''.join(parts), ordered[0][0], ordered[-1][1], delta
+
+
+class ParseState:
+    """
+    Результат разбора одной версии документа.
+
+    Для построчных форматов хранит начала записей (starts, последний
+    элемент - конец текста), записи каждого отрезка (chunks), чтобы
+    при правке разбирать заново только затронутые записи, и типы полей
+    документа (types), если конвертер выводит их по всем записям.
+    records_size - оценка памяти записей для ограничения кэша сессий;
+    nodes и expanded_size - узлы и развернутый размер документа по обходу
+    Governor (None, если документ не проверялся), чтобы правка проверяла
+    ограничения без обхода всего документа.
+    """
+
+    def __init__(self, text: str, source_format: str, parsed: Any = None,
+                 starts: Optional[List[int]] = None,
+                 chunks: Optional[List[List[Any]]] = None,
+                 types: Optional[Dict[str, str]] = None,
+                 records_size: Optional[int] = None,
+                 nodes: Optional[int] = None, expanded_size: Optional[int] = None):
+        self.text = text
+        self.source_format = source_format
+        self.parsed = parsed
+        self.starts = starts
+        self.chunks = chunks
+        self.types = types
+        if records_size is None:
+            records_size = record_size(chunks if chunks is not None else parsed)
+        self.records_size = records_size
+        self.nodes = nodes
+        self.expanded_size = expanded_size
+        self.hash = content_hash(text)
+
+    @property
+    def size(self) -> int:
+        """Оценка памяти, занятой состоянием"""
+        size = sys.getsizeof(self.text) + self.records_size
+        if self.starts is not None:
+            size += sys.getsizeof(self.starts)
+        return size
+
+    @property
+    def record_oriented(self) -> bool:
+        return self.starts is not None
+
+    def records(self) -> Any:
+        """Разобранный документ целиком"""
+        if self.record_oriented:
+            return list(chain.from_iterable(self.chunks))
+        return self.parsed
+
+
+def _assign_records(text: str, starts: List[int], records: List[Any]) -> Optional[List[List[Any]]]:
+    """
+    Раскладывает записи по отрезкам: пустые строки записей не дают.
+    Возвращает None, если число записей не совпало с числом отрезков.
+    """
+    chunks = []
+    iterator = iter(records)
+    for index in range(len(starts) - 1):
+        if text[starts[index]:starts[index + 1]].strip():
+            record = next(iterator, None)
+            if record is None:
+                return None
+            chunks.append([record])
+        else:
+            chunks.append([])
+    if next(iterator, None) is not None:
+        return None
+    return chunks
+
+
+def parse_full(converter: BaseConverter, text: str, source_format: str,
+               governor: Optional[Governor] = None) -> ParseState:
+    """
+    Полный разбор документа с запоминанием границ записей.
+
+    Записи берутся из parse, как при обычной конвертации: типы значений
+    не должны зависеть от того, каким путем документ был разобран.
+    Документ проверяется governor до того, как оценивается его память:
+    оценка обходит общие ссылки столько раз, сколько они встречаются.
+    """
+    parsed = converter.parse(text)
+    nodes = expanded_size = None
+    if governor is not None:
+        governor.walk(parsed)
+        nodes, expanded_size = governor.nodes, governor.size
+    starts = converter.split_records(text)
+    if starts is not None and isinstance(parsed, list):
+        chunks = _assign_records(text, starts, parsed)
+        if chunks is not None:
+            return ParseState(text, source_format, starts=starts, chunks=chunks,
+                              types=converter.record_types(parsed),
+                              nodes=nodes, expanded_size=expanded_size)
+    return ParseState(text, source_format, parsed=parsed,
+                      nodes=nodes, expanded_size=expanded_size)
+
+
+def parse_incremental(converter: BaseConverter, state: ParseState,
+                      edits: List[Dict[str, Any]],
+                      governor: Optional[Governor] = None) -> ParseState:
+    """
+    Применяет правки к разобранному документу.
+
+    Для построчных форматов заново разбираются только записи, задетые
+    правкой; остальные берутся из предыдущего состояния. Если правка
+    затрагивает заголовок, меняет структуру кавычек или типы полей
+    заново разобранных записей расходятся с типами документа (тогда
+    правка могла изменить и значения остальных записей), документ
+    разбирается целиком. Новый текст и новые записи проверяются governor
+    (см. parse_full), итоги документа - по итогам прошлой версии.
+    """
+    text, edit_start, edit_end, delta = apply_edits(state.text, edits)
+    if governor is not None:
+        governor.input(text)
+    if not state.record_oriented:
+        return parse_full(converter, text, state.source_format, governor)
+
+    starts = state.starts
+    header_end = starts[0]
+    if edit_start < header_end or len(starts) < 2:
+        return parse_full(converter, text, state.source_format, governor)
+
+    # Затронутые отрезки [first, last] исходного документа
+    first = min(bisect_right(starts, edit_start) - 1, len(starts) - 2)
+    last = min(bisect_right(starts, edit_end) - 1, len(starts) - 2)
+    if edit_end == starts[last] and last > first:
+        last -= 1
+    region_start = starts[first]
+    region_end = starts[last + 1] + delta
+    region = text[region_start:region_end]
+
+    # Новые границы записей внутри области
+    region_starts = converter.split_records(text[:header_end] + region)
+    if region_starts is None:
+        return parse_full(converter, text, state.source_format, governor)
+    region_starts = [s - header_end + region_start for s in region_starts]
+
+    try:
+        records = list(converter.iter_records(text[:header_end] + region))
+    except ConversionError:
+        return parse_full(converter, text, state.source_format, governor)
+    region_chunks = _assign_records(text, region_starts, records)
+    if region_chunks is None:
+        return parse_full(converter, text, state.source_format, governor)
+    if state.types is not None and (not records or converter.record_types(records) != state.types):
+        return parse_full(converter, text, state.source_format, governor)
+
+    new_starts = (starts[:first] + region_starts[:-1] +
+                  [s + delta for s in starts[last + 1:]])
+    new_chunks = state.chunks[:first] + region_chunks + state.chunks[last + 1:]
+    nodes = expanded_size = None
+    if governor is not None:
+        if state.nodes is None:
+            governor.walk([record for chunk in new_chunks for record in chunk])
+        else:
+            # Обходятся только новые записи; остальная часть документа
+            # учитывается по итогам прошлой версии за вычетом замененных записей
+            governor.walk(records)
+            removed = Limits.unlimited().start()
+            removed.walk([record for chunk in state.chunks[first:last + 1] for record in chunk])
+            governor.charge(state.nodes - removed.nodes, state.expanded_size - removed.size)
+        nodes, expanded_size = governor.nodes, governor.size
+    records_size = (state.records_size - record_size(state.chunks[first:last + 1]) +
+                    record_size(region_chunks))
+    return ParseState(text, state.source_format, starts=new_starts, chunks=new_chunks,
+                      types=state.types, records_size=records_size,
+                      nodes=nodes, expanded_size=expanded_size)
+
+
+class SessionCache:
+    """
+    Кэш последних разобранных документов с ограничением по числу, памяти
+    и времени жизни. Документ больше max_bytes не кэшируется: правки
+    к нему клиент отправляет полным текстом.
+    """
+
+    def __init__(self, max_entries: int = 32, ttl: float = 300.0,
+                 max_bytes: int = SESSION_CACHE_BYTES):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[str, Tuple[float, ParseState]]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[ParseState]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, state = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                self._bytes -= state.size
+                return None
+            self._entries.move_to_end(key)
+            return state
+
+    def put(self, state: ParseState) -> None:
+        size = state.size
+        with self._lock:
+            previous = self._entries.pop(state.hash, None)
+            if previous is not None:
+                self._bytes -= previous[1].size
+            if size > self.max_bytes:
+                return
+            self._entries[state.hash] = (time.monotonic(), state)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
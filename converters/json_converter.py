@@ -2,29 +2,351 @@
 JSON конвертер
 """
 import json
-from typing import Any, Union
+import re
+import codecs
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
 import io
-from .base import BaseConverter, ConversionError, ValidationError
+from .base import (BaseConverter, ConversionError, ValidationError, COMPACT, CANONICAL, PRETTY,
+                   syntax_error, preserve_position)
+from . import parallel
+from .compact import CompactBuilder, to_builtin
+
+
+# Пробельные символы JSON
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+# Лексемы JSON для проверки синтаксиса (литералы NaN и Infinity json.loads
+# тоже принимает)
+_WS = r'[ \t\n\r]*+'
+_STRING = r'"[^"\\\x00-\x1f]*+(?:\\(?:["\\/bfnrt]|u[0-9a-fA-F]{4})[^"\\\x00-\x1f]*+)*+"'
+_SCALAR = (_STRING + r'|-?(?:0|[1-9][0-9]*+)(?:\.[0-9]++)?+(?:[eE][+-]?[0-9]++)?+'
+           r'|true|false|null|NaN|Infinity|-Infinity')
+
+
+def _sequence(item: str) -> str:
+    """Один или несколько item через запятую"""
+    return f'(?:{item})(?:{_WS},{_WS}(?:{item}))*+'
+
+
+def _pair(value: str) -> str:
+    return f'{_STRING}{_WS}:{_WS}(?:{value})'
+
+
+def _container(value: str) -> str:
+    """Массив или объект из значений value"""
+    return (f'\\[{_WS}(?:{_sequence(value)}{_WS})?+\\]'
+            f'|\\{{{_WS}(?:{_sequence(_pair(value))}{_WS})?+\\}}')
+
+
+# Значение с контейнерами до двух уровней вложенности проверяется одним
+# совпадением регулярного выражения, а элементы массива и поля объекта -
+# сериями, поэтому шаги на Python нужны только для глубоких контейнеров
+_NESTED = _SCALAR + '|' + _container(_SCALAR + '|' + _container(_SCALAR))
+_VALUE = re.compile(_NESTED)
+_ELEMENTS = re.compile(_sequence(_NESTED))
+_PAIRS = re.compile(_sequence(_pair(_NESTED)))
+_VALUE_TOKEN = re.compile(_SCALAR + r'|[\[{]')
+_KEY_TOKEN = re.compile(_STRING)
+
+# Символы, которыми может продолжаться число
+_NUMBER_TAIL = frozenset('0123456789.eE+-')
+_NUMBER_TAIL_RUN = re.compile(r'[0-9.eE+-]*')
+
+# Начало лексемы, которое может продолжиться в следующем блоке данных
+_TOKEN_PREFIX = re.compile(
+    r'"(?:[^"\\\x00-\x1f]|\\(?:["\\/bfnrt]|u[0-9a-fA-F]{0,4})?)*+'
+    r'|-?[0-9.eE+-]*+|t(?:r(?:ue?)?)?|f(?:a(?:l(?:se?)?)?)?|n(?:u(?:ll?)?)?'
+    r'|N(?:aN?)?|-?I(?:n(?:f(?:i(?:n(?:i(?:ty?)?)?)?)?)?)?')
+
+_decoder = json.JSONDecoder()
+
+
+def _text_reader(data: Union[str, bytes, io.IOBase]) -> Callable[[int], str]:
+    """Функция чтения текста блоками из строки, байтов или файла"""
+    if isinstance(data, str):
+        # Срезы строки: StringIO хранил бы копию текста
+        position = 0
+
+        def read_text(size: int) -> str:
+            nonlocal position
+            chunk = data[position:position + size]
+            position += len(chunk)
+            return chunk
+        return read_text
+    if isinstance(data, bytes):
+        data = io.BytesIO(data)
+    decoder = codecs.getincrementaldecoder('utf-8')()
+
+    def read(size: int) -> str:
+        while True:
+            chunk = data.read(size)
+            if isinstance(chunk, str):
+                return chunk
+            # Блок может закончиться посреди многобайтного символа
+            text = decoder.decode(chunk, final=not chunk)
+            if text or not chunk:
+                return text
+    return read
+
+
+class _ArrayReader:
+    """
+    Ленивый разбор JSON массива верхнего уровня по одному элементу.
+
+    В памяти держится только текущий блок текста, поэтому потребление
+    памяти определяется размером самого большого элемента, а не документа.
+    """
+
+    BLOCK_SIZE = 64 * 1024
+
+    def __init__(self, read: Callable[[int], str]):
+        self._read = read
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, size: int) -> bool:
+        """Дочитывает блок; False - данные кончились"""
+        if self.eof:
+            return False
+        chunk = self._read(size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def rest(self) -> str:
+        """Весь оставшийся текст"""
+        parts = [self.buffer[self.pos:]]
+        while not self.eof:
+            chunk = self._read(self.BLOCK_SIZE * 16)
+            if not chunk:
+                self.eof = True
+            parts.append(chunk)
+        self.buffer, self.pos = '', 0
+        return ''.join(parts)
+
+    def peek(self) -> str:
+        """Первый непробельный символ (пустая строка в конце данных)"""
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill(self.BLOCK_SIZE):
+                return ''
+
+    def decode(self) -> Any:
+        """Разбирает значение с текущей позиции, дочитывая данные при необходимости"""
+        size = self.BLOCK_SIZE
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+                # Число, которое доходит до конца буфера (например, "-2." перед
+                # "5e3" из следующего блока), могло быть прочитано не полностью
+                if (self.eof or type(value) not in (int, float)
+                        or _NUMBER_TAIL_RUN.match(self.buffer, end).end() < len(self.buffer)):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            if not self.fill(size):
+                continue
+            size *= 2
+
+
+class _SyntaxScanner:
+    """
+    Проверка синтаксиса JSON без построения документа.
+
+    Данные читаются блоками, в памяти держатся текущий блок, стек открытых
+    контейнеров и текущая строка или число, поэтому память не зависит от
+    размера документа.
+    """
+
+    BLOCK_SIZE = 64 * 1024
+
+    # Что ожидается на текущей позиции
+    VALUE, FIRST_VALUE, KEY, FIRST_KEY, COLON, AFTER = range(6)
+
+    def __init__(self, read: Callable[[int], str]):
+        self._read = read
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        # Номер строки начала буфера и смещение начала этой строки
+        self.offset = 0
+        self.line = 1
+        self.line_start = 0
+
+    def fill(self, size: int) -> bool:
+        """Дочитывает блок, отбрасывая проверенную часть буфера"""
+        if self.eof:
+            return False
+        chunk = self._read(size)
+        if not chunk:
+            self.eof = True
+            return False
+        newlines = self.buffer.count('\n', 0, self.pos)
+        if newlines:
+            self.line += newlines
+            self.line_start = self.offset + self.buffer.rfind('\n', 0, self.pos) + 1
+        self.offset += self.pos
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def skip(self) -> str:
+        """Пропускает пробелы; возвращает следующий символ или '' в конце данных"""
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill(self.BLOCK_SIZE):
+                return ''
+
+    def token(self, pattern: 're.Pattern') -> Optional[str]:
+        """Лексема с текущей позиции; лексема на границе блока дочитывается"""
+        size = self.BLOCK_SIZE
+        # Остаток буфера - начало лексемы: она может продолжиться в следующем блоке
+        while not self.eof and _TOKEN_PREFIX.fullmatch(self.buffer, self.pos):
+            if self.fill(size):
+                size *= 2
+        match = pattern.match(self.buffer, self.pos)
+        if match is None:
+            return None
+        self.pos = match.end()
+        return match.group()
+
+    def run(self, pattern: 're.Pattern') -> bool:
+        """
+        Пропускает серию значений одним совпадением.
+
+        Серия проверяется до последней запятой в буфере: значение перед
+        запятой целиком в буфере, а значение в конце блока могло
+        оборваться. Если за серией идет продолжение числа, остаток
+        проверяется по лексемам.
+        """
+        limit = len(self.buffer)
+        if not self.eof:
+            limit = self.buffer.rfind(',', self.pos)
+            if limit == -1:
+                return False
+        match = pattern.match(self.buffer, self.pos, limit)
+        if match is None:
+            return False
+        end = match.end()
+        if end < len(self.buffer) and self.buffer[end] in _NUMBER_TAIL:
+            return False
+        self.pos = end
+        return True
+
+    def error(self, message: str) -> Dict[str, Any]:
+        line = self.line + self.buffer.count('\n', 0, self.pos)
+        newline = self.buffer.rfind('\n', 0, self.pos)
+        if newline == -1:
+            column = self.offset + self.pos - self.line_start + 1
+        else:
+            column = self.pos - newline
+        return syntax_error(f"Ошибка синтаксиса JSON: {message}", line, column)
+
+    def scan(self) -> Optional[Dict[str, Any]]:
+        """Первая ошибка или None"""
+        stack: List[str] = []
+        state = self.VALUE
+        while True:
+            char = self.skip()
+            if state == self.AFTER and not stack:
+                return self.error("лишние данные после документа") if char else None
+            if not char:
+                return self.error("неожиданный конец данных")
+
+            if state == self.FIRST_VALUE and char == ']' or state == self.FIRST_KEY and char == '}':
+                stack.pop()
+                self.pos += 1
+                state = self.AFTER
+            elif state in (self.VALUE, self.FIRST_VALUE):
+                in_array = bool(stack) and stack[-1] == ']'
+                if self.run(_ELEMENTS if in_array else _VALUE):
+                    state = self.AFTER
+                    continue
+                token = self.token(_VALUE_TOKEN)
+                if token is None:
+                    return self.error("ожидалось значение")
+                if token == '[':
+                    stack.append(']')
+                    state = self.FIRST_VALUE
+                elif token == '{':
+                    stack.append('}')
+                    state = self.FIRST_KEY
+                else:
+                    state = self.AFTER
+            elif state in (self.KEY, self.FIRST_KEY):
+                if self.run(_PAIRS):
+                    state = self.AFTER
+                    continue
+                if self.token(_KEY_TOKEN) is None:
+                    return self.error("ожидалось имя поля в двойных кавычках")
+                state = self.COLON
+            elif state == self.COLON:
+                if char != ':':
+                    return self.error("ожидалось ':'")
+                self.pos += 1
+                state = self.VALUE
+            elif char == ',':
+                self.pos += 1
+                state = self.KEY if stack[-1] == '}' else self.VALUE
+            elif char == stack[-1]:
+                stack.pop()
+                self.pos += 1
+            else:
+                return self.error(f"ожидалась ',' или '{stack[-1]}'")
 
 
 class JSONConverter(BaseConverter):
     """Конвертер для JSON формата"""
     
-    def __init__(self):
+    # Массивы от этого размера разбираются в пуле процессов
+    PARALLEL_THRESHOLD = parallel.PARALLEL_THRESHOLD
+    
+    # Элементы массива верхнего уровня читаются по одному (iter_records);
+    # префикс массива - не документ JSON, поэтому предпросмотр его не читает
+    streaming = True
+    record_prefix = False
+    
+    compact_parse = True
+    compact_serialize = True
+    
+    def __init__(self, workers: Optional[int] = None):
         super().__init__()
         self.supported_formats = ['json']
+        # Число процессов для параллельного разбора (по умолчанию - число ядер)
+        self.workers = workers
+    
+    def _read_text(self, data: Union[str, bytes, io.IOBase]) -> str:
+        if isinstance(data, io.IOBase):
+            content = data.read()
+            if isinstance(content, bytes):
+                content = content.decode('utf-8')
+            return content
+        if isinstance(data, bytes):
+            return data.decode('utf-8')
+        return data
     
     def parse(self, data: Union[str, bytes, io.IOBase]) -> Any:
         """Парсит JSON данные"""
         try:
-            if isinstance(data, io.IOBase):
-                content = data.read()
-                if isinstance(content, bytes):
-                    content = content.decode('utf-8')
-            elif isinstance(data, bytes):
-                content = data.decode('utf-8')
-            else:
-                content = data
+            content = self._read_text(data)
+            
+            # Большой массив верхнего уровня разбирается по частям на всех ядрах
+            if (len(content) >= self.PARALLEL_THRESHOLD
+                    and (self.workers or parallel.cpu_count()) > 1):
+                result = parallel.read_json_array(content, self.workers)
+                if result is not None:
+                    return result
             
             return json.loads(content)
         except json.JSONDecodeError as e:
@@ -32,20 +354,105 @@ class JSONConverter(BaseConverter):
         except UnicodeDecodeError as e:
             raise ConversionError(f"Ошибка кодировки: {str(e)}")
     
-    def serialize(self, data: Any) -> str:
+    def parse_compact(self, data: Union[str, bytes, io.IOBase]) -> Any:
+        """
+        Парсит JSON в компактное дерево: объекты упаковываются по мере
+        разбора, и словари всего документа одновременно не создаются
+        """
+        try:
+            builder = CompactBuilder()
+            return builder.value(json.loads(self._read_text(data), object_pairs_hook=builder.mapping))
+        except json.JSONDecodeError as e:
+            raise ConversionError(f"Ошибка парсинга JSON: {str(e)}")
+        except UnicodeDecodeError as e:
+            raise ConversionError(f"Ошибка кодировки: {str(e)}")
+    
+    def streams_records(self, data: Union[str, bytes, io.IOBase]) -> bool:
+        """Записи по частям есть только у массива верхнего уровня"""
+        with preserve_position(data):
+            try:
+                return _ArrayReader(_text_reader(data)).peek() == '['
+            except UnicodeDecodeError:
+                return False
+    
+    def iter_records(self, data: Union[str, bytes, io.IOBase], columns=None,
+                     record_filter=None) -> Iterator[Any]:
+        """
+        Лениво выдает элементы массива верхнего уровня, читая данные блоками
+        
+        Документ, который не является массивом, выдается целиком.
+        
+        Args:
+            data: Входные данные
+            columns: Не используется: элементы разбираются целиком
+            record_filter: Фильтр, проверяемый сразу после разбора элемента
+        """
+        try:
+            reader = _ArrayReader(_text_reader(data))
+            if reader.peek() != '[':
+                record = json.loads(reader.rest())
+                if record_filter is None or record_filter.test(record):
+                    yield record
+                return
+            
+            reader.pos += 1
+            if reader.peek() == ']':
+                reader.pos += 1
+            else:
+                while True:
+                    record = reader.decode()
+                    if record_filter is None or record_filter.test(record):
+                        yield record
+                    separator = reader.peek()
+                    reader.pos += 1
+                    if separator == ']':
+                        break
+                    if separator != ',':
+                        raise ConversionError(
+                            f"Ошибка парсинга JSON: ожидалась запятая или ] на позиции {reader.pos}")
+            
+            if reader.peek():
+                raise ConversionError("Ошибка парсинга JSON: лишние данные после массива")
+        except json.JSONDecodeError as e:
+            raise ConversionError(f"Ошибка парсинга JSON: {str(e)}")
+        except UnicodeDecodeError as e:
+            raise ConversionError(f"Ошибка кодировки: {str(e)}")
+    
+    def _encoder(self, profile: str) -> json.JSONEncoder:
+        # default разворачивает узлы компактного дерева по одному
+        if profile == COMPACT:
+            # Без indent json использует быстрый кодировщик на C
+            return json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=to_builtin)
+        if profile == CANONICAL:
+            return json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), sort_keys=True,
+                                    default=to_builtin)
+        return json.JSONEncoder(ensure_ascii=False, indent=2, default=to_builtin)
+    
+    def serialize(self, data: Any, profile: str = PRETTY) -> str:
         """Сериализует данные в JSON"""
         try:
-            return json.dumps(data, ensure_ascii=False, indent=2)
+            return self._encoder(profile).encode(data)
+        except (TypeError, ValueError) as e:
+            raise ConversionError(f"Ошибка сериализации в JSON: {str(e)}")
+    
+    def iter_serialize(self, data: Any, profile: str = PRETTY) -> Iterator[str]:
+        """Сериализует данные в JSON по мере обхода документа"""
+        try:
+            yield from self._encoder(profile).iterencode(data)
         except (TypeError, ValueError) as e:
             raise ConversionError(f"Ошибка сериализации в JSON: {str(e)}")
     
     def validate(self, data: Union[str, bytes, io.IOBase]) -> bool:
         """Валидирует JSON данные"""
-        try:
-            self.parse(data)
-            return True
-        except ConversionError:
-            return False
+        return self.check_syntax(data) is None
+    
+    def check_syntax(self, data: Union[str, bytes, io.IOBase]) -> Optional[Dict[str, Any]]:
+        """Проверяет синтаксис JSON потоковым сканером лексем"""
+        with preserve_position(data):
+            try:
+                return _SyntaxScanner(_text_reader(data)).scan()
+            except UnicodeDecodeError as e:
+                return syntax_error(f"Ошибка кодировки: {str(e)}")
     
     def get_mime_type(self) -> str:
         return "application/json"
@@ -0,0 +1,127 @@
+"""
+JSON Lines конвертер (одна JSON запись на строку)
+"""
+import json
+from typing import Any, Dict, Iterator, Optional, Union
+import io
+from .base import BaseConverter, ConversionError, COMPACT, CANONICAL, PRETTY, syntax_error, preserve_position
+from .compact import to_builtin
+
+
+class JSONLConverter(BaseConverter):
+    """Конвертер для формата JSON Lines (NDJSON)"""
+    
+    streaming = True
+    streaming_output = True
+    compact_serialize = True
+    
+    # Сколько строк проверять при определении формата
+    VALIDATE_LINES = 20
+    
+    def __init__(self):
+        super().__init__()
+        self.supported_formats = ['jsonl', 'ndjson']
+    
+    def _iter_lines(self, data: Union[str, bytes, io.IOBase]) -> Iterator[str]:
+        if isinstance(data, bytes):
+            data = data.decode('utf-8')
+        if isinstance(data, str):
+            data = io.StringIO(data)
+        for line in data:
+            if isinstance(line, bytes):
+                line = line.decode('utf-8')
+            yield line
+    
+    def parse(self, data: Union[str, bytes, io.IOBase]) -> Any:
+        """Парсит JSON Lines в список записей"""
+        return list(self.iter_records(data))
+    
+    def iter_records(self, data: Union[str, bytes, io.IOBase], columns=None,
+                     record_filter=None) -> Iterator[Any]:
+        """
+        Выдает записи по одной строке за раз
+        
+        Args:
+            data: Входные данные
+            columns: Не используется: записи строк разбираются целиком
+            record_filter: Фильтр, проверяемый сразу после разбора строки
+        """
+        try:
+            for number, line in enumerate(self._iter_lines(data), 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ConversionError(f"Ошибка парсинга JSON Lines в строке {number}: {str(e)}")
+                if record_filter is None or record_filter.test(record):
+                    yield record
+        except UnicodeDecodeError as e:
+            raise ConversionError(f"Ошибка кодировки: {str(e)}")
+    
+    def record_boundary(self, text: str) -> int:
+        """Конец последней полной строки"""
+        return text.rfind('\n') + 1
+    
+    def serialize(self, data: Any, profile: str = PRETTY) -> str:
+        """Сериализует список записей по одной на строку"""
+        return ''.join(self.iter_serialize(data, profile))
+    
+    def iter_serialize(self, data: Any, profile: str = PRETTY) -> Iterator[str]:
+        """Выдает записи по одной строке"""
+        try:
+            records = data if isinstance(data, (list, tuple, Iterator)) else [data]
+            options = {'ensure_ascii': False, 'default': to_builtin}
+            if profile in (COMPACT, CANONICAL):
+                options['separators'] = (',', ':')
+            if profile == CANONICAL:
+                options['sort_keys'] = True
+            encode = json.JSONEncoder(**options).encode
+            for record in records:
+                yield encode(record) + '\n'
+        except (TypeError, ValueError) as e:
+            raise ConversionError(f"Ошибка сериализации в JSON Lines: {str(e)}")
+    
+    def validate(self, data: Union[str, bytes, io.IOBase]) -> bool:
+        """
+        Проверяет первые VALIDATE_LINES строк: каждая должна быть JSON объектом
+        или массивом. Для определения формата этого достаточно, остальные
+        строки не читаются.
+        """
+        return self._check_lines(data, self.VALIDATE_LINES) is None
+    
+    def check_syntax(self, data: Union[str, bytes, io.IOBase]) -> Optional[Dict[str, Any]]:
+        """Проверяет все строки; в памяти держится одна строка"""
+        return self._check_lines(data, None)
+    
+    def _check_lines(self, data: Union[str, bytes, io.IOBase],
+                     limit: Optional[int]) -> Optional[Dict[str, Any]]:
+        """Первая ошибка в первых limit непустых строках (None - во всех)"""
+        checked = 0
+        with preserve_position(data):
+            try:
+                for number, line in enumerate(self._iter_lines(data), 1):
+                    stripped = line.strip()
+                    if not stripped:
+                        continue
+                    if stripped[0] not in '{[':
+                        return syntax_error("Ошибка синтаксиса JSON Lines: строка не является "
+                                            "JSON объектом или массивом", number, 1)
+                    try:
+                        json.loads(line)
+                    except json.JSONDecodeError as e:
+                        return syntax_error(f"Ошибка синтаксиса JSON Lines: {e.msg}", number, e.colno)
+                    checked += 1
+                    if limit is not None and checked >= limit:
+                        break
+            except UnicodeDecodeError as e:
+                return syntax_error(f"Ошибка кодировки: {str(e)}")
+        if not checked:
+            return syntax_error("Ошибка синтаксиса JSON Lines: нет записей")
+        return None
+    
+    def get_mime_type(self) -> str:
+        return "application/x-ndjson"
+    
+    def get_file_extension(self) -> str:
+        return ".jsonl"
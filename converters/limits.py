@@ -0,0 +1,372 @@
+"""
+Ограничения ресурсов одной конвертации
+
+Глубина вложенности, число узлов и развернутый размер документа, размер
+распакованного входа и результата, время и прирост памяти процесса
+проверяются по ходу работы: при чтении входа, при обходе разобранного
+документа или потока записей и при выдаче результата. Превышение сразу
+прерывает конвертацию ошибкой LimitExceeded.
+
+Обход документа считает узлы по ссылкам, поэтому общие объекты (якоря и
+псевдонимы YAML) учитываются столько раз, сколько они встретятся в
+результате, и «бомба» из псевдонимов останавливается на лимите узлов.
+"""
+from typing import Any, Iterable, Iterator, Optional, Union
+from array import array
+import io
+import os
+import time
+
+from .base import ConversionError
+from .compact import CompactObject
+
+# Ограничения по умолчанию (0 или None - без ограничения)
+MAX_DEPTH = 500
+MAX_NODES = 10_000_000
+MAX_SIZE = 512 * 1024 * 1024
+MAX_TIME = 60.0
+MAX_MEMORY = 1024 * 1024 * 1024
+
+# Как часто проверяются время и память: через столько узлов документа,
+# записей потока и байт входа или результата
+CHECK_INTERVAL = 64 * 1024
+CHECK_RECORDS = 1024
+CHECK_BYTES = 1024 * 1024
+
+_CONTAINERS = (dict, list, tuple)
+
+DEPTH = 'depth'
+NODES = 'nodes'
+SIZE = 'size'
+TIME = 'time'
+MEMORY = 'memory'
+
+try:
+    _PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE = 4096
+
+
+def _format_size(size: int) -> str:
+    if size % (1024 * 1024) == 0:
+        return f"{size // (1024 * 1024)} МБ"
+    return f"{size} байт"
+
+
+def _rss() -> Optional[int]:
+    """Резидентная память процесса, байт (None, если узнать нельзя)"""
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        # Пиковое значение: на Linux в килобайтах, на macOS в байтах
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == 'Darwin' else peak * 1024
+    except (ImportError, AttributeError, OSError):
+        return None
+
+
+class LimitExceeded(ConversionError):
+    """Конвертация превысила ограничение ресурсов"""
+
+    def __init__(self, message: str, limit: Optional[str] = None):
+        super().__init__(message)
+        self.limit = limit
+
+    def __reduce__(self):
+        # Исключение передается из процессов пула
+        return (type(self), (str(self), self.limit))
+
+
+class Limits:
+    """
+    Ограничения одной конвертации.
+
+    Args:
+        max_depth: Наибольшая глубина вложенности документа или записи
+        max_nodes: Наибольшее число узлов (объектов, списков и значений)
+        max_size: Наибольший размер, байт: распакованного входа, документа
+            в развернутом виде (строки и ключи с учетом повторов) и результата
+        max_time: Наибольшее время конвертации, с
+        max_memory: Наибольший прирост памяти процесса за конвертацию, байт
+    """
+
+    def __init__(self, max_depth: Optional[int] = MAX_DEPTH, max_nodes: Optional[int] = MAX_NODES,
+                 max_size: Optional[int] = MAX_SIZE, max_time: Optional[float] = MAX_TIME,
+                 max_memory: Optional[int] = MAX_MEMORY):
+        self.max_depth = max_depth or None
+        self.max_nodes = max_nodes or None
+        self.max_size = max_size or None
+        self.max_time = max_time or None
+        self.max_memory = max_memory or None
+
+    @classmethod
+    def from_env(cls) -> 'Limits':
+        """Из LIMIT_DEPTH, LIMIT_NODES, LIMIT_SIZE_MB, LIMIT_TIME, LIMIT_MEMORY_MB (0 - выключено)"""
+        def number(name: str, default: float) -> float:
+            value = os.environ.get(name)
+            return float(value) if value else default
+
+        mb = 1024 * 1024
+        return cls(
+            max_depth=int(number('LIMIT_DEPTH', MAX_DEPTH)),
+            max_nodes=int(number('LIMIT_NODES', MAX_NODES)),
+            max_size=int(number('LIMIT_SIZE_MB', MAX_SIZE / mb) * mb),
+            max_time=number('LIMIT_TIME', MAX_TIME),
+            max_memory=int(number('LIMIT_MEMORY_MB', MAX_MEMORY / mb) * mb),
+        )
+
+    @classmethod
+    def unlimited(cls) -> 'Limits':
+        return cls(None, None, None, None, None)
+
+    def start(self) -> 'Governor':
+        """Начинает учет ресурсов новой конвертации"""
+        return Governor(self)
+
+
+class Governor:
+    """Учет ресурсов одной конвертации"""
+
+    def __init__(self, limits: Limits):
+        self.limits = limits
+        self.started = time.monotonic()
+        self.memory_base = _rss() if limits.max_memory else None
+        self.nodes = 0
+        self.size = 0
+        self.output_size = 0
+        self._next_check = CHECK_INTERVAL
+        self._next_output_check = CHECK_BYTES
+
+    # Проверки
+
+    def check(self) -> None:
+        """Проверяет время и прирост памяти"""
+        limits = self.limits
+        if limits.max_time is not None and time.monotonic() - self.started > limits.max_time:
+            raise LimitExceeded(f"Конвертация выполняется дольше {limits.max_time:g} с", TIME)
+        if self.memory_base is not None:
+            current = _rss()
+            if current is not None and current - self.memory_base > limits.max_memory:
+                raise LimitExceeded(
+                    f"Конвертация заняла больше {_format_size(limits.max_memory)} памяти", MEMORY)
+
+    def _charge(self, nodes: int, size: int) -> None:
+        self.nodes += nodes
+        self.size += size
+        limits = self.limits
+        if limits.max_nodes is not None and self.nodes > limits.max_nodes:
+            raise LimitExceeded(f"В документе больше {limits.max_nodes} узлов", NODES)
+        if limits.max_size is not None and self.size > limits.max_size:
+            raise LimitExceeded(
+                f"Документ в развернутом виде больше {_format_size(limits.max_size)}", SIZE)
+        if self.nodes >= self._next_check:
+            self._next_check = self.nodes + CHECK_INTERVAL
+            self.check()
+
+    def charge(self, nodes: int, size: int) -> None:
+        """
+        Учитывает узлы и развернутый размер, подсчитанные раньше (например,
+        неизмененной части документа при инкрементальной правке)
+        """
+        self._charge(nodes, size)
+
+    def depth_error(self) -> LimitExceeded:
+        if self.limits.max_depth is None:
+            return LimitExceeded("Слишком глубокая вложенность данных", DEPTH)
+        return LimitExceeded(f"Глубина вложенности больше {self.limits.max_depth}", DEPTH)
+
+    def cause(self, error: BaseException) -> Optional[LimitExceeded]:
+        """
+        Превышение ограничения, из-за которого возникла ошибка, или None.
+
+        Конвертеры заворачивают исключения в свои ConversionError, поэтому
+        просматривается вся цепочка причин; RecursionError - это глубина.
+        """
+        while error is not None:
+            if isinstance(error, LimitExceeded):
+                return error
+            if isinstance(error, RecursionError):
+                return self.depth_error()
+            error = error.__cause__ or error.__context__
+        return None
+
+    # Документы и записи
+
+    def walk(self, document: Any) -> Any:
+        """
+        Обходит документ по уровням, учитывая глубину, узлы и размер.
+
+        Обход останавливается, как только ограничение превышено, поэтому
+        документ из общих ссылок не разворачивается дальше лимита.
+        """
+        max_depth = self.limits.max_depth
+        self._charge(1, 0)
+        level = [document]
+        depth = 0
+        while level:
+            children = []
+            extend = children.extend
+            charged = 0
+            size = 0
+            # Элементы упакованных массивов: листья следующего уровня
+            packed = 0
+            for value in level:
+                kind = type(value)
+                if kind is str:
+                    size += len(value)
+                elif kind is dict:
+                    try:
+                        size += sum(map(len, value))
+                    except TypeError:
+                        size += sum(len(key) if type(key) is str else 8 for key in value)
+                    extend(value.values())
+                elif kind is list or kind is tuple:
+                    extend(value)
+                elif kind is CompactObject:
+                    size += sum(map(len, value._keys))
+                    extend(value._values)
+                elif kind is array:
+                    packed += len(value)
+                    size += 8 * len(value)
+                elif kind is bytes:
+                    size += len(value)
+                else:
+                    size += 8
+                    continue
+                if len(children) + packed - charged > CHECK_INTERVAL:
+                    # Широкий уровень учитывается по частям, не дожидаясь конца
+                    self._charge(len(children) + packed - charged, size)
+                    charged = len(children) + packed
+                    size = 0
+            self._charge(len(children) + packed - charged, size)
+            depth += 1
+            if (children or packed) and max_depth is not None and depth > max_depth:
+                raise self.depth_error()
+            level = children
+        return document
+
+    def records(self, records: Iterable[Any]) -> Iterator[Any]:
+        """
+        Поток записей: ограничения узлов, размера и глубины действуют на
+        каждую запись отдельно (поток не копится в памяти), время и память -
+        на всю конвертацию.
+        """
+        count = 0
+        for record in records:
+            count += 1
+            if count % CHECK_RECORDS == 0:
+                self.check()
+            if type(record) is dict:
+                for value in record.values():
+                    if type(value) in _CONTAINERS:
+                        break
+                else:
+                    # Плоская запись (строка CSV, листа) не больше входа
+                    yield record
+                    continue
+            nodes, size, next_check = self.nodes, self.size, self._next_check
+            self.nodes = self.size = 0
+            self._next_check = CHECK_INTERVAL
+            try:
+                self.walk(record)
+            finally:
+                self.nodes, self.size, self._next_check = nodes, size, next_check
+            yield record
+
+    # Вход и результат
+
+    def input(self, data: Union[str, bytes, io.IOBase]) -> Union[str, bytes, io.IOBase]:
+        """Входные данные с учетом распакованного размера"""
+        max_size = self.limits.max_size
+        if max_size is None:
+            return data
+        if isinstance(data, (str, bytes)):
+            if len(data) > max_size:
+                raise self.input_error()
+            return data
+        if isinstance(data, io.TextIOBase):
+            return data
+        return io.BufferedReader(_MeteredReader(data, self))
+
+    def input_error(self) -> LimitExceeded:
+        return LimitExceeded(
+            f"Входные данные после распаковки больше {_format_size(self.limits.max_size)}", SIZE)
+
+    def output(self, chunks: Iterable[Union[str, bytes]]) -> Iterator[Union[str, bytes]]:
+        """Фрагменты результата с учетом размера и времени"""
+        try:
+            for chunk in chunks:
+                self.result(chunk)
+                yield chunk
+        except Exception as e:
+            # Ошибки потокового разбора возникают по ходу выдачи
+            limit = self.cause(e)
+            if limit is not None and limit is not e:
+                raise limit
+            raise
+
+    def result(self, chunk: Union[str, bytes]) -> Union[str, bytes]:
+        """Учитывает фрагмент или весь результат"""
+        self.output_size += len(chunk)
+        max_size = self.limits.max_size
+        if max_size is not None and self.output_size > max_size:
+            raise LimitExceeded(f"Результат больше {_format_size(max_size)}", SIZE)
+        if self.output_size >= self._next_output_check:
+            self._next_output_check = self.output_size + CHECK_BYTES
+            self.check()
+        return chunk
+
+
+class _MeteredReader(io.RawIOBase):
+    """Поток, который считает прочитанные байты и проверяет время и память"""
+
+    def __init__(self, stream: io.IOBase, governor: Governor):
+        self.stream = stream
+        self.governor = governor
+        self.position = 0
+        self.high_water = 0
+        self.next_check = CHECK_BYTES
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self.stream.read(len(buffer))
+        if not data:
+            return 0
+        count = len(data)
+        buffer[:count] = data
+        self.position += count
+        if self.position > self.high_water:
+            # Повторное чтение после перемотки не учитывается дважды
+            self.high_water = self.position
+            if self.high_water > self.governor.limits.max_size:
+                raise self.governor.input_error()
+            if self.high_water >= self.next_check:
+                # Время и память проверяются раз на CHECK_BYTES, а не на каждое чтение
+                self.next_check = self.high_water + CHECK_BYTES
+                self.governor.check()
+        return count
+
+    def seekable(self) -> bool:
+        try:
+            return self.stream.seekable()
+        except (AttributeError, ValueError):
+            return False
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        self.position = self.stream.seek(offset, whence)
+        return self.position
+
+    def tell(self) -> int:
+        return self.position
+
+    def close(self) -> None:
+        try:
+            self.stream.close()
+        finally:
+            super().close()
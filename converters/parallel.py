@@ -0,0 +1,315 @@
+"""
+Параллельный разбор больших CSV файлов и JSON массивов в пуле процессов
+"""
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import io
+import json
+import os
+import re
+import threading
+
+# Меньше этого размера файл разбирается в одном процессе
+PARALLEL_THRESHOLD = 64 * 1024 * 1024
+
+# Минимальный размер одного диапазона
+MIN_CHUNK_SIZE = 4 * 1024 * 1024
+
+# Диапазонов на один процесс: несколько, чтобы выровнять нагрузку
+CHUNKS_PER_WORKER = 4
+
+# Блок чтения файла при поиске границ диапазонов
+SCAN_BLOCK_SIZE = 1024 * 1024
+
+# Сколько диапазонов на процесс одновременно в работе при потоковом разборе
+WINDOW_PER_WORKER = 2
+
+# Конец элемента-объекта или массива, за которым следует запятая
+_ELEMENT_END = re.compile(r'[}\]]\s*,')
+
+# Серии обратных слэшей перед кавычкой: при нечетной длине кавычка экранирована
+_ESCAPED_QUOTE = re.compile(r'\\+"')
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_workers = 0
+_executor_lock = threading.Lock()
+
+
+def cpu_count() -> int:
+    """Число доступных процессу ядер"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def split_file(path: str, parts: int) -> Tuple[int, List[Tuple[int, int]]]:
+    """
+    Делит CSV файл на диапазоны байтов по границам записей.
+
+    Файл читается блоками, в памяти держится один блок. Конец записи -
+    перевод строки, перед которым четное число кавычек, поэтому переводы
+    строк внутри полей в кавычках границами не считаются.
+
+    Returns:
+        Кортеж (конец заголовка, список диапазонов (начало, конец))
+    """
+    size = os.path.getsize(path)
+    ends: List[int] = []
+    step = 0
+    # Первая граница - конец заголовка, следующие - не раньше target
+    target = 0
+    quotes = 0
+    offset = 0
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(SCAN_BLOCK_SIZE)
+            if not block:
+                break
+            counted = 0
+            position = max(target - offset, 0)
+            while position < len(block):
+                newline = block.find(b'\n', position)
+                if newline == -1:
+                    break
+                quotes += block.count(b'"', counted, newline)
+                counted = newline
+                if quotes % 2 == 0:
+                    ends.append(offset + newline + 1)
+                    if len(ends) == 1:
+                        step = max((size - ends[0]) // max(parts, 1), 1)
+                    target = ends[-1] + step
+                    position = target - offset
+                else:
+                    position = newline + 1
+            quotes += block.count(b'"', counted)
+            offset += len(block)
+
+    header_end = ends[0] if ends else size
+    bounds = ends + ([size] if not ends or ends[-1] < size else [])
+    return header_end, list(zip(bounds, bounds[1:]))
+
+
+def _read_range(path: str, header_end: int, start: int, end: int,
+                dtype: Optional[Dict[str, Any]] = None,
+                columns: Optional[Set[str]] = None, record_filter: Any = None) -> Any:
+    """
+    Разбирает один диапазон файла в дочернем процессе; columns и
+    record_filter - выбор колонок и фильтр конвейера, как в iter_records
+    """
+    import pandas as pd
+
+    with open(path, 'rb') as f:
+        header = f.read(header_end)
+        f.seek(start)
+        chunk = f.read(end - start)
+    usecols = (lambda name: name in columns) if columns is not None else None
+    frame = pd.read_csv(io.BytesIO(header + chunk), dtype=dtype, usecols=usecols)
+    if record_filter is not None:
+        frame = record_filter.filter_frame(frame)
+    return frame
+
+
+def _column_kind(column: Any) -> Optional[str]:
+    """Вид значений колонки: 'i', 'f', 'b', 'O' (строки) или None без значений"""
+    values = column.dropna()
+    if values.empty:
+        return None
+    kind = column.dtype.kind
+    if kind in ('i', 'u'):
+        return 'i'
+    if kind in ('f', 'b'):
+        return kind
+    # Булевы значения с пропусками pandas хранит в колонке object
+    if all(isinstance(value, bool) for value in values):
+        return 'b'
+    return 'O'
+
+
+def _text_columns(frames: List[Any]) -> Set[str]:
+    """
+    Колонки, которые при разборе файла целиком стали бы строками.
+
+    Каждый диапазон pandas разбирает со своим выводом типов. Целые и
+    дробные при склейке сводятся к дробным, как и при разборе целиком, а
+    колонка, где строки есть хотя бы в одном диапазоне или булевы значения
+    смешаны с числами, целиком читается как текст.
+    """
+    kinds: Dict[str, Set[str]] = {}
+    for frame in frames:
+        for name in frame.columns:
+            kind = _column_kind(frame[name])
+            if kind is not None:
+                kinds.setdefault(name, set()).add(kind)
+    return {name for name, found in kinds.items()
+            if 'O' in found or ('b' in found and len(found) > 1)}
+
+
+def get_executor(workers: int) -> ProcessPoolExecutor:
+    """Общий пул процессов; пересоздается, если нужно другое число процессов"""
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is None or _executor_workers != workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            _executor = ProcessPoolExecutor(max_workers=workers)
+            _executor_workers = workers
+        return _executor
+
+
+def _split(path: str, workers: int) -> Tuple[int, List[Tuple[int, int]]]:
+    """Диапазоны файла: по несколько на процесс, не меньше MIN_CHUNK_SIZE"""
+    size = os.path.getsize(path)
+    parts = max(min(workers * CHUNKS_PER_WORKER, size // MIN_CHUNK_SIZE), workers)
+    header_end, ranges = split_file(path, parts)
+    return header_end, ranges or [(header_end, header_end)]
+
+
+def iter_frames(path: str, workers: Optional[int] = None, columns: Optional[Set[str]] = None,
+                record_filter: Any = None) -> Iterator[Any]:
+    """
+    Разбирает CSV файл в пуле процессов и выдает таблицы диапазонов по порядку.
+
+    Одновременно в работе не больше WINDOW_PER_WORKER диапазонов на процесс,
+    поэтому память ограничена и при медленном потребителе. Типы колонок
+    выводятся по каждому диапазону, как по каждой части при чтении в одном
+    процессе.
+    """
+    workers = workers or cpu_count()
+    header_end, ranges = _split(path, workers)
+    executor = get_executor(workers)
+    pending: deque = deque()
+    try:
+        for start, end in ranges:
+            pending.append(executor.submit(_read_range, path, header_end, start, end,
+                                           None, columns, record_filter))
+            if len(pending) >= workers * WINDOW_PER_WORKER:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        # Потребитель остановился раньше - оставшиеся диапазоны не нужны
+        for future in pending:
+            future.cancel()
+
+
+def read_csv_parallel(path: str, workers: Optional[int] = None) -> Any:
+    """
+    Разбирает CSV файл в пуле процессов в один DataFrame.
+
+    Процессы сами читают свои диапазоны из файла, в родительский процесс
+    возвращаются только таблицы. Диапазоны, в которых колонка получила
+    другой тип, чем при разборе файла целиком, разбираются повторно с
+    текстовым типом этой колонки.
+    """
+    import pandas as pd
+
+    workers = workers or cpu_count()
+    header_end, ranges = _split(path, workers)
+    executor = get_executor(workers)
+    futures = [executor.submit(_read_range, path, header_end, start, end)
+               for start, end in ranges]
+    try:
+        frames = [future.result() for future in futures]
+    finally:
+        for future in futures:
+            future.cancel()
+
+    text = _text_columns(frames)
+    if text:
+        futures = {}
+        for index, (frame, (start, end)) in enumerate(zip(frames, ranges)):
+            dtype = {name: str for name in text
+                     if name in frame.columns and _column_kind(frame[name]) not in (None, 'O')}
+            if dtype:
+                futures[index] = executor.submit(_read_range, path, header_end, start, end, dtype)
+        for index, future in futures.items():
+            frames[index] = future.result()
+
+    # concat сводит целые и дробные к дробным, как при разборе файла целиком
+    return pd.concat(frames, ignore_index=True)
+
+
+def split_array(text: str, parts: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    Делит JSON массив верхнего уровня на диапазоны целых элементов.
+
+    Текст просматривается один раз: кандидаты в границы ищутся регулярным
+    выражением, а то, что граница лежит вне строки и на первом уровне
+    вложенности, проверяется по числу неэкранированных кавычек и скобок
+    перед ней. Скобки внутри строк могут сбить счет уровня - такая ошибка
+    обнаруживается при разборе диапазона.
+
+    Returns:
+        Диапазоны текста между скобками массива (без запятых-разделителей)
+        или None, если документ не массив
+    """
+    start = len(text) - len(text.lstrip())
+    end = len(text.rstrip())
+    if not text.startswith('[', start) or end - start < 2 or text[end - 1] != ']':
+        return None
+    end -= 1
+
+    escaped = [m.end() - 1 for m in _ESCAPED_QUOTE.finditer(text, start, end)
+               if (m.end() - m.start() - 1) % 2 == 1]
+    size = max((end - start) // max(parts, 1), 1)
+
+    spans = []
+    begin = position = start + 1
+    quotes = 0
+    depth = 1
+    search_from = begin + size
+    while search_from < end:
+        match = _ELEMENT_END.search(text, search_from, end)
+        if match is None:
+            break
+        close = match.start() + 1
+        quotes += (text.count('"', position, close)
+                   - (bisect_left(escaped, close) - bisect_left(escaped, position)))
+        depth += (text.count('{', position, close) + text.count('[', position, close)
+                  - text.count('}', position, close) - text.count(']', position, close))
+        position = close
+        if quotes % 2 == 0 and depth == 1:
+            comma = match.end() - 1
+            spans.append((begin, comma))
+            begin = comma + 1
+            search_from = begin + size
+        else:
+            search_from = close
+    spans.append((begin, end))
+    return spans
+
+
+def _decode_span(chunk: str) -> List[Any]:
+    """Разбирает диапазон элементов массива в дочернем процессе"""
+    return json.loads('[' + chunk + ']')
+
+
+def read_json_array(text: str, workers: Optional[int] = None) -> Optional[List[Any]]:
+    """
+    Разбирает JSON массив верхнего уровня в пуле процессов.
+
+    Returns:
+        Список элементов или None, если документ не массив или его не удалось
+        разделить - тогда документ нужно разобрать целиком
+    """
+    workers = workers or cpu_count()
+    parts = max(min(workers * CHUNKS_PER_WORKER, len(text) // MIN_CHUNK_SIZE), workers)
+    spans = split_array(text, parts)
+    if spans is None or len(spans) < 2:
+        return None
+
+    executor = get_executor(workers)
+    futures = [executor.submit(_decode_span, text[start:end]) for start, end in spans]
+    result: List[Any] = []
+    try:
+        for future in futures:
+            result.extend(future.result())
+    except ValueError:
+        # Граница попала внутрь строки или вложенного массива
+        for future in futures:
+            future.cancel()
+        return None
+    return result
@@ -0,0 +1,297 @@
+"""
+Декларативная обработка записей между разбором и сериализацией
+"""
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+from itertools import islice
+import math
+
+from .base import ConversionError
+from .flatten import unflatten_records
+from .sorting import SortSpec, sort_records
+
+_MISSING = object()
+
+
+def get_path(record: Any, path: str, default: Any = None) -> Any:
+    """
+    Значение по пути вида "a.b.c".
+
+    Сначала ищется ключ целиком (колонки CSV могут содержать точки),
+    затем путь разбирается по вложенным словарям.
+    """
+    if not isinstance(record, dict):
+        return default
+    if path in record:
+        return record[path]
+    value = record
+    for part in path.split('.'):
+        if isinstance(value, dict) and part in value:
+            value = value[part]
+        elif isinstance(value, list) and part.isdigit() and int(part) < len(value):
+            value = value[int(part)]
+        else:
+            return default
+    return value
+
+
+def flatten_record(record: Dict, paths: Optional[List[str]] = None,
+                   separator: str = '.') -> Dict:
+    """Разворачивает вложенные словари в ключи вида "a.b"; paths ограничивает поля"""
+    result = {}
+    for key, value in record.items():
+        if isinstance(value, dict) and (paths is None or key in paths):
+            for sub_key, sub_value in flatten_record(value, None, separator).items():
+                result[f"{key}{separator}{sub_key}"] = sub_value
+        else:
+            result[key] = value
+    return result
+
+
+def _is_missing(value: Any) -> bool:
+    return value is None or value is _MISSING or (isinstance(value, float) and math.isnan(value))
+
+
+def _compare(op: str) -> Callable[[Any, Any], bool]:
+    def compare(left, right):
+        try:
+            if op == 'gt':
+                return left > right
+            if op == 'ge':
+                return left >= right
+            if op == 'lt':
+                return left < right
+            return left <= right
+        except TypeError:
+            return False
+    return compare
+
+
+# Операции фильтра: имя -> функция (значение поля, значение условия)
+_OPERATIONS: Dict[str, Callable[[Any, Any], bool]] = {
+    'eq': lambda left, right: left == right,
+    'ne': lambda left, right: left != right,
+    'gt': _compare('gt'),
+    'ge': _compare('ge'),
+    'lt': _compare('lt'),
+    'le': _compare('le'),
+    'in': lambda left, right: left in right,
+    'contains': lambda left, right: right in str(left),
+    'exists': lambda left, right: (not _is_missing(left)) == bool(right),
+}
+
+
+class Condition:
+    """Простое условие: поле, операция и значение"""
+
+    def __init__(self, field: str, op: str, value: Any = True):
+        if op not in _OPERATIONS:
+            raise ConversionError(f"Неизвестная операция фильтра: {op}")
+        if op == 'in' and not isinstance(value, list):
+            raise ConversionError("Для операции in значение должно быть списком")
+        self.field = field
+        self.op = op
+        self.value = value
+        self._test = _OPERATIONS[op]
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Функции операций не сериализуются - при передаче в другой процесс
+        # условие восстанавливается по имени операции
+        return {'field': self.field, 'op': self.op, 'value': self.value}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(state['field'], state['op'], state['value'])
+
+    def test(self, record: Any) -> bool:
+        value = get_path(record, self.field, _MISSING)
+        if self.op == 'exists':
+            return self._test(value, self.value)
+        if _is_missing(value):
+            # Пустое значение удовлетворяет только сравнению ne
+            return self.op == 'ne' and self.value is not None
+        return bool(self._test(value, self.value))
+
+    def mask(self, frame: Any) -> Any:
+        """Векторизованная проверка для pandas DataFrame"""
+        if self.field not in frame.columns:
+            import pandas as pd
+            # Отсутствующая колонка ведет себя как пустое значение
+            result = (not self.value) if self.op == 'exists' else (self.op == 'ne' and self.value is not None)
+            return pd.Series(result, index=frame.index, dtype=bool)
+        column = frame[self.field]
+        present = column.notna()
+        if self.op == 'exists':
+            return present if self.value else ~present
+        if self.op == 'eq':
+            return present & (column == self.value)
+        if self.op == 'ne':
+            return (column != self.value) | ~present if self.value is not None else present
+        if self.op == 'in':
+            return present & column.isin(self.value)
+        if self.op == 'contains':
+            return present & column.astype(str).str.contains(str(self.value), regex=False)
+        # Сравнения: при несовместимых типах pandas бросит TypeError
+        compare = {'gt': column.gt, 'ge': column.ge, 'lt': column.lt, 'le': column.le}[self.op]
+        return present & compare(self.value)
+
+
+class RecordFilter:
+    """Конъюнкция условий; может проверять как отдельные записи, так и DataFrame"""
+
+    def __init__(self, conditions: List[Condition]):
+        self.conditions = conditions
+
+    @property
+    def fields(self) -> Set[str]:
+        return {condition.field for condition in self.conditions}
+
+    def test(self, record: Any) -> bool:
+        return all(condition.test(record) for condition in self.conditions)
+
+    def filter_frame(self, frame: Any) -> Any:
+        """Отбирает строки DataFrame до превращения их в словари"""
+        try:
+            mask = None
+            for condition in self.conditions:
+                condition_mask = condition.mask(frame)
+                mask = condition_mask if mask is None else mask & condition_mask
+            return frame[mask]
+        except TypeError:
+            # Смешанные типы в колонке - проверяем построчно
+            keep = [self.test(row) for row in frame.to_dict('records')]
+            return frame[keep]
+
+
+def _parse_conditions(spec: Any) -> List[Condition]:
+    items = spec if isinstance(spec, list) else [spec]
+    conditions = []
+    for item in items:
+        if not isinstance(item, dict) or 'field' not in item:
+            raise ConversionError("Условие фильтра должно содержать поле field")
+        conditions.append(Condition(str(item['field']), item.get('op', 'eq'), item.get('value', True)))
+    return conditions
+
+
+def _apply_step(name: str, value: Any, stream: Iterable[Any]) -> Iterable[Any]:
+    """Оборачивает поток записей одним шагом конвейера"""
+    if name == 'select':
+        return ({field: get_path(r, field) for field in value} for r in stream)
+    if name == 'rename':
+        return ({value.get(k, k): v for k, v in r.items()} if isinstance(r, dict) else r
+                for r in stream)
+    if name == 'filter':
+        return filter(value.test, stream)
+    if name == 'flatten':
+        paths, separator = value
+        return (flatten_record(r, paths, separator) if isinstance(r, dict) else r
+                for r in stream)
+    if name == 'unflatten':
+        return unflatten_records(stream, value)
+    if name == 'sort':
+        return sort_records(stream, value)
+    return islice(stream, value)
+
+
+class Pipeline:
+    """
+    Последовательность шагов обработки записей.
+
+    Шаги задаются списком словарей с одним ключом:
+    select (список полей), rename (словарь старое -> новое имя),
+    filter (условие или список условий {field, op, value}),
+    flatten (true, список полей или {paths, separator}),
+    unflatten (true или разделитель: колонки "a.b" -> вложенные объекты),
+    sort (список полей или {by, reverse, unique, memory_budget}),
+    unique (список полей: сортировка по ним без дубликатов),
+    limit (число).
+    """
+
+    def __init__(self, steps: List[Tuple[str, Any]]):
+        self.steps = steps
+
+    @classmethod
+    def from_spec(cls, spec: Union[List[Dict[str, Any]], 'Pipeline', None]) -> Optional['Pipeline']:
+        """Создает конвейер из JSON описания"""
+        if spec is None or isinstance(spec, Pipeline):
+            return spec
+        if not isinstance(spec, list):
+            raise ConversionError("Описание конвейера должно быть списком шагов")
+
+        steps = []
+        for item in spec:
+            if not isinstance(item, dict) or len(item) != 1:
+                raise ConversionError("Шаг конвейера должен быть объектом с одним ключом")
+            name, value = next(iter(item.items()))
+            if name == 'select':
+                if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+                    raise ConversionError("select: ожидается список имен полей")
+                steps.append(('select', value))
+            elif name == 'rename':
+                if not isinstance(value, dict):
+                    raise ConversionError("rename: ожидается объект старое имя -> новое")
+                steps.append(('rename', value))
+            elif name == 'filter':
+                steps.append(('filter', RecordFilter(_parse_conditions(value))))
+            elif name == 'flatten':
+                if isinstance(value, dict):
+                    steps.append(('flatten', (value.get('paths'), value.get('separator', '.'))))
+                elif isinstance(value, list):
+                    steps.append(('flatten', (value, '.')))
+                else:
+                    steps.append(('flatten', (None, '.')))
+            elif name == 'unflatten':
+                steps.append(('unflatten', value if isinstance(value, str) and value else '.'))
+            elif name in ('sort', 'unique'):
+                steps.append(('sort', SortSpec.from_spec(value, unique=name == 'unique')))
+            elif name == 'limit':
+                if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+                    raise ConversionError("limit: ожидается неотрицательное целое число")
+                steps.append(('limit', value))
+            else:
+                raise ConversionError(f"Неизвестный шаг конвейера: {name}")
+        return cls(steps)
+
+    def apply(self, records: Iterable[Any]) -> Iterator[Any]:
+        """Лениво применяет шаги к потоку записей"""
+        stream: Iterable[Any] = records
+        for name, value in self.steps:
+            stream = _apply_step(name, value, stream)
+        return iter(stream)
+
+    def apply_document(self, document: Any) -> Any:
+        """Применяет конвейер к разобранному документу целиком"""
+        if isinstance(document, list):
+            return list(self.apply(document))
+        result = list(self.apply([document]))
+        return result[0] if result else {}
+
+    def pushdown(self) -> Tuple[Optional[Set[str]], Optional[RecordFilter], 'Pipeline']:
+        """
+        Делит конвейер на часть, которую может выполнить потоковый парсер,
+        и остаток.
+
+        Фильтры из начальной части конвейера (до первого rename, flatten или
+        limit) проверяются парсером до создания записей; если в этой части
+        есть select, парсер читает только нужные колонки.
+
+        Returns:
+            Кортеж (колонки или None, фильтр для парсера или None, остаток)
+        """
+        columns: Optional[Set[str]] = None
+        filter_fields: Set[str] = set()
+        conditions: List[Condition] = []
+        remaining: List[Tuple[str, Any]] = []
+        leading = True
+
+        for name, value in self.steps:
+            if leading and name == 'filter':
+                conditions.extend(value.conditions)
+                if columns is None:
+                    filter_fields |= value.fields
+                continue
+            if leading and name == 'select' and columns is None:
+                columns = {field.split('.')[0] for field in value} | set(value) | filter_fields
+            elif name != 'select':
+                leading = False
+            remaining.append((name, value))
+
+        return columns, (RecordFilter(conditions) if conditions else None), Pipeline(remaining)
@@ -0,0 +1,352 @@
+"""
+Профилирование отдельных запросов по требованию
+
+Профиль снимается только для выбранных запросов: с заголовком
+X-Profile-Token, равным настроенному токену, случайной доли запросов или
+запросов, которые выполняются дольше порога. Статистический профилировщик
+периодически снимает стек потока запроса; результат записывается в
+каталог профилей в виде свернутых стеков (.collapsed, для flamegraph.pl)
+и файла speedscope (.speedscope.json). В режиме cprofile вместо этого
+записывается статистика cProfile (.prof).
+
+Если запрос не выбран, профилировщик в его обработку не вмешивается.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import cProfile
+import hmac
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+SAMPLING = 'sampling'
+CPROFILE = 'cprofile'
+PROFILE_MODES = (SAMPLING, CPROFILE)
+
+# Интервал снятия стеков, с
+SAMPLE_INTERVAL = 0.005
+
+# Сколько последних профилей хранить в каталоге
+MAX_PROFILES = 200
+
+# Каталог профилей по умолчанию - вне каталога приложения
+PROFILE_DIR = os.path.join(tempfile.gettempdir(), 'converter-profiles')
+
+# Заголовок с токеном для профилирования запроса и доступа к профилям
+TOKEN_HEADER = 'X-Profile-Token'
+
+_local = threading.local()
+
+
+def _frame_name(frame: Any) -> str:
+    code = frame.f_code
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+def collapse_stack(frame: Any) -> str:
+    """Стек кадра в свернутом виде: корень;...;вершина"""
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+def to_speedscope(stacks: Dict[str, int], name: str, interval: float) -> Dict[str, Any]:
+    """Свернутые стеки в формат speedscope (тип sampled, веса в миллисекундах)"""
+    frames: List[Dict[str, Any]] = []
+    index: Dict[str, int] = {}
+    samples = []
+    weights = []
+    for stack, count in stacks.items():
+        sample = []
+        for frame in stack.split(';'):
+            if frame not in index:
+                index[frame] = len(frames)
+                function, _, location = frame.rpartition(' (')
+                file, _, line = location.rstrip(')').rpartition(':')
+                frames.append({'name': function, 'file': file, 'line': int(line or 0)})
+            sample.append(index[frame])
+        samples.append(sample)
+        weights.append(round(count * interval * 1000, 3))
+    return {
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'name': name,
+        'exporter': 'universal-data-converter',
+        'shared': {'frames': frames},
+        'profiles': [{
+            'type': 'sampled',
+            'name': name,
+            'unit': 'milliseconds',
+            'startValue': 0,
+            'endValue': round(sum(weights), 3),
+            'samples': samples,
+            'weights': weights,
+        }],
+    }
+
+
+class Session:
+    """Профиль одного запроса"""
+
+    def __init__(self, label: str, trigger: str, thread_id: int, mode: str = SAMPLING):
+        self.id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.label = label
+        self.trigger = trigger
+        self.thread_id = thread_id
+        self.mode = mode
+        self.started = time.perf_counter()
+        self.stacks: Dict[str, int] = {}
+        self.annotations: Dict[str, Any] = {}
+        self.profile: Optional[cProfile.Profile] = None
+
+
+class Profiler:
+    """
+    Профилирование запросов по токену, доле запросов или порогу задержки.
+
+    Args:
+        directory: Каталог профилей
+        token: Токен заголовка X-Profile-Token (None - по заголовку не включается)
+        sample_rate: Доля случайно выбранных запросов (0 - выключено)
+        latency_threshold: Порог задержки, с: запрос, который выполняется
+            дольше, начинает профилироваться (0 - выключено)
+        mode: sampling или cprofile (для запросов, выбранных заранее)
+        interval: Интервал снятия стеков, с
+    """
+
+    def __init__(self, directory: str, token: Optional[str] = None, sample_rate: float = 0.0,
+                 latency_threshold: float = 0.0, mode: str = SAMPLING,
+                 interval: float = SAMPLE_INTERVAL):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Неизвестный режим профилирования: {mode}")
+        self.directory = directory
+        self.token = token
+        self.sample_rate = sample_rate
+        self.latency_threshold = latency_threshold
+        self.mode = mode
+        self.interval = interval
+
+        self._sessions: Dict[int, Session] = {}
+        # Запросы, за задержкой которых следит наблюдатель: поток -> (начало, метка)
+        self._watched: Dict[int, Tuple[float, str]] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_env(cls, directory: str = PROFILE_DIR) -> 'Profiler':
+        """Настройки из PROFILE_DIR, PROFILE_TOKEN, PROFILE_SAMPLE_RATE, PROFILE_LATENCY_MS, PROFILE_MODE"""
+        return cls(
+            os.environ.get('PROFILE_DIR') or directory,
+            token=os.environ.get('PROFILE_TOKEN') or None,
+            sample_rate=float(os.environ.get('PROFILE_SAMPLE_RATE', '0')),
+            latency_threshold=float(os.environ.get('PROFILE_LATENCY_MS', '0')) / 1000,
+            mode=os.environ.get('PROFILE_MODE', SAMPLING),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.token or self.sample_rate > 0 or self.latency_threshold > 0)
+
+    def authorized(self, token: Optional[str]) -> bool:
+        """Совпадает ли токен; сравнение за время, не зависящее от совпавшего начала"""
+        if not self.token or token is None:
+            return False
+        return hmac.compare_digest(token.encode('utf-8', 'surrogateescape'),
+                                   self.token.encode('utf-8', 'surrogateescape'))
+
+    # Управление сессиями
+
+    def start(self, label: str, trigger: str, mode: Optional[str] = None) -> Session:
+        """Начинает профиль текущего потока"""
+        session = Session(label, trigger, threading.get_ident(), mode or self.mode)
+        if session.mode == CPROFILE:
+            session.profile = cProfile.Profile()
+            session.profile.enable()
+        else:
+            with self._lock:
+                self._sessions[session.thread_id] = session
+            self._ensure_sampler()
+        _local.session = session
+        return session
+
+    def stop(self, session: Session) -> Optional[str]:
+        """Заканчивает профиль и записывает его; возвращает идентификатор"""
+        if session.profile is not None:
+            session.profile.disable()
+        with self._lock:
+            if self._sessions.get(session.thread_id) is session:
+                del self._sessions[session.thread_id]
+        if getattr(_local, 'session', None) is session:
+            _local.session = None
+        return self._write(session, time.perf_counter() - session.started)
+
+    def _ensure_sampler(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+
+    def _run(self) -> None:
+        """Поток сэмплера: снимает стеки профилируемых потоков и следит за задержкой"""
+        while True:
+            # Сброс до проверки: сигнал о новой сессии после нее не потеряется
+            self._wakeup.clear()
+            with self._lock:
+                sessions = list(self._sessions.values())
+                watched = bool(self._watched)
+            if not sessions and not watched:
+                self._wakeup.wait()
+                continue
+
+            if sessions:
+                frames = sys._current_frames()
+                for session in sessions:
+                    frame = frames.get(session.thread_id)
+                    if frame is not None:
+                        stack = collapse_stack(frame)
+                        session.stacks[stack] = session.stacks.get(stack, 0) + 1
+                del frames
+            if watched:
+                self._promote_slow()
+            time.sleep(self.interval if sessions else min(self.latency_threshold / 4, 0.05))
+
+    def _promote_slow(self) -> None:
+        """Начинает профиль запросов, которые выполняются дольше порога"""
+        now = time.perf_counter()
+        with self._lock:
+            for thread_id, (started, label) in list(self._watched.items()):
+                if now - started >= self.latency_threshold and thread_id not in self._sessions:
+                    session = Session(label, 'latency', thread_id, SAMPLING)
+                    session.started = started
+                    session.annotations['profiled_after_ms'] = round(self.latency_threshold * 1000)
+                    self._sessions[thread_id] = session
+
+    def watch(self, label: str) -> None:
+        """Следить за задержкой запроса текущего потока"""
+        with self._lock:
+            self._watched[threading.get_ident()] = (time.perf_counter(), label)
+        self._ensure_sampler()
+
+    def unwatch(self) -> Optional[str]:
+        """Запрос закончен; если его начали профилировать, записывает профиль"""
+        thread_id = threading.get_ident()
+        with self._lock:
+            self._watched.pop(thread_id, None)
+            session = self._sessions.get(thread_id)
+        if session is not None and session.trigger == 'latency':
+            return self.stop(session)
+        return None
+
+    # Запись и просмотр профилей
+
+    def _write(self, session: Session, duration: float) -> Optional[str]:
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, session.id)
+        files = []
+        if session.profile is not None:
+            session.profile.dump_stats(base + '.prof')
+            files.append(session.id + '.prof')
+        else:
+            with open(base + '.collapsed', 'w', encoding='utf-8') as f:
+                for stack, count in sorted(session.stacks.items()):
+                    f.write(f'{stack} {count}\n')
+            with open(base + '.speedscope.json', 'w', encoding='utf-8') as f:
+                json.dump(to_speedscope(session.stacks, session.label, self.interval), f)
+            files.extend([session.id + '.collapsed', session.id + '.speedscope.json'])
+
+        meta = {
+            'id': session.id,
+            'label': session.label,
+            'trigger': session.trigger,
+            'mode': session.mode,
+            'duration_ms': round(duration * 1000, 1),
+            'samples': sum(session.stacks.values()),
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'files': files,
+        }
+        meta.update(session.annotations)
+        with open(base + '.meta.json', 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        self._prune()
+        return session.id
+
+    def _prune(self) -> None:
+        """Удаляет старые профили сверх MAX_PROFILES"""
+        metas = sorted(name for name in os.listdir(self.directory) if name.endswith('.meta.json'))
+        for name in metas[:-MAX_PROFILES] if len(metas) > MAX_PROFILES else []:
+            profile_id = name[:-len('.meta.json')]
+            for file in os.listdir(self.directory):
+                if file.startswith(profile_id + '.'):
+                    os.unlink(os.path.join(self.directory, file))
+
+    def list_profiles(self) -> List[Dict[str, Any]]:
+        """Сохраненные профили, новые первыми"""
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for name in sorted(os.listdir(self.directory), reverse=True):
+            if name.endswith('.meta.json'):
+                with open(os.path.join(self.directory, name), encoding='utf-8') as f:
+                    profiles.append(json.load(f))
+        return profiles
+
+
+def annotate(**values: Any) -> None:
+    """Добавляет сведения (например, пару форматов) к профилю текущего запроса"""
+    session = getattr(_local, 'session', None)
+    if session is not None:
+        session.annotations.update(values)
+
+
+class ProfilingMiddleware:
+    """
+    WSGI middleware: профилирует выбранные запросы целиком, включая
+    отправку потокового тела ответа.
+    """
+
+    def __init__(self, app, profiler: Profiler):
+        self.app = app
+        self.profiler = profiler
+
+    def __call__(self, environ, start_response):
+        profiler = self.profiler
+        if not profiler.enabled:
+            return self.app(environ, start_response)
+
+        label = f"{environ.get('REQUEST_METHOD', '')} {environ.get('PATH_INFO', '')}"
+        token = environ.get('HTTP_' + TOKEN_HEADER.upper().replace('-', '_'))
+        if profiler.authorized(token):
+            session = profiler.start(label, 'header')
+            done = lambda: profiler.stop(session)
+        elif profiler.sample_rate > 0 and random.random() < profiler.sample_rate:
+            session = profiler.start(label, 'sample')
+            done = lambda: profiler.stop(session)
+        elif profiler.latency_threshold > 0:
+            profiler.watch(label)
+            done = profiler.unwatch
+        else:
+            return self.app(environ, start_response)
+
+        try:
+            body = self.app(environ, start_response)
+        except BaseException:
+            done()
+            raise
+        return self._finish(body, done)
+
+    def _finish(self, body: Iterable[bytes], done) -> Iterable[bytes]:
+        """Тело ответа; done вызывается после отправки"""
+        try:
+            yield from body
+        finally:
+            close = getattr(body, 'close', None)
+            if close is not None:
+                close()
+            done()
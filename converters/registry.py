@@ -0,0 +1,160 @@
+"""
+Реестр конвертеров с ленивой загрузкой
+"""
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+from importlib import import_module
+import logging
+
+from .base import BaseConverter, ConversionError
+
+logger = logging.getLogger(__name__)
+
+# Группа entry points, через которую сторонние пакеты регистрируют форматы
+ENTRY_POINT_GROUP = 'universal_data_converter.formats'
+
+# Встроенные форматы: имя -> "модуль:класс" и псевдонимы.
+# Модули импортируются только при первом обращении к конвертеру.
+BUILTIN_FORMATS = [
+    ('json', '.json_converter:JSONConverter', ()),
+    ('jsonl', '.jsonl_converter:JSONLConverter', ('ndjson',)),
+    ('xml', '.xml_converter:XMLConverter', ()),
+    ('csv', '.csv_converter:CSVConverter', ()),
+    ('yaml', '.yaml_converter:YAMLConverter', ('yml',)),
+    ('toml', '.toml_converter:TOMLConverter', ()),
+    ('xlsx', '.xlsx_converter:XLSXConverter', ()),
+    ('sqlite', '.sqlite_converter:SQLiteConverter', ()),
+]
+
+Factory = Union[str, Callable[[], BaseConverter]]
+
+
+def _load_factory(factory: Factory) -> Callable[[], BaseConverter]:
+    """Превращает строку "модуль:атрибут" в вызываемую фабрику"""
+    if callable(factory):
+        return factory
+    module_name, _, attr = factory.partition(':')
+    module = import_module(module_name, package=__package__)
+    return getattr(module, attr)
+
+
+class ConverterRegistry:
+    """
+    Отображение имен форматов и псевдонимов на конвертеры.
+
+    Конвертер создается при первом обращении и затем переиспользуется,
+    поэтому перечисление форматов не импортирует pandas, yaml и прочие
+    тяжелые зависимости.
+    """
+
+    def __init__(self, load_entry_points: bool = True):
+        self._factories: Dict[str, Factory] = {}
+        self._aliases: Dict[str, str] = {}
+        self._instances: Dict[str, BaseConverter] = {}
+        self._order: List[str] = []
+        self._entry_points_loaded = not load_entry_points
+
+    def register(self, name: str, factory: Factory, aliases=()) -> None:
+        """Регистрирует формат; factory - класс, функция или строка "модуль:класс" """
+        name = name.lower()
+        if name not in self._factories:
+            self._order.append(name)
+        self._factories[name] = factory
+        self._instances.pop(name, None)
+        for alias in aliases:
+            alias = alias.lower()
+            self._aliases[alias] = name
+            if alias not in self._order:
+                self._order.append(alias)
+
+    def _load_entry_points(self) -> None:
+        """Подключает форматы, объявленные через entry points"""
+        if self._entry_points_loaded:
+            return
+        self._entry_points_loaded = True
+        try:
+            from importlib.metadata import entry_points
+            eps = entry_points()
+            if hasattr(eps, 'select'):
+                group = eps.select(group=ENTRY_POINT_GROUP)
+            else:
+                group = eps.get(ENTRY_POINT_GROUP, [])
+        except Exception as e:
+            logger.warning(f"Не удалось прочитать entry points: {e}")
+            return
+
+        for ep in group:
+            if ep.name.lower() in self._factories:
+                continue
+            # Сам модуль плагина загружается только при первом использовании
+            self.register(ep.name, lambda ep=ep: ep.load()())
+
+    def resolve(self, name: str) -> Optional[str]:
+        """Возвращает каноническое имя формата или None"""
+        name = name.lower()
+        if name not in self._factories and name not in self._aliases:
+            # Плагины ищем только если встроенного формата с таким именем нет
+            self._load_entry_points()
+        if name in self._factories:
+            return name
+        return self._aliases.get(name)
+
+    def canonical_names(self) -> List[str]:
+        """Имена форматов без псевдонимов"""
+        self._load_entry_points()
+        return [name for name in self._order if name in self._factories]
+
+    def names(self) -> List[str]:
+        """Имена всех форматов вместе с псевдонимами, без импорта конвертеров"""
+        self._load_entry_points()
+        return list(self._order)
+
+    def is_loaded(self, name: str) -> bool:
+        """Проверяет, создан ли уже конвертер для формата"""
+        canonical = self.resolve(name)
+        return canonical in self._instances
+
+    def get(self, name: str) -> BaseConverter:
+        """Возвращает конвертер, при необходимости импортируя его модуль"""
+        canonical = self.resolve(name)
+        if canonical is None:
+            raise ConversionError(f"Неподдерживаемый формат: {name}")
+
+        converter = self._instances.get(canonical)
+        if converter is None:
+            try:
+                converter = _load_factory(self._factories[canonical])()
+            except ImportError as e:
+                raise ConversionError(f"Формат {canonical} недоступен: {str(e)}")
+            self._instances[canonical] = converter
+        return converter
+
+    # Интерфейс словаря, чтобы registry можно было использовать вместо dict
+    def __contains__(self, name: Any) -> bool:
+        return isinstance(name, str) and self.resolve(name) is not None
+
+    def __getitem__(self, name: str) -> BaseConverter:
+        if name not in self:
+            raise KeyError(name)
+        return self.get(name)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.names())
+
+    def __len__(self) -> int:
+        return len(self.names())
+
+    def keys(self) -> List[str]:
+        return self.names()
+
+    def items(self) -> Iterator:
+        """Пары (имя, конвертер); импортирует конвертеры по мере обхода"""
+        for name in self.names():
+            yield name, self.get(name)
+
+
+def create_default_registry(load_entry_points: bool = True) -> ConverterRegistry:
+    """Создает реестр со встроенными форматами"""
+    registry = ConverterRegistry(load_entry_points=load_entry_points)
+    for name, factory, aliases in BUILTIN_FORMATS:
+        registry.register(name, factory, aliases)
+    return registry
@@ -0,0 +1,107 @@
+"""
+Хранилище результатов конвертации для веб-интерфейса
+
+Полный результат записывается в файл по мере сериализации и отдается по
+адресу /api/results/<id>: страница читает его потоком, а скачивание идет
+по ссылке, без повторной отправки содержимого на сервер. Результаты
+хранятся ограниченное время и удаляются при следующих записях.
+"""
+from typing import Any, Dict, Iterable, Optional, Union
+import json
+import os
+import re
+import time
+import uuid
+
+# Сколько хранится результат, с
+RESULT_TTL = 3600
+
+# Сколько результатов хранить одновременно
+MAX_RESULTS = 100
+
+_RESULT_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+
+class ResultStore:
+    """Каталог результатов: файл <id>.data и описание <id>.meta.json"""
+
+    def __init__(self, directory: str, ttl: float = RESULT_TTL, max_results: int = MAX_RESULTS):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_results = max_results
+
+    def _path(self, result_id: str, suffix: str) -> Optional[str]:
+        if not _RESULT_ID_RE.match(result_id or ''):
+            return None
+        return os.path.join(self.directory, result_id + suffix)
+
+    def save(self, chunks: Iterable[Union[str, bytes]], **meta: Any) -> Dict[str, Any]:
+        """
+        Записывает фрагменты результата; строки - в UTF-8
+
+        Returns:
+            Описание результата: id, size (байт), lines и переданные поля
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        self._prune()
+        result_id = uuid.uuid4().hex
+        path = self._path(result_id, '.data')
+        size = 0
+        lines = 0
+        last = b''
+        try:
+            with open(path, 'wb') as f:
+                for chunk in chunks:
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode('utf-8')
+                    if not chunk:
+                        continue
+                    f.write(chunk)
+                    size += len(chunk)
+                    lines += chunk.count(b'\n')
+                    last = chunk[-1:]
+        except BaseException:
+            os.unlink(path)
+            raise
+        if size and last != b'\n':
+            lines += 1
+
+        meta = dict(meta, id=result_id, size=size, lines=lines, created=time.time())
+        with open(self._path(result_id, '.meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        return meta
+
+    def get(self, result_id: str) -> Optional[Dict[str, Any]]:
+        """Описание результата с путем к файлу (path) или None, если его нет"""
+        meta_path = self._path(result_id, '.meta.json')
+        if meta_path is None or not os.path.isfile(meta_path):
+            return None
+        with open(meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+        if time.time() - meta['created'] > self.ttl:
+            return None
+        meta['path'] = self._path(result_id, '.data')
+        return meta
+
+    def _prune(self) -> None:
+        """Удаляет просроченные результаты и старые сверх max_results"""
+        if not os.path.isdir(self.directory):
+            return
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.meta.json'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                entries.append((os.path.getmtime(path), name[:-len('.meta.json')]))
+            except OSError:
+                continue
+        entries.sort(reverse=True)
+        for index, (mtime, result_id) in enumerate(entries):
+            if now - mtime > self.ttl or index >= self.max_results - 1:
+                for suffix in ('.meta.json', '.data'):
+                    try:
+                        os.unlink(os.path.join(self.directory, result_id + suffix))
+                    except OSError:
+                        pass
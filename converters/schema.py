@@ -0,0 +1,345 @@
+"""
+Валидация по JSON Schema и вывод схемы по образцу записей
+"""
+from typing import Any, Dict, Iterable, List, Optional
+from collections import OrderedDict
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+
+from .base import ConversionError
+
+# Сколько скомпилированных валидаторов держать в памяти
+VALIDATOR_CACHE_SIZE = 128
+
+# Допустимые имена сохраненных схем
+_SCHEMA_NAME_RE = re.compile(r'^[A-Za-z0-9_.-]+$')
+
+_validator_cache: 'OrderedDict[str, Any]' = OrderedDict()
+_validator_lock = threading.Lock()
+
+
+def schema_fingerprint(schema: Dict) -> str:
+    """Хэш схемы, не зависящий от порядка ключей и форматирования"""
+    canonical = json.dumps(schema, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def compile_schema(schema: Dict) -> Any:
+    """
+    Возвращает скомпилированный валидатор для схемы.
+
+    Валидаторы кэшируются по хэшу схемы, поэтому повторные запросы с той же
+    схемой не проверяют и не компилируют ее заново.
+    """
+    if not isinstance(schema, dict):
+        raise ConversionError("Схема должна быть JSON объектом")
+
+    key = schema_fingerprint(schema)
+    with _validator_lock:
+        validator = _validator_cache.get(key)
+        if validator is not None:
+            _validator_cache.move_to_end(key)
+            return validator
+
+    try:
+        import jsonschema
+    except ImportError:
+        raise ConversionError("Для проверки по схеме требуется пакет jsonschema")
+
+    validator_class = jsonschema.validators.validator_for(schema)
+    try:
+        validator_class.check_schema(schema)
+    except jsonschema.SchemaError as e:
+        raise ConversionError(f"Некорректная схема: {e.message}")
+    validator = validator_class(schema)
+
+    with _validator_lock:
+        _validator_cache[key] = validator
+        while len(_validator_cache) > VALIDATOR_CACHE_SIZE:
+            _validator_cache.popitem(last=False)
+    return validator
+
+
+# Ключевые слова схемы массива, которые проверяются по потоку записей
+_ARRAY_KEYWORDS = frozenset({
+    '$schema', '$id', '$anchor', '$defs', 'definitions', '$comment', '$vocabulary',
+    'title', 'description', 'default', 'examples', 'deprecated', 'readOnly', 'writeOnly',
+    'type', 'items', 'prefixItems', 'additionalItems',
+    'minItems', 'maxItems', 'uniqueItems', 'contains', 'minContains', 'maxContains',
+})
+
+
+class _ArrayChecks:
+    """
+    Проверка схемы массива по потоку записей.
+
+    Записи проверяются по prefixItems/items с разрешением ссылок от корня
+    схемы (#/$defs/...), ограничения самого массива - по числу записей,
+    отпечаткам уже прочитанных записей (uniqueItems) и числу записей,
+    подходящих под contains. Остальные ключевые слова уровня массива
+    в потоке не проверить - такая схема отклоняется.
+    """
+
+    def __init__(self, validator: Any, schema: Dict):
+        unsupported = sorted(set(schema) - _ARRAY_KEYWORDS)
+        if unsupported:
+            raise ConversionError(
+                f"Ключевые слова схемы массива не поддерживаются: {', '.join(unsupported)}")
+
+        items = schema.get('items', True)
+        prefix = schema.get('prefixItems', [])
+        if isinstance(items, list):
+            # Черновики до 2020-12: items-список и additionalItems
+            prefix, items = items, schema.get('additionalItems', True)
+        self.prefix = [validator.evolve(schema=s) for s in prefix]
+        self.items = validator.evolve(schema=items)
+        self.min_items = schema.get('minItems')
+        self.max_items = schema.get('maxItems')
+        self.unique = bool(schema.get('uniqueItems'))
+        self.seen: Dict[bytes, int] = {}
+        self.contains = validator.evolve(schema=schema['contains']) if 'contains' in schema else None
+        self.min_contains = schema.get('minContains', 1)
+        self.max_contains = schema.get('maxContains')
+        self.matched = 0
+
+    def record_validator(self, index: int) -> Any:
+        return self.prefix[index] if index < len(self.prefix) else self.items
+
+    def add(self, index: int, record: Any) -> Optional[str]:
+        """Учитывает запись; возвращает ошибку повтора при uniqueItems"""
+        if self.contains is not None and self.contains.is_valid(record):
+            self.matched += 1
+        if self.unique:
+            digest = hashlib.sha256(_unique_key(record).encode('utf-8')).digest()
+            if digest in self.seen:
+                return f"Запись повторяет запись {self.seen[digest]} (uniqueItems)"
+            self.seen[digest] = index
+        return None
+
+    def finish(self, count: int) -> List[str]:
+        """Ошибки ограничений массива после чтения всех записей"""
+        errors = []
+        if self.min_items is not None and count < self.min_items:
+            errors.append(f"Записей {count}, требуется не меньше {self.min_items} (minItems)")
+        if self.max_items is not None and count > self.max_items:
+            errors.append(f"Записей {count}, допускается не больше {self.max_items} (maxItems)")
+        if self.contains is not None:
+            if self.matched < self.min_contains:
+                errors.append(f"Под contains подходит записей: {self.matched}, "
+                              f"требуется не меньше {self.min_contains}")
+            if self.max_contains is not None and self.matched > self.max_contains:
+                errors.append(f"Под contains подходит записей: {self.matched}, "
+                              f"допускается не больше {self.max_contains}")
+        return errors
+
+
+def _unique_key(value: Any) -> str:
+    """Представление записи, равное для равных в смысле JSON Schema значений"""
+    def plain(item):
+        if isinstance(item, float) and item.is_integer():
+            return int(item)
+        if isinstance(item, dict):
+            return {str(k): plain(v) for k, v in item.items()}
+        if isinstance(item, (list, tuple)):
+            return [plain(v) for v in item]
+        return item
+    return json.dumps(plain(value), sort_keys=True, separators=(',', ':'), default=str)
+
+
+def _normalize(value: Any) -> Any:
+    """Заменяет NaN (пустые ячейки pandas) на None"""
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    return value
+
+
+def _json_pointer(path: Iterable) -> str:
+    """Путь внутри записи в виде JSON Pointer"""
+    parts = [str(p).replace('~', '~0').replace('/', '~1') for p in path]
+    return '/' + '/'.join(parts) if parts else ''
+
+
+def validate_records(records: Iterable[Any], schema: Dict,
+                     max_errors: int = 100) -> Dict[str, Any]:
+    """
+    Проверяет записи по схеме по мере их чтения.
+
+    Если схема описывает массив, каждая запись проверяется по схеме элемента,
+    а ограничения массива (minItems, uniqueItems, contains...) - по всему
+    потоку; иначе каждая запись проверяется по всей схеме. Ошибки содержат
+    номер записи и путь внутри нее; у ошибок массива целиком номер - None.
+    """
+    validator = compile_schema(schema)
+    from referencing.exceptions import Unresolvable
+
+    array = _ArrayChecks(validator, schema) if schema.get('type') == 'array' else None
+    errors: List[Dict[str, Any]] = []
+    count = 0
+
+    try:
+        for index, record in enumerate(records):
+            count += 1
+            record = _normalize(record)
+            record_validator = array.record_validator(index) if array is not None else validator
+            for error in record_validator.iter_errors(record):
+                errors.append({
+                    'record': index,
+                    'path': _json_pointer(error.absolute_path),
+                    'message': error.message,
+                })
+                if len(errors) >= max_errors:
+                    break
+            if array is not None and len(errors) < max_errors:
+                duplicate = array.add(index, record)
+                if duplicate is not None:
+                    errors.append({'record': index, 'path': '', 'message': duplicate})
+            if len(errors) >= max_errors:
+                break
+        else:
+            if array is not None:
+                errors.extend({'record': None, 'path': '', 'message': message}
+                              for message in array.finish(count))
+                del errors[max_errors:]
+    except ConversionError as e:
+        # Синтаксическая ошибка посреди потока - тоже ошибка валидации
+        errors.append({'record': count, 'path': '', 'message': str(e)})
+    except Unresolvable as e:
+        raise ConversionError(f"Некорректная ссылка в схеме: {e}")
+
+    return {
+        'valid': not errors,
+        'records': count,
+        'errors': errors,
+        'truncated': len(errors) >= max_errors,
+    }
+
+
+def _type_of(value: Any) -> str:
+    """Тип значения в терминах JSON Schema"""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return 'null'
+    if isinstance(value, bool):
+        return 'boolean'
+    if isinstance(value, int):
+        return 'integer'
+    if isinstance(value, float):
+        return 'number'
+    if isinstance(value, str):
+        return 'string'
+    if isinstance(value, dict):
+        return 'object'
+    if isinstance(value, (list, tuple)):
+        return 'array'
+    return 'string'
+
+
+class _SchemaBuilder:
+    """Накопитель сведений о типах для одного узла документа"""
+
+    def __init__(self):
+        self.types = set()
+        self.properties: Dict[str, '_SchemaBuilder'] = {}
+        self.property_counts: Dict[str, int] = {}
+        self.objects = 0
+        self.items: Optional['_SchemaBuilder'] = None
+
+    def add(self, value: Any) -> None:
+        value_type = _type_of(value)
+        self.types.add(value_type)
+        if value_type == 'object':
+            self.objects += 1
+            for key, item in value.items():
+                key = str(key)
+                if key not in self.properties:
+                    self.properties[key] = _SchemaBuilder()
+                    self.property_counts[key] = 0
+                self.properties[key].add(item)
+                self.property_counts[key] += 1
+        elif value_type == 'array':
+            if self.items is None:
+                self.items = _SchemaBuilder()
+            for item in value:
+                self.items.add(item)
+
+    def build(self) -> Dict[str, Any]:
+        types = set(self.types)
+        # integer поглощается number
+        if 'number' in types:
+            types.discard('integer')
+        schema: Dict[str, Any] = {}
+        if types:
+            ordered = sorted(types)
+            schema['type'] = ordered[0] if len(ordered) == 1 else ordered
+        if 'object' in types:
+            schema['properties'] = {k: b.build() for k, b in self.properties.items()}
+            required = [k for k, c in self.property_counts.items() if c == self.objects]
+            if required:
+                schema['required'] = required
+        if 'array' in types and self.items is not None and self.items.types:
+            schema['items'] = self.items.build()
+        return schema
+
+
+def infer_schema(records: Iterable[Any], sample_size: int = 1000) -> Dict[str, Any]:
+    """
+    Выводит схему по первым sample_size записям.
+
+    Поле считается обязательным, если оно встретилось во всех записях
+    образца. Возвращает схему массива записей.
+    """
+    builder = _SchemaBuilder()
+    for index, record in enumerate(records):
+        if index >= sample_size:
+            break
+        builder.add(record)
+
+    return {
+        '$schema': 'https://json-schema.org/draft/2020-12/schema',
+        'type': 'array',
+        'items': builder.build(),
+    }
+
+
+class SchemaStore:
+    """Каталог сохраненных схем: одна схема - один файл <имя>.json"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, name: str) -> str:
+        if not _SCHEMA_NAME_RE.match(name):
+            raise ConversionError(f"Некорректное имя схемы: {name}")
+        return os.path.join(self.directory, f"{name}.json")
+
+    def load(self, name: str) -> Dict:
+        """Загружает схему по имени"""
+        path = self._path(name)
+        if not os.path.isfile(path):
+            raise ConversionError(f"Схема не найдена: {name}")
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except json.JSONDecodeError as e:
+            raise ConversionError(f"Ошибка чтения схемы {name}: {str(e)}")
+
+    def save(self, name: str, schema: Dict) -> None:
+        """Сохраняет схему под именем"""
+        compile_schema(schema)
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(name)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(schema, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    def names(self) -> List[str]:
+        """Список сохраненных схем"""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(f[:-5] for f in os.listdir(self.directory) if f.endswith('.json'))
@@ -0,0 +1,203 @@
+"""
+Сортировка и удаление дубликатов записей с ограниченной памятью
+
+Записи сортируются в памяти, пока их оценочный размер не превысит бюджет.
+Сверх бюджета отсортированные серии сбрасываются во временные файлы и
+затем сливаются k-путевым слиянием, поэтому память не зависит от размера
+входа.
+"""
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+import heapq
+import os
+import pickle
+import sys
+import tempfile
+
+from .base import ConversionError
+
+# Бюджет памяти на сортировку в памяти по умолчанию
+MEMORY_BUDGET = 64 * 1024 * 1024
+
+# Буфер чтения одной серии при слиянии
+RUN_BUFFER_SIZE = 256 * 1024
+
+# Больше серий за один проход не сливается: лишние сливаются заранее
+MAX_MERGE_WIDTH = 64
+
+_MISSING = object()
+
+
+def _key_part(value: Any) -> Tuple[int, Any]:
+    """
+    Элемент ключа, сравнимый со значениями других типов.
+
+    Пустые значения идут первыми, затем числа, строки и остальные значения
+    в виде строки.
+    """
+    if value is None or value is _MISSING or (isinstance(value, float) and value != value):
+        return (0, 0)
+    if isinstance(value, (bool, int, float)):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    return (3, str(value))
+
+
+def record_size(value: Any) -> int:
+    """Оценка памяти, которую занимает запись"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += sys.getsizeof(key) + record_size(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            size += record_size(item)
+    return size
+
+
+class SortSpec:
+    """
+    Параметры сортировки: поля ключа, порядок и удаление дубликатов.
+
+    Args:
+        by: Поля ключа (пути вида "a.b")
+        reverse: Сортировка по убыванию
+        unique: Сколько первых полей ключа определяют дубликат
+            (0 - дубликаты не удаляются); из записей с одинаковым значением
+            остается первая во входных данных
+        memory_budget: Бюджет памяти на сортировку в памяти, байт
+    """
+
+    def __init__(self, by: List[str], reverse: bool = False, unique: int = 0,
+                 memory_budget: int = MEMORY_BUDGET):
+        self.by = by
+        self.reverse = reverse
+        self.unique = unique
+        self.memory_budget = memory_budget
+        # pipeline импортирует этот модуль - импорт на месте
+        from .pipeline import get_path
+        self._get_path = get_path
+
+    @classmethod
+    def from_spec(cls, value: Any, unique: bool = False) -> 'SortSpec':
+        """
+        Из описания шага: список полей или
+        {by, reverse, unique, memory_budget}; unique - true или список
+        первых полей ключа
+        """
+        if isinstance(value, str):
+            value = [value]
+        if isinstance(value, list):
+            value = {'by': value, 'unique': unique}
+        if not isinstance(value, dict):
+            raise ConversionError("sort: ожидается список полей или объект {by, reverse, unique}")
+
+        by = value.get('by')
+        if isinstance(by, str):
+            by = [by]
+        if not by or not isinstance(by, list) or not all(isinstance(f, str) for f in by):
+            raise ConversionError("sort: by - непустой список имен полей")
+
+        unique_fields = value.get('unique', unique)
+        if unique_fields is True:
+            prefix = len(by)
+        elif not unique_fields:
+            prefix = 0
+        elif isinstance(unique_fields, list) and unique_fields == by[:len(unique_fields)]:
+            prefix = len(unique_fields)
+        else:
+            # Дубликаты находятся среди соседних записей - поля должны
+            # быть началом ключа сортировки
+            raise ConversionError("unique: поля должны совпадать с началом ключа сортировки")
+
+        budget = value.get('memory_budget', MEMORY_BUDGET)
+        if not isinstance(budget, int) or isinstance(budget, bool) or budget <= 0:
+            raise ConversionError("sort: memory_budget - положительное число байт")
+        return cls(by, bool(value.get('reverse', False)), prefix, budget)
+
+    def key(self, record: Any) -> Tuple:
+        return tuple(_key_part(self._get_path(record, field, _MISSING)) for field in self.by)
+
+
+def _write_run(items: List[Tuple[Tuple, Any]], directory: Optional[str]) -> str:
+    """Записывает отсортированную серию во временный файл"""
+    fd, path = tempfile.mkstemp(prefix='sort-run-', suffix='.bin', dir=directory)
+    with os.fdopen(fd, 'wb') as f:
+        pickler = pickle.Pickler(f, protocol=pickle.HIGHEST_PROTOCOL)
+        for item in items:
+            pickler.dump(item)
+            # Без очистки memo pickler держит ссылки на все записанные объекты
+            pickler.clear_memo()
+    return path
+
+
+def _read_run(path: str) -> Iterator[Tuple[Tuple, Any]]:
+    with open(path, 'rb', buffering=RUN_BUFFER_SIZE) as f:
+        while True:
+            try:
+                # Каждая запись записана со своим memo - читается отдельно
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+def _merge(paths: List[str], reverse: bool) -> Iterator[Tuple[Tuple, Any]]:
+    """Слияние серий; при равных ключах порядок серий сохраняется"""
+    return heapq.merge(*(_read_run(path) for path in paths),
+                       key=lambda item: item[0], reverse=reverse)
+
+
+def sort_records(records: Iterable[Any], spec: SortSpec,
+                 directory: Optional[str] = None) -> Iterator[Any]:
+    """
+    Сортирует записи по ключу spec; при spec.unique удаляет дубликаты.
+
+    Сортировка устойчивая: записи с равными ключами идут в порядке входа.
+
+    Args:
+        records: Поток записей
+        spec: Параметры сортировки
+        directory: Каталог временных файлов (по умолчанию системный)
+    """
+    runs: List[str] = []
+    try:
+        buffer: List[Tuple[Tuple, Any]] = []
+        used = 0
+        for record in records:
+            buffer.append((spec.key(record), record))
+            used += record_size(record)
+            if used >= spec.memory_budget:
+                buffer.sort(key=lambda item: item[0], reverse=spec.reverse)
+                runs.append(_write_run(buffer, directory))
+                buffer = []
+                used = 0
+                if len(runs) >= MAX_MERGE_WIDTH:
+                    # Слишком много серий - сливаем их в одну
+                    merged = _write_run(_merge(runs, spec.reverse), directory)
+                    for path in runs:
+                        os.unlink(path)
+                    runs = [merged]
+
+        buffer.sort(key=lambda item: item[0], reverse=spec.reverse)
+        if runs:
+            if buffer:
+                runs.append(_write_run(buffer, directory))
+                buffer = []
+            items: Iterable[Tuple[Tuple, Any]] = _merge(runs, spec.reverse)
+        else:
+            items = buffer
+
+        previous = _MISSING
+        for key, record in items:
+            if spec.unique:
+                unique_key = key[:spec.unique]
+                if unique_key == previous:
+                    continue
+                previous = unique_key
+            yield record
+    finally:
+        for path in runs:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
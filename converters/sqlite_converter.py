@@ -0,0 +1,332 @@
+"""
+SQLite конвертер
+
+Запись: таблицы создаются по схеме, выведенной из записей, строки
+вставляются через executemany крупными транзакциями с отключенным
+журналом. Чтение: строки таблицы или результата запроса выдаются
+курсором по одной. База открывается из временного файла: модулю sqlite3
+нужен путь, а не поток.
+"""
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+from contextlib import contextmanager
+from itertools import islice
+import base64
+import io
+import math
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from .base import BaseConverter, ConversionError, CANONICAL, PRETTY
+from .flatten import flatten_records
+
+# Заголовок файла базы SQLite
+_MAGIC = b'SQLite format 3\x00'
+
+# Настройки записи: файл временный, поэтому журнал и синхронизация не нужны
+_WRITE_PRAGMAS = (
+    'PRAGMA journal_mode = OFF',
+    'PRAGMA synchronous = OFF',
+    'PRAGMA locking_mode = EXCLUSIVE',
+    'PRAGMA temp_store = MEMORY',
+    'PRAGMA cache_size = -65536',
+)
+
+# Действия, разрешенные запросу пользователя: только чтение
+_QUERY_ACTIONS = {sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION,
+                  getattr(sqlite3, 'SQLITE_RECURSIVE', sqlite3.SQLITE_SELECT)}
+
+
+def quote_identifier(name: str) -> str:
+    """Имя таблицы или колонки в кавычках"""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _column_type(values: List[Any]) -> str:
+    """
+    Тип колонки по значениям.
+
+    Колонка со значениями разных видов объявляется без типа, чтобы SQLite
+    не приводил значения к одному виду.
+    """
+    kinds = set()
+    for value in values:
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            continue
+        if isinstance(value, (bool, int)):
+            kinds.add('INTEGER')
+        elif isinstance(value, float):
+            kinds.add('REAL')
+        elif isinstance(value, str):
+            kinds.add('TEXT')
+        else:
+            kinds.add('')
+    if kinds == {'INTEGER', 'REAL'}:
+        return 'REAL'
+    return kinds.pop() if len(kinds) == 1 else ''
+
+
+def _cell_value(value: Any) -> Any:
+    """Значение для вставки: то, что SQLite не хранит, записывается строкой"""
+    if value is None or isinstance(value, (int, float, str, bytes)):
+        return value
+    return str(value)
+
+
+def _record_value(value: Any) -> Any:
+    """Значение из базы для записи: BLOB - строкой base64"""
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode('ascii')
+    return value
+
+
+def _decode_text(value: bytes) -> str:
+    return value.decode('utf-8', errors='replace')
+
+
+def _authorize_query(action: int, *args) -> int:
+    return sqlite3.SQLITE_OK if action in _QUERY_ACTIONS else sqlite3.SQLITE_DENY
+
+
+class SQLiteConverter(BaseConverter):
+    """
+    Конвертер для баз SQLite.
+    
+    База с одной таблицей (или с таблицей, выбранной параметром table) -
+    список записей; с несколькими таблицами без выбора - объект
+    {таблица: записи}. Параметр query - запрос SELECT, строки результата
+    которого становятся записями. При записи объект со списками в
+    значениях становится базой с таблицей на каждый ключ.
+    """
+    
+    streaming = True
+    streaming_output = True
+    binary = True
+    read_options = ('table', 'query')
+    
+    # Сколько записей вставляется одной транзакцией
+    CHUNK_SIZE = 50000
+    
+    # Имя таблицы для списка записей
+    DEFAULT_TABLE = 'data'
+    
+    def __init__(self):
+        super().__init__()
+        self.supported_formats = ['sqlite']
+    
+    @contextmanager
+    def _open(self, data: Union[str, bytes, io.IOBase]):
+        """Соединение только для чтения с копией базы во временном файле"""
+        if isinstance(data, str):
+            raise ConversionError("SQLite - двоичный формат: базу нужно загрузить файлом")
+        fd, path = tempfile.mkstemp(prefix='convert-', suffix='.db')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                if isinstance(data, bytes):
+                    f.write(data)
+                else:
+                    shutil.copyfileobj(data, f)
+            if not self._has_magic(path):
+                raise ConversionError("Данные не являются базой SQLite")
+            connection = sqlite3.connect(f'file:{path}?mode=ro', uri=True,
+                                         check_same_thread=False)
+            try:
+                connection.text_factory = _decode_text
+                yield connection
+            finally:
+                connection.close()
+        finally:
+            os.unlink(path)
+    
+    @staticmethod
+    def _has_magic(path: str) -> bool:
+        with open(path, 'rb') as f:
+            return f.read(len(_MAGIC)) == _MAGIC
+    
+    def _tables(self, connection) -> List[str]:
+        rows = connection.execute(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'view') "
+            "AND name NOT LIKE 'sqlite_%' ORDER BY rowid").fetchall()
+        return [name for (name,) in rows]
+    
+    def _select(self, connection, table: Optional[str]) -> Optional[str]:
+        """Таблица по имени; None - выбор не указан, а таблиц несколько"""
+        tables = self._tables(connection)
+        if table is None or table == '':
+            return tables[0] if len(tables) == 1 else None
+        if table not in tables:
+            raise ConversionError(
+                f"Таблица {table} не найдена (в базе: {', '.join(tables) or 'нет таблиц'})")
+        return table
+    
+    def _iter_cursor(self, cursor, columns=None, record_filter=None) -> Iterator[Dict]:
+        """Записи из строк курсора"""
+        names = [description[0] for description in cursor.description]
+        wanted = [index for index, name in enumerate(names)
+                  if columns is None or name in columns]
+        for row in cursor:
+            record = {names[index]: _record_value(row[index]) for index in wanted}
+            if record_filter is None or record_filter.test(record):
+                yield record
+    
+    def _iter_table(self, connection, table: str, columns=None, record_filter=None) -> Iterator[Dict]:
+        """Записи таблицы; читаются только нужные колонки"""
+        names = [row[1] for row in connection.execute(f'PRAGMA table_info({quote_identifier(table)})')]
+        selected = [name for name in names if columns is None or name in columns]
+        if not selected:
+            return
+        cursor = connection.execute(
+            f"SELECT {', '.join(map(quote_identifier, selected))} FROM {quote_identifier(table)}")
+        yield from self._iter_cursor(cursor, record_filter=record_filter)
+    
+    def _iter_query(self, connection, query: str, columns=None, record_filter=None) -> Iterator[Dict]:
+        """Записи результата запроса; разрешено только чтение"""
+        connection.set_authorizer(_authorize_query)
+        try:
+            cursor = connection.execute(query)
+        except (sqlite3.DatabaseError, sqlite3.Warning) as e:
+            raise ConversionError(f"Ошибка запроса SQLite: {str(e)}")
+        if cursor.description is None:
+            raise ConversionError("Запрос SQLite не возвращает строк")
+        yield from self._iter_cursor(cursor, columns, record_filter)
+    
+    def _read(self, connection, columns, record_filter, table, query) -> Union[Dict, Iterator[Dict]]:
+        """Объект {таблица: записи}, если таблица не выбрана, иначе итератор записей"""
+        if table and query:
+            raise ConversionError("Нужно указать либо таблицу, либо запрос")
+        if query:
+            return self._iter_query(connection, query, columns, record_filter)
+        selected = self._select(connection, table)
+        if selected is None:
+            return {name: list(self._iter_table(connection, name))
+                    for name in self._tables(connection)}
+        return self._iter_table(connection, selected, columns, record_filter)
+    
+    def parse(self, data: Union[str, bytes, io.IOBase], table: Optional[str] = None,
+              query: Optional[str] = None) -> Any:
+        """Парсит базу: записи таблицы или запроса либо объект {таблица: записи}"""
+        with self._open(data) as connection:
+            try:
+                result = self._read(connection, None, None, table, query)
+                return result if isinstance(result, dict) else list(result)
+            except sqlite3.DatabaseError as e:
+                raise ConversionError(f"Ошибка чтения SQLite: {str(e)}")
+    
+    def iter_records(self, data: Union[str, bytes, io.IOBase], columns=None,
+                     record_filter=None, table: Optional[str] = None,
+                     query: Optional[str] = None) -> Iterator[Any]:
+        """
+        Потоково выдает строки таблицы или результата запроса как словари
+        
+        Если в базе несколько таблиц, а table и query не указаны,
+        выдается один документ {таблица: записи}, как у parse.
+        """
+        with self._open(data) as connection:
+            try:
+                result = self._read(connection, columns, record_filter, table, query)
+                if isinstance(result, dict):
+                    yield result
+                else:
+                    yield from result
+            except sqlite3.DatabaseError as e:
+                raise ConversionError(f"Ошибка чтения SQLite: {str(e)}")
+    
+    def _groups(self, data: Any) -> List[Tuple[str, Any]]:
+        """Таблицы результата: пары (имя, записи)"""
+        if isinstance(data, dict) and data and all(isinstance(v, list) for v in data.values()):
+            return list(data.items())
+        if isinstance(data, (list, Iterator)):
+            return [(self.DEFAULT_TABLE, data)]
+        return [(self.DEFAULT_TABLE, [data])]
+    
+    def _write_table(self, connection, table: str, records, profile: str) -> None:
+        """
+        Создает таблицу по первому блоку записей и вставляет записи блоками.
+        
+        Поля, которые появляются в следующих блоках, добавляются колонками
+        через ALTER TABLE.
+        """
+        records = iter(records)
+        name = quote_identifier(table)
+        columns: Optional[List[str]] = None
+        insert = None
+        for batch in iter(lambda: list(islice(records, self.CHUNK_SIZE)), []):
+            batch_columns, rows = flatten_records(batch)
+            types = {column: _column_type([row[index] for row in rows])
+                     for index, column in enumerate(batch_columns)}
+            if columns is None:
+                columns = sorted(batch_columns, key=str) if profile == CANONICAL else list(batch_columns)
+                definitions = ', '.join(f'{quote_identifier(c)} {types[c]}'.rstrip() for c in columns)
+                connection.execute(f'CREATE TABLE {name} ({definitions})')
+            added = [c for c in batch_columns if c not in columns]
+            for column in added:
+                connection.execute(
+                    f'ALTER TABLE {name} ADD COLUMN {quote_identifier(column)} {types[column]}'.rstrip())
+                columns.append(column)
+            if insert is None or added:
+                insert = (f"INSERT INTO {name} ({', '.join(map(quote_identifier, columns))}) "
+                          f"VALUES ({', '.join('?' * len(columns))})")
+            positions = {column: index for index, column in enumerate(batch_columns)}
+            order = [positions.get(column) for column in columns]
+            with connection:
+                connection.executemany(
+                    insert, ([_cell_value(row[i]) if i is not None else None for i in order]
+                             for row in rows))
+        if columns is None:
+            connection.execute(f'CREATE TABLE {name} ("data")')
+    
+    def iter_serialize(self, data: Any, profile: str = PRETTY) -> Iterator[bytes]:
+        """
+        Записывает базу во временный файл и выдает его блоками
+        
+        Файл базы готов только после вставки всех строк, поэтому первый блок
+        появляется в конце сериализации; строки в памяти не накапливаются.
+        """
+        fd, path = tempfile.mkstemp(prefix='convert-', suffix='.db')
+        os.close(fd)
+        try:
+            connection = sqlite3.connect(path, isolation_level='DEFERRED', check_same_thread=False)
+            try:
+                for pragma in _WRITE_PRAGMAS:
+                    connection.execute(pragma)
+                used = set()
+                for table, records in self._groups(data):
+                    table = str(table) or self.DEFAULT_TABLE
+                    if table.lower() in used or table.lower().startswith('sqlite_'):
+                        raise ConversionError(f"Недопустимое имя таблицы: {table}")
+                    used.add(table.lower())
+                    self._write_table(connection, table, records, profile)
+            except sqlite3.Error as e:
+                raise ConversionError(f"Ошибка записи в SQLite: {str(e)}")
+            finally:
+                connection.close()
+            with open(path, 'rb') as f:
+                yield from iter(lambda: f.read(64 * 1024), b'')
+        finally:
+            os.unlink(path)
+    
+    def serialize(self, data: Any, profile: str = PRETTY) -> bytes:
+        """Сериализует данные в базу SQLite"""
+        return b''.join(self.iter_serialize(data, profile))
+    
+    def validate(self, data: Union[str, bytes, io.IOBase]) -> bool:
+        """Проверяет заголовок файла базы SQLite"""
+        if isinstance(data, str):
+            return False
+        if isinstance(data, bytes):
+            return data[:len(_MAGIC)] == _MAGIC
+        try:
+            position = data.tell()
+            try:
+                return data.read(len(_MAGIC)) == _MAGIC
+            finally:
+                data.seek(position)
+        except (OSError, ValueError):
+            return False
+    
+    def get_mime_type(self) -> str:
+        return "application/vnd.sqlite3"
+    
+    def get_file_extension(self) -> str:
+        return ".db"
@@ -1,15 +1,57 @@
 """
 TOML конвертер
 """
-import toml
-from typing import Any, Union
+from typing import Any, Dict, Iterator, Optional, Union
 import io
-from .base import BaseConverter, ConversionError, ValidationError
+import re
+from .base import (BaseConverter, ConversionError, ValidationError, COMPACT, CANONICAL, PRETTY,
+                   syntax_error, preserve_position)
+
+# Чтение: стандартный tomllib (Python 3.11+) или совместимый с ним tomli
+try:
+    import tomllib
+except ImportError:
+    import tomli as tomllib
+
+import tomli_w
+
+# Позиция в сообщении TOMLDecodeError: "... (at line 3, column 5)"
+_ERROR_POSITION = re.compile(r'\s*\(at line (\d+), column (\d+)\)$')
+
+
+def _prepare(value: Any, sort_keys: bool = False) -> Any:
+    """
+    Приводит данные к виду, который можно записать в TOML.
+
+    В TOML нет null: ключи и элементы списков со значением None
+    пропускаются. Ключи таблиц приводятся к строкам, неизвестные
+    типы записываются строкой.
+    """
+    if isinstance(value, dict):
+        items = ((str(k), v) for k, v in value.items() if v is not None)
+        if sort_keys:
+            items = sorted(items)
+        return {k: _prepare(v, sort_keys) for k, v in items}
+    if isinstance(value, (list, tuple)):
+        return [_prepare(v, sort_keys) for v in value if v is not None]
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    try:
+        tomli_w.dumps({'value': value})
+        return value
+    except TypeError:
+        return str(value)
 
 
 class TOMLConverter(BaseConverter):
     """Конвертер для TOML формата"""
     
+    # Ключ таблицы верхнего уровня для данных, которые не являются словарем
+    ROOT_KEY = 'data'
+    
+    # У tomllib нет потокового разбора: проверка читает документ целиком
+    validate_loads_all = True
+    
     def __init__(self):
         super().__init__()
         self.supported_formats = ['toml']
@@ -26,29 +68,66 @@ class TOMLConverter(BaseConverter):
             else:
                 content = data
             
-            return toml.loads(content)
-        except toml.TomlDecodeError as e:
+            return tomllib.loads(content)
+        except tomllib.TOMLDecodeError as e:
             raise ConversionError(f"Ошибка парсинга TOML: {str(e)}")
         except UnicodeDecodeError as e:
             raise ConversionError(f"Ошибка кодировки: {str(e)}")
     
-    def serialize(self, data: Any) -> str:
-        """Сериализует данные в TOML"""
+    def iter_serialize(self, data: Any, profile: str = PRETTY) -> Iterator[str]:
+        """
+        Сериализует данные в TOML по частям
+        
+        Список записей записывается как массив таблиц [[data]]: каждая
+        запись сериализуется отдельным блоком, и результат не собирается
+        в одну строку.
+        """
+        sort_keys = profile == CANONICAL
+        separator = '' if profile in (COMPACT, CANONICAL) else '\n'
         try:
-            if not isinstance(data, dict):
+            if isinstance(data, dict):
+                yield tomli_w.dumps(_prepare(data, sort_keys))
+            elif isinstance(data, list) and data and all(isinstance(r, dict) for r in data):
+                table_header = f'[{self.ROOT_KEY}]\n'
+                for index, record in enumerate(data):
+                    # Запись пишется как таблица [data] (вложенные таблицы
+                    # получают заголовки [data.x]), затем заголовок меняется на [[data]]
+                    block = tomli_w.dumps({self.ROOT_KEY: _prepare(record, sort_keys)})
+                    if block.startswith(table_header):
+                        block = block[len(table_header):]
+                    block = f'[[{self.ROOT_KEY}]]\n' + block
+                    yield block if index == 0 else separator + block
+            else:
                 # TOML требует словарь верхнего уровня
-                data = {"data": data}
-            return toml.dumps(data)
-        except Exception as e:
+                yield tomli_w.dumps(_prepare({self.ROOT_KEY: data}, sort_keys))
+        except (TypeError, ValueError) as e:
             raise ConversionError(f"Ошибка сериализации в TOML: {str(e)}")
     
+    def serialize(self, data: Any, profile: str = PRETTY) -> str:
+        """Сериализует данные в TOML"""
+        return ''.join(self.iter_serialize(data, profile))
+    
     def validate(self, data: Union[str, bytes, io.IOBase]) -> bool:
         """Валидирует TOML данные"""
-        try:
-            self.parse(data)
-            return True
-        except ConversionError:
-            return False
+        return self.check_syntax(data) is None
+    
+    def check_syntax(self, data: Union[str, bytes, io.IOBase]) -> Optional[Dict[str, Any]]:
+        """
+        Проверяет TOML.
+        
+        У tomllib нет отдельного сканера, поэтому документ разбирается
+        целиком; из ошибки берется позиция.
+        """
+        with preserve_position(data):
+            try:
+                self.parse(data)
+                return None
+            except ConversionError as e:
+                message = str(e)
+        match = _ERROR_POSITION.search(message)
+        if match is None:
+            return syntax_error(message)
+        return syntax_error(message[:match.start()], int(match.group(1)), int(match.group(2)))
     
     def get_mime_type(self) -> str:
         return "application/toml"
@@ -0,0 +1,217 @@
+"""
+Пул процессов конвертации с передачей данных через разделяемую память
+
+Входные данные и результат не сериализуются pickle и не проходят через
+канал между процессами: они записываются в сегменты
+multiprocessing.shared_memory, а процессу передается только имя сегмента
+и длина. Сегменты переиспользуются, поэтому стоимость передачи не зависит
+от размера данных.
+"""
+from typing import Any, Dict, List, Optional, Tuple, Union
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import io
+import threading
+
+from .base import ConversionError, PRETTY
+from .parallel import cpu_count
+
+# Минимальный размер сегмента; размеры округляются вверх до степени двойки
+MIN_SEGMENT_SIZE = 64 * 1024
+
+# Сколько байт свободных сегментов держать для повторного использования
+MAX_IDLE_BYTES = 256 * 1024 * 1024
+
+# Движок конвертации в дочернем процессе (создается при первой задаче)
+_engine = None
+
+
+def segment_size(length: int) -> int:
+    """Размер сегмента для данных длины length"""
+    size = MIN_SEGMENT_SIZE
+    while size < length:
+        size *= 2
+    return size
+
+
+class SegmentPool:
+    """
+    Сегменты разделяемой памяти с повторным использованием.
+
+    Освобожденные сегменты остаются открытыми и выдаются следующим
+    запросам того же размера; сверх MAX_IDLE_BYTES сегменты удаляются.
+    """
+
+    def __init__(self, max_idle_bytes: int = MAX_IDLE_BYTES):
+        self.max_idle_bytes = max_idle_bytes
+        self._idle: Dict[int, List[shared_memory.SharedMemory]] = {}
+        self._idle_bytes = 0
+        self._owned: Dict[str, shared_memory.SharedMemory] = {}
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, length: int) -> shared_memory.SharedMemory:
+        """Сегмент, в который помещается length байт"""
+        size = segment_size(length)
+        with self._lock:
+            free = self._idle.get(size)
+            if free:
+                self._idle_bytes -= size
+                self.reused += 1
+                return free.pop()
+        segment = shared_memory.SharedMemory(create=True, size=size)
+        with self._lock:
+            self._owned[segment.name] = segment
+            self.created += 1
+        return segment
+
+    def adopt(self, name: str) -> shared_memory.SharedMemory:
+        """Берет под управление сегмент, созданный другим процессом"""
+        segment = shared_memory.SharedMemory(name=name)
+        with self._lock:
+            self._owned[segment.name] = segment
+        return segment
+
+    def release(self, segment: shared_memory.SharedMemory) -> None:
+        """Возвращает сегмент в пул"""
+        size = segment.size
+        with self._lock:
+            if self._idle_bytes + size <= self.max_idle_bytes:
+                self._idle.setdefault(size, []).append(segment)
+                self._idle_bytes += size
+                return
+            self._owned.pop(segment.name, None)
+        _destroy(segment)
+
+    def close(self) -> None:
+        """Удаляет все сегменты пула"""
+        with self._lock:
+            segments = list(self._owned.values())
+            self._owned.clear()
+            self._idle.clear()
+            self._idle_bytes = 0
+        for segment in segments:
+            _destroy(segment)
+
+
+def _destroy(segment: shared_memory.SharedMemory) -> None:
+    segment.close()
+    try:
+        segment.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _encode(data: Union[str, bytes, io.IOBase]) -> bytes:
+    if isinstance(data, io.IOBase):
+        data = data.read()
+    if isinstance(data, str):
+        return data.encode('utf-8')
+    return bytes(data)
+
+
+def _convert_in_worker(source: Tuple[str, int], target: str, output_size: int,
+                       source_format: str, target_format: str, filename: Optional[str],
+                       pipeline: Any, profile: str,
+                       options: Optional[Dict[str, Any]] = None) -> Tuple[Optional[str], int]:
+    """
+    Конвертация в дочернем процессе.
+
+    Returns:
+        Кортеж (имя нового сегмента или None, если результат поместился
+        в выданный сегмент, длина результата в байтах)
+    """
+    global _engine
+    if _engine is None:
+        from .engine import ConversionEngine
+        _engine = ConversionEngine()
+
+    name, length = source
+    segment = shared_memory.SharedMemory(name=name)
+    try:
+        with segment.buf[:length] as view:
+            text = str(view, 'utf-8')
+    finally:
+        segment.close()
+
+    result = _engine.convert(text, source_format, target_format, filename,
+                             pipeline=pipeline, profile=profile, options=options).encode('utf-8')
+    del text
+
+    if len(result) <= output_size:
+        segment = shared_memory.SharedMemory(name=target)
+        created = None
+    else:
+        # Результат больше выданного сегмента - создаем сегмент нужного размера,
+        # родительский процесс забирает его в пул
+        segment = shared_memory.SharedMemory(create=True, size=segment_size(len(result)))
+        created = segment.name
+    try:
+        segment.buf[:len(result)] = result
+    finally:
+        segment.close()
+    return created, len(result)
+
+
+class WorkerPool:
+    """
+    Конвертация в пуле процессов вокруг ConversionEngine.
+
+    Пример:
+        pool = WorkerPool(workers=4)
+        result = pool.convert(text, 'csv', 'json')
+        pool.close()
+    """
+
+    # Сегмент для результата выделяется с запасом относительно входа
+    OUTPUT_RATIO = 2
+
+    def __init__(self, workers: Optional[int] = None,
+                 segments: Optional[SegmentPool] = None):
+        self.workers = workers or cpu_count()
+        self.segments = segments or SegmentPool()
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+
+    def convert(self, data: Union[str, bytes, io.IOBase],
+                source_format: str, target_format: str,
+                filename: Optional[str] = None, pipeline: Any = None,
+                profile: str = PRETTY, options: Optional[Dict[str, Any]] = None) -> str:
+        """Конвертирует данные в дочернем процессе (аргументы как у ConversionEngine.convert)"""
+        payload = _encode(data)
+        source = self.segments.acquire(len(payload))
+        output = self.segments.acquire(len(payload) * self.OUTPUT_RATIO)
+        try:
+            source.buf[:len(payload)] = payload
+            length = len(payload)
+            del payload
+            future = self._executor.submit(
+                _convert_in_worker, (source.name, length), output.name, output.size,
+                source_format, target_format, filename, pipeline, profile, options)
+            created, result_length = future.result()
+            if created is not None:
+                # Старый сегмент возвращается в пул только после adopt, иначе
+                # при ошибке finally вернул бы его второй раз
+                segment = self.segments.adopt(created)
+                self.segments.release(output)
+                output = segment
+            with output.buf[:result_length] as view:
+                return str(view, 'utf-8')
+        except ConversionError:
+            raise
+        except Exception as e:
+            raise ConversionError(f"Ошибка конвертации в процессе пула: {str(e)}")
+        finally:
+            self.segments.release(source)
+            self.segments.release(output)
+
+    def close(self) -> None:
+        """Останавливает процессы и удаляет сегменты"""
+        self._executor.shutdown(wait=True)
+        self.segments.close()
+
+    def __enter__(self) -> 'WorkerPool':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,268 @@
+"""
+Excel (xlsx) конвертер
+
+Книга читается в режиме read_only: строки листа выдаются итератором прямо
+из архива, и книга целиком в памяти не строится. Запись идет в режиме
+write_only: строки сбрасываются во временные файлы openpyxl по мере
+поступления. Нужен пакет openpyxl.
+"""
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+from itertools import chain, islice
+import datetime
+import io
+import math
+import shutil
+import tempfile
+import zipfile
+
+import openpyxl
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+from .base import BaseConverter, ConversionError, CANONICAL, PRETTY
+from .flatten import flatten_records, SpooledTable
+
+# Файл книги внутри архива xlsx
+_WORKBOOK_PART = 'xl/workbook.xml'
+
+# Символы, недопустимые в имени листа, и его наибольшая длина
+_SHEET_NAME_FORBIDDEN = str.maketrans({char: '_' for char in '[]:*?/\\'})
+_MAX_SHEET_NAME = 31
+
+
+def _cell_value(value: Any) -> Any:
+    """Значение ячейки для записи"""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if isinstance(value, str):
+        return ILLEGAL_CHARACTERS_RE.sub('', value)
+    return value
+
+
+def _record_value(value: Any) -> Any:
+    """Значение ячейки в записи: даты и время - строкой ISO 8601"""
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    return value
+
+
+def _header(row: Tuple) -> List[str]:
+    """Имена колонок из первой строки: пустые заменяются, повторы нумеруются"""
+    names: List[str] = []
+    seen = set()
+    for index, value in enumerate(row, 1):
+        name = str(_record_value(value)) if value not in (None, '') else f'column_{index}'
+        unique, suffix = name, 1
+        while unique in seen:
+            unique = f'{name}.{suffix}'
+            suffix += 1
+        seen.add(unique)
+        names.append(unique)
+    return names
+
+
+def _sheet_title(name: Any, used: set) -> str:
+    """Допустимое и уникальное имя листа"""
+    title = str(name).translate(_SHEET_NAME_FORBIDDEN)[:_MAX_SHEET_NAME] or 'data'
+    unique, suffix = title, 1
+    while unique.lower() in used:
+        tail = f' ({suffix})'
+        unique = title[:_MAX_SHEET_NAME - len(tail)] + tail
+        suffix += 1
+    used.add(unique.lower())
+    return unique
+
+
+class XLSXConverter(BaseConverter):
+    """
+    Конвертер для Excel книг (xlsx).
+    
+    Лист - таблица, первая строка которой содержит имена колонок. Книга с
+    одним листом (или с листом, выбранным параметром sheet) - список
+    записей; книга с несколькими листами без выбора - объект
+    {имя листа: записи}. При записи такой объект со списками в значениях
+    становится книгой с листом на каждый ключ.
+    """
+    
+    streaming = True
+    streaming_output = True
+    binary = True
+    read_options = ('sheet',)
+    
+    # Сколько записей разворачивается в строки за один шаг записи
+    CHUNK_SIZE = 10000
+    
+    # Имя листа для списка записей
+    DEFAULT_SHEET = 'data'
+    
+    def __init__(self):
+        super().__init__()
+        self.supported_formats = ['xlsx']
+    
+    def _open(self, data: Union[str, bytes, io.IOBase]):
+        """Книга в режиме только для чтения"""
+        if isinstance(data, str):
+            raise ConversionError("xlsx - двоичный формат: данные нужно загрузить файлом")
+        if isinstance(data, bytes):
+            data = io.BytesIO(data)
+        elif not data.seekable():
+            # zipfile читает оглавление с конца архива
+            spooled = tempfile.SpooledTemporaryFile(max_size=16 * 1024 * 1024)
+            shutil.copyfileobj(data, spooled)
+            spooled.seek(0)
+            data = spooled
+        try:
+            return openpyxl.load_workbook(data, read_only=True, data_only=True)
+        except (zipfile.BadZipFile, KeyError, OSError, ValueError) as e:
+            raise ConversionError(f"Ошибка чтения xlsx: {str(e)}")
+    
+    def _select(self, workbook, sheet: Optional[Union[str, int]]):
+        """Лист по имени или номеру (с 1); None - выбор не указан"""
+        if sheet is None or sheet == '':
+            return workbook.worksheets[0] if len(workbook.sheetnames) == 1 else None
+        if str(sheet) in workbook.sheetnames:
+            return workbook[str(sheet)]
+        if str(sheet).isdigit() and 1 <= int(sheet) <= len(workbook.sheetnames):
+            return workbook.worksheets[int(sheet) - 1]
+        raise ConversionError(
+            f"Лист {sheet} не найден (в книге: {', '.join(workbook.sheetnames)})")
+    
+    def _iter_sheet(self, worksheet, columns=None, record_filter=None) -> Iterator[Dict]:
+        """Записи листа по одной строке"""
+        rows = worksheet.iter_rows(values_only=True)
+        first = next(rows, None)
+        if first is None:
+            return
+        header = _header(first)
+        wanted = [index for index, name in enumerate(header)
+                  if columns is None or name in columns]
+        for row in rows:
+            if not any(value is not None for value in row):
+                # Пустые строки: в режиме чтения лист часто размечен с запасом
+                continue
+            record = {header[index]: _record_value(row[index]) if index < len(row) else None
+                      for index in wanted}
+            if record_filter is None or record_filter.test(record):
+                yield record
+    
+    def parse(self, data: Union[str, bytes, io.IOBase], sheet: Optional[Union[str, int]] = None) -> Any:
+        """Парсит книгу: записи листа или объект {лист: записи}"""
+        workbook = self._open(data)
+        try:
+            worksheet = self._select(workbook, sheet)
+            if worksheet is None:
+                return {ws.title: list(self._iter_sheet(ws)) for ws in workbook.worksheets}
+            return list(self._iter_sheet(worksheet))
+        finally:
+            workbook.close()
+    
+    def iter_records(self, data: Union[str, bytes, io.IOBase], columns=None,
+                     record_filter=None, sheet: Optional[Union[str, int]] = None) -> Iterator[Any]:
+        """
+        Потоково выдает строки листа как словари
+        
+        Если в книге несколько листов и sheet не указан, выдается один
+        документ {лист: записи}, как у parse.
+        """
+        workbook = self._open(data)
+        try:
+            worksheet = self._select(workbook, sheet)
+            if worksheet is None:
+                yield {ws.title: list(self._iter_sheet(ws)) for ws in workbook.worksheets}
+            else:
+                yield from self._iter_sheet(worksheet, columns, record_filter)
+        finally:
+            workbook.close()
+    
+    def _sheets(self, data: Any) -> List[Tuple[str, Any]]:
+        """Листы результата: пары (имя, записи)"""
+        if isinstance(data, dict) and data and all(isinstance(v, list) for v in data.values()):
+            return list(data.items())
+        if isinstance(data, dict):
+            return [(self.DEFAULT_SHEET, [data])]
+        if isinstance(data, (list, Iterator)):
+            return [(self.DEFAULT_SHEET, data)]
+        return [(self.DEFAULT_SHEET, [data])]
+    
+    def _write_sheet(self, worksheet, records, profile: str) -> None:
+        """
+        Записывает записи блоками по CHUNK_SIZE.
+        
+        Заголовок - первая строка листа, а поле может впервые появиться в
+        последней записи. Поэтому записи длиннее одного блока сначала
+        сбрасываются во временный файл (SpooledTable) и пишутся, когда
+        колонки известны по всем записям.
+        """
+        records = iter(records)
+        first = list(islice(records, self.CHUNK_SIZE))
+        if not first:
+            return
+        following = list(islice(records, self.CHUNK_SIZE))
+        if not following:
+            columns, rows = flatten_records(first)
+            self._append_rows(worksheet, columns, [rows], profile)
+            return
+        
+        with SpooledTable() as table:
+            batches = chain([first, following], iter(lambda: list(islice(records, self.CHUNK_SIZE)), []))
+            for batch in batches:
+                table.add(batch)
+            del first, following, batch
+            self._append_rows(worksheet, table.columns, table.batches(), profile)
+    
+    def _append_rows(self, worksheet, columns: List[str], batches, profile: str) -> None:
+        """Пишет строку заголовка и блоки строк; в canonical колонки по имени"""
+        order = list(range(len(columns)))
+        if profile == CANONICAL:
+            order.sort(key=lambda index: str(columns[index]))
+        worksheet.append([str(columns[index]) for index in order])
+        for rows in batches:
+            for row in rows:
+                worksheet.append([_cell_value(row[index]) for index in order])
+    
+    def iter_serialize(self, data: Any, profile: str = PRETTY) -> Iterator[bytes]:
+        """
+        Записывает книгу в режиме write_only и выдает файл блоками
+        
+        Архив собирается после записи всех строк, поэтому первый блок
+        появляется в конце сериализации; строки в памяти не накапливаются.
+        """
+        try:
+            workbook = openpyxl.Workbook(write_only=True)
+            used: set = set()
+            for name, records in self._sheets(data):
+                worksheet = workbook.create_sheet(_sheet_title(name, used))
+                self._write_sheet(worksheet, records, profile)
+            if not used:
+                workbook.create_sheet(self.DEFAULT_SHEET)
+            with tempfile.TemporaryFile() as output:
+                workbook.save(output)
+                output.seek(0)
+                yield from iter(lambda: output.read(64 * 1024), b'')
+        except (TypeError, ValueError) as e:
+            raise ConversionError(f"Ошибка сериализации в xlsx: {str(e)}")
+    
+    def serialize(self, data: Any, profile: str = PRETTY) -> bytes:
+        """Сериализует данные в xlsx"""
+        return b''.join(self.iter_serialize(data, profile))
+    
+    def validate(self, data: Union[str, bytes, io.IOBase]) -> bool:
+        """Проверяет, что данные - архив с книгой Excel"""
+        if isinstance(data, str):
+            return False
+        if isinstance(data, bytes):
+            data = io.BytesIO(data)
+        try:
+            position = data.tell()
+            try:
+                with zipfile.ZipFile(data) as archive:
+                    return _WORKBOOK_PART in archive.namelist()
+            finally:
+                data.seek(position)
+        except (zipfile.BadZipFile, OSError, ValueError):
+            return False
+    
+    def get_mime_type(self) -> str:
+        return "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    
+    def get_file_extension(self) -> str:
+        return ".xlsx"
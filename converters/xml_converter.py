@@ -2,72 +2,94 @@
 XML конвертер
 """
 import xmltodict
-import xml.etree.ElementTree as ET
-from typing import Any, Union, Dict
+from xml.parsers import expat
+from typing import Any, Union, Dict, Optional
 import io
-from .base import BaseConverter, ConversionError, ValidationError
+from .base import (BaseConverter, ConversionError, ValidationError, COMPACT, CANONICAL, PRETTY,
+                   syntax_error, preserve_position, iter_blocks)
+from .compact import CompactBuilder, MAPPING_TYPES, SEQUENCE_TYPES
 
 
 class XMLConverter(BaseConverter):
     """Конвертер для XML формата"""
     
+    compact_parse = True
+    compact_serialize = True
+    
     def __init__(self):
         super().__init__()
         self.supported_formats = ['xml']
     
+    def _read_text(self, data: Union[str, bytes, io.IOBase]) -> str:
+        if isinstance(data, io.IOBase):
+            content = data.read()
+            if isinstance(content, bytes):
+                content = content.decode('utf-8')
+            return content
+        if isinstance(data, bytes):
+            return data.decode('utf-8')
+        return data
+    
     def parse(self, data: Union[str, bytes, io.IOBase]) -> Any:
         """Парсит XML данные"""
         try:
-            if isinstance(data, io.IOBase):
-                content = data.read()
-                if isinstance(content, bytes):
-                    content = content.decode('utf-8')
-            elif isinstance(data, bytes):
-                content = data.decode('utf-8')
-            else:
-                content = data
-            
-            return xmltodict.parse(content)
+            return xmltodict.parse(self._read_text(data))
+        except Exception as e:
+            raise ConversionError(f"Ошибка парсинга XML: {str(e)}")
+    
+    def parse_compact(self, data: Union[str, bytes, io.IOBase]) -> Any:
+        """Парсит XML в компактное дерево: элементы упаковываются по мере разбора"""
+        try:
+            builder = CompactBuilder()
+            root = xmltodict.parse(self._read_text(data), postprocessor=builder.element)
+            return builder.mapping(list(root.items())) if isinstance(root, dict) else root
         except Exception as e:
             raise ConversionError(f"Ошибка парсинга XML: {str(e)}")
     
-    def serialize(self, data: Any) -> str:
+    def serialize(self, data: Any, profile: str = PRETTY) -> str:
         """Сериализует данные в XML"""
         try:
+            if profile in (COMPACT, CANONICAL):
+                # Без отступов и переводов строк; в canonical элементы по алфавиту
+                return self._dict_to_xml(data, step="", sort_keys=profile == CANONICAL)
             return self._dict_to_xml(data)
         except Exception as e:
             raise ConversionError(f"Ошибка сериализации в XML: {str(e)}")
     
-    def _dict_to_xml(self, data: Any, indent: str = "") -> str:
+    def _dict_to_xml(self, data: Any, indent: str = "", step: str = "\t",
+                     sort_keys: bool = False) -> str:
         """Преобразует данные в XML без корневого элемента"""
-        if isinstance(data, dict):
+        newline = "\n" if step else ""
+        inner = indent + step
+        if isinstance(data, MAPPING_TYPES):
             result = []
-            for key, value in data.items():
-                if isinstance(value, dict):
+            items = sorted(data.items(), key=lambda item: str(item[0])) if sort_keys else data.items()
+            for key, value in items:
+                if isinstance(value, MAPPING_TYPES):
                     result.append(f"{indent}<{key}>")
-                    result.append(self._dict_to_xml(value, indent + "\t"))
+                    result.append(self._dict_to_xml(value, inner, step, sort_keys))
                     result.append(f"{indent}</{key}>")
-                elif isinstance(value, list):
+                elif isinstance(value, SEQUENCE_TYPES):
                     for item in value:
                         result.append(f"{indent}<{key}>")
-                        if isinstance(item, (dict, list)):
-                            result.append(self._dict_to_xml(item, indent + "\t"))
+                        if isinstance(item, MAPPING_TYPES + SEQUENCE_TYPES):
+                            result.append(self._dict_to_xml(item, inner, step, sort_keys))
                         else:
-                            result.append(f"{indent}\t{self._escape_xml(str(item))}")
+                            result.append(f"{inner}{self._escape_xml(str(item))}")
                         result.append(f"{indent}</{key}>")
                 else:
                     result.append(f"{indent}<{key}>{self._escape_xml(str(value))}</{key}>")
-            return "\n".join(result)
-        elif isinstance(data, list):
+            return newline.join(result)
+        elif isinstance(data, SEQUENCE_TYPES):
             result = []
             for item in data:
                 result.append(f"{indent}<item>")
-                if isinstance(item, (dict, list)):
-                    result.append(self._dict_to_xml(item, indent + "\t"))
+                if isinstance(item, MAPPING_TYPES + SEQUENCE_TYPES):
+                    result.append(self._dict_to_xml(item, inner, step, sort_keys))
                 else:
-                    result.append(f"{indent}\t{self._escape_xml(str(item))}")
+                    result.append(f"{inner}{self._escape_xml(str(item))}")
                 result.append(f"{indent}</item>")
-            return "\n".join(result)
+            return newline.join(result)
         else:
             return self._escape_xml(str(data))
     
@@ -81,23 +103,22 @@ class XMLConverter(BaseConverter):
     
     def validate(self, data: Union[str, bytes, io.IOBase]) -> bool:
         """Валидирует XML данные"""
-        try:
-            if isinstance(data, io.IOBase):
-                content = data.read()
-                if isinstance(content, bytes):
-                    content = content.decode('utf-8')
-                data.seek(0)  # Возвращаем указатель в начало
-            elif isinstance(data, bytes):
-                content = data.decode('utf-8')
-            else:
-                content = data
-            
-            ET.fromstring(content)
-            return True
-        except ET.ParseError:
-            return False
-        except Exception:
-            return False
+        return self.check_syntax(data) is None
+    
+    def check_syntax(self, data: Union[str, bytes, io.IOBase]) -> Optional[Dict[str, Any]]:
+        """Проверяет синтаксис XML парсером expat без обработчиков: дерево не строится"""
+        parser = expat.ParserCreate()
+        with preserve_position(data):
+            try:
+                for block in iter_blocks(data):
+                    parser.Parse(block, False)
+                parser.Parse(b'', True)
+                return None
+            except expat.ExpatError as e:
+                return syntax_error(f"Ошибка синтаксиса XML: {expat.errors.messages[e.code]}",
+                                    e.lineno, e.offset + 1)
+            except UnicodeDecodeError as e:
+                return syntax_error(f"Ошибка кодировки: {str(e)}")
     
     def get_mime_type(self) -> str:
         return "application/xml"
@@ -2,14 +2,40 @@
 YAML конвертер
 """
 import yaml
-from typing import Any, Union
+from array import array
+from typing import Any, Dict, Optional, Union
 import io
-from .base import BaseConverter, ConversionError, ValidationError
+from .base import (BaseConverter, ConversionError, ValidationError, COMPACT, PRETTY,
+                   syntax_error, preserve_position)
+from .compact import CompactObject
+
+# Эмиттер и парсер на C из libyaml, если PyYAML собран с ним
+_FastDumper = getattr(yaml, 'CDumper', yaml.Dumper)
+_FastLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+class _Dumper(yaml.Dumper):
+    """Эмиттер, который пишет узлы компактного дерева как словари и списки"""
+
+
+class _CompactDumper(_FastDumper):
+    """То же для потокового стиля"""
+
+
+for _dumper in (_Dumper, _CompactDumper):
+    _dumper.add_representer(CompactObject, _dumper.represent_dict)
+    _dumper.add_representer(tuple, _dumper.represent_list)
+    _dumper.add_representer(array, lambda dumper, value: dumper.represent_list(value.tolist()))
+
+# Теги, которые может построить safe_load
+_SAFE_TAGS = frozenset(tag for tag in yaml.SafeLoader.yaml_constructors if tag is not None)
 
 
 class YAMLConverter(BaseConverter):
     """Конвертер для YAML формата"""
     
+    compact_serialize = True
+    
     def __init__(self):
         super().__init__()
         self.supported_formats = ['yaml', 'yml']
@@ -32,20 +58,64 @@ class YAMLConverter(BaseConverter):
         except UnicodeDecodeError as e:
             raise ConversionError(f"Ошибка кодировки: {str(e)}")
     
-    def serialize(self, data: Any) -> str:
+    def serialize(self, data: Any, profile: str = PRETTY) -> str:
         """Сериализует данные в YAML"""
         try:
-            return yaml.dump(data, default_flow_style=False, allow_unicode=True, indent=2)
+            if profile == COMPACT:
+                # Потоковый стиль в одну строку без сортировки ключей
+                return yaml.dump(data, Dumper=_CompactDumper, default_flow_style=True,
+                                 allow_unicode=True, sort_keys=False, width=2 ** 31 - 1)
+            # Блочный стиль; ключи сортируются, поэтому canonical совпадает с pretty
+            return yaml.dump(data, Dumper=_Dumper, default_flow_style=False, allow_unicode=True,
+                             indent=2)
         except yaml.YAMLError as e:
             raise ConversionError(f"Ошибка сериализации в YAML: {str(e)}")
     
     def validate(self, data: Union[str, bytes, io.IOBase]) -> bool:
         """Валидирует YAML данные"""
-        try:
-            self.parse(data)
-            return True
-        except ConversionError:
-            return False
+        return self.check_syntax(data) is None
+    
+    def check_syntax(self, data: Union[str, bytes, io.IOBase]) -> Optional[Dict[str, Any]]:
+        """
+        Проверяет YAML по событиям парсера, не строя объекты.
+        
+        Кроме синтаксиса проверяется то, на чем остановился бы safe_load:
+        несколько документов, неизвестные теги и ссылки на неизвестные якоря.
+        """
+        anchors = set()
+        documents = 0
+        with preserve_position(data):
+            try:
+                for event in yaml.parse(data, Loader=_FastLoader):
+                    problem = None
+                    if isinstance(event, yaml.DocumentStartEvent):
+                        documents += 1
+                        if documents > 1:
+                            problem = "ожидался один документ"
+                    elif isinstance(event, yaml.AliasEvent):
+                        if event.anchor not in anchors:
+                            problem = f"неизвестный якорь {event.anchor}"
+                    elif isinstance(event, yaml.NodeEvent):
+                        if event.anchor is not None:
+                            anchors.add(event.anchor)
+                        tag = getattr(event, 'tag', None)
+                        if tag is not None and tag != '!' and tag not in _SAFE_TAGS:
+                            problem = f"неподдерживаемый тег {tag}"
+                    if problem is not None:
+                        mark = event.start_mark
+                        return syntax_error(f"Ошибка синтаксиса YAML: {problem}",
+                                            mark.line + 1, mark.column + 1)
+                return None
+            except yaml.MarkedYAMLError as e:
+                mark = e.problem_mark or e.context_mark
+                message = f"Ошибка синтаксиса YAML: {e.problem or e.context}"
+                if mark is None:
+                    return syntax_error(message)
+                return syntax_error(message, mark.line + 1, mark.column + 1)
+            except yaml.YAMLError as e:
+                return syntax_error(f"Ошибка синтаксиса YAML: {str(e)}")
+            except UnicodeDecodeError as e:
+                return syntax_error(f"Ошибка кодировки: {str(e)}")
     
     def get_mime_type(self) -> str:
         return "application/x-yaml"
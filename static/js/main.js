@@ -4,6 +4,13 @@
 let currentResult = null;
 let currentFormat = null;
 let currentFilename = null;
+let currentTruncated = false;
+let currentResultUrl = null;  // Полный результат на сервере (/api/results/<id>)
+let lastFormData = null;
+let resultView = null;
+
+// Состояние инкрементальной конвертации текста
+let incrementalBase = null;  // {hash, text, sourceFormat}
 
 // Инициализация Drop Zone
 function initializeDropZone() {
@@ -54,8 +61,16 @@ function initializeDropZone() {
         }
 
         // Проверка типа файла
-        const allowedTypes = ['json', 'xml', 'csv', 'yaml', 'yml', 'toml', 'txt'];
-        const fileExtension = file.name.split('.').pop().toLowerCase();
+        const allowedTypes = ['json', 'jsonl', 'ndjson', 'xml', 'csv', 'yaml', 'yml', 'toml', 'xlsx',
+                              'db', 'sqlite', 'sqlite3', 'txt'];
+        const formatByExtension = {'db': 'sqlite', 'sqlite3': 'sqlite'};
+        const compressedTypes = ['gz', 'bz2', 'xz', 'zst'];
+        const nameParts = file.name.toLowerCase().split('.');
+        // data.csv.gz: сжатый файл распаковывается на сервере
+        if (nameParts.length > 2 && compressedTypes.includes(nameParts[nameParts.length - 1])) {
+            nameParts.pop();
+        }
+        const fileExtension = nameParts.pop();
         
         if (!allowedTypes.includes(fileExtension)) {
             showAlert('Неподдерживаемый тип файла', 'danger');
@@ -77,7 +92,7 @@ function initializeDropZone() {
         
         // Автоматически устанавливаем исходный формат, если возможно
         if (allowedTypes.includes(fileExtension) && fileExtension !== 'txt') {
-            document.getElementById('sourceFormat').value = fileExtension;
+            document.getElementById('sourceFormat').value = formatByExtension[fileExtension] || fileExtension;
         }
         
         // Очищаем результат при выборе нового файла
@@ -118,6 +133,8 @@ function initializeResultHandlers() {
     copyBtn.addEventListener('click', copyResult);
     downloadBtn.addEventListener('click', downloadResult);
     wrapTextCheckbox.addEventListener('change', toggleTextWrap);
+    
+    resultView = createResultView(document.getElementById('resultContent'));
 }
 
 // Обработка конвертации
@@ -159,20 +176,72 @@ async function handleConvert(e) {
         return;
     }
     
+    // Текст, который правится на странице, конвертируется в режиме
+    // предпросмотра; результат файла сохраняется на сервере целиком и
+    // читается потоком в Web Worker
+    lastFormData = formData;
+    const textMode = activeTab === 'text-tab';
+    const requestData = new FormData(e.target);
+    requestData.append(textMode ? 'preview' : 'store', '1');
+    
+    const text = textMode ? normalizeNewlines(document.getElementById('textInput').value) : null;
+    
     showLoading(true);
     
     try {
-        const response = await fetch('/api/convert', {
-            method: 'POST',
-            body: formData
-        });
+        let response = null;
+        
+        // Текст уже конвертировался: отправляем только правку
+        const incrementalData = textMode ? buildIncrementalRequest(text, formData) : null;
+        if (incrementalData) {
+            response = await fetch(convertUrl(formData), {
+                method: 'POST',
+                body: incrementalData
+            });
+            if (response.status === 409) {
+                // Сервер забыл прошлую версию - отправляем текст целиком
+                incrementalBase = null;
+                response = null;
+            }
+        }
+        
+        if (!response) {
+            if (textMode) {
+                requestData.append('incremental', '1');
+            }
+            response = await fetch(convertUrl(formData), {
+                method: 'POST',
+                body: requestData
+            });
+        }
         
         console.log('Response status:', response.status);
         
+        // Двоичный результат (xlsx) приходит файлом, а не JSON
+        const contentType = response.headers.get('Content-Type') || '';
+        if (response.ok && !contentType.startsWith('application/json')) {
+            incrementalBase = null;
+            currentFormat = formData.get('target_format');
+            saveBlob(await response.blob(), generateFilename());
+            showAlert('Файл загружен', 'success');
+            return;
+        }
+        
         const result = await response.json();
         console.log('Conversion result:', result);
         
-        if (response.ok && result.success) {
+        if (response.ok && result.success && result.binary) {
+            // Двоичный результат (xlsx, sqlite) не показывается - только скачивается
+            incrementalBase = null;
+            currentFormat = result.target_format;
+            downloadUrl(result.result_url, generateFilename());
+            showAlert('Файл загружен', 'success');
+        } else if (response.ok && result.success) {
+            incrementalBase = result.content_hash ? {
+                hash: result.content_hash,
+                text: text,
+                sourceFormat: formData.get('source_format')
+            } : null;
             showResult(result);
             showAlert('Конвертация выполнена успешно!', 'success');
         } else {
@@ -187,6 +256,71 @@ async function handleConvert(e) {
     }
 }
 
+// Адрес конвертации с форматами: сервер оценивает стоимость запроса до чтения тела
+function convertUrl(formData) {
+    const params = new URLSearchParams();
+    for (const name of ['source_format', 'target_format']) {
+        const value = formData.get(name);
+        if (value) {
+            params.set(name, value);
+        }
+    }
+    return '/api/convert?' + params.toString();
+}
+
+// Приведение переводов строк к LF, как это делает сервер
+function normalizeNewlines(text) {
+    return text.replace(/\r\n/g, '\n');
+}
+
+// Количество символов Unicode (а не UTF-16 единиц) в начале строки
+function codePointOffset(text, offset) {
+    let count = 0;
+    for (let i = 0; i < offset; i++) {
+        const code = text.charCodeAt(i);
+        // Вторая половина суррогатной пары не считается отдельным символом
+        if (code < 0xDC00 || code > 0xDFFF) {
+            count++;
+        }
+    }
+    return count;
+}
+
+// Запрос с правкой относительно прошлой версии текста или null
+function buildIncrementalRequest(text, formData) {
+    if (!incrementalBase || incrementalBase.sourceFormat !== formData.get('source_format')) {
+        return null;
+    }
+    
+    const base = incrementalBase.text;
+    let prefix = 0;
+    const maxPrefix = Math.min(base.length, text.length);
+    while (prefix < maxPrefix && base.charCodeAt(prefix) === text.charCodeAt(prefix)) {
+        prefix++;
+    }
+    let suffix = 0;
+    const maxSuffix = maxPrefix - prefix;
+    while (suffix < maxSuffix &&
+           base.charCodeAt(base.length - 1 - suffix) === text.charCodeAt(text.length - 1 - suffix)) {
+        suffix++;
+    }
+    
+    const edit = {
+        start: codePointOffset(base, prefix),
+        end: codePointOffset(base, base.length - suffix),
+        text: text.slice(prefix, text.length - suffix)
+    };
+    
+    const data = new FormData();
+    data.append('target_format', formData.get('target_format'));
+    data.append('profile', formData.get('profile'));
+    data.append('base_hash', incrementalBase.hash);
+    data.append('diff', JSON.stringify([edit]));
+    data.append('content_length', codePointOffset(text, text.length));
+    data.append('preview', '1');
+    return data;
+}
+
 // Обработка валидации
 async function handleValidate() {
     const activeTab = document.querySelector('#inputTabs .nav-link.active').id;
@@ -246,19 +380,25 @@ async function handleValidate() {
 function showResult(result) {
     console.log('Showing result:', result);
     
-    currentResult = result.result;
+    currentResult = result.result_url ? null : result.result;
+    currentResultUrl = result.result_url || null;
     currentFormat = result.target_format;
+    currentTruncated = Boolean(result.truncated);
     
     const resultSection = document.getElementById('resultSection');
-    const resultContent = document.getElementById('resultContent');
     const conversionInfo = document.getElementById('conversionInfo');
     
-    console.log('Result elements:', {resultSection, resultContent, conversionInfo});
-    
-    resultContent.textContent = result.result;
     conversionInfo.textContent = `${result.source_format.toUpperCase()} → ${result.target_format.toUpperCase()}`;
+    document.getElementById('truncatedInfo').style.display = currentTruncated ? 'inline-block' : 'none';
     
     resultSection.style.display = 'block';
+    if (currentResultUrl) {
+        document.getElementById('resultStats').textContent = formatFileSize(result.size);
+        resultView.load(currentResultUrl, currentFormat);
+    } else {
+        document.getElementById('resultStats').textContent = '';
+        resultView.setText(result.result, currentFormat);
+    }
     resultSection.scrollIntoView({ behavior: 'smooth', block: 'start' });
     resultSection.classList.add('fade-in');
     
@@ -269,21 +409,66 @@ function showResult(result) {
 function hideResult() {
     const resultSection = document.getElementById('resultSection');
     resultSection.style.display = 'none';
+    if (resultView) resultView.clear();
     currentResult = null;
+    currentResultUrl = null;
     currentFormat = null;
+    currentTruncated = false;
+}
+
+// Адрес полного результата на сервере; для предпросмотра текста
+// результат конвертируется целиком и сохраняется
+async function ensureResultUrl() {
+    if (currentResultUrl) return currentResultUrl;
+    if (!lastFormData) return null;
+    
+    const data = new FormData();
+    for (const [name, value] of lastFormData.entries()) {
+        data.append(name, value);
+    }
+    data.append('store', '1');
+    
+    showLoading(true);
+    try {
+        const response = await fetch(convertUrl(lastFormData), {
+            method: 'POST',
+            body: data
+        });
+        const result = await response.json();
+        
+        if (response.ok && result.success) {
+            currentResultUrl = result.result_url;
+            return currentResultUrl;
+        }
+        showAlert(result.error || 'Ошибка конвертации', 'danger');
+        return null;
+    } catch (error) {
+        showAlert('Ошибка соединения с сервером', 'danger');
+        console.error('Full conversion error:', error);
+        return null;
+    } finally {
+        showLoading(false);
+    }
 }
 
 // Копирование результата
 async function copyResult() {
-    if (!currentResult) return;
+    if (!currentFormat) return;
+    
+    let text = currentTruncated ? null : currentResult;
+    if (text === null) {
+        const url = await ensureResultUrl();
+        if (!url) return;
+        text = await (await fetch(url)).text();
+    }
     
     try {
-        await navigator.clipboard.writeText(currentResult);
+        await navigator.clipboard.writeText(text);
         showAlert('Результат скопирован в буфер обмена', 'success');
     } catch (error) {
         // Fallback для старых браузеров
         const textArea = document.createElement('textarea');
-        textArea.value = currentResult;
+        textArea.value = text;
         document.body.appendChild(textArea);
         textArea.select();
         document.execCommand('copy');
@@ -292,70 +477,149 @@ async function copyResult() {
     }
 }
 
-// Скачивание результата
+// Сохраняет полученный файл через временную ссылку
+function saveBlob(blob, filename) {
+    const url = window.URL.createObjectURL(blob);
+    downloadUrl(url, filename);
+    window.URL.revokeObjectURL(url);
+}
+
+// Скачивание по адресу: браузер сохраняет файл сам, без загрузки в память страницы
+function downloadUrl(url, filename) {
+    const a = document.createElement('a');
+    a.style.display = 'none';
+    a.href = url;
+    a.download = filename;
+    document.body.appendChild(a);
+    a.click();
+    document.body.removeChild(a);
+}
+
+// Скачивание результата по адресу на сервере
 async function downloadResult() {
-    if (!currentResult || !currentFormat) {
+    if (!currentFormat) {
         console.error('No result or format available for download');
         return;
     }
+    const url = await ensureResultUrl();
+    if (!url) return;
     
-    console.log('Starting download:', {format: currentFormat, contentLength: currentResult.length});
-    
-    try {
-        const downloadData = {
-            content: currentResult,
-            format: currentFormat,
-            filename: generateFilename()
-        };
-        
-        console.log('Download data:', downloadData);
-        
-        const response = await fetch('/api/download', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify(downloadData)
-        });
-        
-        console.log('Download response status:', response.status);
-        
-        if (response.ok) {
-            const blob = await response.blob();
-            console.log('Blob created, size:', blob.size);
-            
-            const url = window.URL.createObjectURL(blob);
-            const a = document.createElement('a');
-            a.style.display = 'none';
-            a.href = url;
-            a.download = generateFilename();
-            document.body.appendChild(a);
-            a.click();
-            window.URL.revokeObjectURL(url);
-            document.body.removeChild(a);
-            showAlert('Файл загружен', 'success');
-            console.log('Download completed successfully');
-        } else {
-            const errorText = await response.text();
-            console.error('Download failed:', response.status, errorText);
-            showAlert(`Ошибка при скачивании файла: ${response.status}`, 'danger');
-        }
-    } catch (error) {
-        showAlert('Ошибка при скачивании файла', 'danger');
-        console.error('Download error:', error);
-    }
+    downloadUrl(`${url}?download=1`, generateFilename());
+    showAlert('Файл загружен', 'success');
 }
 
 // Переключение переноса строк
 function toggleTextWrap() {
-    const resultContent = document.getElementById('resultContent');
-    const wrapText = document.getElementById('wrapText');
+    resultView.setWrap(document.getElementById('wrapText').checked);
+}
+
+// Виртуализированный просмотр результата: текст хранится в Web Worker,
+// в DOM рисуются только видимые строки
+function createResultView(container) {
+    const OVERSCAN = 20;
+    // Браузеры ограничивают высоту элемента; выше этого прокрутка масштабируется
+    const MAX_SCROLL_HEIGHT = 10000000;
+    
+    const spacer = container.querySelector('.result-spacer');
+    const rowsElement = container.querySelector('.result-rows');
+    const worker = new Worker(container.dataset.workerUrl);
+    
+    let rowHeight = 0;
+    let rowCount = 0;
+    let wrap = false;
+    let seq = 0;
+    let frame = null;
+    
+    function measure() {
+        const probe = document.createElement('span');
+        probe.textContent = 'x'.repeat(100);
+        rowsElement.replaceChildren(probe);
+        rowHeight = probe.getBoundingClientRect().height || 20;
+        const charWidth = probe.getBoundingClientRect().width / 100 || 8;
+        rowsElement.replaceChildren();
+        return charWidth;
+    }
     
-    if (wrapText.checked) {
-        resultContent.classList.add('wrap-text');
-    } else {
-        resultContent.classList.remove('wrap-text');
+    function layout() {
+        const charWidth = measure();
+        const style = getComputedStyle(rowsElement);
+        const width = rowsElement.clientWidth - parseFloat(style.paddingLeft) - parseFloat(style.paddingRight);
+        worker.postMessage({type: 'layout', cols: wrap ? Math.max(20, Math.floor(width / charWidth)) : 0});
+    }
+    
+    function scrollHeight() {
+        return Math.min(rowCount * rowHeight, MAX_SCROLL_HEIGHT);
     }
+    
+    function update() {
+        frame = null;
+        const visible = Math.ceil(container.clientHeight / rowHeight) + 1;
+        const scrollable = scrollHeight() - container.clientHeight;
+        let first;
+        let offset;
+        if (rowCount * rowHeight <= MAX_SCROLL_HEIGHT) {
+            first = Math.max(0, Math.floor(container.scrollTop / rowHeight) - OVERSCAN);
+            offset = first * rowHeight;
+        } else {
+            // Прокрутка масштабирована: позиция переводится в номер строки
+            const ratio = scrollable > 0 ? container.scrollTop / scrollable : 0;
+            first = Math.round(ratio * Math.max(0, rowCount - visible));
+            offset = container.scrollTop;
+        }
+        seq++;
+        rowsElement.dataset.offset = offset;
+        worker.postMessage({type: 'render', seq: seq, from: first, to: first + visible + 2 * OVERSCAN});
+    }
+    
+    function schedule() {
+        if (frame === null) {
+            frame = requestAnimationFrame(update);
+        }
+    }
+    
+    worker.onmessage = (event) => {
+        const message = event.data;
+        if (message.type === 'progress') {
+            rowCount = message.rows;
+            spacer.style.height = `${scrollHeight()}px`;
+            document.getElementById('resultLines').textContent =
+                `${message.lines.toLocaleString('ru-RU')} строк${message.done ? '' : ' (загрузка...)'}`;
+            schedule();
+        } else if (message.type === 'rows' && message.seq === seq) {
+            rowsElement.style.transform = `translateY(${rowsElement.dataset.offset}px)`;
+            rowsElement.innerHTML = message.html.join('\n');
+        } else if (message.type === 'error') {
+            showAlert(`Ошибка загрузки результата: ${message.message}`, 'danger');
+        }
+    };
+    
+    container.addEventListener('scroll', schedule);
+    window.addEventListener('resize', () => {
+        if (wrap) layout();
+    });
+    
+    return {
+        load(url, format) {
+            container.scrollTop = 0;
+            layout();
+            worker.postMessage({type: 'load', url: url, format: format});
+        },
+        setText(text, format) {
+            container.scrollTop = 0;
+            layout();
+            worker.postMessage({type: 'text', text: text, format: format});
+        },
+        setWrap(enabled) {
+            wrap = enabled;
+            layout();
+        },
+        clear() {
+            worker.postMessage({type: 'reset'});
+            rowCount = 0;
+            spacer.style.height = '0px';
+            rowsElement.replaceChildren();
+        }
+    };
 }
 
 // Показ индикатора загрузки
@@ -448,11 +712,15 @@ function generateFilename() {
 function getFileExtension(format) {
     const extensions = {
         'json': '.json',
+        'jsonl': '.jsonl',
+        'ndjson': '.ndjson',
         'xml': '.xml',
         'csv': '.csv',
         'yaml': '.yaml',
         'yml': '.yml',
-        'toml': '.toml'
+        'toml': '.toml',
+        'xlsx': '.xlsx',
+        'sqlite': '.db'
     };
     return extensions[format] || '.txt';
 }
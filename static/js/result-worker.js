@@ -0,0 +1,204 @@
+// Web Worker результата: потоковая загрузка, разбиение на строки и подсветка
+//
+// Страница присылает адрес результата (или текст) и запрашивает только
+// видимые строки; весь текст хранится здесь, а в DOM попадает одно окно.
+
+// Строка длиннее этого без переноса показывается обрезанной
+const MAX_RENDER_LENGTH = 10000;
+
+let lines = [];
+let tail = '';
+let format = null;
+let cols = 0;              // Ширина строки при переносе (0 - без переноса)
+let rowLine = null;        // При переносе: строка и смещение каждой видимой строки
+let rowOffset = null;
+let controller = null;
+let loading = false;
+
+// Правила подсветки: одно регулярное выражение с группами на формат
+const RULES = {
+    json: /("(?:[^"\\]|\\.)*")(\s*:)?|(-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)|\b(true|false|null)\b/g,
+    yaml: /^(\s*(?:-\s+)?)([^\s:#'"][^:#]*?)(?=:(?:\s|$))|("(?:[^"\\]|\\.)*"|'[^']*')|(#.*$)|\b(-?\d+(?:\.\d+)?|true|false|null|~)\b/g,
+    xml: /(<!--.*?-->)|(<\/?[\w:.-]+|\/?>)|([\w:.-]+)(?==)|("[^"]*"|'[^']*')/g,
+    toml: /^(\s*\[\[?[^\]]*\]\]?)|^(\s*[\w.-]+|\s*"[^"]*")(?=\s*=)|("(?:[^"\\]|\\.)*"|'[^']*')|(#.*$)|\b(-?\d+(?:\.\d+)?|true|false)\b/g,
+    csv: /("(?:[^"]|"")*")|(,)/g,
+};
+RULES.jsonl = RULES.json;
+RULES.ndjson = RULES.json;
+RULES.yml = RULES.yaml;
+
+// Класс токена по номеру сработавшей группы
+const CLASSES = {
+    json: [null, 'tok-string', 'tok-punct', 'tok-number', 'tok-literal'],
+    yaml: [null, null, 'tok-key', 'tok-string', 'tok-comment', 'tok-number'],
+    xml: [null, 'tok-comment', 'tok-tag', 'tok-attr', 'tok-string'],
+    toml: [null, 'tok-tag', 'tok-key', 'tok-string', 'tok-comment', 'tok-number'],
+    csv: [null, 'tok-string', 'tok-punct'],
+};
+CLASSES.jsonl = CLASSES.json;
+CLASSES.ndjson = CLASSES.json;
+CLASSES.yml = CLASSES.yaml;
+
+function escapeHtml(text) {
+    return text.replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;');
+}
+
+function highlight(text) {
+    const rule = RULES[format];
+    if (!rule) return escapeHtml(text);
+    const classes = CLASSES[format];
+    let html = '';
+    let last = 0;
+    rule.lastIndex = 0;
+    let match;
+    while ((match = rule.exec(text)) !== null) {
+        if (match[0] === '') {
+            rule.lastIndex++;
+            continue;
+        }
+        html += escapeHtml(text.slice(last, match.index));
+        for (let group = 1; group < match.length; group++) {
+            if (match[group] === undefined) continue;
+            let cls = classes[group];
+            // Строка JSON перед двоеточием - ключ
+            if (cls === 'tok-string' && format.startsWith('json') && match[2] !== undefined) {
+                cls = 'tok-key';
+            }
+            const token = escapeHtml(match[group]);
+            html += cls ? `<span class="${cls}">${token}</span>` : token;
+        }
+        last = match.index + match[0].length;
+    }
+    return html + escapeHtml(text.slice(last));
+}
+
+function rowCount() {
+    return cols ? rowLine.length : lines.length;
+}
+
+// Индекс строк с переносом для строк начиная с first
+function indexRows(first) {
+    if (!cols) return;
+    for (let i = first; i < lines.length; i++) {
+        const length = lines[i].length;
+        for (let offset = 0; offset < length || offset === 0; offset += cols) {
+            rowLine.push(i);
+            rowOffset.push(offset);
+        }
+    }
+}
+
+function addText(text, final) {
+    const parts = (tail + text).split('\n');
+    tail = final ? '' : parts.pop();
+    if (final && parts.length && parts[parts.length - 1] === '' && lines.length + parts.length > 1) {
+        // Перевод строки в конце результата не дает пустую строку
+        parts.pop();
+    }
+    const first = lines.length;
+    for (const part of parts) {
+        lines.push(part.endsWith('\r') ? part.slice(0, -1) : part);
+    }
+    indexRows(first);
+}
+
+function reset() {
+    if (controller) controller.abort();
+    controller = null;
+    loading = false;
+    lines = [];
+    tail = '';
+    rowLine = cols ? [] : null;
+    rowOffset = cols ? [] : null;
+}
+
+function progress(done) {
+    postMessage({type: 'progress', rows: rowCount(), lines: lines.length, done: done});
+}
+
+async function load(url) {
+    controller = new AbortController();
+    const signal = controller.signal;
+    loading = true;
+    try {
+        const response = await fetch(url, {signal});
+        if (!response.ok) {
+            postMessage({type: 'error', message: `HTTP ${response.status}`});
+            return;
+        }
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder('utf-8');
+        let lastReport = 0;
+        while (true) {
+            const {done, value} = await reader.read();
+            if (done) break;
+            addText(decoder.decode(value, {stream: true}), false);
+            // Сообщаем о прогрессе не чаще раза в 100 мс
+            const now = Date.now();
+            if (now - lastReport > 100) {
+                lastReport = now;
+                progress(false);
+            }
+        }
+        addText(decoder.decode(), true);
+        progress(true);
+    } catch (error) {
+        if (!signal.aborted) {
+            postMessage({type: 'error', message: String(error)});
+        }
+    } finally {
+        if (!signal.aborted) loading = false;
+    }
+}
+
+function render(from, to) {
+    const html = [];
+    const end = Math.min(to, rowCount());
+    for (let row = Math.max(0, from); row < end; row++) {
+        if (cols) {
+            const offset = rowOffset[row];
+            html.push(highlight(lines[rowLine[row]].slice(offset, offset + cols)));
+            continue;
+        }
+        const line = lines[row];
+        if (line.length > MAX_RENDER_LENGTH) {
+            html.push(highlight(line.slice(0, MAX_RENDER_LENGTH)) +
+                `<span class="tok-cut"> … ещё ${line.length - MAX_RENDER_LENGTH} символов, включите перенос строк</span>`);
+        } else {
+            html.push(highlight(line));
+        }
+    }
+    return html;
+}
+
+onmessage = (event) => {
+    const message = event.data;
+    switch (message.type) {
+        case 'load':
+            reset();
+            format = message.format;
+            progress(false);
+            load(message.url);
+            break;
+        case 'text':
+            reset();
+            format = message.format;
+            addText(message.text, true);
+            progress(true);
+            break;
+        case 'layout':
+            cols = message.cols;
+            rowLine = cols ? [] : null;
+            rowOffset = cols ? [] : null;
+            indexRows(0);
+            progress(!loading);
+            break;
+        case 'render':
+            postMessage({type: 'rows', seq: message.seq, from: message.from,
+                         html: render(message.from, message.to)});
+            break;
+        case 'reset':
+            reset();
+            break;
+    }
+};
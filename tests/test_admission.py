@@ -0,0 +1,170 @@
+"""
+Тесты для допуска запросов и справедливой очереди
+"""
+import unittest
+import gzip
+import os
+import json
+import threading
+import time
+from unittest import mock
+from urllib.parse import urlencode
+from converters.admission import AdmissionController, AdmissionRejected, ThroughputModel
+import app as app_module
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestThroughputModel(unittest.TestCase):
+    """Тесты оценки стоимости"""
+
+    def test_estimate_by_format(self):
+        """Тест: YAML дороже JSON того же размера"""
+        model = ThroughputModel()
+        self.assertGreater(model.estimate(10 ** 6, 'yaml', 'json'),
+                           model.estimate(10 ** 6, 'json', 'yaml'))
+
+    def test_record(self):
+        """Тест: замеры меняют оценку скорости"""
+        model = ThroughputModel()
+        model.record(10 ** 6, 1.0, 'csv', 'json')
+        self.assertEqual(model.throughput('csv', 'json'), 10 ** 6)
+        model.record(1000, 1.0, 'csv', 'json')
+        self.assertEqual(model.throughput('csv', 'json'), 10 ** 6)
+
+
+class TestAdmissionController(unittest.TestCase):
+    """Тесты контроллера допуска"""
+
+    def test_byte_budget(self):
+        """Тест: бюджет байт клиента восполняется со временем"""
+        clock = FakeClock()
+        controller = AdmissionController(max_concurrent=4, client_rate=100,
+                                         client_burst=1000, clock=clock)
+        controller.acquire('a', 800, 'json', 'yaml').release()
+        with self.assertRaises(AdmissionRejected) as context:
+            controller.acquire('a', 800, 'json', 'yaml')
+        self.assertEqual(context.exception.retry_after, 6)
+        # Бюджет других клиентов не затронут
+        controller.acquire('b', 800, 'json', 'yaml').release()
+        clock.now = 6.0
+        controller.acquire('a', 800, 'json', 'yaml').release()
+
+    def test_set_formats_reestimates(self):
+        """Тест: уточненные форматы меняют стоимость, замер идет по ним"""
+        clock = FakeClock()
+        controller = AdmissionController(max_concurrent=1, clock=clock)
+        ticket = controller.acquire('a', 10 ** 6, 'auto', '')
+        ticket.set_formats('yaml', 'json')
+        self.assertEqual(ticket.cost, controller.model.estimate(10 ** 6, 'yaml', 'json'))
+        self.assertEqual(controller._pending_cost, ticket.cost)
+        clock.now = 2.0
+        ticket.release()
+        self.assertEqual(controller._pending_cost, 0.0)
+        self.assertEqual(controller.model.throughput('yaml', 'json'), 5 * 10 ** 5)
+        self.assertEqual(controller.model._rates.keys(), {('yaml', 'json')})
+
+    def test_overload(self):
+        """Тест: при длинной очереди запрос отклоняется сразу"""
+        controller = AdmissionController(max_concurrent=1, max_wait=1.0,
+                                         model=ThroughputModel(default=1000))
+        ticket = controller.acquire('a', 500, 'json', 'yaml')
+        with self.assertRaises(AdmissionRejected):
+            controller.acquire('b', 1000, 'json', 'yaml')
+        ticket.release()
+        controller.acquire('b', 1000, 'json', 'yaml').release()
+
+    def test_fair_order(self):
+        """Тест: место получает клиент с меньшим обслуженным объемом"""
+        controller = AdmissionController(max_concurrent=1, client_concurrent=1)
+        first = controller.acquire('heavy', 10, 'json', 'yaml')
+        order = []
+
+        def request(client):
+            with controller.admit(client, 10, 'json', 'yaml'):
+                order.append(client)
+
+        threads = []
+        for client in ('heavy', 'heavy', 'light'):
+            thread = threading.Thread(target=request, args=(client,))
+            thread.start()
+            threads.append(thread)
+            while controller.stats()['queued'] < len(threads):
+                time.sleep(0.001)
+        first.release()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(order, ['light', 'heavy', 'heavy'])
+        self.assertEqual(controller.stats()['running'], 0)
+
+
+class TestAppAdmission(unittest.TestCase):
+    """Тесты ответа 429 в API"""
+
+    def setUp(self):
+        self.app = app_module.app.test_client()
+        self.admission = app_module.admission
+
+    def tearDown(self):
+        app_module.admission = self.admission
+
+    def post(self, address, headers=None, **kwargs):
+        return self.app.post('/api/convert', headers=headers,
+                             environ_base={'REMOTE_ADDR': address}, **kwargs)
+
+    def test_retry_after(self):
+        """Тест: превышение лимита клиента дает 429 с Retry-After"""
+        app_module.admission = AdmissionController(client_rate=1, client_burst=100)
+        form = {'source_format': 'json', 'target_format': 'yaml', 'text_data': '{"a": 1}'}
+        response = self.post('10.0.0.1', data=form)
+        self.assertEqual(response.status_code, 200)
+        response = self.post('10.0.0.1', data=form)
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response.headers['Retry-After']), 1)
+        self.assertIn('error', json.loads(response.data))
+        response = self.post('10.0.0.2', data=form)
+        self.assertEqual(response.status_code, 200)
+
+    def test_client_headers_not_trusted(self):
+        """Тест: сменой X-Client-Id и X-Forwarded-For лимит не обойти"""
+        app_module.admission = AdmissionController(client_rate=1, client_burst=100)
+        form = {'source_format': 'json', 'target_format': 'yaml', 'text_data': '{"a": 1}'}
+        self.assertEqual(self.post('10.0.0.1', data=form).status_code, 200)
+        for headers in ({'X-Client-Id': 'other'}, {'X-Forwarded-For': '10.0.0.9'}):
+            self.assertEqual(self.post('10.0.0.1', headers, data=form).status_code, 429)
+
+    def test_compressed_body_charged_before_form(self):
+        """Тест: сжатое тело учитывается по длине на проводе, до чтения формы"""
+        app_module.admission = AdmissionController(client_rate=1, client_burst=100)
+        body = gzip.compress(urlencode({'source_format': 'json', 'target_format': 'yaml',
+                                        'text_data': json.dumps({'a': os.urandom(500).hex()})}).encode())
+        self.assertGreater(len(body), 100)
+        with mock.patch.object(app_module, 'run_conversion', return_value='ok') as run:
+            statuses = [self.post('10.0.0.1', {'Content-Encoding': 'gzip'}, data=body,
+                                  content_type='application/x-www-form-urlencoded').status_code
+                        for _ in range(2)]
+        self.assertEqual(statuses, [200, 429])
+        self.assertEqual(run.call_count, 1)
+
+
+    def test_formats_from_query_and_detection(self):
+        """Тест: оценка допуска - по формам из адреса, замер - по определенному формату"""
+        app_module.admission = AdmissionController()
+        text = json.dumps([{'id': i, 'name': 'x' * 20} for i in range(3000)])
+        with mock.patch.object(app_module.admission, 'acquire',
+                               wraps=app_module.admission.acquire) as acquire:
+            response = self.app.post('/api/convert?source_format=auto&target_format=yaml',
+                                     data={'target_format': 'yaml', 'text_data': text},
+                                     environ_base={'REMOTE_ADDR': '10.0.0.1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(acquire.call_args[0][2:], ('auto', 'yaml'))
+        self.assertEqual(set(app_module.admission.model._rates), {('json', 'yaml')})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,6 +4,8 @@
 import unittest
 import json
 import io
+import os
+import tempfile
 from app import app
 
 
@@ -43,6 +45,17 @@ class TestFlaskApp(unittest.TestCase):
         self.assertTrue(data['success'])
         self.assertIn('name: test', data['result'])
     
+    def test_api_convert_compact_profile(self):
+        """Тест API конвертации в компактном оформлении"""
+        response = self.app.post('/api/convert', data={
+            'source_format': 'yaml',
+            'target_format': 'json',
+            'text_data': 'name: test\nvalue: 123',
+            'profile': 'compact'
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)['result'], '{"name":"test","value":123}')
+    
     def test_api_convert_file_upload(self):
         """Тест API конвертации загруженного файла"""
         # Создаем тестовый JSON файл в памяти
@@ -76,6 +89,52 @@ class TestFlaskApp(unittest.TestCase):
         self.assertTrue(data['success'])
         self.assertEqual(data['source_format'], 'json')
     
+    def test_api_convert_preview(self):
+        """Тест API конвертации в режиме предпросмотра"""
+        csv_data = 'id,name\n' + ''.join(f'{i},n{i}\n' for i in range(50))
+        response = self.app.post('/api/convert', data={
+            'source_format': 'csv',
+            'target_format': 'json',
+            'text_data': csv_data,
+            'preview_records': '5'
+        })
+        
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertTrue(data['truncated'])
+        self.assertEqual(len(json.loads(data['result'])), 5)
+    
+    def test_api_convert_incremental(self):
+        """Тест API инкрементальной конвертации по правке"""
+        text = 'name,value\ntest,123\nother,456\n'
+        response = self.app.post('/api/convert', data={
+            'source_format': 'csv',
+            'target_format': 'json',
+            'text_data': text,
+            'incremental': '1'
+        })
+        data = json.loads(response.data)
+        self.assertIn('content_hash', data)
+        
+        start = text.index('456')
+        response = self.app.post('/api/convert', data={
+            'target_format': 'json',
+            'base_hash': data['content_hash'],
+            'diff': json.dumps([{'start': start, 'end': start + 3, 'text': '789'}]),
+            'content_length': len(text)
+        })
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(json.loads(data['result'])[1]['value'], 789)
+        
+        # Неизвестная версия - клиент должен прислать текст целиком
+        response = self.app.post('/api/convert', data={
+            'target_format': 'json',
+            'base_hash': 'unknown',
+            'diff': '[]'
+        })
+        self.assertEqual(response.status_code, 409)
+    
     def test_api_convert_missing_target_format(self):
         """Тест API конвертации без указания целевого формата"""
         response = self.app.post('/api/convert', data={
@@ -110,6 +169,85 @@ class TestFlaskApp(unittest.TestCase):
         data = json.loads(response.data)
         self.assertIn('error', data)
     
+    def test_api_convert_raw_body(self):
+        """Тест результата в теле ответа (raw=1) с метаданными в заголовках"""
+        response = self.app.post('/api/convert?raw=1', data={
+            'target_format': 'csv',
+            'text_data': '[{"id": 1, "name": "Alice"}, {"id": 2, "name": "Bob"}]'
+        })
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/csv')
+        self.assertEqual(response.headers['X-Source-Format'], 'json')
+        self.assertEqual(response.headers['X-Truncated'], 'false')
+        self.assertEqual(response.get_data(as_text=True).splitlines(),
+                         ['id,name', '1,Alice', '2,Bob'])
+    
+    def test_api_convert_raw_body_accept(self):
+        """Тест выбора raw режима по заголовку Accept"""
+        response = self.app.post('/api/convert', data={
+            'source_format': 'yaml',
+            'target_format': 'json',
+            'text_data': "path: 'C:\\data'",
+            'raw': 'true'
+        })
+        self.assertEqual(json.loads(response.data), {'path': 'C:\\data'})
+        
+        response = self.app.post('/api/convert', data={
+            'source_format': 'json',
+            'target_format': 'xml',
+            'text_data': '{"name": "test"}'
+        }, headers={'Accept': 'application/xml'})
+        self.assertEqual(response.mimetype, 'application/xml')
+        self.assertIn('<name>test</name>', response.get_data(as_text=True))
+    
+    def test_api_convert_raw_body_error(self):
+        """Тест: ошибка конвертации в raw режиме возвращается как JSON"""
+        response = self.app.post('/api/convert?raw=1', data={
+            'source_format': 'json',
+            'target_format': 'yaml',
+            'text_data': '{"name": "test"'
+        })
+        
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', json.loads(response.data))
+    
+    def test_api_convert_store_result(self):
+        """Тест: store=1 сохраняет результат на сервере и возвращает его адрес"""
+        with tempfile.TemporaryDirectory() as folder:
+            app.config['RESULT_FOLDER'] = folder
+            try:
+                response = self.app.post('/api/convert', data={
+                    'target_format': 'csv',
+                    'text_data': '[{"id": 1}, {"id": 2}]',
+                    'store': '1'
+                })
+                self.assertEqual(response.status_code, 200)
+                data = json.loads(response.data)
+                self.assertNotIn('result', data)
+                self.assertEqual(data['lines'], 3)
+                self.assertFalse(data['binary'])
+                
+                response = self.app.get(data['result_url'])
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.content_type, 'text/csv; charset=utf-8')
+                self.assertEqual(response.get_data(as_text=True).splitlines(), ['id', '1', '2'])
+                self.assertEqual(int(response.headers['Content-Length']), data['size'])
+                response.close()
+                
+                response = self.app.get(data['result_url'] + '?download=1')
+                self.assertIn('attachment; filename=converted.csv',
+                              response.headers['Content-Disposition'])
+                response.close()
+            finally:
+                app.config['RESULT_FOLDER'] = os.path.join(
+                    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'results')
+    
+    def test_api_result_not_found(self):
+        """Тест: неизвестный или некорректный идентификатор результата"""
+        self.assertEqual(self.app.get('/api/results/' + '0' * 32).status_code, 404)
+        self.assertEqual(self.app.get('/api/results/..%2Fapp.py').status_code, 404)
+    
     def test_api_validate_valid_data(self):
         """Тест API валидации корректных данных"""
         response = self.app.post('/api/validate', data={
@@ -132,6 +270,7 @@ class TestFlaskApp(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         data = json.loads(response.data)
         self.assertFalse(data['valid'])
+        self.assertEqual((data['syntax_error']['line'], data['syntax_error']['column']), (1, 16))
     
     def test_api_validate_missing_format(self):
         """Тест API валидации без указания формата"""
@@ -143,6 +282,31 @@ class TestFlaskApp(unittest.TestCase):
         data = json.loads(response.data)
         self.assertIn('error', data)
     
+    def test_api_validate_with_schema(self):
+        """Тест API валидации по JSON схеме"""
+        schema = {'type': 'object', 'properties': {'value': {'type': 'string'}}}
+        response = self.app.post('/api/validate', data={
+            'format': 'json',
+            'text_data': '{"name": "test", "value": 123}',
+            'schema': json.dumps(schema)
+        })
+        
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertFalse(data['valid'])
+        self.assertEqual(data['errors'][0]['path'], '/value')
+    
+    def test_api_schema_infer(self):
+        """Тест API вывода схемы"""
+        response = self.app.post('/api/schema/infer', data={
+            'format': 'csv',
+            'text_data': 'name,value\ntest,123\n'
+        })
+        
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['schema']['items']['properties']['value'], {'type': 'integer'})
+    
     def test_api_download(self):
         """Тест API скачивания файла"""
         response = self.app.post('/api/download',
@@ -0,0 +1,115 @@
+"""
+Тесты для статических файлов и HTTP кэширования
+"""
+import unittest
+import gzip
+import json
+import os
+import re
+import shutil
+import tempfile
+from assets import StaticAssets, build, brotli, IMMUTABLE, MANIFEST_NAME
+from app import app
+
+
+class TestBuild(unittest.TestCase):
+    """Тесты сборки манифеста и сжатых вариантов"""
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.folder, 'js'))
+        with open(os.path.join(self.folder, 'js', 'main.js'), 'w') as f:
+            f.write('console.log("test");\n' * 100)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_build(self):
+        """Тест: манифест и .gz вариант записываются рядом с файлом"""
+        manifest = build(self.folder)
+        self.assertRegex(manifest['js/main.js'], r'^js/main\.[0-9a-f]{12}\.js$')
+        self.assertTrue(os.path.exists(os.path.join(self.folder, 'js', 'main.js.gz')))
+        with open(os.path.join(self.folder, MANIFEST_NAME)) as f:
+            self.assertEqual(json.load(f), manifest)
+        # Повторная сборка не добавляет сжатые варианты в манифест
+        self.assertEqual(build(self.folder), manifest)
+        self.assertEqual(StaticAssets(self.folder).manifest, manifest)
+
+
+class TestStaticAssets(unittest.TestCase):
+    """Тесты раздачи статических файлов"""
+
+    def setUp(self):
+        self.app = app.test_client()
+
+    def hashed_url(self, name):
+        """Адрес файла из главной страницы"""
+        html = self.app.get('/').get_data(as_text=True)
+        root, ext = name.rsplit('.', 1)
+        match = re.search(rf'/assets/{re.escape(root)}\.[0-9a-f]{{12}}\.{ext}', html)
+        self.assertIsNotNone(match, name)
+        return match.group(0)
+
+    def test_hashed_urls(self):
+        """Тест: шаблоны ссылаются на файлы с хэшем"""
+        for name in ('css/style.css', 'js/main.js', 'images/favicon.ico'):
+            self.hashed_url(name)
+
+    def test_immutable_gzip(self):
+        """Тест: сжатый вариант и бессрочное кэширование"""
+        url = self.hashed_url('js/main.js')
+        response = self.app.get(url, headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(response.headers['Cache-Control'], IMMUTABLE)
+        with open(os.path.join(app.static_folder, 'js', 'main.js'), 'rb') as f:
+            self.assertEqual(gzip.decompress(response.data), f.read())
+
+        plain = self.app.get(url)
+        self.assertNotIn('Content-Encoding', plain.headers)
+        self.assertNotEqual(plain.headers['ETag'], response.headers['ETag'])
+
+    @unittest.skipIf(brotli is None, 'пакет brotli не установлен')
+    def test_brotli_preferred(self):
+        """Тест: br предпочтительнее gzip"""
+        response = self.app.get(self.hashed_url('css/style.css'),
+                                headers={'Accept-Encoding': 'gzip, br'})
+        self.assertEqual(response.headers['Content-Encoding'], 'br')
+
+    def test_not_modified(self):
+        """Тест: повторный запрос с If-None-Match получает 304"""
+        url = self.hashed_url('css/style.css')
+        etag = self.app.get(url).headers['ETag']
+        response = self.app.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_unknown_asset(self):
+        """Тест: файл без хэша из манифеста не отдается"""
+        self.assertEqual(self.app.get('/assets/js/main.js').status_code, 404)
+
+
+class TestConditionalAPI(unittest.TestCase):
+    """Тесты ETag в API"""
+
+    def setUp(self):
+        self.app = app.test_client()
+
+    def test_formats_etag(self):
+        """Тест: список форматов проверяется по ETag"""
+        response = self.app.get('/api/formats')
+        etag = response.headers['ETag']
+        response = self.app.get('/api/formats', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+
+    def test_convert_etag(self):
+        """Тест: тот же результат конвертации получает 304"""
+        form = {'source_format': 'json', 'target_format': 'yaml', 'text_data': '{"a": 1}'}
+        etag = self.app.post('/api/convert', data=form).headers['ETag']
+        response = self.app.post('/api/convert', data=form, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers['ETag'], etag)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,211 @@
+"""
+Тесты для кэша результатов конвертации
+"""
+import unittest
+import io
+import json
+import os
+import tempfile
+import time
+from unittest import mock
+
+from converters import cache as cache_module
+from converters.cache import ResultCache, MemoryBackend, SQLiteBackend, content_digest
+from converters.engine import ConversionEngine
+from converters.limits import Limits, LimitExceeded
+import app as app_module
+
+
+class TestBackends(unittest.TestCase):
+    """Тесты хранилищ"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'cache.sqlite3')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def backends(self, max_size=100, ttl=60):
+        return [MemoryBackend(max_size, ttl), SQLiteBackend(self.path, max_size, ttl)]
+
+    def test_eviction_by_size(self):
+        """Тест: при переполнении вытесняются давно не читанные записи"""
+        for backend in self.backends():
+            backend.set('a', b'x' * 40)
+            backend.set('b', b'x' * 40)
+            time.sleep(0.01)
+            self.assertIsNotNone(backend.get('a'))
+            backend.set('c', b'x' * 40)
+            self.assertIsNone(backend.get('b'), backend.name)
+            self.assertIsNotNone(backend.get('a'), backend.name)
+            self.assertLessEqual(backend.stats()['size'], 100)
+
+    def test_ttl(self):
+        """Тест: просроченная запись - промах"""
+        for backend in self.backends():
+            backend.set('a', b'value')
+            with mock.patch('time.time', return_value=time.time() + 120):
+                self.assertIsNone(backend.get('a'), backend.name)
+
+    def test_sqlite_shared_between_instances(self):
+        """Тест: запись одного процесса видна другому (отдельные соединения)"""
+        SQLiteBackend(self.path).set('key', b'value')
+        self.assertEqual(SQLiteBackend(self.path).get('key'), b'value')
+
+
+class TestResultCache(unittest.TestCase):
+    """Тесты кэша поверх хранилища"""
+
+    def test_text_and_binary_values(self):
+        """Тест: строки и байты возвращаются того же типа"""
+        cache = ResultCache(MemoryBackend())
+        cache.put('t', 'текст')
+        cache.put('b', b'\x00\x01')
+        self.assertEqual(cache.get('t'), 'текст')
+        self.assertEqual(cache.get('b'), b'\x00\x01')
+        self.assertIsNone(cache.get('missing'))
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['stores']), (2, 1, 2))
+        self.assertAlmostEqual(stats['hit_rate'], 2 / 3, places=3)
+
+    def test_large_values_not_stored(self):
+        """Тест: результат больше max_value_size не сохраняется, и в потоке тоже"""
+        cache = ResultCache(MemoryBackend(), max_value_size=10)
+        cache.put('a', 'x' * 100)
+        self.assertEqual(list(cache.store_chunks('b', ['x' * 6, 'x' * 6])), ['x' * 6, 'x' * 6])
+        list(cache.store_chunks('c', ['ab', 'cd']))
+        self.assertIsNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 'abcd')
+
+    def test_unavailable_store(self):
+        """Тест: недоступное хранилище - промах, и какое-то время к нему не обращаются"""
+        with tempfile.NamedTemporaryFile() as f:
+            # Каталог базы - обычный файл, открыть ее нельзя
+            cache = ResultCache(SQLiteBackend(os.path.join(f.name, 'cache.sqlite3')))
+            cache.put('a', 'value')
+            self.assertIsNone(cache.get('a'))
+            stats = cache.stats()
+        self.assertEqual(stats['errors'], 1)
+        self.assertFalse(stats['available'])
+
+    def test_shared_counters(self):
+        """Тест: общие счетчики всех процессов в SQLite"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cache.sqlite3')
+            with mock.patch.object(cache_module, 'STATS_INTERVAL', 0):
+                first = ResultCache(SQLiteBackend(path))
+                second = ResultCache(SQLiteBackend(path))
+                first.put('a', 'value')
+                self.assertEqual(second.get('a'), 'value')
+                second.get('b')
+            shared = first.stats()['shared']
+        self.assertEqual((shared['stores'], shared['hits'], shared['misses']), (1, 1, 1))
+
+    def test_content_digest(self):
+        """Тест: хэш не зависит от вида входа и не сдвигает поток"""
+        stream = io.BytesIO(b'a,b\n1,2\n')
+        self.assertEqual(content_digest(stream), content_digest('a,b\n1,2\n'))
+        self.assertEqual(stream.tell(), 0)
+
+    def test_content_digest_max_size(self):
+        """Тест: вход больше max_size не хэшируется и не читается"""
+        stream = io.BytesIO(b'a,b\n1,2\n')
+        with mock.patch.object(stream, 'read', side_effect=AssertionError('чтение')):
+            self.assertIsNone(content_digest(stream, max_size=4))
+        self.assertEqual(stream.tell(), 0)
+        self.assertIsNone(content_digest('a,b\n1,2\n', max_size=4))
+        self.assertIsNotNone(content_digest('a,b\n1,2\n', max_size=8))
+
+
+class TestEngineCache(unittest.TestCase):
+    """Тесты кэша в движке"""
+
+    def setUp(self):
+        self.engine = ConversionEngine(cache=ResultCache(MemoryBackend()))
+
+    def test_repeated_conversion_hits(self):
+        """Тест: повторная конвертация берется из кэша, другой профиль - нет"""
+        first = self.engine.convert('a,b\n1,2\n', 'csv', 'json')
+        with mock.patch.object(self.engine.converters.get('csv'), 'parse',
+                               side_effect=AssertionError('повторный разбор')):
+            self.assertEqual(self.engine.convert(io.BytesIO(b'a,b\n1,2\n'), 'csv', 'json'), first)
+        self.engine.convert('a,b\n1,2\n', 'csv', 'json', profile='compact')
+        self.assertEqual(self.engine.cache.stats()['hits'], 1)
+
+    def test_stream_and_detected_format(self):
+        """Тест: потоковый результат и определенный формат кэшируются"""
+        source, chunks = self.engine.convert_stream('{"a": 1}\n', 'auto', 'csv')
+        result = ''.join(chunks)
+        with mock.patch.object(self.engine, '_detect_uncached',
+                               side_effect=AssertionError('повторное определение')):
+            self.assertEqual(self.engine.detect_format('{"a": 1}\n'), source)
+            _, chunks = self.engine.convert_stream('{"a": 1}\n', 'auto', 'csv')
+        self.assertEqual(''.join(chunks), result)
+
+    def test_disabled(self):
+        """Тест: cache=None выключает кэш независимо от окружения"""
+        with mock.patch.dict(os.environ, {'CACHE_SIZE_MB': '64'}):
+            self.assertIsNone(ConversionEngine(cache=None).cache)
+            self.assertIsNotNone(ConversionEngine().cache)
+
+    def test_convert_and_stream_keys(self):
+        """Тест: convert и convert_stream кэшируются под разными ключами"""
+        result = self.engine.convert('a,b\n1,2\n', 'csv', 'json')
+        _, chunks = self.engine.convert_stream('a,b\n1,2\n', 'csv', 'json')
+        self.assertEqual(''.join(chunks), result)
+        stats = self.engine.cache.stats()
+        self.assertEqual((stats['hits'], stats['stores']), (0, 2))
+
+    def test_large_input_not_hashed(self):
+        """Тест: вход больше max_input_size не хэшируется и не кэшируется"""
+        self.engine.cache.max_input_size = 4
+        with mock.patch.object(cache_module, 'content_digest',
+                               wraps=cache_module.content_digest) as digest:
+            self.engine.convert('a,b\n1,2\n', 'csv', 'json')
+        digest.assert_called_once_with('a,b\n1,2\n', 4)
+        stats = self.engine.cache.stats()
+        self.assertEqual((stats['misses'], stats['stores']), (0, 0))
+
+    def test_hit_charged_to_limits(self):
+        """Тест: результат из кэша проверяется ограничением размера"""
+        data = '{"a": 1}\n' * 20
+        result = self.engine.convert(data, 'jsonl', 'json')
+        _, chunks = self.engine.convert_stream(data, 'jsonl', 'json')
+        self.assertEqual(''.join(chunks), result)
+        self.assertGreater(len(result), len(data) + 10)
+        self.engine.limits = Limits(max_size=len(data) + 10)
+        with self.assertRaises(LimitExceeded):
+            self.engine.convert(data, 'jsonl', 'json')
+        _, chunks = self.engine.convert_stream(data, 'jsonl', 'json')
+        with self.assertRaises(LimitExceeded):
+            ''.join(chunks)
+        self.assertEqual(self.engine.cache.stats()['hits'], 2)
+
+    def test_errors_not_cached(self):
+        """Тест: ошибки конвертации не кэшируются"""
+        for _ in range(2):
+            with self.assertRaises(Exception):
+                self.engine.convert('{"a": ', 'json', 'yaml')
+        self.assertEqual(self.engine.cache.stats()['stores'], 0)
+
+
+class TestCacheApi(unittest.TestCase):
+    """Тесты статистики кэша в API"""
+
+    def test_stats(self):
+        """Тест: /api/cache возвращает счетчики и долю попаданий"""
+        client = app_module.app.test_client()
+        with mock.patch.object(app_module.converter_engine, 'cache', ResultCache(MemoryBackend())):
+            for _ in range(2):
+                client.post('/api/convert', data={'source_format': 'csv', 'target_format': 'json',
+                                                  'text_data': 'a\n1\n'})
+            stats = json.loads(client.get('/api/cache').data)
+        self.assertTrue(stats['enabled'])
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+        self.assertEqual(stats['hit_rate'], 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
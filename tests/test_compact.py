@@ -0,0 +1,171 @@
+"""
+Тесты для компактного представления разобранных документов
+"""
+import unittest
+import json
+import tracemalloc
+from array import array
+from unittest import mock
+
+from converters.compact import CompactBuilder, CompactObject, thaw, threshold_from_env
+from converters.engine import ConversionEngine
+from converters.json_converter import JSONConverter
+from converters.jsonl_converter import JSONLConverter
+from converters.xml_converter import XMLConverter
+from converters.yaml_converter import YAMLConverter
+from converters.limits import Limits
+
+DOCUMENT = {
+    'items': [
+        {'id': 1, 'name': 'первый', 'tags': ['a', 'b'], 'scores': [1.5, 2.0], 'ok': True},
+        {'id': 2, 'name': 'второй', 'tags': [], 'scores': [3, 4], 'ok': False},
+        {'id': 3, 'name': None, 'tags': ['a'], 'scores': [True, 1], 'nested': {'x': [{'y': 'z'}]}},
+    ],
+    'total': 3,
+}
+
+
+def build(document):
+    builder = CompactBuilder()
+    return builder.value(json.loads(json.dumps(document), object_pairs_hook=builder.mapping))
+
+
+class TestCompactBuilder(unittest.TestCase):
+    """Тесты построения компактного дерева"""
+
+    def test_shapes_and_strings_shared(self):
+        """Тест: объекты с одинаковыми ключами делят кортеж ключей, строки - один экземпляр"""
+        document = build([{'a': 'значение', 'b': 1}, {'a': 'значение', 'b': 2}])
+        first, second = document
+        self.assertIsInstance(first, CompactObject)
+        self.assertIs(first.keys(), second.keys())
+        self.assertIs(first['a'], second['a'])
+
+    def test_packed_sequences(self):
+        """Тест: однотипные числа - array, булевы, смешанные и большие целые - кортеж"""
+        document = build({'i': [1, 2], 'f': [0.5, 1.5], 'b': [True, False], 'm': [1, 1.5],
+                          'big': [2 ** 70, 1], 'e': []})
+        self.assertEqual(document['i'], array('q', [1, 2]))
+        self.assertEqual(document['f'], array('d', [0.5, 1.5]))
+        self.assertEqual(document['b'], (True, False))
+        self.assertEqual(document['m'], (1, 1.5))
+        self.assertEqual(document['big'], (2 ** 70, 1))
+        self.assertEqual(document['e'], ())
+
+    def test_duplicate_keys(self):
+        """Тест: при повторе ключа действует последний, как в json.loads"""
+        builder = CompactBuilder()
+        document = json.loads('{"a": 1, "a": 2}', object_pairs_hook=builder.mapping)
+        self.assertEqual(document, {'a': 2})
+
+    def test_mapping_and_thaw(self):
+        """Тест: дерево читается как отображение и восстанавливается в словари"""
+        document = build(DOCUMENT)
+        item = document['items'][0]
+        self.assertEqual(item['name'], 'первый')
+        self.assertIn('tags', item)
+        self.assertNotIn('missing', item)
+        self.assertEqual(item.get('missing', 0), 0)
+        with self.assertRaises(KeyError):
+            item['missing']
+        self.assertEqual(thaw(document), DOCUMENT)
+        self.assertIs(type(thaw(document)['items']), list)
+
+    def test_threshold_from_env(self):
+        """Тест: порог из COMPACT_PARSE_MB, 0 - выключено"""
+        with mock.patch.dict('os.environ', {'COMPACT_PARSE_MB': '2'}):
+            self.assertEqual(threshold_from_env(), 2 * 1024 * 1024)
+        with mock.patch.dict('os.environ', {'COMPACT_PARSE_MB': '0'}):
+            self.assertIsNone(threshold_from_env())
+
+
+class TestCompactSerialize(unittest.TestCase):
+    """Тесты сериализации компактного дерева"""
+
+    def test_same_output(self):
+        """Тест: сериализаторы выдают для компактного дерева то же, что для словарей"""
+        compact = build(DOCUMENT)
+        for converter in (JSONConverter(), JSONLConverter(), XMLConverter(), YAMLConverter()):
+            for profile in ('pretty', 'compact', 'canonical'):
+                with self.subTest(converter=type(converter).__name__, profile=profile):
+                    self.assertEqual(converter.serialize(compact, profile),
+                                     converter.serialize(DOCUMENT, profile))
+        records = build(DOCUMENT['items'])
+        self.assertEqual(''.join(JSONLConverter().iter_serialize(records)),
+                         ''.join(JSONLConverter().iter_serialize(DOCUMENT['items'])))
+
+    def test_xml_parse(self):
+        """Тест: XML разбирается в компактное дерево с тем же содержимым"""
+        text = '<root a="1"><item><v>x</v></item><item><v>y</v></item><empty/></root>'
+        converter = XMLConverter()
+        compact = converter.parse_compact(text)
+        self.assertIsInstance(compact['root'], CompactObject)
+        self.assertEqual(thaw(compact), thaw(converter.parse(text)))
+        for profile in ('pretty', 'compact'):
+            self.assertEqual(converter.serialize(compact, profile),
+                             converter.serialize(converter.parse(text), profile))
+
+    def test_governor_counts(self):
+        """Тест: узлы и размер компактного дерева считаются как у словарей"""
+        plain = Limits().start()
+        plain.walk(DOCUMENT)
+        compact = Limits().start()
+        compact.walk(build(DOCUMENT))
+        self.assertEqual((compact.nodes, compact.size), (plain.nodes, plain.size))
+
+    def test_memory(self):
+        """Тест: компактное дерево занимает меньше памяти"""
+        text = json.dumps([{'id': i, 'kind': 'point', 'xy': [i, i + 1], 'label': f'p{i % 10}'}
+                           for i in range(20000)])
+
+        def measure(parse):
+            tracemalloc.start()
+            try:
+                document = parse()
+                return tracemalloc.get_traced_memory()[0], document
+            finally:
+                tracemalloc.stop()
+
+        plain, _ = measure(lambda: json.loads(text))
+        compact, _ = measure(lambda: JSONConverter().parse_compact(text))
+        self.assertLess(compact, plain * 0.75)
+
+
+class TestEngineCompact(unittest.TestCase):
+    """Тесты выбора компактного разбора в движке"""
+
+    def setUp(self):
+        self.engine = ConversionEngine()
+        self.engine.cache = None
+        self.engine.compact_threshold = 1
+        self.text = json.dumps(DOCUMENT)
+
+    def test_same_result(self):
+        """Тест: результат конвертации не зависит от представления"""
+        plain = ConversionEngine()
+        plain.cache = None
+        plain.compact_threshold = None
+        for target in ('json', 'yaml', 'xml', 'jsonl'):
+            with self.subTest(target=target):
+                self.assertEqual(self.engine.convert(self.text, 'json', target),
+                                 plain.convert(self.text, 'json', target))
+                _, chunks = self.engine.convert_stream(self.text, 'json', target, profile='compact')
+                self.assertEqual(''.join(chunks),
+                                 plain.convert(self.text, 'json', target, profile='compact'))
+
+    def test_when_used(self):
+        """Тест: компактный разбор только от порога, без конвейера и для поддерживающих форматов"""
+        converter = self.engine.converters.get('json')
+        with mock.patch.object(converter, 'parse_compact', wraps=converter.parse_compact) as parse:
+            self.engine.convert(self.text, 'json', 'yaml')
+            self.assertEqual(parse.call_count, 1)
+            self.engine.convert(self.text, 'json', 'csv')
+            self.engine.convert(self.text, 'json', 'yaml',
+                                pipeline=[{'select': ['total']}])
+            self.engine.compact_threshold = len(self.text) + 1
+            self.engine.convert(self.text, 'json', 'yaml')
+            self.assertEqual(parse.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+"""
+Тесты для сжатых входных данных и результата
+"""
+import unittest
+import bz2
+import gzip
+import io
+import json
+import lzma
+from converters.base import ConversionError
+from converters.compression import (detect_compression, split_extension, open_decompressed,
+                                    iter_compress, ensure_supported, zstandard)
+from converters.engine import ConversionEngine
+from app import app
+
+
+CSV_TEXT = 'id,name\n1,Alice\n2,Bob\n'
+
+
+class _NonSeekable(io.RawIOBase):
+    """Поток без seek, как тело HTTP запроса"""
+
+    def __init__(self, data):
+        self._data = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        chunk = self._data.read(len(buffer))
+        buffer[:len(chunk)] = chunk
+        return len(chunk)
+
+
+class TestCompression(unittest.TestCase):
+    """Тесты модуля сжатия"""
+
+    def test_detect_compression(self):
+        """Тест определения алгоритма по сигнатуре"""
+        self.assertEqual(detect_compression(gzip.compress(b'x')), 'gzip')
+        self.assertEqual(detect_compression(bz2.compress(b'x')), 'bz2')
+        self.assertEqual(detect_compression(lzma.compress(b'x')), 'xz')
+        self.assertIsNone(detect_compression(b'{"a": 1}'))
+
+    def test_split_extension(self):
+        """Тест отделения расширения сжатия"""
+        self.assertEqual(split_extension('data.csv.gz'), ('data.csv', 'gzip'))
+        self.assertEqual(split_extension('data.json'), ('data.json', None))
+
+    def test_round_trip(self):
+        """Тест сжатия результата и распаковки"""
+        for method in ('gzip', 'bz2', 'xz'):
+            compressed = b''.join(iter_compress(['часть 1, ', 'часть 2'], method))
+            stream = open_decompressed(_NonSeekable(compressed))
+            self.assertEqual(stream.read().decode('utf-8'), 'часть 1, часть 2')
+
+    def test_plain_stream_unchanged(self):
+        """Тест: несжатый поток читается без потерь"""
+        stream = open_decompressed(_NonSeekable(b'plain text'))
+        self.assertEqual(stream.read(), b'plain text')
+
+    def test_unsupported_method(self):
+        """Тест неизвестного алгоритма"""
+        with self.assertRaises(ConversionError):
+            ensure_supported('rar')
+
+    @unittest.skipIf(zstandard is None, 'пакет zstandard не установлен')
+    def test_zstd_round_trip(self):
+        """Тест zstd"""
+        compressed = b''.join(iter_compress([CSV_TEXT], 'zstd'))
+        self.assertEqual(open_decompressed(io.BytesIO(compressed)).read().decode(), CSV_TEXT)
+
+
+class TestEngineCompressed(unittest.TestCase):
+    """Тесты конвертации сжатых данных движком"""
+
+    def setUp(self):
+        self.engine = ConversionEngine()
+
+    def test_detect_and_convert_gzip(self):
+        """Тест определения формата и конвертации gzip файла"""
+        data = io.BytesIO(gzip.compress(CSV_TEXT.encode()))
+        self.assertEqual(self.engine.detect_format(data, 'data.csv.gz'), 'csv')
+        result = json.loads(self.engine.convert(data, 'csv', 'json'))
+        self.assertEqual(result[1]['name'], 'Bob')
+
+
+class TestAppCompressed(unittest.TestCase):
+    """Тесты сжатия в API"""
+
+    def setUp(self):
+        self.app = app.test_client()
+        self.app.testing = True
+
+    def test_upload_compressed_file(self):
+        """Тест загрузки data.csv.gz"""
+        response = self.app.post('/api/convert', data={
+            'target_format': 'json',
+            'file': (io.BytesIO(gzip.compress(CSV_TEXT.encode())), 'data.csv.gz')
+        }, content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['source_format'], 'csv')
+
+    def test_content_encoding_request(self):
+        """Тест тела запроса с Content-Encoding: gzip"""
+        body = b'source_format=json&target_format=yaml&text_data=%7B%22a%22%3A+1%7D'
+        response = self.app.post('/api/convert', data=gzip.compress(body), headers={
+            'Content-Encoding': 'gzip',
+            'Content-Type': 'application/x-www-form-urlencoded',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('a: 1', json.loads(response.data)['result'])
+
+    def test_compressed_result(self):
+        """Тест сжатого результата"""
+        response = self.app.post('/api/convert', data={
+            'source_format': 'json',
+            'target_format': 'yaml',
+            'text_data': '{"a": 1}',
+            'compress': 'gzip'
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/gzip')
+        self.assertIn(b'a: 1', gzip.decompress(response.data))
+
+    def test_unsupported_compression(self):
+        """Тест неизвестного алгоритма сжатия результата"""
+        response = self.app.post('/api/convert', data={
+            'source_format': 'json',
+            'target_format': 'yaml',
+            'text_data': '{"a": 1}',
+            'compress': 'rar'
+        })
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,9 +2,11 @@
 Тесты для модулей конвертации
 """
 import unittest
+import unittest.mock
 import json
 import io
 from converters.json_converter import JSONConverter
+from converters.jsonl_converter import JSONLConverter
 from converters.xml_converter import XMLConverter
 from converters.csv_converter import CSVConverter
 from converters.yaml_converter import YAMLConverter
@@ -46,6 +48,82 @@ class TestJSONConverter(unittest.TestCase):
         """Тест валидации некорректного JSON"""
         invalid_json = '{"name": "test"'
         self.assertFalse(self.converter.validate(invalid_json))
+    
+    def test_check_syntax_position(self):
+        """Тест позиции первой синтаксической ошибки"""
+        self.assertIsNone(self.converter.check_syntax('[{"a": [1, {"b": [2, [3]]}]}, NaN, -1.5e3]'))
+        error = self.converter.check_syntax('{\n  "a": [1, 2,],\n  "b": 1\n}')
+        self.assertEqual((error['line'], error['column']), (2, 14))
+        self.assertIn('ожидалось значение', error['message'])
+        self.assertIsNotNone(self.converter.check_syntax('{"a": 01}'))
+        self.assertIsNotNone(self.converter.check_syntax('[1] [2]'))
+    
+    def test_check_syntax_blocks(self):
+        """Тест проверки потоком: лексемы на границах маленьких блоков"""
+        records = [{"id": i, "v": -1.25e-3, "s": "a\\\"б\u0444", "t": [True, None]} for i in range(30)]
+        text = json.dumps(records, ensure_ascii=False)
+        with unittest.mock.patch('converters.json_converter._SyntaxScanner.BLOCK_SIZE', 3):
+            self.assertIsNone(self.converter.check_syntax(io.BytesIO(text.encode('utf-8'))))
+            error = self.converter.check_syntax(text[:-1] + ',]')
+        self.assertEqual((error['line'], error['column']), (1, len(text) + 1))
+    
+    def test_iter_records_lazy(self):
+        """Тест ленивого чтения массива небольшими блоками"""
+        records = [{"id": i, "name": "имя", "tags": [i, "]},"]} for i in range(50)]
+        data = io.BytesIO(json.dumps(records, ensure_ascii=False).encode('utf-8'))
+        with unittest.mock.patch('converters.json_converter._ArrayReader.BLOCK_SIZE', 5):
+            self.assertEqual(list(self.converter.iter_records(data)), records)
+    
+    def test_iter_records_number_on_block_boundary(self):
+        """Тест: число, разрезанное границей блока, дочитывается из следующего блока"""
+        block = 64 * 1024
+        for offset in range(1, 7):
+            data = '[' + ' ' * (block - 1 - offset) + '-2.5e3, 7]'
+            self.assertEqual(list(self.converter.iter_records(data)), [-2500.0, 7])
+            self.assertEqual(list(self.converter.iter_records(io.BytesIO(data.encode()))), [-2500.0, 7])
+    
+    def test_streams_records(self):
+        """Тест: по частям читается только массив, позиция файла не меняется"""
+        data = io.BytesIO(b'  [1, 2]')
+        self.assertTrue(self.converter.streams_records(data))
+        self.assertEqual(data.tell(), 0)
+        self.assertFalse(self.converter.streams_records('{"a": [1]}'))
+    
+    def test_iter_records_invalid(self):
+        """Тест ошибки в середине массива"""
+        with self.assertRaises(ConversionError):
+            list(self.converter.iter_records('[1, 2 3]'))
+
+
+class TestJSONLConverter(unittest.TestCase):
+    """Тесты для JSON Lines конвертера"""
+    
+    def setUp(self):
+        self.converter = JSONLConverter()
+    
+    def test_parse_and_serialize(self):
+        """Тест разбора и сериализации по строкам"""
+        data = '{"a": 1}\n\n{"a": 2}\n'
+        self.assertEqual(self.converter.parse(data), [{"a": 1}, {"a": 2}])
+        self.assertEqual(self.converter.serialize([{"a": 1}, {"a": 2}]), '{"a": 1}\n{"a": 2}\n')
+    
+    def test_invalid_line(self):
+        """Тест ошибки с номером строки"""
+        with self.assertRaises(ConversionError) as context:
+            self.converter.parse('{"a": 1}\n{"a":\n')
+        self.assertIn('строке 2', str(context.exception))
+    
+    def test_validate(self):
+        """Тест валидации"""
+        self.assertTrue(self.converter.validate('{"a": 1}\n{"a": 2}\n'))
+        self.assertFalse(self.converter.validate('a,b\n1,2\n'))
+    
+    def test_check_syntax_all_lines(self):
+        """Тест: check_syntax проверяет все строки, validate - только начало"""
+        data = ''.join('{"a": %d}\n' % i for i in range(30)) + '{"a": \n'
+        self.assertTrue(self.converter.validate(data))
+        error = self.converter.check_syntax(io.StringIO(data))
+        self.assertEqual(error['line'], 31)
 
 
 class TestXMLConverter(unittest.TestCase):
@@ -78,6 +156,14 @@ class TestXMLConverter(unittest.TestCase):
         self.assertFalse(self.converter.validate(invalid_xml))
 
 
+    def test_check_syntax(self):
+        """Тест позиции ошибки XML"""
+        data = io.BytesIO(b'<root>\n  <a>1</b>\n</root>')
+        error = self.converter.check_syntax(data)
+        self.assertEqual((error['line'], error['column']), (2, 9))
+        self.assertEqual(data.tell(), 0)
+
+
 class TestCSVConverter(unittest.TestCase):
     """Тесты для CSV конвертера"""
     
@@ -107,6 +193,19 @@ class TestCSVConverter(unittest.TestCase):
         self.assertIn('test,123', result)
 
 
+    def test_check_syntax_row_width(self):
+        """Тест: строка шире заголовка - ошибка с номером строки"""
+        data = 'a,b,c\n' + '1,2,3\n' * 10 + '1,2,3,4\n'
+        self.assertEqual(self.converter.check_syntax(data)['line'], 12)
+        self.assertTrue(self.converter.validate('a,b,c\n1,2\n"x\ny",2,3\n'))
+    
+    def test_check_syntax_sample(self):
+        """Тест: проверяется только начало данных"""
+        data = 'a,b\n' + '1,2\n' * 100 + '1,2,3\n'
+        with unittest.mock.patch.object(CSVConverter, 'VALIDATE_SAMPLE', 40):
+            self.assertIsNone(self.converter.check_syntax(data.encode('utf-8')))
+
+
 class TestYAMLConverter(unittest.TestCase):
     """Тесты для YAML конвертера"""
     
@@ -132,6 +231,17 @@ class TestYAMLConverter(unittest.TestCase):
         self.assertTrue(self.converter.validate(yaml_data))
 
 
+    def test_check_syntax(self):
+        """Тест проверки YAML по событиям парсера"""
+        self.assertIsNone(self.converter.check_syntax('a: &x [1, 2]\nb: *x\n'))
+        error = self.converter.check_syntax('a: 1\nb: [1, 2\n')
+        self.assertEqual(error['line'], 3)
+        # То, что отверг бы safe_load
+        self.assertFalse(self.converter.validate('a: 1\n---\nb: 2\n'))
+        self.assertFalse(self.converter.validate('a: !!python/object:os.system x'))
+        self.assertFalse(self.converter.validate('a: *missing'))
+
+
 class TestTOMLConverter(unittest.TestCase):
     """Тесты для TOML конвертера"""
     
@@ -155,6 +265,16 @@ class TestTOMLConverter(unittest.TestCase):
         """Тест валидации корректного TOML"""
         toml_data = 'name = "test"\nvalue = 123'
         self.assertTrue(self.converter.validate(toml_data))
+    
+    def test_serialize_records_as_array_of_tables(self):
+        """Тест записи списка записей блоками [[data]]"""
+        records = [{"id": 1, "address": {"city": "Paris"}}, {"id": 2, "note": None}]
+        chunks = list(self.converter.iter_serialize(records))
+        self.assertEqual(len(chunks), 2)
+        self.assertTrue(all('[[data]]' in chunk for chunk in chunks))
+        self.assertIn('[data.address]', chunks[0])
+        self.assertEqual(self.converter.parse(''.join(chunks)),
+                         {"data": [{"id": 1, "address": {"city": "Paris"}}, {"id": 2}]})
 
 
 if __name__ == '__main__':
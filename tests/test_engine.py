@@ -2,7 +2,9 @@
 Тесты для движка конвертации
 """
 import unittest
+import io
 import json
+from unittest import mock
 from converters.engine import ConversionEngine, ConversionError
 
 
@@ -37,6 +39,34 @@ class TestConversionEngine(unittest.TestCase):
         detected_format = self.engine.detect_format(yaml_data)
         self.assertEqual(detected_format, 'yaml')
     
+    def test_detect_format_stream(self):
+        """Тест: автоопределение проверяет поток частями, не читая его целиком"""
+        reads = []
+        
+        class Recording(io.BytesIO):
+            def read(self, size=-1):
+                reads.append(size)
+                return super().read(size)
+        
+        self.engine.cache = None
+        for content, expected in ((b''.join(b'{"id": %d}\n' % i for i in range(100000)), 'jsonl'),
+                                  (b''.join(b'%d,x\n' % i for i in range(300000)), 'csv')):
+            data = Recording(content)
+            data.seek(0)
+            self.assertEqual(self.engine.detect_format(data), expected)
+            self.assertEqual(data.tell(), 0)
+        self.assertTrue(reads)
+        self.assertTrue(all(0 <= size <= ConversionEngine.DETECT_TEXT_LIMIT + 1 for size in reads))
+    
+    def test_detect_format_toml_size_limit(self):
+        """Тест: TOML, который проверяется только целиком, определяется до предела размера"""
+        self.engine.cache = None
+        self.assertEqual(self.engine.detect_format('[a]\nb = 1\n'), 'toml')
+        self.engine.DETECT_TEXT_LIMIT = 4
+        with self.assertRaises(ConversionError):
+            self.engine.detect_format('[a]\nb = 1\n')
+        self.assertEqual(self.engine.detect_format('[a]\nb = 1\n', 'config.toml'), 'toml')
+    
     def test_detect_format_by_filename(self):
         """Тест автоопределения формата по имени файла"""
         json_data = '{"name": "test"}'
@@ -50,6 +80,79 @@ class TestConversionEngine(unittest.TestCase):
         self.assertIn('name: test', result)
         self.assertIn('value: 123', result)
     
+    def test_output_profiles(self):
+        """Тест профилей оформления результата"""
+        data = '{"b": [1, 2], "a": {"y": 1, "x": "z"}}'
+        self.assertEqual(self.engine.convert(data, 'json', 'json', profile='compact'),
+                         '{"b":[1,2],"a":{"y":1,"x":"z"}}')
+        self.assertEqual(self.engine.convert(data, 'json', 'json', profile='canonical'),
+                         '{"a":{"x":"z","y":1},"b":[1,2]}')
+        self.assertEqual(self.engine.convert(data, 'json', 'xml', profile='canonical'),
+                         '<a><x>z</x><y>1</y></a><b>1</b><b>2</b>')
+        compact_yaml = self.engine.convert(data, 'json', 'yaml', profile='compact')
+        self.assertEqual(compact_yaml.count('\n'), 1)
+        self.assertEqual(json.loads(self.engine.convert(compact_yaml, 'yaml', 'json')),
+                         json.loads(data))
+    
+    def test_canonical_csv_columns(self):
+        """Тест сортировки колонок CSV в профиле canonical"""
+        result = self.engine.convert('[{"b": 1, "a": 2}]', 'json', 'csv', profile='canonical')
+        self.assertTrue(result.startswith('a,b'))
+    
+    def test_convert_stream(self):
+        """Тест: результат по частям совпадает с обычной конвертацией"""
+        data = '[{"id": 1, "tags": ["a"]}, {"id": 2, "tags": []}]'
+        for target in ('json', 'jsonl', 'csv', 'xml', 'yaml', 'toml'):
+            source_format, chunks = self.engine.convert_stream(data, 'auto', target)
+            self.assertEqual(source_format, 'json')
+            self.assertEqual(''.join(chunks), self.engine.convert(data, 'json', target))
+    
+    def test_convert_stream_csv_new_columns(self):
+        """Тест: поле, впервые появившееся после первого блока CSV, не теряется"""
+        self.engine.cache = None
+        records = [{'a': i} for i in range(10001)] + [{'a': 1, 'b': 2}, {'a': 0.5, 'c': True}]
+        data = ''.join(json.dumps(record) + '\n' for record in records)
+        for profile in ('pretty', 'canonical'):
+            _, chunks = self.engine.convert_stream(data, 'jsonl', 'csv', profile=profile)
+            result = ''.join(chunks)
+            self.assertEqual(result, self.engine.convert(data, 'jsonl', 'csv', profile=profile))
+            self.assertTrue(result.startswith('a,b,c\n'))
+            self.assertTrue(result.endswith('1.0,2.0,\n0.5,,True\n'))
+    
+    def test_convert_stream_json_array_lazy(self):
+        """Тест: массив JSON идет в JSON Lines по элементам, без разбора документа целиком"""
+        self.engine.cache = None
+        records = [{'id': i, 'name': 'x' * 20} for i in range(50000)]
+        data = io.BytesIO(json.dumps(records).encode('utf-8'))
+        converter = self.engine.get_converter('json')
+        with mock.patch.object(converter, 'parse', side_effect=AssertionError('разбор целиком')):
+            _, chunks = self.engine.convert_stream(data, 'json', 'jsonl')
+            first = next(chunks)
+            # К первому фрагменту прочитано только начало данных
+            self.assertLess(data.tell(), len(data.getvalue()) // 4)
+            result = first + ''.join(chunks)
+        self.assertEqual(result.count('\n'), len(records))
+        self.assertEqual(json.loads(result.split('\n', 1)[0]), records[0])
+    
+    def test_convert_stream_json_object(self):
+        """Тест: объект верхнего уровня разбирается целиком, как в convert"""
+        data = '{"a": [1, 2], "b": ["x", "y"]}'
+        for target in ('csv', 'jsonl'):
+            _, chunks = self.engine.convert_stream(data, 'json', target)
+            self.assertEqual(''.join(chunks), self.engine.convert(data, 'json', target))
+    
+    def test_unknown_profile(self):
+        """Тест неизвестного профиля оформления"""
+        with self.assertRaises(ConversionError):
+            self.engine.convert('{"a": 1}', 'json', 'yaml', profile='tiny')
+    
+    def test_convert_json_to_jsonl(self):
+        """Тест конвертации JSON массива в JSON Lines и обратно"""
+        result = self.engine.convert('[{"a": 1}, {"a": 2}]', 'json', 'jsonl')
+        self.assertEqual(result, '{"a": 1}\n{"a": 2}\n')
+        self.assertEqual(self.engine.detect_format(result), 'jsonl')
+        self.assertEqual(json.loads(self.engine.convert(result, 'ndjson', 'json')), [{"a": 1}, {"a": 2}])
+    
     def test_convert_yaml_to_json(self):
         """Тест конвертации из YAML в JSON"""
         yaml_data = 'name: test\nvalue: 123'
@@ -115,6 +218,29 @@ class TestConversionEngine(unittest.TestCase):
         extension = self.engine.get_file_extension('json')
         self.assertEqual(extension, '.json')
     
+    def test_convert_preview_records(self):
+        """Тест предпросмотра первых N записей"""
+        csv_data = 'id,name\n' + ''.join(f'{i},name{i}\n' for i in range(100))
+        result, truncated = self.engine.convert_preview(csv_data, 'csv', 'json', max_records=3)
+        self.assertTrue(truncated)
+        self.assertEqual([r['id'] for r in json.loads(result)], [0, 1, 2])
+    
+    def test_convert_preview_bytes(self):
+        """Тест предпросмотра по объему входных данных"""
+        csv_data = 'id,text\n' + ''.join(f'{i},"line\nbreak {i}"\n' for i in range(100))
+        result, truncated = self.engine.convert_preview(csv_data, 'csv', 'json', max_bytes=60)
+        self.assertTrue(truncated)
+        records = json.loads(result)
+        # Запись, разорванная границей, в результат не попадает
+        self.assertEqual(records[-1]['text'], f'line\nbreak {len(records) - 1}')
+    
+    def test_convert_preview_small_input(self):
+        """Тест: маленький документ в предпросмотре не обрезается"""
+        result, truncated = self.engine.convert_preview(
+            '{"name": "test"}', 'json', 'yaml', max_records=10, max_bytes=1024)
+        self.assertFalse(truncated)
+        self.assertIn('name: test', result)
+    
     def test_complex_conversion_chain(self):
         """Тест сложной цепочки конвертации"""
         # JSON -> YAML -> JSON
@@ -0,0 +1,80 @@
+"""
+Тесты для планов разворачивания вложенных записей
+"""
+import unittest
+import json
+from unittest import mock
+from converters import flatten
+from converters.flatten import flatten_records, unflatten_records, get_plan, infer_layout
+from converters.engine import ConversionEngine
+
+
+RECORDS = [
+    {'id': 1, 'user': {'name': 'Alice', 'geo': {'lat': 1.5}}, 'tags': ['a', 'b']},
+    {'id': 2, 'user': {'name': 'Bob'}},
+]
+
+
+class TestFlatten(unittest.TestCase):
+    """Тесты разворачивания в таблицу"""
+
+    def test_columns_and_rows(self):
+        """Тест колонок и строк по вложенным записям"""
+        columns, rows = flatten_records(RECORDS)
+        self.assertEqual(columns, ['id', 'user.name', 'user.geo.lat', 'tags'])
+        self.assertEqual(rows[0], [1, 'Alice', 1.5, '["a", "b"]'])
+        self.assertEqual(rows[1], [2, 'Bob', None, None])
+
+    def test_plan_cached_by_layout(self):
+        """Тест: одинаковая раскладка использует один план"""
+        first = get_plan(infer_layout(RECORDS))
+        second = get_plan(infer_layout([dict(r) for r in RECORDS]))
+        self.assertIs(first, second)
+
+    def test_new_fields_after_sample(self):
+        """Тест полей, которых не было в образце"""
+        records = [{'a': 1}, {'a': 2, 'b': {'c': 3}}, {'a': {'x': 1}}]
+        columns, rows = flatten_records(records, sample_size=1)
+        self.assertEqual(columns, ['a', 'b.c'])
+        self.assertEqual(rows, [[1, None], [2, 3], ['{"x": 1}', None]])
+
+    def test_many_new_fields_after_sample(self):
+        """Тест: новые ключи после образца не пересобирают план на каждой записи"""
+        records = [{'id': i, 'attrs': {f'k{i}': i}, 'z': 1} for i in range(1100)]
+        expected = flatten_records(records, sample_size=len(records))
+        with mock.patch.object(flatten, 'get_plan', wraps=flatten.get_plan) as plans:
+            self.assertEqual(flatten_records(records), expected)
+        self.assertLessEqual(plans.call_count, 2)
+
+    def test_unflatten(self):
+        """Тест обратной сборки вложенных записей"""
+        rows = [{'id': 1, 'user.name': 'Alice', 'tags': '["a"]', 'user.age': float('nan')}]
+        self.assertEqual(list(unflatten_records(rows)),
+                         [{'id': 1, 'user': {'name': 'Alice', 'age': None}, 'tags': ['a']}])
+
+    def test_plan_cache_limit(self):
+        """Тест ограничения размера кэша планов"""
+        with mock.patch.object(flatten, 'PLAN_CACHE_SIZE', 2):
+            for index in range(4):
+                get_plan({f'column{index}': None})
+            self.assertLessEqual(len(flatten._plan_cache), 2)
+
+
+class TestEngineFlatten(unittest.TestCase):
+    """Тесты конвертации вложенных данных в CSV и обратно"""
+
+    def setUp(self):
+        self.engine = ConversionEngine()
+
+    def test_round_trip(self):
+        """Тест JSON -> CSV -> JSON с обратной сборкой"""
+        csv_data = self.engine.convert(json.dumps(RECORDS), 'json', 'csv')
+        self.assertTrue(csv_data.startswith('id,user.name,user.geo.lat,tags'))
+        result = json.loads(self.engine.convert(csv_data, 'csv', 'json',
+                                                pipeline=[{'unflatten': True}]))
+        self.assertEqual(result[0]['user'], {'name': 'Alice', 'geo': {'lat': 1.5}})
+        self.assertEqual(result[0]['tags'], ['a', 'b'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+"""
+Тесты для инкрементальной конвертации
+"""
+import unittest
+import json
+from unittest import mock
+from converters.csv_converter import CSVConverter
+from converters.engine import ConversionEngine
+from converters.incremental import (apply_edits, parse_full, parse_incremental,
+                                    IncrementalStateError, SessionCache)
+
+
+CSV_TEXT = 'id,name\n1,Alice\n2,Bob\n3,"Multi\nline"\n4,Dave\n'
+
+
+class TestApplyEdits(unittest.TestCase):
+    """Тесты применения правок"""
+
+    def test_apply_multiple_edits(self):
+        """Тест нескольких непересекающихся правок"""
+        text, start, end, delta = apply_edits('abcdef', [
+            {'start': 4, 'end': 5, 'text': 'XY'},
+            {'start': 0, 'end': 1, 'text': ''},
+        ])
+        self.assertEqual(text, 'bcdXYf')
+        self.assertEqual((start, end, delta), (0, 5, 0))
+
+    def test_overlapping_edits(self):
+        """Тест пересекающихся правок"""
+        with self.assertRaises(IncrementalStateError):
+            apply_edits('abcdef', [{'start': 0, 'end': 3, 'text': ''},
+                                   {'start': 2, 'end': 4, 'text': ''}])
+
+
+class TestIncrementalCSV(unittest.TestCase):
+    """Тесты инкрементального разбора CSV"""
+
+    def setUp(self):
+        self.converter = CSVConverter()
+        self.state = parse_full(self.converter, CSV_TEXT, 'csv')
+
+    def assertMatchesFullParse(self, state):
+        expected = parse_full(self.converter, state.text, 'csv')
+        self.assertEqual(state.records(), expected.records())
+        self.assertEqual(state.starts, expected.starts)
+
+    def test_edit_reparses_only_affected_records(self):
+        """Тест: правка одной записи не разбирает остальные"""
+        start = CSV_TEXT.index('Bob')
+        edits = [{'start': start, 'end': start + 3, 'text': 'Robert'}]
+        with mock.patch.object(self.converter, 'iter_records',
+                               wraps=self.converter.iter_records) as iter_records:
+            state = parse_incremental(self.converter, self.state, edits)
+        self.assertEqual(iter_records.call_args[0][0], 'id,name\n2,Robert\n')
+        self.assertEqual(state.records()[1], {'id': 2, 'name': 'Robert'})
+        self.assertMatchesFullParse(state)
+
+    def test_insert_and_delete_records(self):
+        """Тест добавления и удаления строк"""
+        position = CSV_TEXT.index('4,Dave')
+        state = parse_incremental(self.converter, self.state,
+                                  [{'start': position, 'end': position, 'text': '5,Eve\n\n'}])
+        self.assertMatchesFullParse(state)
+
+        start = state.text.index('1,Alice')
+        end = state.text.index('3,"Multi')
+        state = parse_incremental(self.converter, state, [{'start': start, 'end': end, 'text': ''}])
+        self.assertEqual([r['id'] for r in state.records()], [3, 5, 4])
+        self.assertMatchesFullParse(state)
+
+    def test_append_at_end(self):
+        """Тест дописывания в конец документа"""
+        state = parse_incremental(self.converter, self.state,
+                                  [{'start': len(CSV_TEXT), 'end': len(CSV_TEXT), 'text': '6,Frank'}])
+        self.assertEqual(state.records()[-1], {'id': 6, 'name': 'Frank'})
+        self.assertMatchesFullParse(state)
+
+    def test_quote_change_falls_back_to_full_parse(self):
+        """Тест: незакрытая кавычка приводит к полному разбору"""
+        position = CSV_TEXT.index('Alice')
+        state = parse_incremental(self.converter, self.state,
+                                  [{'start': position, 'end': position, 'text': '"'}])
+        self.assertIsNone(state.starts)
+
+    def test_column_types_follow_document(self):
+        """Тест: тип колонки выводится по всему документу, как при полной конвертации"""
+        engine = ConversionEngine()
+        engine.cache = None
+        for text, old, new in (('a,b\n1,x\n,y\n3,z\n', '1', '2'),
+                               ('a,b\n1,x\n,y\n3,z\n', ',y', '5,y'),
+                               ('a,b\n1,x\n2,y\n3,z\n', '2', '2.5'),
+                               ('a,b\n1,x\n2,y\n3,z\n', 'y', '7')):
+            with self.subTest(text=text, old=old, new=new):
+                state = parse_full(self.converter, text, 'csv')
+                start = text.index(old)
+                state = parse_incremental(self.converter, state,
+                                          [{'start': start, 'end': start + len(old), 'text': new}])
+                self.assertEqual(json.dumps(state.records(), separators=(',', ':')),
+                                 engine.convert(state.text, 'csv', 'json', profile='compact'))
+
+    def test_header_edit(self):
+        """Тест правки заголовка"""
+        state = parse_incremental(self.converter, self.state,
+                                  [{'start': 3, 'end': 7, 'text': 'title'}])
+        self.assertEqual(state.records()[0], {'id': 1, 'title': 'Alice'})
+
+
+class TestEngineIncremental(unittest.TestCase):
+    """Тесты инкрементальной конвертации через движок"""
+
+    def setUp(self):
+        self.engine = ConversionEngine()
+
+    def test_round_trip(self):
+        """Тест повторной конвертации по правке"""
+        result, digest, source_format, _ = self.engine.convert_tracked(CSV_TEXT, 'auto', 'json')
+        self.assertEqual(source_format, 'csv')
+        start = CSV_TEXT.index('Alice')
+        result, new_digest, _, _ = self.engine.convert_incremental(
+            digest, [{'start': start, 'end': start + 5, 'text': 'Alicia'}], 'json')
+        self.assertNotEqual(digest, new_digest)
+        self.assertEqual(json.loads(result)[0]['name'], 'Alicia')
+
+    def test_unknown_base(self):
+        """Тест правки к неизвестной версии"""
+        with self.assertRaises(IncrementalStateError):
+            self.engine.convert_incremental('missing', [], 'json')
+
+    def test_content_length_mismatch(self):
+        """Тест несовпадения длины нового текста"""
+        _, digest, _, _ = self.engine.convert_tracked('{"a": 1}', 'json', 'yaml')
+        with self.assertRaises(IncrementalStateError):
+            self.engine.convert_incremental(digest, [], 'yaml', content_length=100)
+
+    def test_session_cache_eviction(self):
+        """Тест вытеснения старых версий"""
+        cache = SessionCache(max_entries=1)
+        first = parse_full(CSVConverter(), 'a\n1\n', 'csv')
+        second = parse_full(CSVConverter(), 'a\n2\n', 'csv')
+        cache.put(first)
+        cache.put(second)
+        self.assertIsNone(cache.get(first.hash))
+        self.assertIs(cache.get(second.hash), second)
+
+    def test_session_cache_memory_limit(self):
+        """Тест: версии вытесняются по памяти, слишком большая не кэшируется"""
+        first = parse_full(CSVConverter(), 'a\n1\n', 'csv')
+        second = parse_full(CSVConverter(), 'a\n2\n', 'csv')
+        cache = SessionCache(max_bytes=first.size + second.size - 1)
+        cache.put(first)
+        cache.put(second)
+        self.assertIsNone(cache.get(first.hash))
+        self.assertIs(cache.get(second.hash), second)
+
+        cache = SessionCache(max_bytes=first.size - 1)
+        cache.put(first)
+        self.assertIsNone(cache.get(first.hash))
+
+
+if __name__ == '__main__':
+    unittest.main()
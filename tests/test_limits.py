@@ -0,0 +1,243 @@
+"""
+Тесты для ограничений ресурсов конвертации
+"""
+import unittest
+import gzip
+import io
+import json
+import pickle
+import time
+from unittest import mock
+
+from converters.base import ConversionError
+from converters.engine import ConversionEngine
+from converters.limits import Governor, Limits, LimitExceeded, DEPTH, NODES, SIZE, TIME, MEMORY
+import app as app_module
+
+# «Бомба» из псевдонимов YAML: 9^9 строк в развернутом виде
+ALIAS_BOMB = '\n'.join(
+    ['a0: &a0 ["lol","lol","lol","lol","lol","lol","lol","lol","lol"]'] +
+    [f'a{i}: &a{i} [' + ','.join([f'*a{i - 1}'] * 9) + ']' for i in range(1, 9)]
+)
+
+
+class TestGovernor(unittest.TestCase):
+    """Тесты учета ресурсов"""
+
+    def test_walk_counts_nodes_and_size(self):
+        """Тест: узлы и размер строк и ключей"""
+        governor = Limits().start()
+        governor.walk({'ab': ['xyz', 1]})
+        self.assertEqual(governor.nodes, 4)
+        self.assertEqual(governor.size, len('ab') + len('xyz') + 8)
+
+    def test_shared_references_counted_each_time(self):
+        """Тест: общий объект учитывается при каждой встрече"""
+        shared = ['x'] * 100
+        governor = Limits(max_nodes=1000).start()
+        with self.assertRaises(LimitExceeded) as context:
+            governor.walk([shared] * 100)
+        self.assertEqual(context.exception.limit, NODES)
+
+    def test_depth(self):
+        """Тест: глубина вложенности"""
+        document = []
+        for _ in range(20):
+            document = [document]
+        Limits(max_depth=21).start().walk(document)
+        with self.assertRaises(LimitExceeded) as context:
+            Limits(max_depth=10).start().walk(document)
+        self.assertEqual(context.exception.limit, DEPTH)
+
+    def test_records_limited_one_by_one(self):
+        """Тест: в потоке ограничения узлов действуют на каждую запись"""
+        governor = Limits(max_nodes=10).start()
+        records = [{'a': [1, 2]}] * 100
+        self.assertEqual(len(list(governor.records(records))), 100)
+        with self.assertRaises(LimitExceeded):
+            list(governor.records([{'a': list(range(20))}]))
+
+    def test_time_and_memory(self):
+        """Тест: время и прирост памяти"""
+        governor = Limits(max_time=0.01).start()
+        time.sleep(0.02)
+        with self.assertRaises(LimitExceeded) as context:
+            governor.check()
+        self.assertEqual(context.exception.limit, TIME)
+
+        governor = Limits(max_memory=1024 * 1024).start()
+        with mock.patch('converters.limits._rss', return_value=governor.memory_base + 2 * 1024 * 1024):
+            with self.assertRaises(LimitExceeded) as context:
+                governor.check()
+        self.assertEqual(context.exception.limit, MEMORY)
+
+    def test_input_checks_throttled(self):
+        """Тест: время и память при чтении потока проверяются раз на CHECK_BYTES"""
+        governor = Limits(max_size=16 * 1024 * 1024).start()
+        stream = governor.input(io.BytesIO(b'x' * (4 * 1024 * 1024)))
+        with mock.patch.object(governor, 'check') as check:
+            while stream.read(4096):
+                pass
+        self.assertEqual(check.call_count, 4)
+
+    def test_cause_in_wrapped_error(self):
+        """Тест: превышение находится в цепочке причин ошибки конвертера"""
+        governor = Limits().start()
+        try:
+            try:
+                raise LimitExceeded('лимит', SIZE)
+            except Exception as e:
+                raise ConversionError(f'Ошибка парсинга: {e}')
+        except ConversionError as e:
+            self.assertEqual(governor.cause(e).limit, SIZE)
+        self.assertEqual(governor.cause(RecursionError()).limit, DEPTH)
+        self.assertIsNone(governor.cause(ValueError()))
+
+    def test_pickle(self):
+        """Тест: ошибка передается из процессов пула вместе с limit"""
+        error = pickle.loads(pickle.dumps(LimitExceeded('лимит', NODES)))
+        self.assertEqual((str(error), error.limit), ('лимит', NODES))
+
+    def test_from_env(self):
+        """Тест: ограничения из переменных окружения, 0 - без ограничения"""
+        with mock.patch.dict('os.environ', {'LIMIT_DEPTH': '50', 'LIMIT_SIZE_MB': '2',
+                                            'LIMIT_TIME': '0'}):
+            limits = Limits.from_env()
+        self.assertEqual(limits.max_depth, 50)
+        self.assertEqual(limits.max_size, 2 * 1024 * 1024)
+        self.assertIsNone(limits.max_time)
+
+
+class TestEngineLimits(unittest.TestCase):
+    """Тесты ограничений в движке"""
+
+    def test_yaml_alias_bomb(self):
+        """Тест: бомба из псевдонимов останавливается на лимите узлов"""
+        engine = ConversionEngine(limits=Limits(max_nodes=100000))
+        for convert in (engine.convert, lambda *args: engine.convert_stream(*args)[1]):
+            with self.assertRaises(LimitExceeded) as context:
+                convert(ALIAS_BOMB, 'yaml', 'json')
+            self.assertEqual(context.exception.limit, NODES)
+
+    def test_deeply_nested_json(self):
+        """Тест: 100 тысяч уровней вложенности - ошибка глубины, а не RecursionError"""
+        engine = ConversionEngine()
+        deep = '[' * 100000 + ']' * 100000
+        with self.assertRaises(LimitExceeded) as context:
+            engine.convert(deep, 'json', 'yaml')
+        self.assertEqual(context.exception.limit, DEPTH)
+        shallow = ConversionEngine(limits=Limits(max_depth=20))
+        with self.assertRaises(LimitExceeded):
+            shallow.convert('[' * 50 + ']' * 50, 'json', 'yaml')
+
+    def test_decompressed_size(self):
+        """Тест: размер входа считается после распаковки, и в потоке тоже"""
+        engine = ConversionEngine(limits=Limits(max_size=1024 * 1024))
+        payload = io.BytesIO(gzip.compress(b'{"a": 1}\n' * 500000))
+        _, chunks = engine.convert_stream(payload, 'jsonl', 'csv')
+        with self.assertRaises(LimitExceeded) as context:
+            list(chunks)
+        self.assertEqual(context.exception.limit, SIZE)
+
+    def test_giant_csv_field(self):
+        """Тест: CSV с огромным полем в кавычках упирается в размер входа"""
+        engine = ConversionEngine(limits=Limits(max_size=64 * 1024))
+        data = io.BytesIO(b'a,b\n1,"' + b'x' * 200000 + b'"\n')
+        with self.assertRaises(LimitExceeded) as context:
+            engine.convert(data, 'csv', 'json')
+        self.assertEqual(context.exception.limit, SIZE)
+
+    def test_output_size(self):
+        """Тест: размер результата"""
+        engine = ConversionEngine(limits=Limits(max_size=2000))
+        with self.assertRaises(LimitExceeded):
+            engine.convert('key\n' + '1\n' * 150, 'csv', 'json')
+
+    def test_tracked_and_incremental(self):
+        """Тест: конвертация для редактора и правки проверяются теми же ограничениями"""
+        engine = ConversionEngine(limits=Limits(max_nodes=100000, max_size=4000))
+        with self.assertRaises(LimitExceeded) as context:
+            engine.convert_tracked(ALIAS_BOMB, 'yaml', 'json')
+        self.assertEqual(context.exception.limit, NODES)
+        _, digest, _, _ = engine.convert_tracked('a: 1\n', 'yaml', 'json')
+        with self.assertRaises(LimitExceeded) as context:
+            engine.convert_incremental(digest, [{'start': 0, 'end': 5, 'text': ALIAS_BOMB}], 'json')
+        self.assertEqual(context.exception.limit, NODES)
+        _, digest, _, _ = engine.convert_tracked('key\n1\n', 'csv', 'json')
+        with self.assertRaises(LimitExceeded) as context:
+            engine.convert_incremental(digest, [{'start': 6, 'end': 6, 'text': '1\n' * 400}], 'json')
+        self.assertEqual(context.exception.limit, SIZE)
+
+    def test_incremental_walks_only_edited_records(self):
+        """Тест: правка обходит только новые записи, но итоги документа проверяются"""
+        engine = ConversionEngine(limits=Limits(max_nodes=420))
+        text = 'key\n' + '1\n' * 200
+        _, digest, _, _ = engine.convert_tracked(text, 'csv', 'json')
+        walked = []
+        walk = Governor.walk
+
+        def counted_walk(governor, document):
+            walked.append(len(document))
+            return walk(governor, document)
+
+        with mock.patch.object(Governor, 'walk', autospec=True, side_effect=counted_walk):
+            _, digest, _, _ = engine.convert_incremental(digest, [{'start': 4, 'end': 6, 'text': '2\n' * 6}], 'json')
+            self.assertEqual(walked, [6, 1])
+            text = 'key\n' + '2\n' * 6 + '1\n' * 199
+            with self.assertRaises(LimitExceeded) as context:
+                engine.convert_incremental(digest, [{'start': len(text), 'end': len(text), 'text': '3\n' * 5}], 'json')
+            self.assertEqual(context.exception.limit, NODES)
+
+    def test_preview(self):
+        """Тест: предпросмотр возвращает превышение ограничения, а не общую ошибку"""
+        engine = ConversionEngine(limits=Limits(max_nodes=100000))
+        with self.assertRaises(LimitExceeded) as context:
+            engine.convert_preview(ALIAS_BOMB, 'yaml', 'json', max_records=10)
+        self.assertEqual(context.exception.limit, NODES)
+
+    def test_within_limits(self):
+        """Тест: обычные данные конвертируются как раньше"""
+        engine = ConversionEngine(limits=Limits(max_nodes=1000, max_depth=5, max_size=10000))
+        self.assertEqual(json.loads(engine.convert('a,b\n1,2\n', 'csv', 'json')), [{'a': 1, 'b': 2}])
+        _, chunks = engine.convert_stream('{"a": [1]}\n' * 500, 'jsonl', 'jsonl')
+        self.assertEqual(''.join(chunks).count('\n'), 500)
+
+
+class TestApiLimits(unittest.TestCase):
+    """Тесты ответа API при превышении ограничений"""
+
+    def setUp(self):
+        self.app = app_module.app.test_client()
+
+    def test_limit_response(self):
+        """Тест: превышение - ответ 422 с названием ограничения"""
+        with mock.patch.object(app_module.converter_engine, 'limits', Limits(max_nodes=100000)):
+            response = self.app.post('/api/convert', data={
+                'source_format': 'yaml',
+                'target_format': 'json',
+                'text_data': ALIAS_BOMB,
+            })
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(json.loads(response.data)['limit'], NODES)
+
+    def test_incremental_limit_response(self):
+        """Тест: правка, превышающая ограничение, - ответ 422"""
+        with mock.patch.object(app_module.converter_engine, 'limits', Limits(max_nodes=100000)):
+            response = self.app.post('/api/convert', data={
+                'source_format': 'yaml',
+                'target_format': 'json',
+                'text_data': 'a: 1\n',
+                'incremental': '1',
+            })
+            digest = json.loads(response.data)['content_hash']
+            response = self.app.post('/api/convert', data={
+                'target_format': 'json',
+                'base_hash': digest,
+                'diff': json.dumps([{'start': 0, 'end': 5, 'text': ALIAS_BOMB}]),
+            })
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(json.loads(response.data)['limit'], NODES)
+
+
+if __name__ == '__main__':
+    unittest.main()
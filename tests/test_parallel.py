@@ -0,0 +1,175 @@
+"""
+Тесты для параллельного разбора CSV
+"""
+import unittest
+import io
+import json
+import os
+import pickle
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from converters import parallel
+from converters.csv_converter import CSVConverter
+from converters.json_converter import JSONConverter
+from converters.parallel import split_file, split_array
+from converters.pipeline import Pipeline
+
+
+ROWS = ['id,name,note'] + [f'{i},name{i},"line {i}\nwith ""quotes"""' for i in range(200)]
+CSV_BYTES = ('\n'.join(ROWS) + '\n').encode('utf-8')
+
+
+def write_temp(data: bytes) -> str:
+    with tempfile.NamedTemporaryFile(suffix='.csv', delete=False) as f:
+        f.write(data)
+    return f.name
+
+
+class TestSplitFile(unittest.TestCase):
+    """Тесты деления CSV файла на диапазоны"""
+
+    def setUp(self):
+        self.path = write_temp(CSV_BYTES)
+        self.addCleanup(os.remove, self.path)
+
+    def test_ranges_cover_data_on_record_boundaries(self):
+        """Тест: диапазоны покрывают файл и не режут поля в кавычках"""
+        for block_size in (7, 64, 1024 * 1024):
+            with self.subTest(block_size=block_size), \
+                    mock.patch.object(parallel, 'SCAN_BLOCK_SIZE', block_size):
+                header_end, ranges = split_file(self.path, 7)
+                self.assertEqual(CSV_BYTES[:header_end], b'id,name,note\n')
+                self.assertGreater(len(ranges), 5)
+                self.assertEqual(ranges[0][0], header_end)
+                self.assertEqual(ranges[-1][1], len(CSV_BYTES))
+                for (_, end), (start, _) in zip(ranges, ranges[1:]):
+                    self.assertEqual(end, start)
+                for start, end in ranges:
+                    chunk = CSV_BYTES[start:end]
+                    self.assertEqual(chunk.count(b'"') % 2, 0)
+                    self.assertTrue(chunk.split(b',')[0].isdigit())
+
+    def test_header_only(self):
+        """Тест файла без данных"""
+        path = write_temp(b'a,b\n')
+        self.addCleanup(os.remove, path)
+        self.assertEqual(split_file(path, 4), (4, []))
+
+
+class TestParallelCSV(unittest.TestCase):
+    """Тесты разбора CSV в пуле процессов"""
+
+    def setUp(self):
+        self.converter = CSVConverter(workers=2)
+        self.converter.PARALLEL_THRESHOLD = 1
+
+    def test_parse_matches_serial(self):
+        """Тест: результат совпадает с разбором в одном процессе"""
+        self.assertEqual(self.converter.parse(io.BytesIO(CSV_BYTES)),
+                         CSVConverter().parse(CSV_BYTES))
+
+    def test_column_types_match_serial(self):
+        """Тест: тип колонки один для всех диапазонов, как при разборе целиком"""
+        rows = ['i,f,s,b,n']
+        rows += [f'{k},{k},{k},True,{k}' for k in range(100)]
+        rows += [f'{k},{k}.5,x{k},,{k}' for k in range(100)]
+        data = ('\n'.join(rows) + '\n').encode('utf-8')
+        path = write_temp(data)
+        self.addCleanup(os.remove, path)
+        header_end, ranges = split_file(path, 2)
+        # Строки второй половины попадают в другой диапазон
+        self.assertEqual(len(ranges), 2)
+        self.assertLess(ranges[0][1], data.index(b'x0'))
+        self.assertEqual(json.dumps(self.converter.parse(data)),
+                         json.dumps(CSVConverter().parse(data)))
+
+    def test_input_not_read_into_memory(self):
+        """Тест: поток копируется во временный файл блоками и удаляется после разбора"""
+        stream = io.BytesIO(CSV_BYTES)
+        self.converter.COPY_BLOCK_SIZE = 100
+        reads = []
+        read = stream.read
+        with mock.patch.object(stream, 'read', side_effect=lambda *a: reads.append(a) or read(*a)), \
+                mock.patch.object(parallel, 'read_csv_parallel',
+                                  wraps=parallel.read_csv_parallel) as read_csv:
+            self.assertEqual(self.converter.parse(stream), CSVConverter().parse(CSV_BYTES))
+        self.assertTrue(reads and all(a and a[0] <= 100 for a in reads))
+        self.assertFalse(os.path.exists(read_csv.call_args[0][0]))
+
+    def test_iter_records_ordered(self):
+        """Тест: потоковый разбор идет в пуле, по порядку и с временным файлом"""
+        with mock.patch.object(parallel, 'iter_frames', wraps=parallel.iter_frames) as frames:
+            records = list(self.converter.iter_records(io.BytesIO(CSV_BYTES)))
+        self.assertEqual(records, list(CSVConverter(workers=1).iter_records(CSV_BYTES)))
+        self.assertFalse(os.path.exists(frames.call_args[0][0]))
+
+    def test_iter_frames_window(self):
+        """Тест: в работе не больше WINDOW_PER_WORKER диапазонов на процесс"""
+        path = write_temp(CSV_BYTES)
+        self.addCleanup(os.remove, path)
+        submitted = []
+        executor = ThreadPoolExecutor(max_workers=2)
+        self.addCleanup(executor.shutdown)
+
+        def submit(*args):
+            submitted.append(args)
+            return executor.submit(*args)
+
+        fake = mock.Mock(submit=submit)
+        with mock.patch.object(parallel, 'get_executor', return_value=fake), \
+                mock.patch.object(parallel, 'MIN_CHUNK_SIZE', 1):
+            frames = parallel.iter_frames(path, workers=2)
+            first = next(frames)
+            self.assertEqual(len(submitted), 2 * parallel.WINDOW_PER_WORKER)
+            ids = list(first['id']) + [i for frame in frames for i in frame['id']]
+        self.assertGreater(len(submitted), 2 * parallel.WINDOW_PER_WORKER)
+        self.assertEqual(ids, list(range(200)))
+
+    def test_iter_records_with_pushdown(self):
+        """Тест потокового разбора с выбором колонок и фильтром"""
+        columns, record_filter, _ = Pipeline.from_spec([
+            {'filter': {'field': 'id', 'op': 'ge', 'value': 195}},
+            {'select': ['id']},
+        ]).pushdown()
+        records = list(self.converter.iter_records(CSV_BYTES, columns, record_filter))
+        self.assertEqual(records, [{'id': i} for i in range(195, 200)])
+
+    def test_condition_pickle(self):
+        """Тест передачи условия фильтра в другой процесс"""
+        pipeline = Pipeline.from_spec([{'filter': {'field': 'a', 'op': 'in', 'value': [1]}}])
+        condition = pickle.loads(pickle.dumps(pipeline.steps[0][1].conditions[0]))
+        self.assertTrue(condition.test({'a': 1}))
+
+
+RECORDS = [{'id': i, 'text': 'a\\"],{' if i % 5 == 0 else 'b', 'items': [{'k': i}, {'k': i + 1}]}
+           for i in range(300)]
+JSON_TEXT = json.dumps(RECORDS)
+
+
+class TestParallelJSON(unittest.TestCase):
+    """Тесты разбора JSON массивов по частям"""
+
+    def test_split_array_on_element_boundaries(self):
+        """Тест: каждый диапазон - список целых элементов"""
+        spans = split_array(JSON_TEXT, 8)
+        self.assertGreater(len(spans), 1)
+        elements = []
+        for start, end in spans:
+            elements.extend(json.loads('[' + JSON_TEXT[start:end] + ']'))
+        self.assertEqual(elements, RECORDS)
+
+    def test_split_array_not_array(self):
+        """Тест документа, который не является массивом"""
+        self.assertIsNone(split_array('{"a": [1, 2]}', 4))
+
+    def test_parse_matches_serial(self):
+        """Тест: результат совпадает с json.loads"""
+        converter = JSONConverter(workers=2)
+        converter.PARALLEL_THRESHOLD = 1
+        self.assertEqual(converter.parse(JSON_TEXT), RECORDS)
+        self.assertEqual(converter.parse('[{"a": "}, {"}]'), [{'a': '}, {'}])
+
+
+if __name__ == '__main__':
+    unittest.main()
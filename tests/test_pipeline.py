@@ -0,0 +1,129 @@
+"""
+Тесты для конвейера обработки записей
+"""
+import unittest
+import json
+from unittest import mock
+from converters.base import ConversionError
+from converters.csv_converter import CSVConverter
+from converters.engine import ConversionEngine
+from converters.pipeline import Pipeline, get_path, flatten_record
+
+
+RECORDS = [
+    {'id': 1, 'name': 'Alice', 'age': 30, 'address': {'city': 'Moscow', 'zip': '101000'}},
+    {'id': 2, 'name': 'Bob', 'age': 17, 'address': {'city': 'Kazan'}},
+    {'id': 3, 'name': 'Carol', 'age': None, 'address': None},
+]
+
+CSV_DATA = 'id,name,age,city\n1,Alice,30,Moscow\n2,Bob,17,Kazan\n3,Carol,,Perm\n'
+
+
+class TestPipeline(unittest.TestCase):
+    """Тесты шагов конвейера"""
+
+    def run_pipeline(self, spec, records=RECORDS):
+        return list(Pipeline.from_spec(spec).apply(records))
+
+    def test_get_path(self):
+        """Тест получения значения по пути"""
+        self.assertEqual(get_path(RECORDS[0], 'address.city'), 'Moscow')
+        self.assertEqual(get_path({'a.b': 1}, 'a.b'), 1)
+        self.assertIsNone(get_path(RECORDS[2], 'address.city'))
+
+    def test_select_and_rename(self):
+        """Тест выбора и переименования полей"""
+        result = self.run_pipeline([{'select': ['id', 'address.city']},
+                                    {'rename': {'address.city': 'city'}}])
+        self.assertEqual(result[0], {'id': 1, 'city': 'Moscow'})
+
+    def test_filter_operations(self):
+        """Тест операций фильтра"""
+        self.assertEqual([r['id'] for r in self.run_pipeline(
+            [{'filter': {'field': 'age', 'op': 'ge', 'value': 18}}])], [1])
+        self.assertEqual([r['id'] for r in self.run_pipeline(
+            [{'filter': {'field': 'age', 'op': 'exists', 'value': False}}])], [3])
+        self.assertEqual([r['id'] for r in self.run_pipeline(
+            [{'filter': [{'field': 'name', 'op': 'in', 'value': ['Bob', 'Carol']},
+                         {'field': 'address.city', 'op': 'contains', 'value': 'az'}]}])], [2])
+
+    def test_flatten_and_limit(self):
+        """Тест разворачивания вложенных полей и ограничения числа записей"""
+        result = self.run_pipeline([{'flatten': ['address']}, {'limit': 1}])
+        self.assertEqual(result, [{'id': 1, 'name': 'Alice', 'age': 30,
+                                   'address.city': 'Moscow', 'address.zip': '101000'}])
+        self.assertEqual(flatten_record({'a': {'b': {'c': 1}}}, separator='_'), {'a_b_c': 1})
+
+    def test_limit_is_lazy(self):
+        """Тест: limit прекращает чтение источника"""
+        consumed = []
+
+        def records():
+            for i in range(100):
+                consumed.append(i)
+                yield {'id': i}
+
+        self.run_pipeline([{'limit': 3}], records())
+        self.assertEqual(len(consumed), 3)
+
+    def test_invalid_spec(self):
+        """Тест некорректного описания"""
+        for spec in ({'select': []}, [{'unknown': 1}], [{'limit': -1}],
+                     [{'filter': {'field': 'a', 'op': 'like'}}]):
+            with self.assertRaises(ConversionError):
+                Pipeline.from_spec(spec)
+
+    def test_pushdown_split(self):
+        """Тест разделения конвейера для потокового парсера"""
+        pipeline = Pipeline.from_spec([
+            {'filter': {'field': 'age', 'op': 'gt', 'value': 18}},
+            {'select': ['id', 'name']},
+            {'limit': 10},
+            {'filter': {'field': 'id', 'op': 'eq', 'value': 1}},
+        ])
+        columns, record_filter, rest = pipeline.pushdown()
+        self.assertEqual(columns, {'id', 'name', 'age'})
+        self.assertEqual(record_filter.fields, {'age'})
+        self.assertEqual([name for name, _ in rest.steps], ['select', 'limit', 'filter'])
+
+
+class TestPipelinePushdown(unittest.TestCase):
+    """Тесты выполнения конвейера внутри потокового разбора CSV"""
+
+    def setUp(self):
+        self.engine = ConversionEngine()
+
+    def test_csv_pushdown(self):
+        """Тест: парсер читает только нужные колонки и строки"""
+        converter = self.engine.get_converter('csv')
+        spec = [{'filter': {'field': 'age', 'op': 'lt', 'value': 20}}, {'select': ['name']}]
+        with mock.patch.object(CSVConverter, 'iter_records', autospec=True,
+                               side_effect=CSVConverter.iter_records) as iter_records:
+            result = self.engine.convert(CSV_DATA, 'csv', 'json', pipeline=spec)
+        self.assertEqual(json.loads(result), [{'name': 'Bob'}])
+        kwargs = iter_records.call_args[1]
+        self.assertEqual(kwargs['columns'], {'name', 'age'})
+        self.assertIsNotNone(kwargs['record_filter'])
+
+    def test_csv_filter_mixed_types(self):
+        """Тест фильтра по колонке со смешанными типами"""
+        csv_data = 'v\n1\nx\n3\n'
+        spec = [{'filter': {'field': 'v', 'op': 'gt', 'value': '2'}}]
+        result = self.engine.convert(csv_data, 'csv', 'json', pipeline=spec)
+        self.assertEqual(json.loads(result), [{'v': 'x'}, {'v': '3'}])
+
+    def test_same_format_with_pipeline(self):
+        """Тест: конвейер применяется и при совпадении форматов"""
+        result = self.engine.convert('[{"a": 1, "b": 2}]', 'json', 'json', pipeline=[{'select': ['a']}])
+        self.assertEqual(json.loads(result), [{'a': 1}])
+
+    def test_preview_with_pipeline(self):
+        """Тест предпросмотра с конвейером"""
+        result, truncated = self.engine.convert_preview(
+            CSV_DATA, 'csv', 'json', max_records=1, pipeline=[{'select': ['id']}])
+        self.assertTrue(truncated)
+        self.assertEqual(json.loads(result), [{'id': 1}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+"""
+Тесты для профилирования запросов
+"""
+import unittest
+import json
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+from converters.profiling import (Profiler, ProfilingMiddleware, to_speedscope, annotate,
+                                  CPROFILE, TOKEN_HEADER)
+import app as app_module
+
+
+def busy(seconds):
+    """Нагрузка для профилировщика"""
+    end = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < end:
+        total += sum(range(100))
+    return total
+
+
+class TestProfiler(unittest.TestCase):
+    """Тесты профилировщика"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_sampling_session(self):
+        """Тест: статистический профиль записывается в .collapsed и speedscope"""
+        profiler = Profiler(self.directory, interval=0.001)
+        session = profiler.start('test', 'header')
+        annotate(source_format='csv', target_format='json')
+        busy(0.1)
+        profile_id = profiler.stop(session)
+
+        meta = profiler.list_profiles()[0]
+        self.assertEqual(meta['id'], profile_id)
+        self.assertEqual(meta['source_format'], 'csv')
+        self.assertGreater(meta['samples'], 0)
+        with open(os.path.join(self.directory, profile_id + '.collapsed')) as f:
+            self.assertIn('busy (test_profiling.py', f.read())
+        with open(os.path.join(self.directory, profile_id + '.speedscope.json')) as f:
+            self.assertEqual(json.load(f)['profiles'][0]['type'], 'sampled')
+
+    def test_cprofile_session(self):
+        """Тест режима cProfile"""
+        profiler = Profiler(self.directory, mode=CPROFILE)
+        session = profiler.start('test', 'sample')
+        busy(0.01)
+        profile_id = profiler.stop(session)
+        self.assertTrue(os.path.exists(os.path.join(self.directory, profile_id + '.prof')))
+
+    def test_speedscope(self):
+        """Тест преобразования свернутых стеков"""
+        document = to_speedscope({'a (x.py:1);b (x.py:5)': 3, 'a (x.py:1)': 1}, 'p', 0.01)
+        frames = document['shared']['frames']
+        self.assertEqual(frames[1], {'name': 'b', 'file': 'x.py', 'line': 5})
+        self.assertEqual(document['profiles'][0]['samples'], [[0, 1], [0]])
+        self.assertEqual(document['profiles'][0]['weights'], [30.0, 10.0])
+
+
+class TestProfilingMiddleware(unittest.TestCase):
+    """Тесты выбора запросов для профилирования"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def call(self, profiler, headers=None, duration=0.0):
+        def application(environ, start_response):
+            busy(duration)
+            start_response('200 OK', [])
+            return [b'ok']
+
+        environ = {'REQUEST_METHOD': 'POST', 'PATH_INFO': '/api/convert'}
+        environ.update(headers or {})
+        body = ProfilingMiddleware(application, profiler)(environ, lambda *args: None)
+        return b''.join(body)
+
+    def test_disabled(self):
+        """Тест: без настроек профили не пишутся"""
+        profiler = Profiler(self.directory)
+        self.assertEqual(self.call(profiler, {'HTTP_X_PROFILE_TOKEN': ''}), b'ok')
+        self.assertEqual(profiler.list_profiles(), [])
+
+    def test_token(self):
+        """Тест: профиль по заголовку только с верным токеном"""
+        profiler = Profiler(self.directory, token='secret')
+        self.call(profiler, {'HTTP_X_PROFILE_TOKEN': 'wrong'})
+        self.assertEqual(profiler.list_profiles(), [])
+        self.call(profiler, {'HTTP_X_PROFILE_TOKEN': 'secret'})
+        profiles = profiler.list_profiles()
+        self.assertEqual([(p['trigger'], p['label']) for p in profiles],
+                         [('header', 'POST /api/convert')])
+
+    def test_authorized(self):
+        """Тест: токен сравнивается целиком, без токена доступа нет"""
+        profiler = Profiler(self.directory, token='secret')
+        self.assertTrue(profiler.authorized('secret'))
+        for token in (None, '', 'secre', 'secret2', 'sécret'):
+            self.assertFalse(profiler.authorized(token))
+        self.assertFalse(Profiler(self.directory).authorized(''))
+
+    def test_default_directory(self):
+        """Тест: по умолчанию профили пишутся вне каталога приложения"""
+        with mock.patch.dict(os.environ, {'PROFILE_DIR': ''}):
+            directory = Profiler.from_env().directory
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.assertFalse(os.path.abspath(directory).startswith(root + os.sep))
+        with mock.patch.dict(os.environ, {'PROFILE_DIR': self.directory}):
+            self.assertEqual(Profiler.from_env().directory, self.directory)
+
+    def test_latency_threshold(self):
+        """Тест: медленный запрос профилируется после порога, быстрый - нет"""
+        profiler = Profiler(self.directory, latency_threshold=0.05, interval=0.001)
+        self.call(profiler)
+        self.assertEqual(profiler.list_profiles(), [])
+        self.call(profiler, duration=0.3)
+        profiles = profiler.list_profiles()
+        self.assertEqual(len(profiles), 1)
+        self.assertEqual(profiles[0]['trigger'], 'latency')
+        self.assertGreater(profiles[0]['samples'], 0)
+
+
+class TestProfilesAPI(unittest.TestCase):
+    """Тесты /api/profiles"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.app = app_module.app.test_client()
+        self.profiler = app_module.profiler
+        self.saved = (self.profiler.token, self.profiler.directory)
+        self.profiler.token, self.profiler.directory = 'secret', self.directory
+
+    def tearDown(self):
+        self.profiler.token, self.profiler.directory = self.saved
+        shutil.rmtree(self.directory)
+
+    def test_profile_request(self):
+        """Тест: запрос с токеном профилируется, профиль доступен по API"""
+        self.assertEqual(self.app.get('/api/profiles').status_code, 403)
+        response = self.app.post('/api/convert', data={
+            'source_format': 'json', 'target_format': 'yaml', 'text_data': '{"a": 1}'
+        }, headers={TOKEN_HEADER: 'secret'})
+        self.assertEqual(response.status_code, 200)
+        # Профиль записывается после отправки тела ответа
+        response.get_data()
+        response.close()
+
+        profiles = json.loads(self.app.get('/api/profiles', headers={TOKEN_HEADER: 'secret'}).data)
+        profile = profiles['profiles'][0]
+        self.assertEqual(profile['target_format'], 'yaml')
+        response = self.app.get(f"/api/profiles/{profile['files'][0]}",
+                                headers={TOKEN_HEADER: 'secret'})
+        self.assertEqual(response.status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
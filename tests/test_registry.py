@@ -0,0 +1,94 @@
+"""
+Тесты для реестра конвертеров
+"""
+import unittest
+import subprocess
+import sys
+import os
+from unittest import mock
+from converters.base import BaseConverter, ConversionError
+from converters.registry import ConverterRegistry, create_default_registry
+from converters.engine import ConversionEngine
+
+
+class DummyConverter(BaseConverter):
+    """Простейший конвертер для тестов"""
+
+    def parse(self, data):
+        return {'dummy': data}
+
+    def serialize(self, data):
+        return 'dummy'
+
+    def validate(self, data):
+        return data == 'dummy'
+
+
+class TestConverterRegistry(unittest.TestCase):
+    """Тесты для реестра конвертеров"""
+
+    def setUp(self):
+        self.registry = create_default_registry(load_entry_points=False)
+
+    def test_names_do_not_load_converters(self):
+        """Тест: перечисление форматов не создает конвертеры"""
+        names = self.registry.names()
+        self.assertEqual(names, ['json', 'jsonl', 'ndjson', 'xml', 'csv', 'yaml', 'yml', 'toml', 'xlsx', 'sqlite'])
+        for name in names:
+            self.assertFalse(self.registry.is_loaded(name))
+
+    def test_alias_shares_instance(self):
+        """Тест: псевдоним yml использует тот же экземпляр, что и yaml"""
+        self.assertIs(self.registry.get('yml'), self.registry.get('yaml'))
+        self.assertEqual(self.registry.resolve('YML'), 'yaml')
+
+    def test_unknown_format(self):
+        """Тест обращения к незарегистрированному формату"""
+        self.assertNotIn('unknown', self.registry)
+        with self.assertRaises(ConversionError):
+            self.registry.get('unknown')
+
+    def test_register_custom_factory(self):
+        """Тест регистрации стороннего формата"""
+        self.registry.register('dummy', DummyConverter, aliases=('dmy',))
+        self.assertIn('dummy', self.registry.names())
+        self.assertIsInstance(self.registry.get('dmy'), DummyConverter)
+
+    def test_entry_point_plugins(self):
+        """Тест подключения формата через entry points"""
+        entry_point = mock.Mock()
+        entry_point.name = 'dummy'
+        entry_point.load.return_value = DummyConverter
+        entry_points = mock.Mock()
+        entry_points.select.return_value = [entry_point]
+
+        registry = ConverterRegistry()
+        with mock.patch('importlib.metadata.entry_points', return_value=entry_points):
+            self.assertIn('dummy', registry.names())
+        # Плагин импортируется только при первом использовании
+        entry_point.load.assert_not_called()
+        self.assertIsInstance(registry.get('dummy'), DummyConverter)
+        entry_point.load.assert_called_once()
+
+    def test_engine_with_custom_registry(self):
+        """Тест движка с собственным реестром"""
+        self.registry.register('dummy', DummyConverter)
+        engine = ConversionEngine(self.registry)
+        self.assertEqual(engine.detect_format('dummy', 'data.dummy'), 'dummy')
+        self.assertEqual(engine.convert('{"a": 1}', 'json', 'dummy'), 'dummy')
+
+    def test_cold_start_does_not_import_heavy_modules(self):
+        """Тест: создание движка и список форматов не импортируют pandas и yaml"""
+        code = (
+            "import sys\n"
+            "from converters.engine import ConversionEngine\n"
+            "ConversionEngine().get_supported_formats()\n"
+            "print(','.join(m for m in ('pandas', 'yaml', 'toml', 'xmltodict') if m in sys.modules))\n"
+        )
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.check_output([sys.executable, '-c', code], cwd=root, text=True)
+        self.assertEqual(output.strip(), '')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+"""
+Тесты для проверки по JSON Schema и вывода схемы
+"""
+import unittest
+import tempfile
+from converters.base import ConversionError
+from converters.engine import ConversionEngine
+from converters.schema import (compile_schema, infer_schema, validate_records,
+                               schema_fingerprint, SchemaStore)
+
+
+RECORD_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'name': {'type': 'string'},
+        'age': {'type': 'integer', 'minimum': 0},
+    },
+    'required': ['name', 'age'],
+}
+
+
+class TestSchemaValidation(unittest.TestCase):
+    """Тесты проверки записей по схеме"""
+
+    def test_compiled_validator_is_cached(self):
+        """Тест: одинаковые схемы дают один скомпилированный валидатор"""
+        reordered = dict(reversed(list(RECORD_SCHEMA.items())))
+        self.assertEqual(schema_fingerprint(RECORD_SCHEMA), schema_fingerprint(reordered))
+        self.assertIs(compile_schema(RECORD_SCHEMA), compile_schema(reordered))
+
+    def test_invalid_schema(self):
+        """Тест некорректной схемы"""
+        with self.assertRaises(ConversionError):
+            compile_schema({'type': 'no-such-type'})
+
+    def test_error_positions(self):
+        """Тест: ошибки содержат номер записи и путь"""
+        records = [{'name': 'Alice', 'age': 30}, {'name': 'Bob', 'age': -1}, {'age': 5}]
+        report = validate_records(iter(records), {'type': 'array', 'items': RECORD_SCHEMA})
+        self.assertFalse(report['valid'])
+        self.assertEqual(report['records'], 3)
+        self.assertEqual([(e['record'], e['path']) for e in report['errors']],
+                         [(1, '/age'), (2, '')])
+
+    def test_refs_to_root_definitions(self):
+        """Тест: ссылки из items разрешаются от корня схемы"""
+        schema = {'type': 'array', 'items': {'$ref': '#/$defs/record'},
+                  '$defs': {'record': RECORD_SCHEMA}}
+        report = validate_records(iter([{'name': 'Alice', 'age': 30}, {'age': 5}]), schema)
+        self.assertEqual([(e['record'], e['path']) for e in report['errors']], [(1, '')])
+        with self.assertRaises(ConversionError):
+            validate_records(iter([{}]), {'type': 'array', 'items': {'$ref': '#/$defs/missing'}})
+
+    def test_array_keywords(self):
+        """Тест: ограничения массива проверяются по всему потоку записей"""
+        records = [{'name': 'Alice', 'age': 30}, {'name': 'Bob', 'age': 5},
+                   {'name': 'Alice', 'age': 30.0}]
+        for keywords, expected in (({'minItems': 5}, [None]),
+                                   ({'maxItems': 2}, [None]),
+                                   ({'minItems': 3, 'maxItems': 3}, []),
+                                   ({'uniqueItems': True}, [2]),
+                                   ({'contains': {'properties': {'age': {'maximum': 10}}}}, []),
+                                   ({'contains': {'properties': {'age': {'maximum': 1}}}}, [None]),
+                                   ({'contains': {'properties': {'name': {'const': 'Alice'}}},
+                                     'maxContains': 1}, [None]),
+                                   ({'prefixItems': [{'properties': {'age': {'minimum': 50}}}]}, [0])):
+            with self.subTest(keywords=keywords):
+                schema = dict({'type': 'array', 'items': RECORD_SCHEMA}, **keywords)
+                report = validate_records(iter(records), schema)
+                self.assertEqual([e['record'] for e in report['errors']], expected)
+
+    def test_unsupported_array_keyword(self):
+        """Тест: ключевое слово массива, которое нельзя проверить потоком, отклоняется"""
+        with self.assertRaises(ConversionError):
+            validate_records(iter([]), {'type': 'array', 'items': RECORD_SCHEMA,
+                                        'unevaluatedItems': False})
+
+    def test_max_errors_stops_stream(self):
+        """Тест: после max_errors ошибок поток дальше не читается"""
+        consumed = []
+
+        def records():
+            for i in range(100):
+                consumed.append(i)
+                yield {'name': i, 'age': 1}
+
+        report = validate_records(records(), RECORD_SCHEMA, max_errors=2)
+        self.assertTrue(report['truncated'])
+        self.assertEqual(len(consumed), 2)
+
+
+class TestSchemaInference(unittest.TestCase):
+    """Тесты вывода схемы"""
+
+    def test_infer_types_and_required(self):
+        """Тест вывода типов и обязательных полей"""
+        records = [{'id': 1, 'price': 1.5, 'tags': ['a']},
+                   {'id': 2, 'price': 2, 'note': None}]
+        schema = infer_schema(records)
+        items = schema['items']
+        self.assertEqual(schema['type'], 'array')
+        self.assertEqual(items['properties']['id'], {'type': 'integer'})
+        self.assertEqual(items['properties']['price'], {'type': 'number'})
+        self.assertEqual(items['properties']['tags']['items'], {'type': 'string'})
+        self.assertEqual(items['required'], ['id', 'price'])
+        # Выведенная схема должна принимать исходные данные
+        self.assertTrue(validate_records(records, schema)['valid'])
+
+    def test_sample_size(self):
+        """Тест ограничения размера образца"""
+        records = [{'a': 1}] * 5 + [{'a': 'x'}]
+        schema = infer_schema(records, sample_size=5)
+        self.assertEqual(schema['items']['properties']['a'], {'type': 'integer'})
+
+
+class TestEngineSchema(unittest.TestCase):
+    """Тесты проверки по схеме через движок"""
+
+    def setUp(self):
+        self.engine = ConversionEngine()
+
+    def test_validate_csv_stream(self):
+        """Тест проверки CSV по схеме"""
+        csv_data = 'name,age\nAlice,30\nBob,x\n'
+        report = self.engine.validate_schema(csv_data, 'csv', RECORD_SCHEMA)
+        self.assertFalse(report['valid'])
+        self.assertEqual(report['errors'][0]['path'], '/age')
+
+    def test_parse_error_in_report(self):
+        """Тест: синтаксическая ошибка попадает в отчет"""
+        report = self.engine.validate_schema('{"name": ', 'json', RECORD_SCHEMA)
+        self.assertFalse(report['valid'])
+        self.assertEqual(report['errors'][0]['record'], 0)
+
+    def test_infer_schema_json(self):
+        """Тест вывода схемы для JSON"""
+        schema = self.engine.infer_schema('[{"a": 1}, {"a": 2, "b": "x"}]', 'json')
+        self.assertEqual(schema['items']['required'], ['a'])
+
+
+class TestSchemaStore(unittest.TestCase):
+    """Тесты хранилища схем"""
+
+    def test_save_and_load(self):
+        """Тест сохранения и загрузки схемы"""
+        with tempfile.TemporaryDirectory() as directory:
+            store = SchemaStore(directory)
+            store.save('users', RECORD_SCHEMA)
+            self.assertEqual(store.names(), ['users'])
+            self.assertEqual(store.load('users'), RECORD_SCHEMA)
+            with self.assertRaises(ConversionError):
+                store.load('../users')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+"""
+Тесты для сортировки и удаления дубликатов
+"""
+import unittest
+import os
+import random
+import shutil
+import tempfile
+from converters.base import ConversionError
+from converters.engine import ConversionEngine
+from converters.pipeline import Pipeline
+from converters.sorting import SortSpec, sort_records
+
+
+def make_records(count):
+    generator = random.Random(42)
+    return [{'id': generator.randint(0, count // 4), 'seq': i, 'user': {'name': f'u{i % 7}'}}
+            for i in range(count)]
+
+
+class TestSortRecords(unittest.TestCase):
+    """Тесты сортировки в памяти и с внешними сериями"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_in_memory(self):
+        """Тест устойчивой сортировки в памяти"""
+        records = make_records(200)
+        result = list(sort_records(iter(records), SortSpec(['id'])))
+        self.assertEqual(result, sorted(records, key=lambda r: r['id']))
+
+    def test_external(self):
+        """Тест: при малом бюджете серии сливаются с тем же результатом"""
+        records = make_records(3000)
+        spec = SortSpec(['user.name', 'id'], memory_budget=20000)
+        result = list(sort_records(iter(records), spec, self.directory))
+        self.assertEqual(result, sorted(records, key=lambda r: (r['user']['name'], r['id'])))
+        # Временные файлы удалены
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_reverse_unique(self):
+        """Тест: по убыванию, из дубликатов остается первая запись"""
+        records = make_records(1000)
+        spec = SortSpec(['id'], reverse=True, unique=1, memory_budget=10000)
+        result = list(sort_records(iter(records), spec, self.directory))
+        ids = [r['id'] for r in result]
+        self.assertEqual(ids, sorted(set(r['id'] for r in records), reverse=True))
+        first = {}
+        for record in records:
+            first.setdefault(record['id'], record['seq'])
+        self.assertTrue(all(r['seq'] == first[r['id']] for r in result))
+
+    def test_mixed_and_missing_values(self):
+        """Тест: пустые значения идут первыми, типы не конфликтуют"""
+        records = [{'k': 'b'}, {'k': 2}, {}, {'k': None}, {'k': 1.5}]
+        result = list(sort_records(iter(records), SortSpec(['k'])))
+        self.assertEqual(result, [{}, {'k': None}, {'k': 1.5}, {'k': 2}, {'k': 'b'}])
+
+
+class TestSortPipeline(unittest.TestCase):
+    """Тесты шагов sort и unique"""
+
+    def test_spec(self):
+        """Тест разбора описания шагов"""
+        pipeline = Pipeline.from_spec([{'unique': ['id']}])
+        name, spec = pipeline.steps[0]
+        self.assertEqual((name, spec.by, spec.unique), ('sort', ['id'], 1))
+        spec = SortSpec.from_spec({'by': ['a', 'b'], 'unique': ['a'], 'reverse': True})
+        self.assertEqual((spec.unique, spec.reverse), (1, True))
+
+    def test_invalid_spec(self):
+        """Тест некорректных описаний"""
+        for step in ({'sort': {}}, {'sort': {'by': ['a', 'b'], 'unique': ['b']}},
+                     {'sort': {'by': 'a', 'memory_budget': 0}}):
+            with self.assertRaises(ConversionError):
+                Pipeline.from_spec([step])
+
+    def test_stream_csv(self):
+        """Тест: потоковая конвертация CSV с сортировкой и удалением дубликатов"""
+        rows = [f'{i % 50},name{i}' for i in range(500)]
+        data = 'id,name\n' + '\n'.join(rows) + '\n'
+        pipeline = [{'sort': {'by': ['id'], 'unique': True, 'memory_budget': 4096}}]
+        engine = ConversionEngine()
+        _, chunks = engine.convert_stream(data, 'csv', 'csv', pipeline=pipeline)
+        lines = ''.join(chunks).splitlines()
+        self.assertEqual(lines[0], 'id,name')
+        self.assertEqual(lines[1:], [f'{i},name{i}' for i in range(50)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,164 @@
+"""
+Тесты для SQLite конвертера
+"""
+import unittest
+import io
+import json
+import os
+import sqlite3
+import tempfile
+
+from app import app
+from converters.base import ConversionError
+from converters.engine import ConversionEngine
+from converters.sqlite_converter import SQLiteConverter
+
+
+def make_database(script):
+    """Файл базы SQLite, созданной SQL скриптом"""
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    try:
+        connection = sqlite3.connect(path)
+        connection.executescript(script)
+        connection.close()
+        with open(path, 'rb') as f:
+            return f.read()
+    finally:
+        os.unlink(path)
+
+
+class TestSQLiteConverter(unittest.TestCase):
+    """Тесты для SQLite конвертера"""
+
+    def setUp(self):
+        self.converter = SQLiteConverter()
+        self.database = make_database('''
+            CREATE TABLE users (name TEXT, age INTEGER);
+            INSERT INTO users VALUES ('Анна', 30), ('Олег', 25);
+            CREATE TABLE cities (city TEXT, photo BLOB);
+            INSERT INTO cities VALUES ('Москва', x'0102');
+        ''')
+
+    def test_round_trip(self):
+        """Тест: записи сохраняются в таблицу и читаются обратно"""
+        records = [{'name': 'Анна', 'age': 30, 'score': 1.5}, {'name': 'Олег', 'age': None, 'score': 2}]
+        data = self.converter.serialize(records)
+        self.assertTrue(self.converter.validate(data))
+        self.assertEqual(self.converter.parse(data), records)
+
+    def test_inferred_column_types(self):
+        """Тест: типы колонок выводятся по значениям, смешанная колонка - без типа"""
+        data = self.converter.serialize([
+            {'i': 1, 'f': 1, 's': 'a', 'm': 1, 'nested': {'x': True}},
+            {'i': 2, 'f': 2.5, 's': 'b', 'm': 'два', 'nested': {'x': False}},
+        ])
+        fd, path = tempfile.mkstemp(suffix='.db')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        try:
+            connection = sqlite3.connect(path)
+            columns = {row[1]: row[2] for row in connection.execute('PRAGMA table_info(data)')}
+            connection.close()
+        finally:
+            os.unlink(path)
+        self.assertEqual(columns, {'i': 'INTEGER', 'f': 'REAL', 's': 'TEXT', 'm': '',
+                                   'nested.x': 'INTEGER'})
+
+    def test_new_fields_add_columns(self):
+        """Тест: поля, которые появляются в следующих блоках, добавляются колонками"""
+        self.converter.CHUNK_SIZE = 2
+        data = self.converter.serialize([{'a': 1}, {'a': 2}, {'a': 3, 'b': 'x'}])
+        self.assertEqual(self.converter.parse(data),
+                         [{'a': 1, 'b': None}, {'a': 2, 'b': None}, {'a': 3, 'b': 'x'}])
+
+    def test_multiple_tables(self):
+        """Тест: база с несколькими таблицами - объект {таблица: записи}"""
+        self.assertEqual(self.converter.parse(self.database), {
+            'users': [{'name': 'Анна', 'age': 30}, {'name': 'Олег', 'age': 25}],
+            'cities': [{'city': 'Москва', 'photo': 'AQI='}],
+        })
+        data = self.converter.serialize({'a': [{'x': 1}], 'b': [{'y': 2}]})
+        self.assertEqual(self.converter.parse(data, table='b'), [{'y': 2}])
+
+    def test_table_and_query(self):
+        """Тест: выбор таблицы и запрос SELECT"""
+        self.assertEqual(self.converter.parse(self.database, table='cities')[0]['city'], 'Москва')
+        self.assertEqual(self.converter.parse(self.database, query='SELECT max(age) AS age FROM users'),
+                         [{'age': 30}])
+        with self.assertRaises(ConversionError):
+            self.converter.parse(self.database, table='orders')
+
+    def test_query_is_read_only(self):
+        """Тест: запрос не может менять базу или подключать другие файлы"""
+        for query in ('DELETE FROM users', "ATTACH 'other.db' AS other", 'PRAGMA writable_schema = 1'):
+            with self.assertRaises(ConversionError):
+                self.converter.parse(self.database, query=query)
+
+    def test_iter_records_pushdown(self):
+        """Тест: из таблицы читаются только выбранные колонки"""
+        records = list(self.converter.iter_records(self.database, columns=['age'], table='users'))
+        self.assertEqual(records, [{'age': 30}, {'age': 25}])
+
+    def test_text_input_rejected(self):
+        """Тест: базу нельзя передать текстом"""
+        self.assertFalse(self.converter.validate('SQLite format 3'))
+        with self.assertRaises(ConversionError):
+            self.converter.parse('SELECT 1')
+
+
+class TestSQLiteEngine(unittest.TestCase):
+    """Тесты конвертации SQLite через движок"""
+
+    def setUp(self):
+        self.engine = ConversionEngine()
+
+    def test_csv_to_sqlite_and_back(self):
+        """Тест: CSV загружается в базу и выгружается обратно потоком"""
+        database = self.engine.convert('id,name\n1,a\n2,b\n', 'csv', 'sqlite')
+        self.assertEqual(self.engine.detect_format(database), 'sqlite')
+        _, chunks = self.engine.convert_stream(io.BytesIO(database), 'auto', 'csv')
+        self.assertEqual(''.join(chunks).splitlines(), ['id,name', '1,a', '2,b'])
+
+    def test_query_option(self):
+        """Тест: параметр query передается конвертеру"""
+        database = self.engine.convert('[{"a": 1}, {"a": 2}]', 'json', 'sqlite')
+        result = self.engine.convert(database, 'sqlite', 'jsonl',
+                                     options={'query': 'SELECT a * 10 AS a FROM data WHERE a > 1'})
+        self.assertEqual(result.strip(), '{"a": 20}')
+
+
+class TestSQLiteApi(unittest.TestCase):
+    """Тесты SQLite в API"""
+
+    def setUp(self):
+        self.app = app.test_client()
+
+    def test_database_download(self):
+        """Тест: результат в SQLite отдается файлом .db"""
+        response = self.app.post('/api/convert', data={
+            'source_format': 'json',
+            'target_format': 'sqlite',
+            'text_data': '[{"a": 1}]',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/vnd.sqlite3')
+        self.assertIn('converted.db', response.headers['Content-Disposition'])
+        self.assertEqual(SQLiteConverter().parse(response.data), [{'a': 1}])
+
+    def test_upload_with_table(self):
+        """Тест: загрузка базы и выбор таблицы"""
+        database = make_database('CREATE TABLE t (x); INSERT INTO t VALUES (1); CREATE TABLE u (y);')
+        response = self.app.post('/api/convert', data={
+            'target_format': 'json',
+            'table': 't',
+            'file': (io.BytesIO(database), 'dump.db'),
+        }, content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['source_format'], 'sqlite')
+        self.assertEqual(json.loads(data['result']), [{'x': 1}])
+
+
+if __name__ == '__main__':
+    unittest.main()
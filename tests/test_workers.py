@@ -0,0 +1,103 @@
+"""
+Тесты для пула процессов с разделяемой памятью
+"""
+import unittest
+import json
+from multiprocessing import shared_memory
+from unittest import mock
+from converters.base import ConversionError
+from converters.engine import ConversionEngine
+from converters.workers import WorkerPool, SegmentPool, segment_size, MIN_SEGMENT_SIZE
+
+
+class TestSegmentPool(unittest.TestCase):
+    """Тесты пула сегментов"""
+
+    def setUp(self):
+        self.segments = SegmentPool()
+
+    def tearDown(self):
+        self.segments.close()
+
+    def test_segment_size(self):
+        """Тест округления размера сегмента"""
+        self.assertEqual(segment_size(0), MIN_SEGMENT_SIZE)
+        self.assertEqual(segment_size(MIN_SEGMENT_SIZE + 1), MIN_SEGMENT_SIZE * 2)
+
+    def test_reuse(self):
+        """Тест: освобожденный сегмент выдается повторно"""
+        segment = self.segments.acquire(1000)
+        name = segment.name
+        self.segments.release(segment)
+        self.assertEqual(self.segments.acquire(2000).name, name)
+        self.assertEqual(self.segments.reused, 1)
+
+    def test_idle_limit(self):
+        """Тест: сверх лимита свободные сегменты удаляются"""
+        segments = SegmentPool(max_idle_bytes=0)
+        segment = segments.acquire(10)
+        segments.release(segment)
+        self.assertNotEqual(segments.acquire(10).name, segment.name)
+        segments.close()
+
+
+class TestWorkerPool(unittest.TestCase):
+    """Тесты конвертации в пуле процессов"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.pool = WorkerPool(workers=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.close()
+
+    def test_convert_matches_engine(self):
+        """Тест: результат совпадает с конвертацией в текущем процессе"""
+        data = json.dumps([{'id': i, 'name': f'имя {i}'} for i in range(100)])
+        engine = ConversionEngine()
+        for target in ('csv', 'yaml', 'xml'):
+            self.assertEqual(self.pool.convert(data, 'json', target),
+                             engine.convert(data, 'json', target))
+
+    def test_result_larger_than_segment(self):
+        """Тест: результат больше выделенного сегмента"""
+        data = 'id\n' + '\n'.join(str(i) for i in range(50000)) + '\n'
+        result = json.loads(self.pool.convert(data, 'csv', 'json'))
+        self.assertEqual(len(result), 50000)
+        self.assertEqual(result[-1], {'id': 49999})
+
+    def test_segments_reused(self):
+        """Тест: повторные запросы не создают новых сегментов"""
+        self.pool.convert('{"a": 1}', 'json', 'yaml')
+        created = self.pool.segments.created
+        for _ in range(5):
+            self.pool.convert('{"a": 2}', 'json', 'yaml')
+        self.assertEqual(self.pool.segments.created, created)
+
+    def test_conversion_error(self):
+        """Тест: ошибка в процессе пула возвращается как ConversionError"""
+        with self.assertRaises(ConversionError):
+            self.pool.convert('{"a": ', 'json', 'yaml')
+
+    def test_adopt_failure_releases_once(self):
+        """Тест: ошибка adopt не возвращает сегмент результата в пул дважды"""
+        def failing_adopt(name):
+            segment = shared_memory.SharedMemory(name=name)
+            segment.close()
+            segment.unlink()
+            raise OSError("сегмент недоступен")
+
+        segments = SegmentPool()
+        with WorkerPool(workers=1, segments=segments) as pool:
+            data = 'id\n' + '\n'.join(str(i) for i in range(50000)) + '\n'
+            with mock.patch.object(segments, 'adopt', side_effect=failing_adopt):
+                with self.assertRaises(ConversionError):
+                    pool.convert(data, 'csv', 'json')
+            idle = [segment.name for free in segments._idle.values() for segment in free]
+            self.assertEqual(len(idle), len(set(idle)))
+            self.assertEqual(len(idle), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
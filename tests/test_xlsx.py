@@ -0,0 +1,199 @@
+"""
+Тесты для Excel (xlsx) конвертера
+"""
+import unittest
+import datetime
+import io
+import json
+
+import openpyxl
+
+from app import app
+from converters.base import ConversionError, CANONICAL
+from converters.engine import ConversionEngine
+from converters.xlsx_converter import XLSXConverter
+
+
+def make_workbook(sheets):
+    """Книга xlsx из словаря {лист: строки}"""
+    workbook = openpyxl.Workbook()
+    workbook.remove(workbook.active)
+    for title, rows in sheets.items():
+        worksheet = workbook.create_sheet(title)
+        for row in rows:
+            worksheet.append(row)
+    output = io.BytesIO()
+    workbook.save(output)
+    return output.getvalue()
+
+
+class TestXLSXConverter(unittest.TestCase):
+    """Тесты для xlsx конвертера"""
+
+    def setUp(self):
+        self.converter = XLSXConverter()
+        self.book = make_workbook({
+            'users': [['name', 'age'], ['Анна', 30], ['Олег', 25]],
+            'cities': [['city'], ['Москва']],
+        })
+
+    def test_round_trip(self):
+        """Тест: записи сохраняются и читаются обратно"""
+        records = [{'name': 'Анна', 'age': 30}, {'name': 'Олег', 'age': None}]
+        data = self.converter.serialize(records)
+        self.assertIsInstance(data, bytes)
+        self.assertTrue(self.converter.validate(data))
+        self.assertEqual(self.converter.parse(data), records)
+
+    def test_nested_records_are_flattened(self):
+        """Тест: вложенные объекты разворачиваются в колонки"""
+        data = self.converter.serialize([{'user': {'name': 'Анна'}, 'tags': [1, 2]}])
+        self.assertEqual(self.converter.parse(data), [{'user.name': 'Анна', 'tags': '[1, 2]'}])
+
+    def test_canonical_sorts_columns(self):
+        """Тест: в каноническом профиле колонки идут по алфавиту"""
+        data = self.converter.serialize([{'b': 1, 'a': 2}], profile=CANONICAL)
+        self.assertEqual(list(self.converter.parse(data)[0]), ['a', 'b'])
+
+    def test_new_columns_after_first_chunk(self):
+        """Тест: поле, впервые появившееся после первого блока, не теряется"""
+        self.converter.CHUNK_SIZE = 2
+        records = [{'a': 1}, {'a': 2}, {'a': 3}, {'a': 4, 'b': 'x'}, {'c': True}]
+        for profile in ('pretty', CANONICAL):
+            data = b''.join(self.converter.iter_serialize(iter(records), profile))
+            parsed = self.converter.parse(data)
+            self.assertEqual(list(parsed[0]), ['a', 'b', 'c'])
+            self.assertEqual(parsed[3], {'a': 4, 'b': 'x', 'c': None})
+            self.assertEqual(parsed[4], {'a': None, 'b': None, 'c': True})
+
+    def test_multiple_sheets(self):
+        """Тест: книга с несколькими листами - объект {лист: записи}"""
+        self.assertEqual(self.converter.parse(self.book), {
+            'users': [{'name': 'Анна', 'age': 30}, {'name': 'Олег', 'age': 25}],
+            'cities': [{'city': 'Москва'}],
+        })
+        # И обратно: объект со списками становится книгой с листами
+        data = self.converter.serialize(self.converter.parse(self.book))
+        self.assertEqual(openpyxl.load_workbook(io.BytesIO(data)).sheetnames, ['users', 'cities'])
+
+    def test_sheet_selection(self):
+        """Тест: выбор листа по имени и номеру"""
+        self.assertEqual(self.converter.parse(self.book, sheet='cities'), [{'city': 'Москва'}])
+        self.assertEqual(self.converter.parse(self.book, sheet='1')[0]['name'], 'Анна')
+        with self.assertRaises(ConversionError):
+            self.converter.parse(self.book, sheet='orders')
+
+    def test_header_and_values(self):
+        """Тест: пустые и повторяющиеся заголовки, даты и пустые строки"""
+        data = make_workbook({'data': [
+            ['id', None, 'id'],
+            [1, 'x', datetime.datetime(2024, 1, 2, 3, 4, 5)],
+            [None, None, None],
+        ]})
+        self.assertEqual(self.converter.parse(data),
+                         [{'id': 1, 'column_2': 'x', 'id.1': '2024-01-02T03:04:05'}])
+
+    def test_iter_records_pushdown(self):
+        """Тест: выбор колонок и фильтр при потоковом чтении"""
+        class AgeFilter:
+            def test(self, record):
+                return record['age'] > 26
+        records = list(self.converter.iter_records(
+            self.book, columns=['age'], record_filter=AgeFilter(), sheet='users'))
+        self.assertEqual(records, [{'age': 30}])
+
+    def test_text_input_rejected(self):
+        """Тест: xlsx нельзя передать текстом"""
+        self.assertFalse(self.converter.validate('name,age'))
+        with self.assertRaises(ConversionError):
+            self.converter.parse('name,age')
+
+    def test_sheet_title(self):
+        """Тест: недопустимые символы и длина имени листа"""
+        data = self.converter.serialize({'a/b': [{'x': 1}], 'A/B': [{'x': 2}], 'c' * 40: []})
+        self.assertEqual(openpyxl.load_workbook(io.BytesIO(data)).sheetnames,
+                         ['a_b', 'A_B (1)', 'c' * 31])
+
+
+class TestXLSXEngine(unittest.TestCase):
+    """Тесты конвертации xlsx через движок"""
+
+    def setUp(self):
+        self.engine = ConversionEngine()
+        self.book = make_workbook({'users': [['name', 'age'], ['Анна', 30], ['Олег', 25]]})
+
+    def test_detect_format(self):
+        """Тест: xlsx определяется по содержимому, без имени файла"""
+        self.assertEqual(self.engine.detect_format(self.book), 'xlsx')
+        self.assertEqual(self.engine.detect_format(io.BytesIO(self.book)), 'xlsx')
+
+    def test_convert_stream_to_csv(self):
+        """Тест: потоковая конвертация xlsx в csv"""
+        _, chunks = self.engine.convert_stream(io.BytesIO(self.book), 'auto', 'csv')
+        self.assertEqual(''.join(chunks).splitlines(), ['name,age', 'Анна,30', 'Олег,25'])
+
+    def test_convert_json_to_xlsx(self):
+        """Тест: результат в xlsx - байты"""
+        result = self.engine.convert('[{"a": 1}]', 'json', 'xlsx')
+        self.assertEqual(self.engine.convert(result, 'xlsx', 'json', options={'sheet': 'data'}),
+                         '[\n  {\n    "a": 1\n  }\n]')
+
+    def test_passthrough_keeps_bytes(self):
+        """Тест: xlsx в xlsx возвращается без изменений"""
+        self.assertEqual(self.engine.convert(self.book, 'xlsx', 'xlsx'), self.book)
+        _, chunks = self.engine.convert_stream(io.BytesIO(self.book), 'xlsx', 'xlsx')
+        self.assertEqual(b''.join(chunks), self.book)
+
+    def test_preview_limits_records(self):
+        """Тест: предпросмотр двоичного источника ограничивается числом записей"""
+        result, truncated = self.engine.convert_preview(self.book, 'xlsx', 'jsonl',
+                                                        max_records=1, max_bytes=10)
+        self.assertTrue(truncated)
+        self.assertEqual(result.strip(), '{"name": "Анна", "age": 30}')
+
+    def test_unknown_option(self):
+        """Тест: параметр чтения, который формат не поддерживает"""
+        with self.assertRaises(ConversionError):
+            self.engine.convert('a\n1\n', 'csv', 'json', options={'sheet': 'data'})
+
+
+class TestXLSXApi(unittest.TestCase):
+    """Тесты xlsx в API"""
+
+    def setUp(self):
+        self.app = app.test_client()
+        self.book = make_workbook({
+            'users': [['name', 'age'], ['Анна', 30]],
+            'cities': [['city'], ['Москва']],
+        })
+
+    def test_upload_with_sheet(self):
+        """Тест: загрузка книги и выбор листа"""
+        response = self.app.post('/api/convert', data={
+            'target_format': 'json',
+            'sheet': 'cities',
+            'file': (io.BytesIO(self.book), 'book.xlsx'),
+        }, content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['source_format'], 'xlsx')
+        self.assertEqual(json.loads(data['result']), [{'city': 'Москва'}])
+
+    def test_xlsx_result_is_attachment(self):
+        """Тест: результат в xlsx отдается файлом, а не строкой в JSON"""
+        response = self.app.post('/api/convert', data={
+            'source_format': 'json',
+            'target_format': 'xlsx',
+            'text_data': '[{"a": 1}, {"a": 2}]',
+            'preview': '1',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype,
+                         'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+        self.assertNotIn('charset', response.content_type)
+        self.assertIn('converted.xlsx', response.headers['Content-Disposition'])
+        self.assertEqual(XLSXConverter().parse(response.data), [{'a': 1}, {'a': 2}])
+
+
+if __name__ == '__main__':
+    unittest.main()